@@ -0,0 +1,315 @@
+# app_logging.py
+# Asynchronous, buffered logging pipeline.
+#
+# Application threads only put records on a queue (QueueHandler). A single background
+# QueueListener thread formats them and hands them to the real handlers, so upload
+# workers never wait on disk I/O or on a shared handler lock.
+#
+# The file handler batches output and flushes when any of these happens:
+#   * FLUSH_MAX_RECORDS records or FLUSH_MAX_BYTES characters are buffered,
+#   * FLUSH_INTERVAL_SECONDS have passed since the last flush (also when idle),
+#   * a record at FLUSH_LEVEL (ERROR) or above arrives,
+#   * logging is shut down (atexit).
+# It rotates when the file reaches LOG_MAX_BYTES and at local midnight, whichever
+# comes first.
+#
+# The file holds one JSON object per line (see JsonLinesFormatter); the console keeps
+# the human-readable format.
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FILE_NAME = 'archive_app.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_MAX_RECORDS = 500
+FLUSH_MAX_BYTES = 64 * 1024
+FLUSH_LEVEL = logging.ERROR
+# Optional `extra={...}` fields copied into the JSON record when present
+JSON_EXTRA_FIELDS = ("user", "action", "path")
+
+_listener = None
+_file_handler = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON object per line:
+    {"ts": "2024-05-01T10:15:02.123", "level": "INFO", "thread": "...", "msg": "...", ...}
+    Tracebacks stay inside "msg", so a record never spans more than one line.
+    """
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["msg"] += "\n" + self.formatException(record.exc_info)
+        for field in JSON_EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_log_line(line):
+    """
+    Parses one line of the log file into a dict with at least ts, level and msg.
+    Plain-text lines written by older versions ('<time> - <LEVEL> - <message>') are
+    accepted too; anything else comes back with level None.
+    """
+    line = line.rstrip("\r\n")
+    if line.startswith("{"):
+        try:
+            return json.loads(line)
+        except ValueError:
+            pass
+    parts = line.split(" - ", 2)
+    if len(parts) == 3 and parts[1] in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        return {"ts": parts[0], "level": parts[1], "msg": parts[2]}
+    return {"ts": "", "level": None, "msg": line}
+
+
+def tail_lines(path, count, predicate=None, chunk_size=8192, max_bytes=1024 * 1024):
+    """
+    Returns the last `count` lines of path (oldest first) without reading the whole file:
+    blocks are read backwards from the end until enough lines are found.
+
+    Args:
+        predicate (callable | None): Only lines for which predicate(line) is true count.
+        max_bytes (int): Stop scanning backwards after this many bytes, so a filter that
+            matches nothing cannot turn into a full-file read.
+
+    Returns:
+        tuple: (lines, end_offset). end_offset is the file size that was read up to,
+        suitable for starting a LogFollower.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end_offset = position = f.tell()
+        matched = []
+        remainder = b"" # Partial line carried over to the next (earlier) block
+        scanned = 0
+        while position > 0 and len(matched) < count and scanned < max_bytes:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            scanned += read_size
+            pieces = block.split(b"\n")
+            # The first piece may be the tail of a line that started in an earlier block
+            remainder = pieces.pop(0) if position > 0 else b""
+            for raw in reversed(pieces):
+                if not raw.strip():
+                    continue
+                line = raw.decode("utf-8", errors="replace").rstrip("\r")
+                if predicate is None or predicate(line):
+                    matched.append(line)
+                    if len(matched) >= count:
+                        break
+    matched.reverse()
+    return matched, end_offset
+
+
+class LogFollower:
+    """
+    Incrementally reads lines appended to a log file since the last call ("tail -f").
+    Survives rotation: if the file shrinks below the remembered offset, reading
+    restarts from the beginning of the new file.
+    """
+    def __init__(self, path, offset=None):
+        self.path = path
+        self._partial = b""
+        try:
+            self.offset = os.path.getsize(path) if offset is None else offset
+        except OSError:
+            self.offset = 0
+
+    def read_new(self, max_bytes=256 * 1024):
+        """Returns complete new lines (str) appended since the last call."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset: # Rotated or truncated
+            self.offset = 0
+            self._partial = b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, max_bytes))
+        self.offset += len(data)
+        data = self._partial + data
+        pieces = data.split(b"\n")
+        self._partial = pieces.pop() # Incomplete last line waits for the next call
+        return [p.decode("utf-8", errors="replace").rstrip("\r") for p in pieces if p.strip()]
+
+
+def _next_midnight(now=None):
+    tomorrow = datetime.date.fromtimestamp(now or time.time()) + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time()).timestamp()
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that writes records in batches instead of one write+flush each.
+    Meant to be driven by a single QueueListener thread.
+    """
+    def __init__(self, filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                 flush_interval=FLUSH_INTERVAL_SECONDS, max_records=FLUSH_MAX_RECORDS,
+                 max_bytes_buffered=FLUSH_MAX_BYTES, flush_level=FLUSH_LEVEL, encoding="utf-8"):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.flush_interval = flush_interval
+        self.max_records = max_records
+        self.max_bytes_buffered = max_bytes_buffered
+        self.flush_level = flush_level
+        self._buffer = []
+        self._buffered_chars = 0
+        self._last_flush = time.monotonic()
+        # A file left over from a previous day is rotated on the first flush
+        try:
+            self._rollover_at = _next_midnight(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self._rollover_at = _next_midnight()
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        self._buffer.append(message)
+        self._buffered_chars += len(message)
+        if (record.levelno >= self.flush_level or
+                len(self._buffer) >= self.max_records or
+                self._buffered_chars >= self.max_bytes_buffered or
+                time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush_if_due(self):
+        """Flushes a partially filled buffer once the flush interval has passed."""
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buffer:
+                data = "".join(self._buffer)
+                self._buffer.clear()
+                self._buffered_chars = 0
+                try:
+                    if self.stream is None:
+                        self.stream = self._open()
+                    # Rotate at midnight, or before the batch would push the file past maxBytes
+                    size = self.stream.tell()
+                    if size > 0 and (time.time() >= self._rollover_at or
+                                     (self.maxBytes > 0 and size + len(data) >= self.maxBytes)):
+                        self.doRollover()
+                        self._rollover_at = _next_midnight()
+                    self.stream.write(data)
+                except Exception:
+                    # Same fallback as Handler.handleError, without a record to report
+                    if logging.raiseExceptions:
+                        sys.stderr.write("--- Logging error while flushing buffered records ---\n")
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener that also gives buffered handlers a chance to flush while idle."""
+    def __init__(self, log_queue, *handlers, poll_interval=FLUSH_INTERVAL_SECONDS):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.poll_interval = poll_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.poll_interval if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    flush_if_due = getattr(handler, "flush_if_due", None)
+                    if flush_if_due:
+                        flush_if_due()
+
+
+def configure_logging(log_file_path, level=logging.INFO, console=True):
+    """
+    Routes the root logger through the queue pipeline. Safe to call more than once;
+    a previous pipeline is shut down first.
+
+    Returns:
+        QueueListener: The running listener.
+    """
+    global _listener, _file_handler
+    shutdown_logging()
+
+    _file_handler = BufferedRotatingFileHandler(log_file_path)
+    _file_handler.setFormatter(JsonLinesFormatter())
+    handlers = [_file_handler]
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger()
+    logger.setLevel(level)
+    # Clear existing handlers to prevent duplicate logs if this function is called again
+    if logger.hasHandlers():
+        logger.handlers.clear()
+    logger.addHandler(QueueHandler(log_queue))
+
+    _listener = FlushingQueueListener(log_queue, *handlers)
+    _listener.start()
+    return _listener
+
+
+def get_log_file_path():
+    """Absolute path of the active log file, or None before configure_logging."""
+    return _file_handler.baseFilename if _file_handler else None
+
+
+def flush_logs():
+    """Writes out records the listener has already buffered (e.g. before reading the log back)."""
+    if _file_handler:
+        _file_handler.flush()
+
+
+def shutdown_logging():
+    """Drains the queue, flushes and closes the handlers. Registered with atexit."""
+    global _listener, _file_handler
+    if _listener is None:
+        return
+    _listener.stop() # Processes every record still queued, then joins the thread
+    for handler in _listener.handlers:
+        try:
+            handler.flush()
+            handler.close()
+        except Exception:
+            pass
+    _listener = None
+    _file_handler = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,53 @@
+# conftest.py
+# Shared fixtures for the benchmark suite. The archive size is set with environment
+# variables so CI and a developer machine can run the same suite at different scales:
+#   BENCH_COMPANIES (default 3), BENCH_FILES_PER_LEAF (5), BENCH_BACKUPS_PER_FILE (3)
+import copy
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from controllers.archive_controller import ArchiveController, DEFAULT_ARCHIVE_STRUCTURE # noqa: E402
+from synthetic_archive import generate_archive # noqa: E402
+
+BENCH_COMPANIES = int(os.environ.get("BENCH_COMPANIES", 3))
+BENCH_FILES_PER_LEAF = int(os.environ.get("BENCH_FILES_PER_LEAF", 5))
+BENCH_BACKUPS_PER_FILE = int(os.environ.get("BENCH_BACKUPS_PER_FILE", 3))
+
+
+@pytest.fixture(scope="session")
+def archive(tmp_path_factory):
+    """A read-only synthetic archive shared by every benchmark that only reads."""
+    root = tmp_path_factory.mktemp("archives")
+    summary = generate_archive(str(root), BENCH_COMPANIES, BENCH_FILES_PER_LEAF, BENCH_BACKUPS_PER_FILE)
+    summary["path"] = str(root)
+    return summary
+
+
+@pytest.fixture
+def controller(archive):
+    return ArchiveController(copy.deepcopy(DEFAULT_ARCHIVE_STRUCTURE), archive["path"])
+
+
+@pytest.fixture
+def writable_controller(tmp_path):
+    """Controller over an empty archive, for benchmarks that write."""
+    return ArchiveController(copy.deepcopy(DEFAULT_ARCHIVE_STRUCTURE), str(tmp_path / "archives"))
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    """Fifty 64 KiB files to upload."""
+    folder = tmp_path / "incoming"
+    folder.mkdir()
+    payload = os.urandom(64 * 1024)
+    paths = []
+    for i in range(50):
+        path = folder / f"scan_{i:03d}.pdf"
+        path.write_bytes(payload)
+        paths.append(str(path))
+    return paths
@@ -0,0 +1,88 @@
+# synthetic_archive.py
+# Builds a synthetic archive for the benchmarks: N companies laid out with the app's
+# structure template, M files in every leaf folder and K timestamped backups per file.
+#
+#   python benchmarks/synthetic_archive.py <target_dir> --companies 5 --files 10 --backups 3
+import argparse
+import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.archive_controller import ArchiveController, DEFAULT_ARCHIVE_STRUCTURE # noqa: E402
+
+FILE_EXTENSIONS = (".pdf", ".docx", ".xlsx", ".jpg", ".png")
+
+
+def iter_leaves(structure):
+    """Yields (header, subheader, section, subsection) for every leaf folder of a structure template."""
+    for header, subheaders in structure.items():
+        if isinstance(subheaders, list):
+            for subheader in subheaders:
+                yield header, subheader, "", ""
+            continue
+        for subheader, sections in subheaders.items():
+            if not sections:
+                yield header, subheader, "", ""
+                continue
+            for section, subsections in sections.items():
+                if not subsections:
+                    yield header, subheader, section, ""
+                for subsection in subsections or []:
+                    yield header, subheader, section, subsection
+
+
+def generate_archive(archives_path, companies=3, files_per_leaf=5, backups_per_file=3,
+                     file_size=1024, structure=DEFAULT_ARCHIVE_STRUCTURE):
+    """
+    Creates the synthetic archive under archives_path.
+
+    Returns:
+        dict: companies, leaves, files and backups created, plus a sample
+        (company, header, subheader, section, subsection, filename) for lookups.
+    """
+    controller = ArchiveController(structure, archives_path)
+    payload = os.urandom(file_size)
+    base_time = datetime.datetime(2024, 1, 1, 9, 0, 0)
+    leaves = list(iter_leaves(structure))
+    files = backups = 0
+    sample = None
+    for c in range(companies):
+        company = controller.create_company_structure(f"Company {c:03d}")
+        for leaf in leaves:
+            folder = controller.folder_for(company, *leaf)
+            os.makedirs(folder, exist_ok=True)
+            for f in range(files_per_leaf):
+                ext = FILE_EXTENSIONS[f % len(FILE_EXTENSIONS)]
+                name = f"{leaf[2] or leaf[1]}_doc{f:03d}{ext}"
+                with open(os.path.join(folder, name), "wb") as out:
+                    out.write(payload)
+                files += 1
+                for b in range(backups_per_file):
+                    stamp = (base_time + datetime.timedelta(days=b, seconds=f)).strftime("%Y%m%d%H%M%S")
+                    base, _ = os.path.splitext(name)
+                    with open(os.path.join(folder, f"{base}_backup_{stamp}{ext}"), "wb") as out:
+                        out.write(payload)
+                    backups += 1
+                if sample is None:
+                    sample = (company,) + leaf + (name,)
+    return {"companies": companies, "leaves": len(leaves), "files": files,
+            "backups": backups, "sample": sample}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic archive for benchmarking.")
+    parser.add_argument("target", help="Directory to create the archive in")
+    parser.add_argument("--companies", type=int, default=3)
+    parser.add_argument("--files", type=int, default=5, help="Files per leaf folder")
+    parser.add_argument("--backups", type=int, default=3, help="Backups per file")
+    parser.add_argument("--size", type=int, default=1024, help="Bytes per file")
+    args = parser.parse_args()
+    summary = generate_archive(args.target, args.companies, args.files, args.backups, args.size)
+    print(f"Created {summary['files']} files and {summary['backups']} backups in "
+          f"{summary['companies']} companies x {summary['leaves']} leaf folders under {args.target}")
+
+
+if __name__ == "__main__":
+    main()
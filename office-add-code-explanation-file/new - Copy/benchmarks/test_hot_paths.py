@@ -0,0 +1,107 @@
+# test_hot_paths.py
+# Benchmarks for upload, batch upload, search, dashboard statistics, folder options,
+# rollback listing, company structure creation, naming pre-check and translation lookup. The upload,
+# dashboard, search and rollback benchmarks drive the ArchiveController methods that
+# FileArchiveApp.perform_file_upload, open_dashboard, search_archive and the rollback
+# dialog delegate to, so they run without a display.
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import translations # noqa: E402
+from controllers.archive_controller import DEFAULT_ARCHIVE_STRUCTURE # noqa: E402
+from controllers.naming_policy import NamingPolicy # noqa: E402
+from synthetic_archive import iter_leaves # noqa: E402
+
+UPLOAD_WORKERS = 4 # Same as FileArchiveApp's executor
+
+
+def test_perform_file_upload(benchmark, writable_controller, source_files):
+    company = writable_controller.create_company_structure("Upload Co")
+    leaf = next(iter_leaves(DEFAULT_ARCHIVE_STRUCTURE))
+    folder = writable_controller.folder_for(company, *leaf)
+    # The same name each round, so every upload after the first also creates a backup
+    benchmark(writable_controller.store_file, folder, source_files[0], "report.pdf")
+
+
+def test_batch_upload_throughput(benchmark, writable_controller, source_files):
+    company = writable_controller.create_company_structure("Batch Co")
+    folders = [writable_controller.folder_for(company, *leaf) for leaf in iter_leaves(DEFAULT_ARCHIVE_STRUCTURE)]
+
+    def batch():
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            list(executor.map(lambda i: writable_controller.store_file(
+                folders[i % len(folders)], source_files[i], os.path.basename(source_files[i])),
+                range(len(source_files))))
+
+    benchmark(batch)
+
+
+@pytest.mark.parametrize("query", ["doc001", "backup", "no-such-file"])
+def test_search(benchmark, controller, query):
+    results = benchmark(controller.search, query)
+    assert query != "doc001" or results
+
+
+def test_dashboard_stats(benchmark, controller, archive):
+    total_files, _, _ = benchmark(controller.collect_stats)
+    assert total_files == archive["files"] + archive["backups"]
+
+
+def test_get_dynamic_folder_options_uncached(benchmark, controller, archive):
+    company, header = archive["sample"][0], "Working Papers File"
+    base = os.path.join(controller.archives_path, company, header)
+    template = controller.structure[header]
+
+    def lookup():
+        controller.clear_cache()
+        return controller.get_dynamic_folder_options(base, template)
+
+    assert benchmark(lookup)
+
+
+def test_get_dynamic_folder_options_cached(benchmark, controller, archive):
+    company, header = archive["sample"][0], "Working Papers File"
+    base = os.path.join(controller.archives_path, company, header)
+    template = controller.structure[header]
+    controller.get_dynamic_folder_options(base, template)
+    assert benchmark(controller.get_dynamic_folder_options, base, template)
+
+
+def test_rollback_listing(benchmark, controller, archive):
+    company, header, subheader, section, subsection, filename = archive["sample"]
+    folder = controller.folder_for(company, header, subheader, section, subsection)
+    backups = benchmark(controller.list_backups, folder, filename)
+    assert len(backups) == int(os.environ.get("BENCH_BACKUPS_PER_FILE", 3))
+
+
+def test_create_company_structure_existing(benchmark, controller, archive):
+    # Verifying an existing company is what every upload pays when the company changes
+    benchmark(controller.create_company_structure, "Company 000")
+
+
+def test_create_company_structure_new(benchmark, writable_controller):
+    counter = iter(range(10**9))
+    benchmark(lambda: writable_controller.create_company_structure(f"New Co {next(counter)}"))
+
+
+def test_naming_precheck_batch(benchmark):
+    # What batch_upload pays before its rename prompt for a 10k-file selection
+    policy = NamingPolicy(DEFAULT_ARCHIVE_STRUCTURE, {"Working Papers File/B1": "{prefix}_{date}_{seq}{any}"})
+    names = [f"scan_{i:05d}.pdf" for i in range(10000)]
+    review = benchmark(policy.review, names, "Working Papers File", "B1", "B10", "B10A")
+    assert len(review.invalid_names) == len(names)
+    assert review.fixed[-1].startswith("B10A_") and review.fixed[-1].endswith("_10000_scan_09999.pdf")
+
+
+def test_translation_lookup(benchmark):
+    keys = list(translations.TRANSLATIONS[translations.DEFAULT_LANGUAGE].keys())
+
+    def lookup_all():
+        for key in keys:
+            translations.get_translation(key)
+
+    benchmark(lookup_all)
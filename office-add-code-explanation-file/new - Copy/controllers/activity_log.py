@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+
+ACTIVITY_FLUSH_RECORDS = 50 # Write buffered rows once this many are pending...
+ACTIVITY_FLUSH_SECONDS = 2.0 # ...or once the oldest pending row is this old
+
+# Action names stored in the activity table
+ACTION_UPLOAD = "upload"
+ACTION_SCAN = "scan"
+ACTION_ROLLBACK = "rollback"
+ACTION_LOGIN = "login"
+ACTION_LOGOUT = "logout"
+ACTION_USER_ADD = "user_add"
+ACTION_USER_EDIT = "user_edit"
+ACTION_USER_DELETE = "user_delete"
+ACTION_USER_IMPORT = "user_import"
+ACTION_USER_EXPORT = "user_export"
+ACTION_PASSWORD_CHANGE = "password_change"
+ACTION_ARCHIVE_EXPORT = "archive_export"
+ACTION_ARCHIVE_IMPORT = "archive_import"
+
+
+class ActivityLog:
+    """
+    Records who did what, to which path and when, in the activity table of users.db.
+
+    Upload workers record one row per file, so rows are buffered and written in batches
+    (one transaction per ACTIVITY_FLUSH_RECORDS rows or ACTIVITY_FLUSH_SECONDS). Reads
+    flush first, so the activity view always includes everything recorded so far.
+    """
+    def __init__(self, repository):
+        self._repository = repository
+        self._pending = []
+        self._oldest_pending = None
+        self._lock = threading.Lock()
+
+    def record(self, username, action, path="", details=""):
+        """Queues one activity row. Never raises: auditing must not break the action itself."""
+        now = time.time()
+        with self._lock:
+            self._pending.append((now, username, action, path or "", details or ""))
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+            due = (len(self._pending) >= ACTIVITY_FLUSH_RECORDS or
+                   now - self._oldest_pending >= ACTIVITY_FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered rows in one transaction."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._oldest_pending = None
+        if not rows:
+            return
+        try:
+            self._repository.add_activity_many(rows)
+        except Exception as e:
+            logging.error(f"Failed to write {len(rows)} activity records: {e}", exc_info=True)
+
+    def recent(self, limit=10, username=None, action=None, path_contains=None, before_id=None, after_id=None):
+        """Newest-first activity rows (see UserRepository.recent_activity)."""
+        self.flush()
+        return self._repository.recent_activity(limit=limit, username=username, action=action,
+                                                path_contains=path_contains, before_id=before_id,
+                                                after_id=after_id)
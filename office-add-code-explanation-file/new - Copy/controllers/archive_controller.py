@@ -1,15 +1,77 @@
+import datetime
+import hashlib
 import os
 import logging
+import platform
+import re
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from controllers.archive_structure import ArchiveStructure, DEFAULT_ARCHIVE_STRUCTURE
+from controllers.integrity_scrubber import SCRUB_READ_CHUNK, file_sha256
+from instrumentation import OP_BACKUP, OP_COPY, OP_SEARCH, OP_STATS, metrics
+
+__all__ = ["ArchiveController", "DEFAULT_ARCHIVE_STRUCTURE", "backup_pattern", "sanitize_path"]
+
+INVALID_PATH_CHARS = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
+
+
+def sanitize_path(text):
+    """Sanitize text for use in file paths, preserving Unicode characters"""
+    # Replace filesystem-unsafe characters with safe ones
+    for char in INVALID_PATH_CHARS:
+        text = text.replace(char, '_')
+
+    # Ensure the path is valid for the current OS
+    if platform.system() == 'Windows':
+        # Handle Windows-specific path limitations (260 char path limit, trailing spaces/dots)
+        text = text.rstrip('. ')
+        # Prefix long paths with \\?\ on Windows to handle paths > 260 chars
+        if len(text) > 200:  # Conservative threshold
+            return f"\\\\?\\{text}"
+
+    return text
+
+
+def backup_pattern(filename):
+    """Regex matching backups of filename: <base>_backup_<YYYYmmddHHMMSS>[_<n>]<ext>."""
+    base_name, ext = os.path.splitext(filename)
+    return re.compile(re.escape(base_name) + r"_backup_(\d{14}(?:_\d+)?)" + re.escape(ext) + r"$")
+
+
+def _copy_hashing(source_path, dest_path):
+    """shutil.copy2 that also returns the SHA-256 of the bytes read from source_path."""
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(SCRUB_READ_CHUNK), b""):
+            digest.update(chunk)
+            dst.write(chunk)
+    shutil.copystat(source_path, dest_path)
+    return digest.hexdigest()
+
 
 class ArchiveController:
     """
     Handles dynamic discovery of archive folders based on a template structure and on-disk state.
     """
-    def __init__(self, structure, archives_path):
-        # structure: nested dict of headers → subheaders → sections → subsections
-        self.structure = structure
+    def __init__(self, structure, archives_path, checksums=None):
+        # structure: compiled ArchiveStructure (a template dict is compiled here)
+        self.structure = structure if isinstance(structure, ArchiveStructure) else ArchiveStructure(structure)
         self.archives_path = archives_path
+        self.checksums = checksums # ArchiveIndexRepository receiving the checksum of each stored file, or None
         self.folder_cache = {}
+        self.verified_companies = set() # (safe company name, structure revision) already created on disk
+        self._dest_locks = {} # normalized destination path -> [lock, number of users]
+        self._dest_locks_guard = threading.Lock()
+
+    def set_structure(self, structure):
+        """Switches to a new compiled structure (e.g. after an admin added a folder)."""
+        self.structure = structure
+        self.verified_companies.clear()
+        self.clear_cache()
 
     def get_dynamic_folder_options(self, base_folder_path, template_options):
         """
@@ -17,7 +79,7 @@ class ArchiveController:
 
         Args:
             base_folder_path (str): Path on disk to scan.
-            template_options (dict|list|None): Template-defined names.
+            template_options (Mapping|list|tuple|None): Template-defined names.
 
         Returns:
             list[str]: Combined and sorted unique folder names.
@@ -40,9 +102,9 @@ class ArchiveController:
         else:
             logging.debug(f"Base folder path does not exist: {base_folder_path}")
 
-        if isinstance(template_options, dict):
+        if isinstance(template_options, Mapping):
             template_folders = set(template_options.keys())
-        elif isinstance(template_options, list):
+        elif isinstance(template_options, (list, tuple)):
             template_folders = set(template_options)
 
         combined = sorted(template_folders.union(disk_folders))
@@ -67,4 +129,236 @@ class ArchiveController:
             for cached_path in list(self.folder_cache.keys()):
                 if cached_path.startswith(path_prefix):
                     del self.folder_cache[cached_path]
-            logging.info(f"ArchiveController cache cleared for prefix: {path_prefix}")
\ No newline at end of file
+            logging.info(f"ArchiveController cache cleared for prefix: {path_prefix}")
+    # --------------------------------------------------------------------------
+    # Company folders and file storage
+    # --------------------------------------------------------------------------
+    def create_company_structure(self, company_name):
+        """
+        Creates (or verifies) the folder tree of self.structure for a company.
+
+        Returns:
+            str: The sanitized company folder name.
+        """
+        safe_company_name = sanitize_path(company_name)
+        key = (safe_company_name, self.structure.revision)
+        if key in self.verified_companies:
+            return safe_company_name
+        base_path = os.path.join(self.archives_path, safe_company_name)
+        logging.info(f"Creating/Verifying structure for company: {company_name} (Safe Path: {safe_company_name})")
+        os.makedirs(base_path, exist_ok=True)
+
+        for folder in self.structure.folders: # Parents before children
+            os.makedirs(os.path.join(base_path, folder), exist_ok=True)
+
+        self.verified_companies.add(key)
+        logging.info(f"Structure verification complete for: {safe_company_name}")
+        return safe_company_name
+
+    def folder_for(self, safe_company_name, header, subheader="", section="", subsection="", known_section_only=False):
+        """
+        Archive folder for a header/subheader/section/subsection selection. The subsection
+        is only used when the template defines subsections for that section.
+
+        Args:
+            known_section_only (bool): Ignore a section the template does not list under
+                the subheader (the browse, preview and rollback dialogs); uploads keep it.
+        """
+        return os.path.join(self.archives_path, safe_company_name,
+                            *self.structure.folder_parts(header, subheader, section, subsection,
+                                                         known_section_only=known_section_only))
+
+    def store_file(self, dest_folder, source_file_path, filename):
+        """
+        Copies source_file_path into dest_folder as filename. An existing file of that name
+        is first renamed to <base>_backup_<timestamp>[_<n>]<ext>. Uploads of the same name
+        from several workers (e.g. dropped folders holding equally named files) are
+        serialized per destination, so each one versions the previous copy.
+
+        The source is hashed while it is copied and the copy is read back and compared,
+        so the SHA-256 recorded in checksums is the one of the source, not of whatever
+        reached the disk. A copy that does not match is removed and the previous version
+        put back.
+
+        Returns:
+            str: The destination file path.
+
+        Raises:
+            IOError: If the folder cannot be created or the file cannot be versioned, copied
+                or verified.
+        """
+        try:
+            os.makedirs(dest_folder, exist_ok=True)
+        except OSError as e_mkdir:
+            raise IOError(f"Failed to create directory: {dest_folder}") from e_mkdir
+
+        dest_file = os.path.join(dest_folder, filename)
+        with self._dest_lock(dest_file):
+            return self._store_locked(dest_folder, dest_file, source_file_path, filename)
+
+    @contextmanager
+    def _dest_lock(self, dest_file):
+        key = os.path.normcase(os.path.abspath(dest_file))
+        with self._dest_locks_guard:
+            entry = self._dest_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._dest_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._dest_locks[key]
+
+    def _store_locked(self, dest_folder, dest_file, source_file_path, filename):
+        backup_path = None
+        if os.path.exists(dest_file):
+            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            base, ext = os.path.splitext(filename)
+            backup_path = os.path.join(dest_folder, f"{base}_backup_{timestamp}{ext}")
+            count = 0
+            while os.path.exists(backup_path): # Handle collision
+                count += 1
+                backup_path = os.path.join(dest_folder, f"{base}_backup_{timestamp}_{count}{ext}")
+            try:
+                with metrics.timer(OP_BACKUP):
+                    os.rename(dest_file, backup_path)
+                metrics.increment("backups_created")
+                logging.info(f"Existing file versioned: {dest_file} -> {backup_path}")
+            except OSError as e_mv:
+                raise IOError(f"Error versioning existing file '{filename}'") from e_mv
+
+        try:
+            with metrics.timer(OP_COPY):
+                sha256 = _copy_hashing(source_file_path, dest_file)
+            copied_sha256 = file_sha256(dest_file)
+        except OSError as e_copy:
+            try:
+                if os.path.exists(dest_file):
+                    os.remove(dest_file)
+                if backup_path:
+                    os.replace(backup_path, dest_file)
+            except OSError as e_restore:
+                logging.error(f"Could not restore {dest_file} after a failed copy: {e_restore}")
+            raise IOError("Failed to copy file to destination") from e_copy
+        if copied_sha256 != sha256:
+            logging.error(f"Copy of {source_file_path} to {dest_file} does not match the source "
+                          f"({copied_sha256} != {sha256}); removing it.")
+            os.remove(dest_file)
+            if backup_path:
+                os.replace(backup_path, dest_file)
+            raise IOError(f"The copy of '{filename}' did not verify against the source")
+        metrics.increment("files_stored")
+        if self.checksums is not None:
+            try:
+                stat = os.stat(dest_file)
+                self.checksums.save_checksum(dest_file, stat.st_size, stat.st_mtime, sha256, time.time())
+            except Exception as e:
+                # The scrubber's archive walk records it later (from the file on disk)
+                logging.warning(f"Could not record the checksum of {dest_file}: {e}")
+        return dest_file
+
+    def list_backups(self, folder, filename):
+        """
+        Backups of filename in folder, newest first.
+
+        Returns:
+            list[str]: Backup file names.
+        """
+        pattern = backup_pattern(filename)
+        backups = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    match = pattern.match(entry.name)
+                    if match and entry.is_file():
+                        backups.append((match.group(1), entry.name))
+        except OSError as e:
+            logging.warning(f"Could not list backups in '{folder}': {e}")
+            return []
+        # Sort by the 14-digit timestamp, then by collision counter
+        backups.sort(key=lambda item: (item[0][:14], int(item[0][15:] or 0)), reverse=True)
+        return [name for _, name in backups]
+
+    # --------------------------------------------------------------------------
+    # Statistics and search
+    # --------------------------------------------------------------------------
+    @metrics.timed(OP_STATS)
+    def collect_stats(self):
+        """
+        Walks the archive once.
+
+        Returns:
+            tuple: (total_files, total_size_bytes, {extension: count}).
+        """
+        total_files, total_size, file_types = 0, 0, {}
+        stack = [self.archives_path]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        total_size += entry.stat().st_size
+                    except OSError:
+                        continue
+                    total_files += 1
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    file_types[ext] = file_types.get(ext, 0) + 1
+        return total_files, total_size, file_types
+
+    @metrics.timed(OP_SEARCH)
+    def search(self, query, file_type_filter="All", start_date=None, end_date=None, extensions=(), text_matches=()):
+        """
+        Finds folders and files whose name contains query (case-insensitive).
+
+        Args:
+            file_type_filter (str): "All", or "Images" to keep only files with one of extensions.
+            start_date / end_date (datetime | None): Modification time bounds.
+            text_matches (iterable): Paths whose content matched (OCR index); appended after
+                the name matches, subject to the same filters.
+
+        Returns:
+            list[tuple]: (full_path, name, modified datetime or None).
+        """
+        query = query.lower()
+        results = []
+        for root, dirs, files in os.walk(self.archives_path):
+            file_names = set(files)
+            for name in dirs + files:
+                if query not in name.lower():
+                    continue
+                full_path = os.path.join(root, name)
+                if file_type_filter != "All" and name in file_names:
+                    if file_type_filter == "Images" and os.path.splitext(name)[1].lower() not in extensions:
+                        continue
+                try:
+                    mod_time = datetime.datetime.fromtimestamp(os.stat(full_path).st_mtime)
+                except OSError:
+                    mod_time = None
+                if start_date and mod_time and mod_time < start_date:
+                    continue
+                if end_date and mod_time and mod_time > end_date:
+                    continue
+                results.append((full_path, name, mod_time))
+        found = {full_path for full_path, _, _ in results}
+        for full_path in text_matches:
+            name = os.path.basename(full_path)
+            if full_path in found or not os.path.isfile(full_path):
+                continue
+            if file_type_filter == "Images" and os.path.splitext(name)[1].lower() not in extensions:
+                continue
+            try:
+                mod_time = datetime.datetime.fromtimestamp(os.stat(full_path).st_mtime)
+            except OSError:
+                continue
+            if (start_date and mod_time < start_date) or (end_date and mod_time > end_date):
+                continue
+            results.append((full_path, name, mod_time))
+        return results
@@ -0,0 +1,167 @@
+import re
+
+LOOKUP_CHUNK = 500 # Paths / checksums per IN (...) lookup; below SQLite's parameter limit
+
+# Statements over the ocr_documents / ocr_text (schema v6) and file_checksums (v7, v8)
+# tables of users.db. Module constants, so every call hits the prepared-statement cache.
+SQL_UPSERT_OCR_DOCUMENT = """
+    INSERT INTO ocr_documents(path, mtime, size, indexed_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET mtime=excluded.mtime, size=excluded.size, indexed_at=excluded.indexed_at
+    RETURNING id
+"""
+SQL_DELETE_OCR_TEXT = "DELETE FROM ocr_text WHERE rowid=?"
+SQL_INSERT_OCR_TEXT = "INSERT INTO ocr_text(rowid, content) VALUES (?, ?)"
+SQL_SEARCH_OCR_TEXT = """
+    SELECT d.path FROM ocr_text JOIN ocr_documents d ON d.id = ocr_text.rowid
+    WHERE ocr_text MATCH ? ORDER BY rank LIMIT ?
+"""
+SQL_UPSERT_CHECKSUM = """
+    INSERT INTO file_checksums(path, size, mtime, sha256, recorded_at, verified_at, status)
+    VALUES (?, ?, ?, ?, ?, ?, 'ok')
+    ON CONFLICT(path) DO UPDATE SET size=excluded.size, mtime=excluded.mtime, sha256=excluded.sha256,
+        recorded_at=excluded.recorded_at, verified_at=excluded.verified_at, status='ok'
+"""
+SQL_DUE_CHECKSUMS = """
+    SELECT path, size, mtime, sha256 FROM file_checksums
+    WHERE verified_at < ? ORDER BY mtime DESC LIMIT ?
+"""
+SQL_MARK_VERIFIED = "UPDATE file_checksums SET verified_at=?, status=? WHERE path=?"
+SQL_DELETE_CHECKSUM = "DELETE FROM file_checksums WHERE path=?"
+
+
+class ArchiveIndexRepository:
+    """
+    Data-access layer for what users.db records about the archive's files: the OCR
+    full-text index and the SHA-256 checksums used by the scrubber and package
+    import/export.
+
+    The tables live in users.db, so this class borrows connections from the
+    UserRepository's pool and relies on its migrate() for the schema; it only holds the
+    queries.
+    """
+    def __init__(self, repository):
+        self._repository = repository
+
+    # --------------------------------------------------------------------------
+    # OCR text (full-text index of archived scans)
+    # --------------------------------------------------------------------------
+    def save_ocr_text(self, path, mtime, size, text, now):
+        """Stores (or replaces) the recognized text of path, recorded for that mtime/size."""
+        with self._repository.transaction() as conn:
+            doc_id = conn.execute(SQL_UPSERT_OCR_DOCUMENT, (path, mtime, size, now)).fetchone()[0]
+            conn.execute(SQL_DELETE_OCR_TEXT, (doc_id,))
+            conn.execute(SQL_INSERT_OCR_TEXT, (doc_id, text))
+
+    def ocr_state(self, paths):
+        """
+        Returns:
+            dict: {path: (mtime, size)} for the paths that have been read already.
+        """
+        paths = list(paths)
+        state = {}
+        with self._repository.connection() as conn:
+            for start in range(0, len(paths), LOOKUP_CHUNK):
+                chunk = paths[start:start + LOOKUP_CHUNK]
+                sql = f"SELECT path, mtime, size FROM ocr_documents WHERE path IN ({','.join('?' * len(chunk))})"
+                state.update((path, (mtime, size)) for path, mtime, size in conn.execute(sql, chunk))
+        return state
+
+    def search_ocr_text(self, query, limit=200):
+        """
+        Paths whose recognized text contains every word of query (word prefixes match),
+        best matches first.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"*' for word in words) # Quoted: no FTS operators from user input
+        with self._repository.connection() as conn:
+            return [row[0] for row in conn.execute(SQL_SEARCH_OCR_TEXT, (match, limit))]
+
+    def count_ocr_documents(self):
+        with self._repository.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM ocr_documents").fetchone()[0]
+
+    # --------------------------------------------------------------------------
+    # File checksums (integrity scrubber)
+    # --------------------------------------------------------------------------
+    def save_checksum(self, path, size, mtime, sha256, now):
+        """Records sha256 as the reference checksum of path (status ok, verified now)."""
+        with self._repository.transaction() as conn:
+            conn.execute(SQL_UPSERT_CHECKSUM, (path, size, mtime, sha256, now, now))
+
+    def checksum_state(self, paths):
+        """
+        Returns:
+            dict: {path: (mtime, size)} for the paths that have a recorded checksum.
+        """
+        paths = list(paths)
+        state = {}
+        with self._repository.connection() as conn:
+            for start in range(0, len(paths), LOOKUP_CHUNK):
+                chunk = paths[start:start + LOOKUP_CHUNK]
+                sql = f"SELECT path, mtime, size FROM file_checksums WHERE path IN ({','.join('?' * len(chunk))})"
+                state.update((path, (mtime, size)) for path, mtime, size in conn.execute(sql, chunk))
+        return state
+
+    def recorded_checksums(self, paths):
+        """
+        Returns:
+            dict: {path: (size, mtime, sha256)} for the paths whose last verification passed.
+        """
+        paths = list(paths)
+        recorded = {}
+        with self._repository.connection() as conn:
+            for start in range(0, len(paths), LOOKUP_CHUNK):
+                chunk = paths[start:start + LOOKUP_CHUNK]
+                sql = (f"SELECT path, size, mtime, sha256 FROM file_checksums "
+                       f"WHERE status != 'corrupt' AND path IN ({','.join('?' * len(chunk))})")
+                recorded.update((path, (size, mtime, sha256)) for path, size, mtime, sha256 in conn.execute(sql, chunk))
+        return recorded
+
+    def paths_by_checksum(self, sha256s):
+        """
+        Returns:
+            dict: {sha256: [paths]} for the checksums recorded for at least one intact file.
+        """
+        sha256s = list(sha256s)
+        found = {}
+        with self._repository.connection() as conn:
+            for start in range(0, len(sha256s), LOOKUP_CHUNK):
+                chunk = sha256s[start:start + LOOKUP_CHUNK]
+                sql = (f"SELECT sha256, path FROM file_checksums "
+                       f"WHERE status != 'corrupt' AND sha256 IN ({','.join('?' * len(chunk))})")
+                for sha256, path in conn.execute(sql, chunk):
+                    found.setdefault(sha256, []).append(path)
+        return found
+
+    def due_checksums(self, verified_before, limit):
+        """
+        Returns:
+            list: (path, size, mtime, sha256) last verified before verified_before,
+            most recently modified first.
+        """
+        with self._repository.connection() as conn:
+            return conn.execute(SQL_DUE_CHECKSUMS, (verified_before, limit)).fetchall()
+
+    def mark_checksum(self, path, status, now):
+        with self._repository.transaction() as conn:
+            conn.execute(SQL_MARK_VERIFIED, (now, status, path))
+
+    def delete_checksum(self, path):
+        with self._repository.transaction() as conn:
+            conn.execute(SQL_DELETE_CHECKSUM, (path,))
+
+    def checksum_summary(self):
+        """
+        Returns:
+            dict: {status: number of files}.
+        """
+        with self._repository.connection() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM file_checksums GROUP BY status"))
+
+    def checksum_problems(self, limit=50):
+        """Paths whose last verification failed (status other than ok), newest first."""
+        with self._repository.connection() as conn:
+            return conn.execute("SELECT path, status, verified_at FROM file_checksums WHERE status != 'ok' "
+                                "ORDER BY verified_at DESC LIMIT ?", (limit,)).fetchall()
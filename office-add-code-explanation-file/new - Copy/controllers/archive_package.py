@@ -0,0 +1,524 @@
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+PACKAGE_ZIP = "zip"
+PACKAGE_TAR_ZST = "tar.zst"
+MANIFEST_NAME = "manifest.json" # First entry of every package
+MANIFEST_FORMAT = 1
+PACKAGE_CHUNK = 1024 * 1024 # Read/write unit; the only file data held in memory
+PACKAGE_HASH_WORKERS = 4 # Files without a recorded checksum are hashed in parallel before writing
+PACKAGE_ZSTD_LEVEL = 3
+PACKAGE_PROGRESS_SECONDS = 0.25
+PACKAGE_FILE_TYPES = [("Archive packages", "*.zip *.tar.zst *.tzst *.tar *.tar.gz *.tgz"), ("Package manifest", "*.json")]
+# Already compressed formats are stored in ZIP packages as they are; deflating them costs
+# CPU time and saves nothing
+STORED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".gif", ".tif", ".tiff", ".webp", ".docx", ".xlsx",
+                     ".pptx", ".zip", ".gz", ".zst", ".7z", ".rar", ".mp3", ".mp4"}
+
+_BACKUP_RE = re.compile(r"_backup_\d{14}(?:_\d+)?(?:\.[^.]*)?$") # Names written by ArchiveController.store_file
+
+
+def package_formats():
+    """Package formats available in this installation (tar.zst needs the zstandard module)."""
+    return [PACKAGE_ZIP, PACKAGE_TAR_ZST] if ZSTD_AVAILABLE else [PACKAGE_ZIP]
+
+
+def is_backup(filename):
+    return _BACKUP_RE.search(filename) is not None
+
+
+def _original_name(filename):
+    """The name a backup was made from ("a_backup_20240101120000.pdf" -> "a.pdf")."""
+    return re.sub(r"_backup_\d{14}(?:_\d+)?(?=(?:\.[^.]*)?$)", "", filename)
+
+
+def export_package(archive_root, source_parts, package_path, package_format=PACKAGE_ZIP, include_backups=False,
+                   repository=None, structure_revision=0, on_progress=None, cancel=None):
+    """
+    Streams a company, or any header/section subtree of one, into a ZIP or tar.zst package.
+
+    Entries keep their path relative to archive_root (company folder first). The first
+    entry is manifest.json with the size, mtime and SHA-256 of every file, so an import
+    can verify each file while it streams. Checksums recorded by the integrity scrubber
+    are reused when size and mtime still match; the rest are computed in parallel first.
+    Every file is hashed again while it is written, and the export fails if any content
+    differs from its manifest entry. File data passes through in PACKAGE_CHUNK pieces, so
+    memory use does not depend on file or package size. tar.zst packages are compressed
+    by zstandard on all cores; ZIP packages store already compressed formats unchanged.
+
+    The package is written to <package_path>.part and renamed when complete, and its own
+    SHA-256 is written to <package_path>.sha256 (sha256sum format).
+
+    Args:
+        source_parts (list[str]): [safe company name, header, subheader, ...] to export.
+        include_backups (bool): Also export <name>_backup_<timestamp> versions.
+        repository: ArchiveIndexRepository for recorded checksums, or None.
+        on_progress (callable | None): on_progress(done_bytes, total_bytes), throttled.
+        cancel (threading.Event | None): Set to abandon the export.
+
+    Returns:
+        dict: files, bytes, skipped_backups, package, sha256.
+
+    Raises:
+        IOError: If the source is missing, a file changed during the export, or writing failed.
+    """
+    if package_format == PACKAGE_TAR_ZST and not ZSTD_AVAILABLE:
+        raise IOError("tar.zst packages need the 'zstandard' module.")
+    source = os.path.join(archive_root, *source_parts)
+    if not os.path.isdir(source):
+        raise IOError(f"Folder not found: {source}")
+
+    files, skipped_backups = _collect_files(archive_root, source, include_backups)
+    _fill_checksums(files, repository, cancel)
+    total_bytes = sum(entry["size"] for entry in files)
+    manifest = {"format": MANIFEST_FORMAT, "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "source": "/".join(source_parts), "structure_revision": structure_revision,
+                "include_backups": include_backups, "files": [_public(entry) for entry in files]}
+    manifest_data = json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+
+    progress = _Progress(total_bytes, on_progress)
+    temp_path = f"{package_path}.part"
+    try:
+        with open(temp_path, "wb") as raw:
+            output = _HashingWriter(raw)
+            if package_format == PACKAGE_TAR_ZST:
+                _write_tar_zst(output, manifest_data, files, progress, cancel)
+            else:
+                _write_zip(output, manifest_data, files, progress, cancel)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, package_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    progress.report(final=True)
+
+    package_sha256 = output.digest.hexdigest()
+    with open(f"{package_path}.sha256", "w", encoding="utf-8") as f:
+        f.write(f"{package_sha256}  {os.path.basename(package_path)}\n")
+    logging.info(f"[Export] {package_path}: {len(files)} file(s), {total_bytes} bytes, "
+                 f"{skipped_backups} backup(s) left out.")
+    return {"files": len(files), "bytes": total_bytes, "skipped_backups": skipped_backups,
+            "package": package_path, "sha256": package_sha256}
+
+
+def read_manifest(package_path):
+    """
+    Reads and checks the manifest of a package, or a manifest.json next to extracted files,
+    without reading any file data.
+
+    Raises:
+        IOError: If the file is not a package written by export_package.
+    """
+    with _open_package(package_path) as (manifest, _):
+        return manifest
+
+
+def import_package(package_path, archive_root, structure, store, repository=None, company=None,
+                   on_progress=None, cancel=None):
+    """
+    Imports a package written by export_package (or a manifest.json next to the extracted
+    files) into the archive.
+
+    Entries are read in package order, one at a time. Each entry's folder must exist in
+    structure; entries elsewhere are reported as unmapped. An entry is skipped without
+    writing anything when its destination folder already holds the same SHA-256 under
+    the same name or another version of it, so importing a package again only costs
+    reading it. Other entries are copied
+    to a staging file while being hashed, checked against the manifest, and handed to
+    store, which applies the usual backup/versioning of existing files.
+
+    Args:
+        structure (ArchiveStructure): Current archive structure.
+        store (callable): store(company, folder_parts, staged_path, filename) -> stored path.
+        repository: ArchiveIndexRepository for recorded checksums, or None.
+        company (str | None): Safe name of the target company; the package's company if None.
+        on_progress (callable | None): on_progress(done_bytes, total_bytes), throttled.
+        cancel (threading.Event | None): Set to stop after the current entry.
+
+    Returns:
+        dict: company, files, stored, duplicates, unmapped (paths) and errors ("path: message").
+    """
+    staging = tempfile.mkdtemp(prefix="archive_import_")
+    try:
+        with _open_package(package_path) as (manifest, members):
+            expected = {entry["path"]: entry for entry in manifest["files"]}
+            company = company or manifest["source"].split("/")[0]
+            if company in ("", ".", "..") or any(separator in company for separator in ("/", "\\", ":")):
+                raise IOError(f"Invalid company folder name: '{company}'")
+            known = repository.paths_by_checksum({entry["sha256"] for entry in manifest["files"]}) if repository else {}
+            progress = _Progress(sum(entry["size"] for entry in manifest["files"]), on_progress)
+            result = {"company": company, "files": 0, "stored": 0, "duplicates": 0, "unmapped": [], "errors": []}
+            seen = set()
+            staged_path = os.path.join(staging, "entry")
+            for name, stream in members:
+                if cancel is not None and cancel.is_set():
+                    result["errors"].append("Import cancelled.")
+                    break
+                entry = expected.get(name)
+                if entry is None or name in seen:
+                    result["errors"].append(f"{name}: not listed in the manifest")
+                    continue
+                seen.add(name)
+                if stream is None:
+                    result["errors"].append(f"{name}: missing from the package")
+                    continue
+                result["files"] += 1
+                target = _target(name, structure)
+                if target is None:
+                    result["unmapped"].append(name)
+                    progress.advance(entry["size"])
+                    continue
+                folder_parts, filename = target
+                dest_folder = os.path.join(archive_root, company, *folder_parts)
+                if _already_stored(entry, dest_folder, filename, known, repository):
+                    result["duplicates"] += 1
+                    progress.advance(entry["size"])
+                    continue
+                try:
+                    _stage(stream, staged_path, entry, progress)
+                    dest_file = store(company, folder_parts, staged_path, filename)
+                except Exception as e:
+                    logging.error(f"[Import] {name}: {e}")
+                    result["errors"].append(f"{name}: {e}")
+                    continue
+                finally:
+                    if os.path.exists(staged_path):
+                        os.remove(staged_path)
+                if repository:
+                    repository.save_checksum(dest_file, entry["size"], os.stat(dest_file).st_mtime, entry["sha256"], time.time())
+                known.setdefault(entry["sha256"], []).append(dest_file)
+                result["stored"] += 1
+            else:
+                result["errors"].extend(f"{name}: missing from the package" for name in expected if name not in seen)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    progress.report(final=True)
+    logging.info(f"[Import] {package_path} -> {company}: {result['stored']} stored, {result['duplicates']} already present, "
+                 f"{len(result['unmapped'])} unmapped, {len(result['errors'])} errors.")
+    return result
+
+
+# ------------------------------------------------------------------------------
+# Export internals
+# ------------------------------------------------------------------------------
+def _collect_files(archive_root, source, include_backups):
+    """Files under source in name order, as manifest entries without checksums."""
+    files = []
+    skipped_backups = 0
+    stack = [source]
+    while stack:
+        folder = stack.pop()
+        with os.scandir(folder) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subfolders = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                if not include_backups and is_backup(entry.name):
+                    skipped_backups += 1
+                    continue
+                stat = entry.stat()
+                files.append({"path": os.path.relpath(entry.path, archive_root).replace(os.sep, "/"),
+                              "size": stat.st_size, "mtime": stat.st_mtime, "sha256": None,
+                              "backup": is_backup(entry.name), "local_path": entry.path})
+        stack.extend(reversed(subfolders))
+    return files, skipped_backups
+
+
+def _fill_checksums(files, repository, cancel):
+    """Takes recorded checksums where size and mtime match and hashes the other files in parallel."""
+    recorded = repository.recorded_checksums(entry["local_path"] for entry in files) if repository else {}
+    missing = []
+    for entry in files:
+        known = recorded.get(entry["local_path"])
+        if known and known[:2] == (entry["size"], entry["mtime"]):
+            entry["sha256"] = known[2]
+        else:
+            missing.append(entry)
+    if not missing:
+        return
+    logging.info(f"[Export] Hashing {len(missing)} file(s) without a recorded checksum.")
+
+    def hash_entry(entry):
+        if cancel is not None and cancel.is_set():
+            raise InterruptedError("Export cancelled.")
+        digest = hashlib.sha256()
+        with open(entry["local_path"], "rb") as f:
+            for chunk in iter(lambda: f.read(PACKAGE_CHUNK), b""):
+                digest.update(chunk)
+        entry["sha256"] = digest.hexdigest()
+        if repository:
+            repository.save_checksum(entry["local_path"], entry["size"], entry["mtime"], entry["sha256"], time.time())
+
+    with ThreadPoolExecutor(max_workers=PACKAGE_HASH_WORKERS) as pool:
+        for _ in pool.map(hash_entry, missing): # hashlib releases the GIL on large updates
+            pass
+
+
+def _write_zip(output, manifest_data, files, progress, cancel):
+    with zipfile.ZipFile(output, "w", allowZip64=True) as package:
+        package.writestr(MANIFEST_NAME, manifest_data, compress_type=zipfile.ZIP_DEFLATED)
+        for entry in files:
+            info = zipfile.ZipInfo.from_file(entry["local_path"], entry["path"], strict_timestamps=False)
+            stored = os.path.splitext(entry["path"])[1].lower() in STORED_EXTENSIONS
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            with open(entry["local_path"], "rb") as source, package.open(info, "w") as target:
+                reader = _VerifyingReader(source, entry, progress, cancel)
+                for chunk in iter(lambda: reader.read(PACKAGE_CHUNK), b""):
+                    target.write(chunk)
+                reader.verify()
+
+
+def _write_tar_zst(output, manifest_data, files, progress, cancel):
+    compressor = zstandard.ZstdCompressor(level=PACKAGE_ZSTD_LEVEL, threads=-1) # One worker per core
+    with compressor.stream_writer(output, closefd=False) as compressed, \
+            tarfile.open(fileobj=compressed, mode="w|", format=tarfile.PAX_FORMAT) as package:
+        info = tarfile.TarInfo(MANIFEST_NAME)
+        info.size = len(manifest_data)
+        info.mtime = time.time()
+        package.addfile(info, io.BytesIO(manifest_data))
+        for entry in files:
+            info = tarfile.TarInfo(entry["path"])
+            info.size = entry["size"]
+            info.mtime = entry["mtime"]
+            info.mode = 0o644
+            with open(entry["local_path"], "rb") as source:
+                reader = _VerifyingReader(source, entry, progress, cancel)
+                package.addfile(info, reader)
+                reader.verify()
+
+
+def _public(entry):
+    return {key: entry[key] for key in ("path", "size", "mtime", "sha256", "backup")}
+
+
+class _VerifyingReader:
+    """File wrapper that hashes what is read and checks it against the manifest entry."""
+    def __init__(self, source, entry, progress, cancel):
+        self._source = source
+        self._entry = entry
+        self._progress = progress
+        self._cancel = cancel
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def read(self, size=-1):
+        if self._cancel is not None and self._cancel.is_set():
+            raise InterruptedError("Export cancelled.")
+        chunk = self._source.read(min(size, PACKAGE_CHUNK) if size and size > 0 else PACKAGE_CHUNK)
+        self._digest.update(chunk)
+        self._size += len(chunk)
+        self._progress.advance(len(chunk))
+        return chunk
+
+    def verify(self):
+        if self._size != self._entry["size"] or self._digest.hexdigest() != self._entry["sha256"]:
+            raise IOError(f"{self._entry['path']} changed or does not match its recorded checksum; export stopped.")
+
+
+class _HashingWriter:
+    """Write-only stream that hashes the package bytes on their way to disk."""
+    def __init__(self, raw):
+        self._raw = raw
+        self.digest = hashlib.sha256()
+        self._position = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self._position += len(data)
+        return self._raw.write(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        self._raw.flush()
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+
+class _Progress:
+    def __init__(self, total, callback):
+        self.total = total
+        self.done = 0
+        self._callback = callback
+        self._last = 0.0
+
+    def advance(self, amount):
+        self.done += amount
+        self.report()
+
+    def report(self, final=False):
+        if not self._callback:
+            return
+        now = time.monotonic()
+        if final or now - self._last >= PACKAGE_PROGRESS_SECONDS:
+            self._last = now
+            self._callback(self.done, self.total)
+
+
+# ------------------------------------------------------------------------------
+# Import internals
+# ------------------------------------------------------------------------------
+@contextmanager
+def _open_package(package_path):
+    """Yields (manifest, members), where members yields (path, readable stream or None) in package order."""
+    lower = package_path.lower()
+    if lower.endswith(".json"):
+        manifest = _check_manifest(_load_json(package_path), package_path)
+        yield manifest, _manifest_members(manifest, os.path.dirname(package_path))
+    elif lower.endswith(".zip"):
+        with zipfile.ZipFile(package_path) as package:
+            try:
+                manifest = _check_manifest(_load_json(package.open(MANIFEST_NAME)), package_path)
+            except KeyError:
+                raise IOError(f"{package_path} has no {MANIFEST_NAME}; it was not written by Export Package.")
+            yield manifest, _zip_members(package, manifest)
+    else:
+        with open(package_path, "rb") as raw:
+            if lower.endswith((".tar.zst", ".tzst")):
+                if not ZSTD_AVAILABLE:
+                    raise IOError("tar.zst packages need the 'zstandard' module.")
+                source = zstandard.ZstdDecompressor().stream_reader(raw)
+                mode = "r|"
+            else:
+                source, mode = raw, "r|*" # .tar, .tar.gz
+            with tarfile.open(fileobj=source, mode=mode) as package:
+                first = package.next()
+                if first is None or first.name != MANIFEST_NAME:
+                    raise IOError(f"{package_path} does not start with {MANIFEST_NAME}; it was not written by Export Package.")
+                manifest = _check_manifest(_load_json(package.extractfile(first)), package_path)
+                yield manifest, _tar_members(package)
+
+
+def _load_json(source):
+    try:
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8") as f:
+                return json.load(f)
+        with source:
+            return json.loads(source.read().decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise IOError(f"Invalid {MANIFEST_NAME}: {e}") from e
+
+
+def _check_manifest(manifest, package_path):
+    try:
+        if manifest.get("format", 0) > MANIFEST_FORMAT:
+            raise IOError(f"{package_path} was written by a newer version (manifest format {manifest['format']}).")
+        for entry in manifest["files"]:
+            if not (isinstance(entry["path"], str) and isinstance(entry["size"], int) and len(entry["sha256"]) == 64):
+                raise ValueError(entry)
+        if not isinstance(manifest["source"], str):
+            raise ValueError("source")
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise IOError(f"{package_path} has an invalid {MANIFEST_NAME}: {e}") from e
+    return manifest
+
+
+def _manifest_members(manifest, base_folder):
+    for entry in manifest["files"]:
+        local_path = os.path.join(base_folder, *entry["path"].split("/"))
+        if _target(entry["path"], None) is None or not os.path.isfile(local_path):
+            yield entry["path"], None
+            continue
+        with open(local_path, "rb") as stream:
+            yield entry["path"], stream
+
+
+def _zip_members(package, manifest):
+    names = set(package.namelist())
+    for entry in manifest["files"]:
+        if entry["path"] not in names:
+            yield entry["path"], None
+            continue
+        with package.open(entry["path"]) as stream:
+            yield entry["path"], stream
+
+
+def _tar_members(package):
+    for member in package: # Streamed: members not read are skipped, never buffered
+        if member.isfile() and member.name != MANIFEST_NAME: # Iteration starts again at the manifest
+            yield member.name, package.extractfile(member)
+
+
+def _target(path, structure):
+    """(folder parts below the company, file name) for a package path, or None if it does not map."""
+    parts = path.split("/")
+    if len(parts) < 3 or any(part in ("", ".", "..") or "\\" in part or ":" in part for part in parts):
+        return None # Also keeps crafted paths from leaving the archive
+    folder_parts = tuple(parts[1:-1])
+    if structure is not None and structure.node(*folder_parts) is None:
+        return None
+    return folder_parts, parts[-1]
+
+
+def _already_stored(entry, dest_folder, filename, known, repository):
+    """
+    True if dest_folder already holds entry's content as filename or as another version
+    of it (the file it is a backup of, or one of its backups).
+    """
+    dest_folder = os.path.normpath(dest_folder)
+    original = _original_name(filename)
+    for path in known.get(entry["sha256"], ()):
+        if (os.path.normpath(os.path.dirname(path)) == dest_folder and _original_name(os.path.basename(path)) == original
+                and os.path.exists(path)):
+            return True
+    dest_file = os.path.join(dest_folder, filename)
+    try:
+        stat = os.stat(dest_file)
+    except OSError:
+        return False
+    if stat.st_size != entry["size"]:
+        return False
+    digest = hashlib.sha256() # Not recorded yet (e.g. copied in by hand); hash it once
+    with open(dest_file, "rb") as f:
+        for chunk in iter(lambda: f.read(PACKAGE_CHUNK), b""):
+            digest.update(chunk)
+    if repository:
+        repository.save_checksum(dest_file, stat.st_size, stat.st_mtime, digest.hexdigest(), time.time())
+    known.setdefault(digest.hexdigest(), []).append(dest_file)
+    return digest.hexdigest() == entry["sha256"]
+
+
+def _stage(stream, staged_path, entry, progress):
+    """Copies stream to staged_path, verifying size and SHA-256 against the manifest entry."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(staged_path, "wb") as staged:
+        for chunk in iter(lambda: stream.read(PACKAGE_CHUNK), b""):
+            digest.update(chunk)
+            staged.write(chunk)
+            size += len(chunk)
+            progress.advance(len(chunk))
+    if size != entry["size"] or digest.hexdigest() != entry["sha256"]:
+        raise IOError("content does not match the manifest checksum; not imported")
+    if entry.get("mtime"):
+        os.utime(staged_path, (entry["mtime"], entry["mtime"])) # store_file copies with copy2, keeping the original date
@@ -0,0 +1,376 @@
+import copy
+import datetime
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+# Default document structure: header -> subheader -> section -> [subsections].
+# Stable English keys are used internally. It seeds the structure file on first start.
+DEFAULT_ARCHIVE_STRUCTURE = {
+    "Permanent Audit File": {
+        "c1": {}, "c2": {}, "c3": {}, "c4": {}, "c5": {}, "c6": {},
+    },
+    "Working Papers File": {
+        "A": {str(i): [] for i in range(1, 16)},
+        "B1": {
+            "B10": ["B10A"],
+            "B11": ["B11A"],
+            "B12": [], "B13": [], "B14": [], "B15": [],
+            "B16": [], "B17": [], "B18": [], "B19": [],
+        },
+        "B2": {
+            "B20": [], "B21": [], "B22": [], "B23": [],
+            "B24": [], "B25": [], "B26": [], "B27": [],
+        },
+        "B3": {
+            "B30": [], "B31": [], "B32": [], "B33": [], "B34": [],
+        },
+        "I1": {
+            "I10": [], "I11": [], "I11A": [], "I12": [],
+        },
+        "I2": {
+            "I20": [], "I21": [], "I22": [], "I23": [], "I24": [],
+            "I25": [], "I26": [], "I27": [], "I28": [], "I29": [],
+        },
+        # Add other sections like I3, I4, I5, I6, I7 etc. if needed
+    },
+}
+
+STRUCTURE_FILE = "archive_structure.json"
+STRUCTURE_FORMAT = 1
+
+LEVEL_HEADER, LEVEL_SUBHEADER, LEVEL_SECTION, LEVEL_SUBSECTION = range(4)
+
+
+class StructureNode:
+    """One folder of the structure template. Immutable once the tree is compiled."""
+    __slots__ = ("name", "parts", "level", "children", "options", "flat")
+
+    def __init__(self, parts, children, flat=False):
+        self.name = parts[-1] if parts else ""
+        self.parts = parts
+        self.level = len(parts) - 1
+        self.children = tuple(children) # Template order
+        self.options = tuple(sorted(self.children)) # Order shown in the upload dropdowns
+        self.flat = flat # Header whose subheaders are a plain list (no sections)
+
+
+class ArchiveStructure(Mapping):
+    """
+    The structure template compiled into an immutable tree.
+
+    Every node is indexed by its path tuple (header, subheader, section, subsection), with
+    its child names, so dropdowns, folder paths, naming prefixes and company folder
+    creation are lookups instead of walks over nested dicts. As a Mapping it still reads
+    like the template dict for code that expects one: header -> read-only view of its
+    subtree (mappings for dicts, tuples for lists), built once.
+
+    Args:
+        template (dict): header -> {subheader: {section: [subsections]}} or header -> [subheaders].
+        revision (int): Revision of the stored definition this tree was compiled from.
+    """
+    def __init__(self, template, revision=0):
+        self.revision = revision
+        self._template = copy.deepcopy(template)
+        self._nodes = {}
+        folders = []
+        for header, subheaders in self._template.items():
+            if isinstance(subheaders, list):
+                self._add((header,), [s for s in subheaders if s], flat=True)
+                folders.append((header,))
+                for subheader in subheaders:
+                    if subheader:
+                        self._add((header, subheader), ())
+                        folders.append((header, subheader))
+                continue
+            if not isinstance(subheaders, dict):
+                logging.warning(f"Unknown structure type for header '{header}': {type(subheaders)}. Ignored.")
+                continue
+            self._add((header,), subheaders)
+            folders.append((header,))
+            for subheader, sections in subheaders.items():
+                if not isinstance(sections, dict):
+                    logging.warning(f"Expected dict for sections under {header}/{subheader}, found: {type(sections)}.")
+                    sections = {}
+                self._add((header, subheader), sections)
+                folders.append((header, subheader))
+                for section, subsections in sections.items():
+                    if not isinstance(subsections, list):
+                        logging.warning(f"Expected list of subsections for {header}/{subheader}/{section}, found: {type(subsections)}.")
+                        subsections = []
+                    subsections = [s for s in subsections if s] # Skip empty subsection names
+                    self._add((header, subheader, section), subsections)
+                    folders.append((header, subheader, section))
+                    for subsection in subsections:
+                        self._add((header, subheader, section, subsection), ())
+                        folders.append((header, subheader, section, subsection))
+        self.headers = tuple(self._template)
+        self._views = {header: _read_only(subtree) for header, subtree in self._template.items()}
+        self.folders = tuple(os.path.join(*parts) for parts in folders) # Parents before children
+
+    def _add(self, parts, children, flat=False):
+        self._nodes[parts] = StructureNode(parts, children, flat)
+
+    # --- Mapping interface (template dict view) ---
+    def __getitem__(self, header):
+        return self._views[header]
+
+    def __iter__(self):
+        return iter(self.headers)
+
+    def __len__(self):
+        return len(self.headers)
+
+    def template(self):
+        """A deep copy of the template dict."""
+        return copy.deepcopy(self._template)
+
+    # --- Lookups ---
+    def node(self, *parts):
+        """The node at parts (trailing empty parts ignored), or None."""
+        return self._nodes.get(_trim(parts))
+
+    def children(self, *parts):
+        """Child names of a node in template order (empty tuple if the node does not exist)."""
+        node = self._nodes.get(_trim(parts))
+        return node.children if node else ()
+
+    def options(self, *parts):
+        """Child names of a node, sorted."""
+        node = self._nodes.get(_trim(parts))
+        return node.options if node else ()
+
+    def is_flat(self, header):
+        node = self._nodes.get((header,))
+        return bool(node and node.flat)
+
+    def folder_parts(self, header, subheader="", section="", subsection="", known_section_only=False):
+        """
+        Folder of a selection relative to the company folder. The subsection is only used
+        when the template defines subsections for that section; with known_section_only,
+        so is the section.
+        """
+        parts = [header]
+        if subheader:
+            parts.append(subheader)
+        if self.is_flat(header):
+            return parts
+        if known_section_only and (not subheader or section not in self.children(header, subheader)):
+            return parts
+        if section:
+            parts.append(section)
+            if subsection and self.children(header, subheader, section):
+                parts.append(subsection)
+        return parts
+
+    def prefix_for(self, header, subheader="", section="", subsection=""):
+        """File-name prefix required in the selected folder ("" if none)."""
+        if self.is_flat(header) or not section or section not in self.children(header, subheader):
+            return subheader or ""
+        return subsection if subsection and subsection in self.children(header, subheader, section) else section
+
+
+class StructureStore:
+    """
+    Keeps the structure template in a versioned JSON file and hands out compiled trees.
+
+    The file holds {"format": 1, "revision": n, "updated": ..., "structure": {...}}. It is
+    seeded from DEFAULT_ARCHIVE_STRUCTURE and only changes through add() (folders created
+    in the app) or import_folders() (folders an admin chose from unlisted_folders()), so a
+    stray folder on the share never becomes part of every company's template by itself.
+    Every change re-reads the file, applies the change, and atomically replaces the file
+    with the next revision, so additions made by other running instances are kept.
+
+    Args:
+        path (str): The structure file.
+        archives_path (str): Archive root, scanned by unlisted_folders().
+    """
+    def __init__(self, path, archives_path):
+        self.path = path
+        self.archives_path = archives_path
+        self.current = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Returns the compiled structure, creating the file on first use."""
+        with self._lock:
+            data = self._read()
+            if data is None:
+                logging.info(f"Seeding {self.path} from the default structure.")
+                data = self._write(copy.deepcopy(DEFAULT_ARCHIVE_STRUCTURE), 0)
+            return self._compile(data)
+
+    def refresh(self):
+        """Reloads the structure if another instance changed the file; returns the current tree."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.current
+        if mtime != self._mtime:
+            with self._lock:
+                data = self._read()
+                if data is not None and data["revision"] != getattr(self.current, "revision", None):
+                    logging.info(f"Archive structure changed on disk (revision {data['revision']}); reloading.")
+                    return self._compile(data)
+        return self.current
+
+    def add(self, parent_parts, name):
+        """
+        Adds a subheader, section or subsection under parent_parts in one transaction.
+
+        Returns:
+            ArchiveStructure: The new compiled structure (unchanged if name already exists).
+
+        Raises:
+            ValueError: If the parent does not exist or cannot have children.
+        """
+        parent_parts = _trim(parent_parts)
+        with self._lock:
+            data = self._read() or {"revision": 0, "structure": self.current.template()}
+            template = data["structure"]
+            if not _insert(template, parent_parts, name):
+                return self._compile(data)
+            data = self._write(template, data["revision"])
+            logging.info(f"Structure revision {data['revision']}: added '{name}' under {'/'.join(parent_parts)}.")
+            return self._compile(data)
+
+    def unlisted_folders(self):
+        """
+        Folders under <archive>/<company>/<header>/... that the template does not list.
+
+        Returns:
+            list[tuple]: Path tuples (header, subheader[, section[, subsection]]), parents first.
+        """
+        template = self.current.template() if self.current else copy.deepcopy(DEFAULT_ARCHIVE_STRUCTURE)
+        return _merge_disk_folders(template, self.archives_path)
+
+    def import_folders(self, folders):
+        """
+        Adds the given folders (path tuples from unlisted_folders(), parents first) to the
+        template in one transaction. Folders that no longer fit the template are skipped.
+
+        Returns:
+            ArchiveStructure: The new compiled structure.
+        """
+        with self._lock:
+            data = self._read() or {"revision": 0, "structure": self.current.template()}
+            added = 0
+            for parts in folders:
+                try:
+                    added += _insert(data["structure"], tuple(parts[:-1]), parts[-1])
+                except ValueError as e:
+                    logging.warning(f"Not importing folder {'/'.join(parts)}: {e}")
+            if added:
+                data = self._write(data["structure"], data["revision"])
+                logging.info(f"Structure revision {data['revision']}: imported {added} folder(s) from the archive.")
+            return self._compile(data)
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _compile(self, data):
+        if self.current is None or self.current.revision != data["revision"]:
+            self.current = ArchiveStructure(data["structure"], data["revision"])
+        return self.current
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Cannot read the archive structure from {self.path}: {e}") from e
+        if data.get("format", STRUCTURE_FORMAT) > STRUCTURE_FORMAT or not isinstance(data.get("structure"), dict):
+            raise RuntimeError(f"Unsupported archive structure file: {self.path}")
+        data.setdefault("revision", 0)
+        return data
+
+    def _write(self, template, previous_revision):
+        data = {"format": STRUCTURE_FORMAT, "revision": previous_revision + 1,
+                "updated": datetime.datetime.now().isoformat(timespec="seconds"), "structure": template}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path) # Atomic: readers see the old or the new revision, never half
+        self._mtime = os.stat(self.path).st_mtime_ns
+        return data
+
+
+def _trim(parts):
+    parts = tuple(parts)
+    while parts and not parts[-1]:
+        parts = parts[:-1]
+    return parts
+
+
+def _insert(template, parent_parts, name):
+    """Adds name under parent_parts in a template dict; False if it is already there."""
+    if not parent_parts or parent_parts[0] not in template:
+        raise ValueError(f"Unknown header: {parent_parts[:1]}")
+    level = template[parent_parts[0]]
+    for depth, part in enumerate(parent_parts[1:], start=1):
+        if isinstance(level, list) and part in level: # Leaf folders (subsections, flat items)
+            raise ValueError(f"'{'/'.join(parent_parts)}' cannot contain folders.")
+        if not isinstance(level, dict) or part not in level:
+            raise ValueError(f"'{'/'.join(parent_parts[:depth + 1])}' is not part of the structure.")
+        level = level[part]
+    if isinstance(level, dict):
+        if name in level:
+            return False
+        level[name] = {} if len(parent_parts) == 1 else [] # Subheaders hold sections; sections hold subsections
+        return True
+    if isinstance(level, list) and len(parent_parts) in (1, 3): # Flat header or section
+        if name in level:
+            return False
+        level.append(name)
+        return True
+    raise ValueError(f"'{'/'.join(parent_parts)}' cannot contain folders.")
+
+
+def _read_only(subtree):
+    """Read-only view of a template subtree: dicts become mappings, lists tuples."""
+    if isinstance(subtree, dict):
+        return MappingProxyType({name: _read_only(child) for name, child in subtree.items()})
+    if isinstance(subtree, list):
+        return tuple(subtree)
+    return subtree
+
+
+def _merge_disk_folders(template, archives_path):
+    """Adds folders found under <archive>/<company>/<header>/... to template; returns the new ones as path tuples."""
+    added = []
+    try:
+        companies = [entry.path for entry in os.scandir(archives_path) if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+        return added
+
+    def subfolders(path):
+        try:
+            return sorted(entry.name for entry in os.scandir(path) if entry.is_dir() and not entry.name.startswith('.'))
+        except OSError:
+            return []
+
+    for company_path in companies:
+        for header in list(template):
+            header_path = os.path.join(company_path, header)
+            for subheader in subfolders(header_path):
+                if _insert(template, (header,), subheader):
+                    added.append((header, subheader))
+                if isinstance(template[header], list):
+                    continue
+                subheader_path = os.path.join(header_path, subheader)
+                for section in subfolders(subheader_path):
+                    if _insert(template, (header, subheader), section):
+                        added.append((header, subheader, section))
+                    for subsection in subfolders(os.path.join(subheader_path, section)):
+                        if _insert(template, (header, subheader, section), subsection):
+                            added.append((header, subheader, section, subsection))
+    return added
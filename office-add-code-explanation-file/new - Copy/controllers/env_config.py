@@ -0,0 +1,30 @@
+import logging
+import os
+
+
+def env_number(name, default, cast=float, minimum=None):
+    """
+    Reads a numeric setting from the environment.
+
+    A missing variable gives default. A value that does not parse, or is below minimum,
+    is logged and also gives default, so a typo in a deployment script cannot stop the
+    application from starting.
+
+    Args:
+        name (str): Environment variable name.
+        default (int | float): Value used when the variable is missing or invalid.
+        cast (type): int or float.
+        minimum (int | float | None): Smallest accepted value.
+    """
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = cast(raw.strip())
+    except ValueError:
+        logging.warning(f"Ignoring {name}={raw!r}: not a valid {cast.__name__}; using {default}.")
+        return default
+    if minimum is not None and value < minimum:
+        logging.warning(f"Ignoring {name}={raw!r}: must be at least {minimum}; using {default}.")
+        return default
+    return value
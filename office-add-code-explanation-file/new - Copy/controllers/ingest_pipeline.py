@@ -0,0 +1,161 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+INGEST_WORKERS = 4 # Copies in parallel; archive writes are I/O bound
+INGEST_QUEUE_SIZE = 256 # Files found but not yet picked up; the folder walk pauses beyond this
+INGEST_PROGRESS_SECONDS = 0.25 # At most one progress callback per interval
+
+# Outcomes returned by the handle callable
+INGEST_STORED = "stored"
+INGEST_REJECTED = "rejected"
+
+
+class IngestPipeline:
+    """
+    Streams dropped files and folders into the archive with bounded memory and concurrency.
+
+    A walker thread expands folders lazily (os.scandir, depth first) and feeds accepted
+    files into a bounded queue; INGEST_WORKERS threads take files from it and call
+    handle(path). Completion is tracked with counters: the walker sends one stop marker
+    per worker, and the last worker to stop reports the result, so nothing ever polls
+    a list of futures.
+
+    Args:
+        paths (list[str]): Dropped files and folders.
+        accept (callable): accept(path) -> bool; files it refuses are counted as skipped.
+        handle (callable): handle(path) -> INGEST_STORED or INGEST_REJECTED; exceptions
+            are counted as errors.
+        on_progress (callable | None): on_progress(finished, found, walking), throttled.
+        on_done (callable | None): on_done(result) once, where result is a dict with
+            found, stored, skipped, rejected (names) and errors ("name: message").
+    """
+    def __init__(self, paths, accept, handle, on_progress=None, on_done=None, workers=INGEST_WORKERS):
+        self.paths = list(paths)
+        self.accept = accept
+        self.handle = handle
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.workers = workers
+        self.found = 0
+        self.finished = 0
+        self.stored = 0
+        self.skipped = 0
+        self.rejected = []
+        self.errors = []
+        self.walking = True
+        self._queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._running_workers = workers
+        self._last_progress = 0.0
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._walk, name="IngestWalker", daemon=True).start()
+        for index in range(self.workers):
+            threading.Thread(target=self._work, name=f"IngestWorker-{index}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        """Stops walking and drops files not started yet; files being copied finish."""
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        """Blocks until every worker has stopped; False if timeout passed first."""
+        return self._done.wait(timeout)
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _walk(self):
+        try:
+            for path in self._iter_files():
+                if self._cancelled.is_set():
+                    break
+                if not self.accept(path):
+                    with self._lock:
+                        self.skipped += 1
+                    continue
+                with self._lock:
+                    self.found += 1
+                self._queue.put(path) # Blocks while the workers are behind
+        except Exception as e:
+            logging.error(f"[Drop] Walking dropped folders failed: {e}", exc_info=True)
+            with self._lock:
+                self.errors.append(f"(folder walk): {e}")
+        finally:
+            with self._lock:
+                self.walking = False
+            for _ in range(self.workers):
+                self._queue.put(None)
+
+    def _iter_files(self):
+        for path in self.paths:
+            if not os.path.isdir(path):
+                yield path
+                continue
+            stack = [path]
+            while stack:
+                try:
+                    entries = os.scandir(stack.pop())
+                except OSError as e:
+                    logging.warning(f"[Drop] Cannot read folder: {e}")
+                    continue
+                with entries:
+                    subfolders = []
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subfolders.append(entry.path)
+                            elif entry.is_file():
+                                yield entry.path
+                        except OSError:
+                            continue
+                stack.extend(reversed(sorted(subfolders))) # Visit subfolders in name order
+
+    def _work(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            outcome, error = None, None
+            if not self._cancelled.is_set():
+                try:
+                    outcome = self.handle(path)
+                except Exception as e:
+                    logging.error(f"[Drop] Error uploading {path}: {e}", exc_info=True)
+                    error = f"{os.path.basename(path)}: {e}"
+            with self._lock:
+                self.finished += 1
+                if outcome == INGEST_STORED:
+                    self.stored += 1
+                elif outcome == INGEST_REJECTED:
+                    self.rejected.append(os.path.basename(path))
+                elif error:
+                    self.errors.append(error)
+            self._report_progress()
+        with self._lock:
+            self._running_workers -= 1
+            last = self._running_workers == 0
+        if last:
+            self._done.set()
+            self._report_progress(final=True)
+            logging.info(f"[Drop] Finished: {self.found} found, {self.stored} stored, {len(self.rejected)} rejected, "
+                         f"{len(self.errors)} errors, {self.skipped} unsupported skipped.")
+            if self.on_done:
+                self.on_done({"found": self.found, "stored": self.stored, "skipped": self.skipped,
+                              "rejected": list(self.rejected), "errors": list(self.errors)})
+
+    def _report_progress(self, final=False):
+        if not self.on_progress:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not final and now - self._last_progress < INGEST_PROGRESS_SECONDS:
+                return
+            self._last_progress = now
+            finished, found, walking = self.finished, self.found, self.walking
+        self.on_progress(finished, found, walking)
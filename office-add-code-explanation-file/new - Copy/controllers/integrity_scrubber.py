@@ -0,0 +1,274 @@
+import collections
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+from controllers.env_config import env_number
+
+SCRUB_RATE_BYTES = int(env_number("ARCHIVE_SCRUB_RATE_MB", 20, minimum=0) * 1024 * 1024) # 0: unlimited
+SCRUB_INTERVAL_SECONDS = env_number("ARCHIVE_SCRUB_INTERVAL_DAYS", 7, minimum=0.01) * 86400 # Re-verify each file this often
+SCRUB_WALK_SECONDS = 6 * 3600 # Look for new, renamed (backups) and changed files this often; stat only
+SCRUB_MIRROR_PATH = os.environ.get("ARCHIVE_MIRROR_PATH") or None # Copy of the archive used for repairs
+SCRUB_READ_CHUNK = 1024 * 1024
+SCRUB_BATCH = 200 # Files per discovery / verification step
+SCRUB_IDLE_SECONDS = 60 # Wait this long when nothing is due
+SCRUB_BUSY_RECHECK_SECONDS = 1.0
+
+STATUS_OK = "ok"
+STATUS_CORRUPT = "corrupt"
+STATUS_REPAIRED = "repaired"
+
+
+class RateLimiter:
+    """Token bucket over bytes read; consume() sleeps once the caller is ahead of the rate."""
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self._allowance = float(bytes_per_second)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount, stop=None):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= amount
+            delay = -self._allowance / self.rate if self._allowance < 0 else 0
+        if delay:
+            if stop is not None:
+                stop.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+def file_sha256(path, limiter=None, stop=None):
+    """SHA-256 of a file, read in SCRUB_READ_CHUNK pieces at the limiter's rate."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(SCRUB_READ_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if limiter:
+                limiter.consume(len(chunk), stop)
+            if stop is not None and stop.is_set():
+                raise InterruptedError("Scrubber stopped.")
+    return digest.hexdigest()
+
+
+class IntegrityScrubber:
+    """
+    Records a SHA-256 for every archived file and backup in users.db and re-verifies
+    them in the background. Files stored by the app arrive with the checksum of their
+    source (ArchiveController.store_file); the scrubber hashes everything else.
+
+    Work is taken in priority order, one file at a time:
+      1. files with no checksum yet, or changed since it was recorded (found by a lazy
+         walk of the archive every SCRUB_WALK_SECONDS, which also picks up the backups
+         store_file renames; newest first within each batch of SCRUB_BATCH);
+      2. files last verified more than `interval` ago, most recently modified first.
+    All reads go through one RateLimiter, so a full pass never takes more than `rate`
+    bytes per second from the share. A file whose content no longer matches while its
+    size and mtime are unchanged is reported as corrupt and, when a mirror is configured
+    and holds an intact copy, restored from it.
+
+    Args:
+        repository: ArchiveIndexRepository (checksum methods).
+        archive_root (str): Root of the archive.
+        mirror_root (str | None): Root of a copy of the archive with the same layout.
+        is_busy (callable | None): Returns True while scrubbing should wait.
+    """
+    def __init__(self, repository, archive_root, mirror_root=SCRUB_MIRROR_PATH, rate=SCRUB_RATE_BYTES,
+                 interval=SCRUB_INTERVAL_SECONDS, is_busy=None):
+        self.repository = repository
+        self.archive_root = archive_root
+        self.mirror_root = mirror_root
+        self.interval = interval
+        self.is_busy = is_busy or (lambda: False)
+        self.limiter = RateLimiter(rate)
+        self.checked = 0
+        self.bytes_read = 0
+        self.corrupt = 0
+        self.repaired = 0
+        self.last_pass = None # Time the last discovery walk finished
+        self._discovery = None # Generator of discovery batches while a walk is running
+        self._pending = collections.deque() # Current discovery batch
+        self._problems = [] # (path, status, verified_at) of files that failed, refreshed after each failure
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="IntegrityScrubber", daemon=True)
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return {"queued": len(self._pending), "discovering": self._discovery is not None,
+                    "checked": self.checked, "bytes_read": self.bytes_read, "corrupt": self.corrupt,
+                    "repaired": self.repaired, "last_pass": self.last_pass, "mirror": self.mirror_root,
+                    "rate": self.limiter.rate}
+
+    def problems(self):
+        """Files whose last verification failed or that were repaired, newest first."""
+        with self._lock:
+            return list(self._problems)
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _run(self):
+        self._refresh_problems()
+        while not self._stop.is_set():
+            if self.is_busy():
+                self._stop.wait(SCRUB_BUSY_RECHECK_SECONDS)
+                continue
+            try:
+                if not self._step():
+                    self._wake.wait(SCRUB_IDLE_SECONDS)
+                    self._wake.clear()
+            except InterruptedError:
+                return
+            except Exception as e:
+                logging.error(f"[Scrub] Unexpected error: {e}", exc_info=True)
+                self._stop.wait(SCRUB_IDLE_SECONDS)
+
+    def _step(self):
+        """Does one unit of work; False when there was nothing to do."""
+        if self._pending:
+            self._baseline(self._pending.popleft())
+            return True
+        if self._discovery is None and (self.last_pass is None or time.time() - self.last_pass > min(self.interval, SCRUB_WALK_SECONDS)):
+            with self._lock:
+                self._discovery = self._unrecorded_files()
+            logging.info(f"[Scrub] Checking {self.archive_root} for files without a current checksum.")
+        if self._discovery is not None:
+            batch = next(self._discovery, None)
+            if batch is None:
+                with self._lock:
+                    self._discovery = None
+                self.last_pass = time.time()
+                logging.info("[Scrub] Archive walk finished; every file has a checksum.")
+            else:
+                self._pending.extend(batch)
+            return True
+        due = self.repository.due_checksums(time.time() - self.interval, SCRUB_BATCH)
+        for path, size, mtime, sha256 in due:
+            if self._stop.is_set():
+                break
+            self._verify(path, size, mtime, sha256)
+        return bool(due)
+
+    def _baseline(self, path):
+        """Hashes path and stores the result as its reference checksum."""
+        try:
+            stat = os.stat(path)
+            sha256 = self._hash(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logging.warning(f"[Scrub] Cannot read {path}: {e}")
+            return
+        self.repository.save_checksum(path, stat.st_size, stat.st_mtime, sha256, time.time())
+
+    def _verify(self, path, size, mtime, sha256):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.repository.delete_checksum(path) # Removed or renamed (e.g. rollback); found again by the walk
+            return
+        if stat.st_size != size or stat.st_mtime != mtime:
+            self._baseline(path) # Changed through a normal write, not bit rot
+            return
+        try:
+            actual = self._hash(path)
+        except OSError as e:
+            logging.warning(f"[Scrub] Cannot read {path}: {e}")
+            return
+        if actual == sha256:
+            self.repository.mark_checksum(path, STATUS_OK, time.time())
+            return
+        self.corrupt += 1
+        logging.error(f"[Scrub] Checksum mismatch: {path} (expected {sha256}, found {actual}).")
+        if self._repair(path, sha256):
+            self.repaired += 1
+            stat = os.stat(path) # The mirror copy brings its own mtime
+            self.repository.save_checksum(path, stat.st_size, stat.st_mtime, sha256, time.time())
+            self.repository.mark_checksum(path, STATUS_REPAIRED, time.time())
+        else:
+            self.repository.mark_checksum(path, STATUS_CORRUPT, time.time())
+        self._refresh_problems()
+
+    def _refresh_problems(self):
+        problems = self.repository.checksum_problems()
+        with self._lock:
+            self._problems = problems
+
+    def _repair(self, path, sha256):
+        """Restores path from the mirror if the mirror's copy has the recorded checksum."""
+        if not self.mirror_root:
+            return False
+        mirror_path = os.path.join(self.mirror_root, os.path.relpath(path, self.archive_root))
+        try:
+            if self._hash(mirror_path) != sha256:
+                logging.error(f"[Scrub] Mirror copy of {path} does not match either; not repaired.")
+                return False
+            temp_path = f"{path}.repair"
+            shutil.copy2(mirror_path, temp_path)
+            if self._hash(temp_path) != sha256:
+                os.remove(temp_path)
+                logging.error(f"[Scrub] Copy from the mirror did not verify; {path} not repaired.")
+                return False
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.error(f"[Scrub] Repair of {path} from {mirror_path} failed: {e}")
+            return False
+        logging.warning(f"[Scrub] Repaired {path} from the mirror.")
+        return True
+
+    def _hash(self, path):
+        sha256 = file_sha256(path, self.limiter, self._stop)
+        with self._lock:
+            self.checked += 1
+            self.bytes_read += os.path.getsize(path)
+        return sha256
+
+    def _unrecorded_files(self):
+        """Batches of files under archive_root whose checksum is missing or out of date, newest first."""
+        stack = [self.archive_root]
+        batch = []
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(".repair"):
+                            stat = entry.stat()
+                            batch.append((entry.path, stat.st_mtime, stat.st_size))
+                    except OSError:
+                        continue
+            if len(batch) >= SCRUB_BATCH or (batch and not stack):
+                known = self.repository.checksum_state(path for path, _, _ in batch)
+                changed = [(mtime, path) for path, mtime, size in batch if known.get(path) != (mtime, size)]
+                if changed:
+                    yield [path for _, path in sorted(changed, reverse=True)]
+                batch = []
@@ -0,0 +1,265 @@
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+
+from controllers.archive_structure import ArchiveStructure
+
+# A naming template describes a file name without its extension; the extension is always kept.
+#   {prefix}          the selected folder's prefix (subsection, section or subheader name)
+#   {date}            a date stamp, YYYYMMDD by default; {date:%Y-%m-%d} for another format
+#   {seq} / {seq:4}   a sequence number, zero-padded to 3 (or the given) digits
+#   {any}             any text
+# The default template, "{prefix}{any}", is the archive's original rule: the name starts
+# with the prefix. Fixing a name replaces the first {any} with "_" + the original name,
+# so "report.pdf" in section B10 becomes "B10_report.pdf".
+DEFAULT_TEMPLATE = "{prefix}{any}"
+NAMING_RULES_FILE = "naming_rules.json"
+NAMING_RULES_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\{(prefix|date|seq|any|name)(?::([^}]*))?\}")
+_DATE_CODES = {"Y": r"\d{4}", "y": r"\d{2}", "m": r"\d{2}", "d": r"\d{2}",
+               "H": r"\d{2}", "M": r"\d{2}", "S": r"\d{2}"}
+_DEFAULT_DATE_FORMAT = "%Y%m%d"
+_DEFAULT_SEQ_WIDTH = 3
+
+
+class NamingRule:
+    """
+    One naming template compiled for one prefix: a single anchored regex for validation
+    and a render function for fixes and generated names.
+
+    Args:
+        template (str): Template that valid names (without extension) must match.
+        prefix (str): Value of {prefix} for this folder ("" if the folder has none).
+        fix_template (str | None): Template for fixed names; derived from template if None.
+    """
+    def __init__(self, template, prefix="", fix_template=None):
+        self.template = template
+        self.prefix = prefix
+        self.fix_template = fix_template or _derive_fix_template(template)
+        self.uses_sequence = "{seq" in self.fix_template
+        self._regex = re.compile(self._compile(template), re.DOTALL)
+        self._match = self._regex.fullmatch
+
+    def _compile(self, template):
+        parts, position = [], 0
+        for token in _TOKEN_RE.finditer(template):
+            parts.append(re.escape(template[position:token.start()]))
+            name, spec = token.group(1), token.group(2)
+            if name == "prefix":
+                parts.append(re.escape(self.prefix))
+            elif name == "date":
+                parts.append(_date_regex(spec or _DEFAULT_DATE_FORMAT))
+            elif name == "seq":
+                if "(?P<seq>" in "".join(parts):
+                    raise ValueError(f"Naming template '{template}' has more than one {{seq}}.")
+                parts.append(r"(?P<seq>\d{%d,})" % int(spec or _DEFAULT_SEQ_WIDTH))
+            else: # any / name
+                parts.append(".*")
+            position = token.end()
+        parts.append(re.escape(template[position:]))
+        return "".join(parts)
+
+    def matches(self, filename):
+        """True if filename (extension ignored) follows the rule."""
+        return self._match(os.path.splitext(filename)[0]) is not None
+
+    def check(self, filenames):
+        """Validates a whole batch in one pass; returns a list of booleans."""
+        match = self._match
+        return [match(stem) is not None for stem, _ in map(os.path.splitext, filenames)]
+
+    def next_sequence(self, existing_names):
+        """First sequence number above every valid name in existing_names (1 if none)."""
+        if not self.uses_sequence:
+            return 1
+        highest = 0
+        for stem, _ in map(os.path.splitext, existing_names):
+            found = self._match(stem)
+            if found and found.groupdict().get("seq"):
+                highest = max(highest, int(found.group("seq")))
+        return highest + 1
+
+    def fix(self, filename, sequence=1, today=None):
+        """Renders filename into the fix template (e.g. adds the prefix)."""
+        stem, ext = os.path.splitext(filename)
+        return self.render(stem, sequence, today) + ext
+
+    def render(self, name="", sequence=1, today=None):
+        today = today or datetime.date.today()
+
+        def value(token):
+            kind, spec = token.group(1), token.group(2)
+            if kind == "prefix":
+                return self.prefix
+            if kind == "date":
+                return today.strftime(spec or _DEFAULT_DATE_FORMAT)
+            if kind == "seq":
+                return str(sequence).zfill(int(spec or _DEFAULT_SEQ_WIDTH))
+            return name if kind == "name" else ""
+
+        rendered = _TOKEN_RE.sub(value, self.fix_template)
+        return rendered if self.prefix else rendered.lstrip("_") # No "_report.pdf" without a prefix
+
+    def describe(self):
+        """Human-readable form of the fix template, e.g. "B10_<name>" or "B10_YYYYMMDD_NNN_<name>"."""
+        def placeholder(token):
+            kind, spec = token.group(1), token.group(2)
+            if kind == "prefix":
+                return self.prefix
+            if kind == "date":
+                return re.sub(r"%(.)", lambda code: {"Y": "YYYY", "y": "YY", "m": "MM", "d": "DD", "H": "hh",
+                                                     "M": "mm", "S": "ss"}.get(code.group(1), ""),
+                              spec or _DEFAULT_DATE_FORMAT)
+            if kind == "seq":
+                return "N" * int(spec or _DEFAULT_SEQ_WIDTH)
+            return "<name>"
+        return _TOKEN_RE.sub(placeholder, self.fix_template)
+
+
+class NamingReview:
+    """
+    Result of NamingPolicy.review for a batch of file names.
+
+    Attributes:
+        rule (NamingRule): The rule that was applied.
+        names (list[str]): The names reviewed, in order.
+        valid (list[bool]): Whether each name already follows the rule.
+        fixed (list[str]): The name each file gets when fixed; valid names are unchanged.
+            Sequence numbers are allocated across the batch, after the existing names.
+    """
+    def __init__(self, rule, names, valid, fixed):
+        self.rule = rule
+        self.names = names
+        self.valid = valid
+        self.fixed = fixed
+
+    @property
+    def invalid_names(self):
+        return [name for name, ok in zip(self.names, self.valid) if not ok]
+
+    def final_names(self, auto_fix):
+        """Target names, in order: fixed when auto_fix, otherwise None for names that need fixing."""
+        if auto_fix:
+            return list(self.fixed)
+        return [name if ok else None for name, ok in zip(self.names, self.valid)]
+
+
+class NamingPolicy:
+    """
+    File naming rules for every folder of the archive structure.
+
+    Rules are declared per structure node as "Header/Subheader/Section/Subsection" paths
+    (any leading part of one); the most specific declared node applies, and folders
+    without a declaration use DEFAULT_TEMPLATE. Each folder's rule is compiled once and
+    cached until clear_cache() (e.g. after the structure changes).
+
+    Args:
+        structure (ArchiveStructure | dict): The compiled archive structure (a template dict is compiled).
+        rules (dict | None): {node path: template or {"pattern": ..., "fix": ...}}.
+    """
+    def __init__(self, structure, rules=None):
+        self.structure = structure if isinstance(structure, ArchiveStructure) else ArchiveStructure(structure)
+        self.rules = {}
+        for node, spec in (rules or {}).items():
+            if isinstance(spec, str):
+                spec = {"pattern": spec}
+            self.rules[tuple(part for part in node.split("/") if part)] = (spec["pattern"], spec.get("fix"))
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, structure, path):
+        """Loads rules from a JSON file ({"version": 1, "rules": {...}}); defaults only if it is missing or invalid."""
+        rules = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version", NAMING_RULES_VERSION) > NAMING_RULES_VERSION:
+                    raise ValueError(f"unsupported version {data.get('version')}")
+                rules = data.get("rules", {})
+                policy = cls(structure, rules)
+                for node in policy.rules: # Compile now, so a bad template is reported at startup
+                    policy.rule_for(*node)
+                logging.info(f"Loaded {len(rules)} naming rule(s) from {path}")
+                return policy
+            except (OSError, ValueError, KeyError, TypeError, re.error) as e:
+                logging.error(f"Invalid naming rules in {path}; using the default prefix rule: {e}")
+        return cls(structure)
+
+    def clear_cache(self):
+        with self._lock:
+            self._compiled.clear()
+
+    def set_structure(self, structure):
+        """Switches to a new compiled structure; prefixes are recompiled on demand."""
+        self.structure = structure
+        self.clear_cache()
+
+    def rule_for(self, header, subheader="", section="", subsection=""):
+        """The compiled NamingRule of a folder."""
+        key = (header, subheader or "", section or "", subsection or "")
+        rule = self._compiled.get(key)
+        if rule is None:
+            template, fix_template = self._declared_rule(key)
+            rule = NamingRule(template, self.structure.prefix_for(*key), fix_template)
+            with self._lock:
+                self._compiled[key] = rule
+        return rule
+
+    def _declared_rule(self, key):
+        node = tuple(part for part in key if part)
+        while node:
+            if node in self.rules:
+                return self.rules[node]
+            node = node[:-1]
+        return DEFAULT_TEMPLATE, None
+
+    def review(self, names, header, subheader="", section="", subsection="", existing_names=(), today=None):
+        """
+        Validates a batch of file names against a folder's rule and computes the fixed
+        name of every file in the same pass.
+
+        Args:
+            names (list[str]): File names (no directories).
+            existing_names (iterable[str]): Names already in the folder; only read when the
+                rule numbers files, to continue the sequence.
+
+        Returns:
+            NamingReview
+        """
+        rule = self.rule_for(header, subheader, section, subsection)
+        names = list(names)
+        valid = rule.check(names)
+        sequence = rule.next_sequence(existing_names) if rule.uses_sequence else 1
+        today = today or datetime.date.today()
+        fixed = []
+        for name, ok in zip(names, valid):
+            if ok:
+                fixed.append(name)
+            else:
+                fixed.append(rule.fix(name, sequence, today))
+                sequence += 1
+        return NamingReview(rule, names, valid, fixed)
+
+
+def _derive_fix_template(template):
+    if "{any}" in template:
+        return template.replace("{any}", "_{name}", 1).replace("{any}", "")
+    return template
+
+
+def _date_regex(date_format):
+    parts, position = [], 0
+    for code in re.finditer(r"%(.)", date_format):
+        parts.append(re.escape(date_format[position:code.start()]))
+        if code.group(1) not in _DATE_CODES:
+            raise ValueError(f"Unsupported date code %{code.group(1)} in naming template.")
+        parts.append(_DATE_CODES[code.group(1)])
+        position = code.end()
+    parts.append(re.escape(date_format[position:]))
+    return "".join(parts)
@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pytesseract
+    from PIL import Image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+OCR_LANGUAGES = os.environ.get("ARCHIVE_OCR_LANGUAGES", "eng+ara") # The UI's two languages
+OCR_WORKERS = max(1, (os.cpu_count() or 2) // 4) # Leave most cores to interactive work
+OCR_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".tif")
+OCR_BUSY_RECHECK_SECONDS = 1.0 # Wait this long while paused or while the app is busy
+OCR_BACKFILL_BATCH = 200 # Files checked against the index per backfill step
+PRIORITY_NEW = 0 # New uploads and scans
+PRIORITY_BACKFILL = 1 # Existing archive
+IDLE_PRIORITY_CLASS = 0x00000040 # Windows process priority class
+
+
+def _lower_priority():
+    """Process pool initializer: run OCR workers (and the tesseract processes they start) at idle priority."""
+    os.environ["OMP_THREAD_LIMIT"] = "1" # One core per tesseract process
+    try:
+        if os.name == "nt":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), IDLE_PRIORITY_CLASS)
+        else:
+            os.nice(19)
+    except (OSError, AttributeError):
+        pass
+
+
+def recognize(sources, languages=OCR_LANGUAGES):
+    """Runs in a worker process. Returns the text of every frame of every source image."""
+    texts = []
+    for source in sources:
+        with Image.open(source) as image:
+            for frame_index in range(getattr(image, "n_frames", 1)):
+                image.seek(frame_index)
+                texts.append(pytesseract.image_to_string(image, lang=languages))
+    return "\n".join(text.strip() for text in texts if text.strip())
+
+
+class OcrPipeline:
+    """
+    Background OCR for archived scans, stored in the full-text index of users.db.
+
+    New uploads and scans are queued ahead of the backfill of the existing archive.
+    A dispatcher thread feeds a small process pool running at idle priority, keeps at
+    most `workers` files in flight, and holds off entirely while paused or while
+    is_busy() reports interactive work (e.g. a scan batch).
+
+    Args:
+        repository: ArchiveIndexRepository (save_ocr_text / ocr_state).
+        archive_root (str): Root walked by backfill().
+        is_busy (callable | None): Returns True while OCR should wait.
+    """
+    def __init__(self, repository, archive_root, is_busy=None, workers=OCR_WORKERS, spool_dir=None):
+        self.repository = repository
+        self.archive_root = archive_root
+        self.is_busy = is_busy or (lambda: False)
+        self.workers = workers
+        self.spool_dir = spool_dir # Page images kept for OCR of assembled PDFs
+        self.available = False
+        self.done = 0
+        self.failed = 0
+        self._queue = [] # heap of (priority, seq, path, sources, cleanup)
+        self._queued_paths = set()
+        self._seq = itertools.count()
+        self._backfill = None # Generator of paths, while a backfill is running
+        self._slots = threading.Semaphore(workers)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._stop = threading.Event()
+        self._pool = None
+        self._thread = threading.Thread(target=self._dispatch, name="OcrDispatcher", daemon=True)
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def pause(self):
+        self._running.clear()
+        logging.info("OCR paused.")
+
+    def resume(self):
+        self._running.set()
+        self._wake.set()
+        logging.info("OCR resumed.")
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def submit(self, path, priority=PRIORITY_NEW):
+        """Queues an archived image for OCR; other file types are ignored."""
+        if os.path.splitext(path)[1].lower() in OCR_EXTENSIONS:
+            self._enqueue(priority, path, [path], None)
+
+    def submit_pages(self, path, page_images):
+        """
+        Queues OCR of page images that were assembled into path (a PDF). The images are
+        moved into the spool folder now and deleted once read, so the caller may delete
+        its temporary folder straight away.
+        """
+        if not page_images or not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        spooled = []
+        for image in page_images:
+            target = os.path.join(self.spool_dir, f"{next(self._seq)}_{os.path.basename(image)}")
+            shutil.move(image, target)
+            spooled.append(target)
+        self._enqueue(PRIORITY_NEW, path, spooled, spooled)
+
+    def backfill(self):
+        """Queues every image in the archive that has no up-to-date text (lazily, in batches)."""
+        with self._lock:
+            if self._backfill is None:
+                self._backfill = self._unindexed_images()
+                logging.info("OCR backfill of the archive started.")
+        self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return {"available": self.available, "paused": self.paused, "pending": len(self._queue),
+                    "backfilling": self._backfill is not None, "done": self.done, "failed": self.failed}
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _enqueue(self, priority, path, sources, cleanup):
+        with self._lock:
+            if path in self._queued_paths and cleanup is None:
+                return
+            self._queued_paths.add(path)
+            heapq.heappush(self._queue, (priority, next(self._seq), path, sources, cleanup))
+        self._wake.set()
+
+    def _next_job(self):
+        with self._lock:
+            if self._queue:
+                return heapq.heappop(self._queue)
+            backfill = self._backfill
+        if backfill is not None:
+            path = next(backfill, None)
+            if path is not None:
+                return (PRIORITY_BACKFILL, next(self._seq), path, [path], None)
+            with self._lock:
+                self._backfill = None
+            logging.info("OCR backfill of the archive finished.")
+        return None
+
+    def _dispatch(self):
+        if not self._check_tesseract():
+            return
+        while not self._stop.is_set():
+            if not self._running.is_set() or self.is_busy():
+                self._stop.wait(OCR_BUSY_RECHECK_SECONDS)
+                continue
+            self._slots.acquire()
+            job = self._next_job()
+            if job is None:
+                self._slots.release()
+                self._wake.wait(OCR_BUSY_RECHECK_SECONDS)
+                self._wake.clear()
+                continue
+            _, _, path, sources, cleanup = job
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_lower_priority)
+            try:
+                future = self._pool.submit(recognize, sources, OCR_LANGUAGES)
+            except RuntimeError: # Pool shut down
+                self._slots.release()
+                return
+            future.add_done_callback(lambda f, job=job: self._finished(job, f))
+
+    def _finished(self, job, future):
+        _, _, path, sources, cleanup = job
+        try:
+            text = future.result()
+            stat = os.stat(path)
+            self.repository.save_ocr_text(path, stat.st_mtime, stat.st_size, text, time.time())
+            self.done += 1
+            logging.debug(f"OCR indexed {path} ({len(text)} characters).")
+        except Exception as e:
+            self.failed += 1
+            logging.warning(f"OCR failed for {path}: {e}")
+        finally:
+            with self._lock:
+                self._queued_paths.discard(path)
+            for spooled in cleanup or ():
+                try:
+                    os.remove(spooled)
+                except OSError:
+                    pass
+            self._slots.release()
+
+    def _check_tesseract(self):
+        if not OCR_AVAILABLE:
+            logging.warning("pytesseract/Pillow not installed; OCR disabled.")
+            return False
+        try:
+            version = pytesseract.get_tesseract_version()
+        except Exception as e:
+            logging.warning(f"Tesseract not found ({e}); OCR disabled.")
+            return False
+        self.available = True
+        logging.info(f"OCR enabled: Tesseract {version}, languages {OCR_LANGUAGES}, {self.workers} worker(s).")
+        return True
+
+    def _unindexed_images(self):
+        """Images under archive_root whose mtime/size differ from what was indexed."""
+        stack = [self.archive_root]
+        batch = []
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in OCR_EXTENSIONS:
+                            stat = entry.stat()
+                            batch.append((entry.path, stat.st_mtime, stat.st_size))
+                    except OSError:
+                        continue
+            if len(batch) >= OCR_BACKFILL_BATCH or not stack:
+                known = self.repository.ocr_state(path for path, _, _ in batch)
+                for path, mtime, size in batch:
+                    if known.get(path) != (mtime, size):
+                        yield path
+                batch = []
@@ -0,0 +1,111 @@
+import logging
+import os
+
+from PIL import Image, ImageChops, ImageOps, ImageStat
+
+PDF_TARGET_DPI = 200 # Pages scanned finer than this are downsampled
+PDF_ASSUMED_DPI = 300 # Source resolution when the image does not record one
+PDF_JPEG_QUALITY = 70
+BITONAL_MIN_FRACTION = 0.97 # Share of near-black/near-white pixels for a page to count as text-only
+BITONAL_THRESHOLD = 160 # Grey level separating ink from paper on bitonal pages
+GRAYSCALE_MAX_CHANNEL_SPREAD = 6 # Mean |R-G|/|G-B| below this: store the page as greyscale
+
+
+class PdfAssembler:
+    """
+    Builds one compressed PDF from page images, one page at a time.
+
+    Each page is classified and encoded separately:
+      * bitonal (text) pages become 1-bit images, which Pillow stores with CCITT G4
+        when it is built with libtiff;
+      * greyscale and colour pages are stored as JPEG (DCT) at PDF_JPEG_QUALITY;
+      * pages finer than target_dpi are downsampled first.
+    Pages are appended to the file as they are added (Pillow's incremental PDF append),
+    so only the current page is ever held in memory.
+
+    Args:
+        dest_path (str): PDF file to create (overwritten).
+        target_dpi (int | None): Downsample to this resolution; None keeps the original.
+    """
+    def __init__(self, dest_path, target_dpi=PDF_TARGET_DPI, jpeg_quality=PDF_JPEG_QUALITY):
+        self.dest_path = dest_path
+        self.target_dpi = target_dpi
+        self.jpeg_quality = jpeg_quality
+        self.pages = 0
+        self.source_bytes = 0
+
+    def add_page(self, image_path):
+        """Appends every frame of image_path (multi-page TIFFs included) as PDF pages."""
+        self.source_bytes += os.path.getsize(image_path)
+        with Image.open(image_path) as source:
+            for frame_index in range(getattr(source, "n_frames", 1)):
+                source.seek(frame_index)
+                page, dpi = prepare_page(source, self.target_dpi)
+                # JPEG quality only applies to DCT pages; 1-bit pages are G4 (TIFF encoder)
+                options = {} if page.mode == "1" else {"quality": self.jpeg_quality}
+                page.save(self.dest_path, "PDF", resolution=dpi, append=self.pages > 0, **options)
+                self.pages += 1
+
+    def close(self):
+        """
+        Returns:
+            int: Number of pages written.
+        """
+        if self.pages:
+            pdf_bytes = os.path.getsize(self.dest_path)
+            logging.info(f"PDF assembled: {self.dest_path} ({self.pages} pages, "
+                         f"{self.source_bytes} -> {pdf_bytes} bytes)")
+        return self.pages
+
+
+def assemble_pdf(image_paths, dest_path, target_dpi=PDF_TARGET_DPI, jpeg_quality=PDF_JPEG_QUALITY):
+    """
+    Writes image_paths, in order, as one compressed PDF.
+
+    Returns:
+        int: Number of pages written.
+    """
+    assembler = PdfAssembler(dest_path, target_dpi, jpeg_quality)
+    for image_path in image_paths:
+        assembler.add_page(image_path)
+    return assembler.close()
+
+
+def prepare_page(image, target_dpi=PDF_TARGET_DPI):
+    """
+    Returns:
+        tuple: (image in mode "1", "L" or "RGB", dpi it should be stored at).
+    """
+    image = ImageOps.exif_transpose(image)
+    dpi = image.info.get("dpi", (PDF_ASSUMED_DPI, PDF_ASSUMED_DPI))[0] or PDF_ASSUMED_DPI
+    if image.mode not in ("1", "L", "RGB"):
+        image = image.convert("RGB") # Drops alpha / palettes; PDF pages are opaque
+    if image.mode == "RGB" and _is_grayscale(image):
+        image = image.convert("L")
+    bitonal = image.mode == "1" or (image.mode == "L" and _is_bitonal(image))
+    if image.mode == "1":
+        image = image.convert("L") # Resample in greyscale, then threshold again
+    if target_dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+        dpi = target_dpi
+    if bitonal:
+        image = image.point(lambda v: 255 if v >= BITONAL_THRESHOLD else 0, "1")
+    return image, dpi
+
+
+def _is_grayscale(image):
+    sample = image.copy()
+    sample.thumbnail((128, 128))
+    r, g, b = sample.split()
+    spread = max(ImageStat.Stat(ImageChops.difference(r, g)).mean[0],
+                 ImageStat.Stat(ImageChops.difference(g, b)).mean[0])
+    return spread < GRAYSCALE_MAX_CHANNEL_SPREAD
+
+
+def _is_bitonal(image):
+    histogram = image.histogram()
+    total = sum(histogram) or 1
+    extremes = sum(histogram[:48]) + sum(histogram[208:])
+    return extremes / total >= BITONAL_MIN_FRACTION
@@ -0,0 +1,133 @@
+import logging
+import os
+import stat
+import threading
+
+if os.name == "nt":
+    import ctypes
+    from ctypes import wintypes
+
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+INVALID_FILE_ATTRIBUTES = 0xFFFFFFFF
+HIDDEN_MASK = FILE_ATTRIBUTE_HIDDEN | FILE_ATTRIBUTE_SYSTEM # Same bits as `attrib +h +s`
+
+POSIX_VISIBLE_MODE = 0o755
+POSIX_HIDDEN_MODE = 0o700
+
+
+class PermissionManager:
+    """
+    In-process visibility/permission control for the archive tree, replacing `attrib` and
+    `chmod` subprocesses.
+
+    On Windows the hidden+system attributes are set through GetFileAttributesW /
+    SetFileAttributesW. Elsewhere the root folder's mode is switched between 0o755 and
+    0o700 (the mode of the root gates access to everything below it, so descendants
+    are left alone, as before).
+
+    The last state applied to each path is remembered, so repeated show/hide calls only
+    touch paths whose state actually has to change. Paths created since the last pass
+    are simply not in the cache yet and get handled on the next one.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._applied = {} # path -> True (visible) / False (hidden)
+        self._lock = threading.Lock()
+        self._kernel32 = None
+        if os.name == "nt":
+            try:
+                self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+                self._kernel32.GetFileAttributesW.argtypes = [wintypes.LPCWSTR]
+                self._kernel32.GetFileAttributesW.restype = wintypes.DWORD
+                self._kernel32.SetFileAttributesW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD]
+                self._kernel32.SetFileAttributesW.restype = wintypes.BOOL
+            except (OSError, AttributeError) as e:
+                logging.error(f"PermissionManager: could not load kernel32 file attribute APIs: {e}")
+                self._kernel32 = None
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+    def set_visible(self, visible, recursive=False, use_cache=True):
+        """
+        Shows or hides the archive root, and on Windows optionally everything below it.
+
+        Args:
+            visible (bool): True to show, False to hide.
+            recursive (bool): Also apply to every folder and file under the root
+                (Windows only; equivalent to `attrib /S /D`).
+            use_cache (bool): Skip paths already known to be in the desired state. Pass
+                False to re-check every path against the file system.
+
+        Returns:
+            tuple: (checked, changed) path counts.
+        """
+        if not os.path.exists(self.root):
+            logging.warning(f"PermissionManager: archive root does not exist: {self.root}")
+            return 0, 0
+        checked = changed = 0
+        with self._lock:
+            for path in self._targets(recursive):
+                if use_cache and self._applied.get(path) is visible:
+                    continue
+                checked += 1
+                try:
+                    if self._apply(path, visible):
+                        changed += 1
+                    self._applied[path] = visible
+                except OSError as e:
+                    self._applied.pop(path, None)
+                    logging.error(f"PermissionManager: could not update '{path}': {e}")
+        logging.info(f"Archive {'shown' if visible else 'hidden'} "
+                     f"({'recursive' if recursive else 'root only'}): {checked} checked, {changed} changed.")
+        return checked, changed
+
+    def forget(self, path=None):
+        """Drops cached state for path and everything below it (or for the whole tree)."""
+        with self._lock:
+            if path is None:
+                self._applied.clear()
+                return
+            prefix = os.path.abspath(path)
+            for cached in [p for p in self._applied if p == prefix or p.startswith(prefix + os.sep)]:
+                del self._applied[cached]
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _targets(self, recursive):
+        yield self.root
+        if not recursive or os.name != "nt":
+            return
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in dirnames:
+                yield os.path.join(dirpath, name)
+            for name in filenames:
+                yield os.path.join(dirpath, name)
+
+    def _apply(self, path, visible):
+        """Brings one path to the desired state. Returns True if anything was changed."""
+        if os.name == "nt":
+            return self._apply_windows(path, visible)
+        return self._apply_posix(path, visible)
+
+    def _apply_windows(self, path, visible):
+        if self._kernel32 is None:
+            raise OSError("kernel32 file attribute APIs unavailable")
+        attrs = self._kernel32.GetFileAttributesW(path)
+        if attrs == INVALID_FILE_ATTRIBUTES:
+            raise ctypes.WinError(ctypes.get_last_error())
+        desired = attrs & ~HIDDEN_MASK if visible else attrs | HIDDEN_MASK
+        if desired == attrs:
+            return False
+        if not self._kernel32.SetFileAttributesW(path, desired):
+            raise ctypes.WinError(ctypes.get_last_error())
+        return True
+
+    def _apply_posix(self, path, visible):
+        desired = POSIX_VISIBLE_MODE if visible else POSIX_HIDDEN_MODE
+        if stat.S_IMODE(os.stat(path).st_mode) == desired:
+            return False
+        os.chmod(path, desired)
+        return True
@@ -0,0 +1,247 @@
+import functools
+import itertools
+import logging
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+try:
+    import win32api
+    import win32print
+    import win32ui
+    from PIL import Image, ImageWin
+    WIN32_PRINT_AVAILABLE = True
+except ImportError:
+    WIN32_PRINT_AVAILABLE = False
+
+PRINTER_CACHE_SECONDS = 300 # Printer list is re-enumerated at most this often
+PRINT_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".tif")
+HORZRES, VERTRES = 8, 10 # GetDeviceCaps indexes: printable area in device pixels
+
+JOB_QUEUED = "queued"
+JOB_PRINTING = "printing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class PrintJob:
+    def __init__(self, job_id, files, printer, title):
+        self.id = job_id
+        self.files = list(files)
+        self.printer = printer
+        self.title = title
+        self.status = JOB_QUEUED
+        self.error = None
+        self.submitted = time.time()
+
+    def describe(self):
+        target = f" on '{self.printer}'" if self.printer else ""
+        text = f"Print job #{self.id} ({len(self.files)} file(s){target}): {self.status}"
+        return f"{text} - {self.error}" if self.error else text
+
+
+class PrintSpooler:
+    """
+    Prints archived files from one background thread, in submission order.
+
+    Originals are sent as they are, without re-encoding:
+      * Windows: the images of a job are drawn page by page into ONE spooler document
+        through GDI (win32ui + PIL.ImageWin); other files are handed to their
+        application's "printto" verb.
+      * macOS/Linux: all files of a job go to a single `lp` call (CUPS converts them).
+    The printer list is enumerated on the spooler thread too (EnumPrinters / lpstat can
+    take seconds with network printers) and cached for PRINTER_CACHE_SECONDS; callers on
+    the UI thread only ever read the cache.
+
+    Args:
+        on_status (callable | None): on_status(job) whenever a job changes state, from the
+            spooler thread.
+    """
+    def __init__(self, on_status=None):
+        self.on_status = on_status
+        self.last_printer = None
+        self._printers = None
+        self._printers_at = 0
+        self._printers_refresh_queued = False
+        self._printers_lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(target=self._run, name="PrintSpooler", daemon=True)
+        self._thread.start()
+
+    # --------------------------------------------------------------------------
+    # Printers
+    # --------------------------------------------------------------------------
+    def printers(self):
+        """
+        The cached printer list; never enumerates. A missing or stale cache is refreshed in
+        the background, so the first call may return an empty list.
+
+        Returns:
+            tuple: (list of printer names, default printer name or None).
+        """
+        with self._printers_lock:
+            printers = self._printers
+            stale = printers is None or time.time() - self._printers_at > PRINTER_CACHE_SECONDS
+        if stale:
+            self.refresh_printers()
+        return printers or ([], None)
+
+    def refresh_printers(self, on_done=None):
+        """
+        Queues a re-enumeration of the printers on the spooler thread.
+
+        Args:
+            on_done (callable | None): on_done(names, default), from the spooler thread.
+        """
+        with self._printers_lock:
+            if on_done is None and self._printers_refresh_queued:
+                return
+            self._printers_refresh_queued = True
+        self._jobs.put(functools.partial(self._refresh_printers, on_done))
+
+    def _refresh_printers(self, on_done):
+        try:
+            printers = _enumerate_printers()
+        except Exception as e:
+            logging.error(f"Could not list printers: {e}")
+            printers = ([], None)
+        with self._printers_lock:
+            self._printers = printers
+            self._printers_at = time.time()
+            self._printers_refresh_queued = False
+        if on_done:
+            try:
+                on_done(*printers)
+            except Exception as e:
+                logging.error(f"Printer list callback failed: {e}")
+
+    def preferred_printer(self):
+        """The printer used last in this session, else the system default."""
+        names, default = self.printers()
+        if self.last_printer in names:
+            return self.last_printer
+        return default or (names[0] if names else None)
+
+    # --------------------------------------------------------------------------
+    # Jobs
+    # --------------------------------------------------------------------------
+    def submit(self, files, printer=None, title="Archive"):
+        """Queues files as one print job and returns it immediately."""
+        job = PrintJob(next(self._ids), files, printer, title)
+        if printer:
+            self.last_printer = printer
+        self._jobs.put(job)
+        self._notify(job)
+        logging.info(f"Print job #{job.id} queued: {len(job.files)} file(s), printer '{printer}'.")
+        return job
+
+    def _notify(self, job):
+        if self.on_status:
+            try:
+                self.on_status(job)
+            except Exception as e:
+                logging.error(f"Print status callback failed: {e}")
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if callable(job): # Printer list refresh
+                job()
+                continue
+            job.status = JOB_PRINTING
+            self._notify(job)
+            try:
+                if platform.system() == "Windows":
+                    self._print_windows(job)
+                else:
+                    self._print_lp(job)
+                job.status = JOB_DONE
+                logging.info(f"Print job #{job.id} sent to the printer.")
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                logging.error(f"Print job #{job.id} failed: {e}", exc_info=True)
+            self._notify(job)
+
+    def _print_windows(self, job):
+        if not WIN32_PRINT_AVAILABLE:
+            raise RuntimeError("Printing needs pywin32 (win32print/win32ui).")
+        try:
+            printer = job.printer or win32print.GetDefaultPrinter()
+        except Exception as e:
+            raise RuntimeError("No printer found.") from e
+        images = [f for f in job.files if os.path.splitext(f)[1].lower() in PRINT_IMAGE_EXTENSIONS]
+        documents = [f for f in job.files if f not in images]
+        if images:
+            _print_images_gdi(images, printer, job.title)
+        for document in documents:
+            # Application-specific printing (PDF reader, Office); returns once handed over
+            win32api.ShellExecute(0, "printto", document, f'"{printer}"', os.path.dirname(document), 0)
+
+    def _print_lp(self, job):
+        if not shutil.which("lp"):
+            raise RuntimeError("The 'lp' command is not available.")
+        command = ["lp", "-t", job.title]
+        if job.printer:
+            command += ["-d", job.printer]
+        result = subprocess.run(command + ["--"] + job.files, capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"lp exited with code {result.returncode}")
+
+
+def _enumerate_printers():
+    if platform.system() == "Windows":
+        if not WIN32_PRINT_AVAILABLE:
+            return [], None
+        flags = win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
+        names = [printer[2] for printer in win32print.EnumPrinters(flags)]
+        try:
+            default = win32print.GetDefaultPrinter()
+        except Exception:
+            default = None
+        return names, default
+    if not shutil.which("lpstat"):
+        return [], None
+    listing = subprocess.run(["lpstat", "-e"], capture_output=True, text=True, check=False).stdout
+    names = [line.strip() for line in listing.splitlines() if line.strip()]
+    default_line = subprocess.run(["lpstat", "-d"], capture_output=True, text=True, check=False).stdout
+    default = default_line.rsplit(":", 1)[-1].strip() if ":" in default_line else None
+    return names, default if default in names else None
+
+
+def _print_images_gdi(paths, printer, title):
+    """Draws each image (every frame of multi-page TIFFs) on its own page of one print document."""
+    dc = win32ui.CreateDC()
+    dc.CreatePrinterDC(printer)
+    try:
+        printable = dc.GetDeviceCaps(HORZRES), dc.GetDeviceCaps(VERTRES)
+        dc.StartDoc(title)
+        try:
+            _draw_pages(dc, paths, printable)
+        except Exception:
+            dc.AbortDoc() # Nothing half-printed is left in the queue
+            raise
+        dc.EndDoc()
+    finally:
+        dc.DeleteDC()
+
+
+def _draw_pages(dc, paths, printable):
+    for path in paths:
+        with Image.open(path) as image:
+            for frame_index in range(getattr(image, "n_frames", 1)):
+                image.seek(frame_index)
+                page = image if image.mode in ("1", "L", "RGB") else image.convert("RGB")
+                if (page.width > page.height) != (printable[0] > printable[1]):
+                    page = page.rotate(90, expand=True) # Landscape scans on portrait paper
+                scale = min(printable[0] / page.width, printable[1] / page.height)
+                width, height = int(page.width * scale), int(page.height * scale)
+                left, top = (printable[0] - width) // 2, (printable[1] - height) // 2
+                dc.StartPage()
+                ImageWin.Dib(page).draw(dc.GetHandleOutput(), (left, top, left + width, top + height))
+                dc.EndPage()
@@ -0,0 +1,218 @@
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+
+from controllers.pdf_assembler import PdfAssembler
+from instrumentation import OP_SCAN, metrics
+
+try:
+    import comtypes
+    import comtypes.client
+    from _ctypes import COMError
+    WIA_AVAILABLE = True
+except ImportError:
+    WIA_AVAILABLE = False
+
+# WIA 2.0 constants (wiadef.h / WIA Automation Layer)
+WIA_DEVICE_TYPE_SCANNER = 1
+WIA_DPS_DOCUMENT_HANDLING_CAPABILITIES = 3086
+WIA_DPS_DOCUMENT_HANDLING_STATUS = 3087
+WIA_DPS_DOCUMENT_HANDLING_SELECT = 3088
+WIA_DPS_PAGES = 3096
+WIA_FEEDER = 0x001
+WIA_FLATBED = 0x002
+WIA_FEED_READY = 0x001
+WIA_ERROR_PAPER_EMPTY = 0x80210003
+WIA_FORMAT_PNG = "{B96B3CAF-0728-11D3-9D7B-0000F81EF32E}"
+
+SCAN_QUEUE_PAGES = 8 # Acquired pages waiting to be archived; the scanner pauses beyond this
+MAX_FEEDER_PAGES = 500 # Safety stop for drivers that never report an empty feeder
+
+
+class ScanBatch:
+    """
+    Scans every page in the document feeder (or one flatbed page) without UI, off the Tk
+    thread, and archives each page as soon as it arrives.
+
+    Two threads form the pipeline: the acquisition thread owns the COM apartment and
+    saves each transferred page to a temporary file; the store thread moves pages into
+    the archive with ArchiveController.store_file, or, with pdf_name, appends them to one
+    compressed PDF (PdfAssembler) that is archived when the feeder is empty. A bounded
+    queue between the threads keeps at most SCAN_QUEUE_PAGES pages in flight.
+
+    Args:
+        archive_controller: ArchiveController used to store the pages.
+        dest_folder (str): Archive folder the pages go to.
+        name_for (callable): name_for(page_number, ext) -> file name (page_number from 1).
+        pdf_name (str | None): Archive the batch as this single PDF instead of one image per page.
+        on_page (callable | None): on_page(page_number) after each page is stored or added
+            to the PDF, from the store thread.
+        on_file (callable | None): on_file(dest_file) for each file written to the archive.
+        page_sink (callable | None): With pdf_name, page_sink(dest_file, page_images) receives
+            the page images of the stored PDF (e.g. for OCR) and must move them away before
+            returning; otherwise they are deleted.
+        on_done (callable | None): on_done(pages_stored, error_message_or_None), called once.
+        use_feeder (bool): Prefer the document feeder when the device has one.
+    """
+    def __init__(self, archive_controller, dest_folder, name_for, pdf_name=None,
+                 on_page=None, on_file=None, on_done=None, page_sink=None, use_feeder=True):
+        self.archive_controller = archive_controller
+        self.dest_folder = dest_folder
+        self.name_for = name_for
+        self.pdf_name = pdf_name
+        self.on_page = on_page
+        self.on_file = on_file
+        self.on_done = on_done
+        self.page_sink = page_sink
+        self.use_feeder = use_feeder
+        self.pages_stored = 0
+        self._pages = queue.Queue(maxsize=SCAN_QUEUE_PAGES)
+        self._cancelled = threading.Event()
+        self._error = None
+        self._temp_dir = tempfile.mkdtemp(prefix="archive_scan_")
+        self._acquire_thread = threading.Thread(target=self._acquire, name="ScanAcquire", daemon=True)
+        self._store_thread = threading.Thread(target=self._store, name="ScanStore", daemon=True)
+
+    def start(self):
+        if not WIA_AVAILABLE:
+            raise RuntimeError("Scanning via WIA is not available (comtypes is not installed).")
+        self._store_thread.start()
+        self._acquire_thread.start()
+        return self
+
+    def cancel(self):
+        """Stops after the page currently being transferred; pages already scanned are kept."""
+        self._cancelled.set()
+
+    # --------------------------------------------------------------------------
+    # Acquisition (COM thread)
+    # --------------------------------------------------------------------------
+    def _acquire(self):
+        comtypes.CoInitializeEx(comtypes.COINIT_APARTMENTTHREADED) # WIA objects must live in an STA
+        try:
+            device = self._connect_scanner()
+            feeder = self.use_feeder and self._select_feeder(device)
+            item = device.Items[1]
+            page_number = 0
+            while not self._cancelled.is_set() and page_number < MAX_FEEDER_PAGES:
+                if feeder and page_number and not self._feeder_ready(device):
+                    break
+                try:
+                    with metrics.timer(OP_SCAN):
+                        image = item.Transfer(WIA_FORMAT_PNG)
+                except COMError as e:
+                    if (e.hresult & 0xFFFFFFFF) == WIA_ERROR_PAPER_EMPTY:
+                        if not page_number:
+                            self._error = "The document feeder is empty."
+                        break
+                    raise
+                page_number += 1
+                ext = "." + (getattr(image, "FileExtension", "") or "png").lower().lstrip(".")
+                temp_path = os.path.join(self._temp_dir, f"page_{page_number:04d}{ext}")
+                image.SaveFile(temp_path)
+                logging.info(f"[Scan] Page {page_number} acquired ({ext}).")
+                self._pages.put((page_number, temp_path, ext)) # Blocks while the store stage is behind
+                if not feeder:
+                    break
+        except Exception as e:
+            logging.error(f"[Scan] Acquisition failed: {e}", exc_info=True)
+            self._error = str(e)
+        finally:
+            self._pages.put(None)
+            comtypes.CoUninitialize()
+
+    def _connect_scanner(self):
+        manager = comtypes.client.CreateObject("WIA.DeviceManager")
+        for index in range(1, manager.DeviceInfos.Count + 1):
+            info = manager.DeviceInfos[index]
+            if info.Type == WIA_DEVICE_TYPE_SCANNER:
+                logging.info(f"[Scan] Using scanner '{info.Properties['Name'].Value}'.")
+                return info.Connect()
+        raise RuntimeError("No WIA scanner is connected.")
+
+    def _select_feeder(self, device):
+        """Switches the device to its feeder; False if it has none (flatbed only)."""
+        capabilities = _get_property(device, WIA_DPS_DOCUMENT_HANDLING_CAPABILITIES) or 0
+        if not capabilities & WIA_FEEDER:
+            return False
+        _set_property(device, WIA_DPS_DOCUMENT_HANDLING_SELECT, WIA_FEEDER)
+        _set_property(device, WIA_DPS_PAGES, 1) # One page per Transfer call
+        return True
+
+    def _feeder_ready(self, device):
+        status = _get_property(device, WIA_DPS_DOCUMENT_HANDLING_STATUS)
+        return status is None or bool(status & WIA_FEED_READY) # Unknown: let Transfer decide
+
+    # --------------------------------------------------------------------------
+    # Storing
+    # --------------------------------------------------------------------------
+    def _store(self):
+        pdf = PdfAssembler(os.path.join(self._temp_dir, "batch.pdf")) if self.pdf_name else None
+        kept_pages = [] # Page images handed to page_sink once the PDF is stored
+        try:
+            while True:
+                page = self._pages.get()
+                if page is None:
+                    break
+                page_number, temp_path, ext = page
+                try:
+                    if pdf:
+                        pdf.add_page(temp_path)
+                    else:
+                        self._archive(temp_path, self.name_for(page_number, ext))
+                    self.pages_stored += 1
+                    if self.on_page:
+                        self.on_page(page_number)
+                except Exception as e:
+                    logging.error(f"[Scan] Failed to archive page {page_number}: {e}", exc_info=True)
+                    self._error = self._error or f"Page {page_number} could not be saved: {e}"
+                    self._cancelled.set()
+                finally:
+                    if pdf and self.page_sink:
+                        kept_pages.append(temp_path)
+                    else:
+                        try:
+                            os.remove(temp_path)
+                        except OSError:
+                            pass
+            if pdf and pdf.close():
+                dest_file = self._archive(pdf.dest_path, self.pdf_name)
+                if self.page_sink:
+                    self.page_sink(dest_file, kept_pages)
+        except Exception as e:
+            logging.error(f"[Scan] Failed to archive the scanned PDF: {e}", exc_info=True)
+            self._error = self._error or f"The PDF could not be saved: {e}"
+            self.pages_stored = 0
+        finally:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            logging.info(f"[Scan] Batch finished: {self.pages_stored} pages archived to {self.dest_folder}.")
+            if self.on_done:
+                self.on_done(self.pages_stored, self._error)
+
+    def _archive(self, path, filename):
+        dest_file = self.archive_controller.store_file(self.dest_folder, path, filename)
+        if self.on_file:
+            self.on_file(dest_file)
+        return dest_file
+
+
+def _find_property(obj, prop_id):
+    for index in range(1, obj.Properties.Count + 1):
+        prop = obj.Properties[index]
+        if prop.PropertyID == prop_id:
+            return prop
+    return None
+
+
+def _get_property(obj, prop_id):
+    prop = _find_property(obj, prop_id)
+    return prop.Value if prop is not None else None
+
+
+def _set_property(obj, prop_id, value):
+    prop = _find_property(obj, prop_id)
+    if prop is not None:
+        prop.Value = value
@@ -0,0 +1,160 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+
+DEFAULT_IDLE_TIMEOUT_SECONDS = 10 * 60
+DEFAULT_MAX_LIFETIME_SECONDS = 8 * 60 * 60
+
+
+class Session:
+    """
+    A verified login held in memory only.
+
+    password_tag is an HMAC of the password under the manager's per-process key, so an
+    unlock can be checked with one HMAC instead of a full PBKDF2 derivation. It is never
+    written anywhere and is useless once the process exits.
+    """
+    __slots__ = ("username", "role", "token", "created_at", "last_activity", "password_tag")
+
+    def __init__(self, username, role, token, password_tag, now):
+        self.username = username
+        self.role = role
+        self.token = token
+        self.password_tag = password_tag
+        self.created_at = now
+        self.last_activity = now
+
+
+class SessionManager:
+    """
+    Caches recently verified credentials so lock/unlock and user switches on a shared
+    station do not re-derive PBKDF2 hashes. Stored hashes are untouched.
+
+    Sessions expire after `idle_timeout` seconds without activity, or `max_lifetime`
+    seconds after the full verification that created them, whichever comes first.
+    """
+    def __init__(self, idle_timeout=DEFAULT_IDLE_TIMEOUT_SECONDS, max_lifetime=DEFAULT_MAX_LIFETIME_SECONDS):
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self._key = secrets.token_bytes(32) # Per-process signing key, never persisted
+        self._sessions = {} # username -> Session
+        self._lock = threading.Lock()
+
+    def _password_tag(self, username, password):
+        message = f"pwd\0{username}\0{password}".encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def _sign(self, username, nonce, issued_at):
+        message = f"tok\0{username}\0{nonce}\0{issued_at}".encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).hexdigest()
+
+    def _is_expired(self, session, now):
+        return (now - session.last_activity > self.idle_timeout or
+                now - session.created_at > self.max_lifetime)
+
+    def create(self, username, role, password):
+        """
+        Starts (or replaces) the session for username after a successful full verification.
+
+        Returns:
+            str: A signed session token of the form '<nonce>.<issued_at>.<signature>'.
+        """
+        now = time.time()
+        nonce = secrets.token_urlsafe(16)
+        issued_at = int(now)
+        token = f"{nonce}.{issued_at}.{self._sign(username, nonce, issued_at)}"
+        with self._lock:
+            self._sessions[username] = Session(username, role, token,
+                                               self._password_tag(username, password), now)
+        logging.info(f"Session started for '{username}'.")
+        return token
+
+    def validate(self, token):
+        """
+        Returns the live Session for token, or None if the token is unknown, forged or expired.
+        Does not count as activity.
+        """
+        if not token:
+            return None
+        try:
+            nonce, issued_at, _signature = token.split(".")
+        except ValueError:
+            return None
+        now = time.time()
+        with self._lock:
+            for username, session in self._sessions.items():
+                if not hmac.compare_digest(session.token, token):
+                    continue
+                expected = f"{nonce}.{issued_at}.{self._sign(username, nonce, issued_at)}"
+                if not hmac.compare_digest(expected, token):
+                    return None
+                if self._is_expired(session, now):
+                    del self._sessions[username]
+                    logging.info(f"Session for '{username}' expired.")
+                    return None
+                return session
+        return None
+
+    def touch(self, token):
+        """Records user activity for the session identified by token."""
+        session = self.validate(token)
+        if session:
+            session.last_activity = time.time()
+
+    def idle_seconds(self, token):
+        """Seconds since the last recorded activity, or None if the session is no longer valid."""
+        session = self.validate(token)
+        if not session:
+            return None
+        return time.time() - session.last_activity
+
+    def unlock(self, username, password):
+        """
+        Fast path for lock screens and user switches: checks password against the cached
+        session instead of the stored PBKDF2 hash.
+
+        Returns:
+            Session | None: The refreshed session on success, None if there is no live
+            session for username or the password does not match it.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(username)
+            if not session:
+                return None
+            if self._is_expired(session, now):
+                del self._sessions[username]
+                logging.info(f"Session for '{username}' expired.")
+                return None
+            if not hmac.compare_digest(session.password_tag, self._password_tag(username, password)):
+                return None
+            session.last_activity = now
+            return session
+
+    def verify_password(self, username, password):
+        """Returns True if password matches the live session for username (no activity recorded)."""
+        with self._lock:
+            session = self._sessions.get(username)
+            if not session or self._is_expired(session, time.time()):
+                return False
+            return hmac.compare_digest(session.password_tag, self._password_tag(username, password))
+
+    def invalidate(self, username):
+        """Ends the session for username, e.g. after a password/role change or deletion."""
+        with self._lock:
+            if self._sessions.pop(username, None):
+                logging.info(f"Session for '{username}' invalidated.")
+
+    def purge_expired(self):
+        """Drops all expired sessions. Returns the number removed."""
+        now = time.time()
+        with self._lock:
+            expired = [u for u, s in self._sessions.items() if self._is_expired(s, now)]
+            for username in expired:
+                del self._sessions[username]
+        if expired:
+            logging.info(f"Purged {len(expired)} expired session(s).")
+        return len(expired)
@@ -1,23 +1,80 @@
 import logging
+import time
 from passlib.hash import pbkdf2_sha256
 from tkinter import messagebox
 
+# passlib's default cost for pbkdf2_sha256; used when no explicit cost is configured.
+DEFAULT_KDF_ROUNDS = 29000
+
+# Brute-force protection: failures allowed before a lockout, then exponential backoff.
+LOGIN_FREE_ATTEMPTS = 3
+LOGIN_BACKOFF_BASE_SECONDS = 2
+LOGIN_BACKOFF_MAX_SECONDS = 300
+
+
+def login_backoff_seconds(failed_attempts):
+    """
+    Returns how long an account stays locked after `failed_attempts` consecutive failures.
+
+    The first LOGIN_FREE_ATTEMPTS failures are free; after that the delay doubles with
+    every further failure, capped at LOGIN_BACKOFF_MAX_SECONDS.
+    """
+    excess = failed_attempts - LOGIN_FREE_ATTEMPTS
+    if excess < 0:
+        return 0
+    return min(LOGIN_BACKOFF_BASE_SECONDS * (2 ** excess), LOGIN_BACKOFF_MAX_SECONDS)
+
+
 class UserController:
     """
     Handles user authentication and password management.
     """
-    def __init__(self, users_store):
-        # users_store: dict of username -> {password: hash, role: str}
-        self._users = users_store
+    def __init__(self, repository, kdf_rounds=DEFAULT_KDF_ROUNDS):
+        # repository: UserRepository backed by users.db (safe to use from worker threads)
+        self._repository = repository
+        # kdf_rounds: PBKDF2 iteration count used for new hashes and rehash-on-login
+        self.kdf_rounds = kdf_rounds
+        self._hasher = pbkdf2_sha256.using(rounds=kdf_rounds)
+
+    def hash_password(self, password):
+        """Returns a new pbkdf2_sha256 hash of password using the configured cost."""
+        return self._hasher.hash(password)
+
+    def needs_rehash(self, stored_hash):
+        """
+        Returns True if stored_hash was derived with a different cost than the configured one.
+        Hashes have the form '$pbkdf2-sha256$<rounds>$<salt>$<checksum>'.
+        """
+        try:
+            return int(stored_hash.split("$")[2]) != self.kdf_rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    def check_password(self, username, password):
+        """Returns True if password matches the stored hash for username."""
+        user = self._repository.get(username)
+        return bool(user) and pbkdf2_sha256.verify(password, user["password"])
 
     def verify_credentials(self, username, password):
         """
-        Verifies username/password against the users store.
+        Verifies username/password against users.db.
         Returns a dict {'username': ..., 'role': ...} on success, or None on failure.
+
+        If the stored hash uses a different KDF cost than configured, it is transparently
+        replaced with a hash at the configured cost (the plaintext is only available here).
         """
-        if username in self._users and pbkdf2_sha256.verify(password, self._users[username]["password"]):
-            return {"username": username, "role": self._users[username]["role"]}
-        return None
+        user = self._repository.get(username)
+        if not user or not pbkdf2_sha256.verify(password, user["password"]):
+            return None
+
+        if self.needs_rehash(user["password"]):
+            try:
+                self._repository.update_password(username, self.hash_password(password))
+                logging.info(f"Password hash for '{username}' upgraded to {self.kdf_rounds} KDF rounds.")
+            except Exception as e:
+                logging.error(f"Failed to persist rehashed password for '{username}': {e}", exc_info=True)
+
+        return {"username": username, "role": user["role"]}
 
     def change_password(self, current_user, current_pwd, new_pwd, confirm_pwd, parent_window=None):
         """
@@ -42,12 +99,39 @@ class UserController:
             return False
 
         username = current_user["username"]
-        if not pbkdf2_sha256.verify(current_pwd, self._users[username]["password"]):
+        if not self.check_password(username, current_pwd):
             messagebox.showerror("Error", "Current password is incorrect", parent=parent_window)
             return False
 
         # Update hash
-        self._users[username]["password"] = pbkdf2_sha256.hash(new_pwd)
+        self._repository.update_password(username, self.hash_password(new_pwd))
         messagebox.showinfo("Success", "Password changed successfully", parent=parent_window)
         logging.info(f"Admin '{username}' changed their password")
-        return True
\ No newline at end of file
+        return True
+
+    # --------------------------------------------------------------------------
+    # Login lockout (brute-force protection)
+    # --------------------------------------------------------------------------
+    def lockout_remaining(self, username):
+        """Returns the number of seconds username is still locked out for (0 if not locked)."""
+        row = self._repository.get_lockout(username)
+        if not row:
+            return 0
+        return max(0.0, row[1] - time.time())
+
+    def record_failed_login(self, username):
+        """
+        Increments the failed-attempt counter for username and applies exponential backoff.
+        Returns the resulting lockout in seconds (0 while still within the free attempts).
+        """
+        result = self._repository.record_failure(username, login_backoff_seconds, time.time())
+        if not result:
+            return 0 # Unknown user: nothing to track
+        failed_attempts, lockout = result
+        if lockout:
+            logging.warning(f"User '{username}' locked for {lockout}s after {failed_attempts} failed login attempts.")
+        return lockout
+
+    def reset_failed_logins(self, username):
+        """Clears the failed-attempt counter after a successful login."""
+        self._repository.reset_failures(username)
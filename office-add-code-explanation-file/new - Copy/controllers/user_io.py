@@ -0,0 +1,192 @@
+import csv
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from passlib.hash import pbkdf2_sha256
+
+VALID_ROLES = ("admin", "user")
+MAX_USERNAME_LENGTH = 64
+EXPORT_FIELDS = ["username", "role", "password_hash"]
+PBKDF2_HASH_PREFIX = "$pbkdf2-sha256$"
+# Below this many passwords the process pool costs more to start than it saves
+PARALLEL_HASH_THRESHOLD = 8
+
+
+def _hash_password_worker(password, rounds):
+    # Top-level so it can be pickled into ProcessPoolExecutor workers
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def read_user_file(path):
+    """
+    Reads user records from a .csv or .json file.
+
+    CSV files need a header row; JSON files hold a list of objects. Recognised fields are
+    username, role, password (plaintext, hashed on import) and password_hash (an existing
+    pbkdf2_sha256 hash, e.g. from an export, stored as-is).
+
+    Returns:
+        list: (row_number, dict) tuples. Row numbers match what the user sees in the file
+        (CSV rows count the header as row 1, JSON entries start at 1).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return [(row_number, row) for row_number, row in enumerate(csv.DictReader(f), start=2)]
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError("JSON user file must contain a list of user objects.")
+        return list(enumerate(data, start=1))
+    raise ValueError(f"Unsupported user file type '{ext}'. Use .csv or .json.")
+
+
+def validate_user_records(records, existing_usernames, update_existing=False):
+    """
+    Checks raw records without touching the database.
+
+    Returns:
+        tuple: (valid, errors). valid is a list of dicts with username, role, row and
+        either password or password_hash; errors is a list of (row_number, message).
+    """
+    valid = []
+    errors = []
+    seen = set()
+    for row_number, record in records:
+        if not isinstance(record, dict):
+            errors.append((row_number, "Row is not an object."))
+            continue
+        username = str(record.get("username") or "").strip()
+        role = str(record.get("role") or "user").strip().lower()
+        password = str(record.get("password") or "")
+        password_hash = str(record.get("password_hash") or "").strip()
+
+        if not username:
+            errors.append((row_number, "Username is required."))
+            continue
+        if len(username) > MAX_USERNAME_LENGTH:
+            errors.append((row_number, f"Username '{username}' is longer than {MAX_USERNAME_LENGTH} characters."))
+            continue
+        if username in seen:
+            errors.append((row_number, f"Username '{username}' appears more than once in the file."))
+            continue
+        if role not in VALID_ROLES:
+            errors.append((row_number, f"Role '{role}' is not one of: {', '.join(VALID_ROLES)}."))
+            continue
+        if password_hash and not password_hash.startswith(PBKDF2_HASH_PREFIX):
+            errors.append((row_number, "password_hash is not a pbkdf2_sha256 hash."))
+            continue
+        if not password and not password_hash:
+            errors.append((row_number, "A password or password_hash is required."))
+            continue
+        if username in existing_usernames and not update_existing:
+            errors.append((row_number, f"User '{username}' already exists."))
+            continue
+
+        seen.add(username)
+        valid.append({"username": username, "role": role, "row": row_number,
+                      "password": password, "password_hash": password_hash})
+    return valid, errors
+
+
+def hash_passwords(passwords, rounds, max_workers=None):
+    """
+    Hashes passwords with pbkdf2_sha256, spreading the work across CPU cores.
+    PBKDF2 is CPU bound and holds the GIL, so a process pool (not threads) is used.
+
+    Returns:
+        list: Hashes in the same order as passwords.
+    """
+    if len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [_hash_password_worker(p, rounds) for p in passwords]
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_hash_password_worker, passwords, [rounds] * len(passwords), chunksize=chunksize))
+
+
+def guard_admins(valid, existing_roles, protected_usernames=()):
+    """
+    Drops rows an import must not apply: changes to protected users (the admin running
+    the import) and demotions that would leave no admin at all.
+
+    Args:
+        valid (list): Rows from validate_user_records, in file order.
+        existing_roles (dict): {username: role} of the users already stored.
+
+    Returns:
+        tuple: (kept rows, errors as (row_number, message)).
+    """
+    kept, errors = [], []
+    admins = {username for username, role in existing_roles.items() if role == "admin"}
+    admins.update(r["username"] for r in valid if r["role"] == "admin")
+    for record in valid:
+        username = record["username"]
+        if username in protected_usernames:
+            errors.append((record["row"], f"User '{username}' is signed in and cannot be changed by an import."))
+            continue
+        if existing_roles.get(username) == "admin" and record["role"] != "admin":
+            if admins == {username}:
+                errors.append((record["row"], f"User '{username}' is the last admin and cannot be demoted."))
+                continue
+            admins.discard(username)
+        kept.append(record)
+    return kept, errors
+
+
+def import_users(repository, path, kdf_rounds, update_existing=False, protected_usernames=()):
+    """
+    Imports users from path: validates every row, hashes new passwords in parallel and
+    writes all valid rows in one transaction. Invalid rows are reported, not fatal.
+    Existing users are only changed when update_existing is set, never the ones in
+    protected_usernames, and never so that no admin is left.
+
+    Returns:
+        dict: {'imported': int, 'updated': int, 'updated_usernames': [str],
+        'errors': [(row_number, message), ...]}. Sessions of updated users must be
+        invalidated by the caller.
+    """
+    records = read_user_file(path)
+    existing_roles = {username: role for username, _, role in repository.all_users()}
+    existing = set(existing_roles)
+    valid, errors = validate_user_records(records, existing, update_existing)
+    valid, guard_errors = guard_admins(valid, existing_roles, protected_usernames)
+    errors = sorted(errors + guard_errors)
+
+    to_hash = [r for r in valid if not r["password_hash"]]
+    for record, hashed in zip(to_hash, hash_passwords([r["password"] for r in to_hash], kdf_rounds)):
+        record["password_hash"] = hashed
+
+    repository.save_many((r["username"], r["password_hash"], r["role"]) for r in valid)
+    updated_usernames = [r["username"] for r in valid if r["username"] in existing]
+    updated = len(updated_usernames)
+    logging.info(f"Bulk import from '{path}': {len(valid) - updated} added, {updated} updated, {len(errors)} rejected.")
+    return {"imported": len(valid) - updated, "updated": updated, "updated_usernames": updated_usernames,
+            "errors": errors}
+
+
+def export_users(repository, path):
+    """
+    Writes every user (username, role, password_hash) to a .csv or .json file.
+    Plaintext passwords are never available, so hashes are exported; the file can be
+    re-imported on another station as-is.
+
+    Returns:
+        int: Number of users written.
+    """
+    rows = [{"username": u, "role": r, "password_hash": h} for u, h, r in repository.all_users()]
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif ext == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    else:
+        raise ValueError(f"Unsupported user file type '{ext}'. Use .csv or .json.")
+    logging.info(f"Exported {len(rows)} users to '{path}'.")
+    return len(rows)
@@ -0,0 +1,458 @@
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000 # How long a writer waits on a competing write lock before failing
+
+# ------------------------------------------------------------------------------
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Each entry is (version, callable(connection)). Never edit a released migration;
+# append a new one instead.
+# ------------------------------------------------------------------------------
+def _migration_1_users_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL
+        )
+    """)
+
+
+def _migration_2_login_lockout(conn):
+    # Databases written by earlier builds may already carry these columns
+    existing_columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    if "failed_attempts" not in existing_columns:
+        conn.execute("ALTER TABLE users ADD COLUMN failed_attempts INTEGER NOT NULL DEFAULT 0")
+    if "locked_until" not in existing_columns:
+        conn.execute("ALTER TABLE users ADD COLUMN locked_until REAL NOT NULL DEFAULT 0")
+
+
+def _migration_3_role_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
+
+
+def _migration_4_activity_table(conn):
+    # Audit trail of user actions (uploads, rollbacks, user management). Newest-first
+    # queries walk the rowid backwards, so their cost depends on the page size only.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS activity (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            username TEXT,
+            action TEXT NOT NULL,
+            path TEXT NOT NULL DEFAULT '',
+            details TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_username ON activity(username)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_action ON activity(action)")
+
+
+def _migration_5_user_list_indexes(conn):
+    # The admin user table pages through users ordered by username COLLATE NOCASE,
+    # optionally filtered by role. These covering indexes return pages in order straight
+    # from the index (no sort, no table lookups); the role index supersedes v3's.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users(username COLLATE NOCASE, role)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role_username ON users(role, username COLLATE NOCASE)")
+    conn.execute("DROP INDEX IF EXISTS idx_users_role")
+
+
+def _migration_6_ocr_text(conn):
+    # Text recognized in archived scans. ocr_documents remembers which version of each
+    # file was read (mtime, size), so the backfill skips unchanged files; ocr_text is a
+    # full-text index over the recognized text, keyed by the same rowid.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ocr_documents (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            indexed_at REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS ocr_text
+        USING fts5(content, tokenize='unicode61 remove_diacritics 2')
+    """)
+
+
+def _migration_7_file_checksums(conn):
+    # SHA-256 of every archived file and backup, recorded for that mtime/size, with the
+    # time it was last verified. The scrubber picks due files newest-first, hence the
+    # (verified_at, mtime) index.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_checksums (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL,
+            recorded_at REAL NOT NULL,
+            verified_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ok'
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_checksums_due ON file_checksums(verified_at, mtime)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_checksums_status ON file_checksums(status)")
+
+
+def _migration_8_checksum_lookup(conn):
+    # Package imports skip files whose content is already stored, by SHA-256
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_file_checksums_sha256 ON file_checksums(sha256)")
+
+
+MIGRATIONS = [
+    (1, _migration_1_users_table),
+    (2, _migration_2_login_lockout),
+    (3, _migration_3_role_index),
+    (4, _migration_4_activity_table),
+    (5, _migration_5_user_list_indexes),
+    (6, _migration_6_ocr_text),
+    (7, _migration_7_file_checksums),
+    (8, _migration_8_checksum_lookup),
+]
+
+# ------------------------------------------------------------------------------
+# Statements. Kept as module constants so every call reuses the same SQL text and
+# hits sqlite3's per-connection prepared-statement cache.
+# ------------------------------------------------------------------------------
+SQL_GET_USER = "SELECT username, password, role FROM users WHERE username=?"
+SQL_USER_EXISTS = "SELECT 1 FROM users WHERE username=?"
+SQL_UPSERT_USER = """
+    INSERT INTO users(username, password, role) VALUES (?, ?, ?)
+    ON CONFLICT(username) DO UPDATE SET password=excluded.password, role=excluded.role
+"""
+SQL_INSERT_USER = "INSERT INTO users(username, password, role) VALUES (?, ?, ?)"
+SQL_UPDATE_PASSWORD = "UPDATE users SET password=? WHERE username=?"
+SQL_UPDATE_ROLE = "UPDATE users SET role=? WHERE username=?"
+SQL_DELETE_USER = "DELETE FROM users WHERE username=?"
+SQL_ALL_USERNAMES = "SELECT username FROM users"
+SQL_ALL_USERS = "SELECT username, password, role FROM users ORDER BY username COLLATE NOCASE"
+SQL_COUNT_BY_ROLE = "SELECT role, COUNT(*) FROM users GROUP BY role"
+SQL_GET_LOCKOUT = "SELECT failed_attempts, locked_until FROM users WHERE username=?"
+SQL_SET_LOCKOUT = "UPDATE users SET failed_attempts=?, locked_until=? WHERE username=?"
+SQL_RESET_LOCKOUT = "UPDATE users SET failed_attempts=0, locked_until=0 WHERE username=? AND failed_attempts>0"
+SQL_INSERT_ACTIVITY = "INSERT INTO activity(ts, username, action, path, details) VALUES (?, ?, ?, ?, ?)"
+
+
+class UserRepository:
+    """
+    Data-access layer for users.db.
+
+    Connections come from a small thread-safe pool, so worker threads and the Tk thread
+    can use the repository concurrently. The database runs in WAL mode: readers never
+    block the writer, and a writer waits up to BUSY_TIMEOUT_MS for another writer
+    instead of failing with "database is locked".
+    """
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self._pool = queue.LifoQueue(maxsize=pool_size) # LIFO keeps warm connections in use
+        self._pool_size = pool_size
+        self._created = 0
+        self._all_connections = []
+        self._create_lock = threading.Lock()
+        self._closed = False
+
+    # --------------------------------------------------------------------------
+    # Connection pool
+    # --------------------------------------------------------------------------
+    def _new_connection(self):
+        # Connections are handed between threads by the pool, never used by two at once
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints; safe with WAL
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _acquire(self):
+        if self._closed:
+            raise RuntimeError("UserRepository is closed.")
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._create_lock:
+            if self._created < self._pool_size:
+                conn = self._new_connection()
+                self._created += 1
+                self._all_connections.append(conn)
+                return conn
+        return self._pool.get() # Pool exhausted: wait for a connection to be returned
+
+    def _release(self, conn):
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection (autocommit mode) for reads."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Borrows a pooled connection and wraps the block in one write transaction.
+        BEGIN IMMEDIATE takes the write lock up front, so the block cannot fail halfway
+        through on a lock upgrade. Commits on success, rolls back on any exception.
+        """
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Closes every pooled connection. The repository cannot be used afterwards."""
+        self._closed = True
+        with self._create_lock:
+            for conn in self._all_connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logging.warning(f"Error closing users.db connection: {e}")
+            self._all_connections.clear()
+        logging.info("User repository closed.")
+
+    # --------------------------------------------------------------------------
+    # Schema
+    # --------------------------------------------------------------------------
+    def migrate(self):
+        """
+        Brings the schema up to the latest version. Each migration runs in its own
+        transaction together with its user_version bump.
+
+        Returns:
+            int: The schema version after migrating.
+        """
+        with self.connection() as conn:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.transaction() as conn:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version={version}")
+            logging.info(f"users.db migrated to schema version {version}.")
+            current = version
+        return current
+
+    # --------------------------------------------------------------------------
+    # Users
+    # --------------------------------------------------------------------------
+    def get(self, username):
+        """Returns {'username', 'password', 'role'} for username, or None."""
+        with self.connection() as conn:
+            row = conn.execute(SQL_GET_USER, (username,)).fetchone()
+        if not row:
+            return None
+        return {"username": row[0], "password": row[1], "role": row[2]}
+
+    def exists(self, username):
+        with self.connection() as conn:
+            return conn.execute(SQL_USER_EXISTS, (username,)).fetchone() is not None
+
+    @staticmethod
+    def _user_filter(search, role):
+        """WHERE clause and parameters shared by list_users and count_users."""
+        sql = " WHERE 1=1"
+        params = []
+        if search:
+            # Prefix match: LIKE is case-insensitive, so SQLite turns it into a range on the
+            # username COLLATE NOCASE indexes instead of scanning every row
+            sql += " AND username LIKE ? ESCAPE '\\'"
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"{escaped}%")
+        if role:
+            sql += " AND role=?"
+            params.append(role)
+        return sql, params
+
+    def list_users(self, search="", role=None, limit=None, offset=0, after=None):
+        """
+        Returns users ordered by username as a list of {'username', 'role'} dicts.
+
+        Args:
+            search (str): Case-insensitive prefix of the username to match.
+            role (str | None): Restrict to this role.
+            limit (int | None): Return at most this many rows (one page); None for all.
+            offset (int): Number of matching rows to skip before the page starts.
+            after (str | None): Username of the last row of the previous page. The page
+                starts right after it (keyset paging: a range seek on the index, so the
+                cost does not grow with the position in the list); offset then counts
+                from there.
+        """
+        where, params = self._user_filter(search, role)
+        if after is not None:
+            # Ties under NOCASE ("Bob", "bob") are ordered by the binary username
+            where += " AND username >= ? COLLATE NOCASE AND (username > ? COLLATE NOCASE OR username > ?)"
+            params += [after, after, after]
+        sql = "SELECT username, role FROM users" + where + " ORDER BY username COLLATE NOCASE, username"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self.connection() as conn:
+            return [{"username": u, "role": r} for u, r in conn.execute(sql, params)]
+
+    def count_users(self, search="", role=None):
+        """Number of users list_users(search, role) would return without a limit."""
+        where, params = self._user_filter(search, role)
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users" + where, params).fetchone()[0]
+
+    def usernames(self):
+        """Returns the set of all usernames."""
+        with self.connection() as conn:
+            return {row[0] for row in conn.execute(SQL_ALL_USERNAMES)}
+
+    def all_users(self):
+        """Returns (username, password_hash, role) for every user, ordered by username."""
+        with self.connection() as conn:
+            return conn.execute(SQL_ALL_USERS).fetchall()
+
+    def count_by_role(self):
+        """Returns {role: count}."""
+        with self.connection() as conn:
+            return dict(conn.execute(SQL_COUNT_BY_ROLE).fetchall())
+
+    def count(self):
+        return sum(self.count_by_role().values())
+
+    def save(self, username, password_hash, role):
+        """Inserts or updates a user. Lockout state of an existing user is preserved."""
+        with self.transaction() as conn:
+            conn.execute(SQL_UPSERT_USER, (username, password_hash, role))
+        logging.info(f"User '{username}' saved to database.")
+
+    def add(self, username, password_hash, role):
+        """Inserts a new user. Returns False if the username is already taken."""
+        try:
+            with self.transaction() as conn:
+                conn.execute(SQL_INSERT_USER, (username, password_hash, role))
+        except sqlite3.IntegrityError:
+            return False
+        logging.info(f"User '{username}' added to database.")
+        return True
+
+    def save_many(self, rows):
+        """
+        Upserts many users in a single transaction (all or nothing).
+
+        Args:
+            rows (iterable): (username, password_hash, role) tuples.
+
+        Returns:
+            int: Number of rows written.
+        """
+        rows = list(rows)
+        with self.transaction() as conn:
+            conn.executemany(SQL_UPSERT_USER, rows)
+        logging.info(f"Saved {len(rows)} users to database in one transaction.")
+        return len(rows)
+
+    def update_password(self, username, password_hash):
+        with self.transaction() as conn:
+            return conn.execute(SQL_UPDATE_PASSWORD, (password_hash, username)).rowcount > 0
+
+    def update_role(self, username, role):
+        with self.transaction() as conn:
+            return conn.execute(SQL_UPDATE_ROLE, (role, username)).rowcount > 0
+
+    def delete(self, username):
+        """Deletes username. Returns True if a row was removed."""
+        with self.transaction() as conn:
+            return conn.execute(SQL_DELETE_USER, (username,)).rowcount > 0
+
+    # --------------------------------------------------------------------------
+    # Login lockout state
+    # --------------------------------------------------------------------------
+    def get_lockout(self, username):
+        """Returns (failed_attempts, locked_until) for username, or None for unknown users."""
+        with self.connection() as conn:
+            return conn.execute(SQL_GET_LOCKOUT, (username,)).fetchone()
+
+    def record_failure(self, username, backoff, now):
+        """
+        Atomically increments the failed-attempt counter for username.
+
+        Args:
+            backoff (callable): failed_attempts -> lockout seconds.
+            now (float): Current time.time().
+
+        Returns:
+            tuple | None: (failed_attempts, lockout_seconds), or None for unknown users.
+        """
+        with self.transaction() as conn:
+            row = conn.execute(SQL_GET_LOCKOUT, (username,)).fetchone()
+            if not row:
+                return None
+            failed_attempts = row[0] + 1
+            lockout = backoff(failed_attempts)
+            conn.execute(SQL_SET_LOCKOUT, (failed_attempts, now + lockout if lockout else 0, username))
+        return failed_attempts, lockout
+
+    def reset_failures(self, username):
+        with self.transaction() as conn:
+            conn.execute(SQL_RESET_LOCKOUT, (username,))
+
+    # --------------------------------------------------------------------------
+    # Activity (audit trail)
+    # --------------------------------------------------------------------------
+    def add_activity_many(self, rows):
+        """
+        Appends activity rows in a single transaction.
+
+        Args:
+            rows (iterable): (ts, username, action, path, details) tuples.
+        """
+        with self.transaction() as conn:
+            conn.executemany(SQL_INSERT_ACTIVITY, rows)
+
+    def recent_activity(self, limit=10, username=None, action=None, path_contains=None, before_id=None, after_id=None):
+        """
+        Returns the newest activity rows first, as dicts with id, ts, username, action,
+        path and details.
+
+        Args:
+            limit (int): Maximum number of rows.
+            username / action (str | None): Exact-match filters (indexed).
+            path_contains (str | None): Case-insensitive substring of the path.
+            before_id (int | None): Only rows older than this id (for paging).
+            after_id (int | None): Only rows newer than this id (for following).
+        """
+        sql = "SELECT id, ts, username, action, path, details FROM activity WHERE 1=1"
+        params = []
+        if username:
+            sql += " AND username=?"
+            params.append(username)
+        if action:
+            sql += " AND action=?"
+            params.append(action)
+        if path_contains:
+            sql += " AND path LIKE ? ESCAPE '\\'"
+            escaped = path_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if before_id:
+            sql += " AND id<?"
+            params.append(before_id)
+        if after_id:
+            sql += " AND id>?"
+            params.append(after_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        columns = ("id", "ts", "username", "action", "path", "details")
+        with self.connection() as conn:
+            return [dict(zip(columns, row)) for row in conn.execute(sql, params)]
@@ -0,0 +1,349 @@
+# instrumentation.py
+# In-process timers, counters and on-demand profiling for the archive's hot paths.
+#
+# Every timed operation feeds a fixed-bucket latency histogram (log-spaced, ~12% wide),
+# so recording is O(1) with no per-sample allocation, and p50/p95 are read from the
+# buckets at any time. The admin "Performance" panel shows snapshot().
+#
+# An operation can be armed for profiling: the next time it runs, it is recorded with
+# cProfile (calls on the thread running the operation) or with a sampling profiler
+# (stacks of that thread every SAMPLE_INTERVAL_SECONDS, from a helper thread). The
+# result is written to <data dir>/profiles.
+#
+# StallWatchdog detects a blocked Tk thread: the Tk thread stamps a heartbeat from a short
+# after() tick, and a helper thread captures the Tk thread's stack whenever the heartbeat
+# is older than the stall threshold. When the loop resumes, the stall (duration and the
+# stacks seen) is logged and kept for the Performance panel.
+import cProfile
+import datetime
+import io
+import logging
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from controllers.env_config import env_number
+
+HISTOGRAM_MIN_SECONDS = 1e-5 # Lower edge of the first bucket (10 µs)
+HISTOGRAM_BUCKETS_PER_DOUBLING = 6
+HISTOGRAM_BUCKET_COUNT = 150 # Up to ~340 s; slower samples land in the last bucket
+SAMPLE_INTERVAL_SECONDS = 0.005
+STALL_TICK_MS = 50 # Heartbeat interval on the Tk thread
+STALL_THRESHOLD_SECONDS = env_number("ARCHIVE_UI_STALL_SECONDS", 0.5, minimum=0.1)
+STALL_HISTORY = 50 # Most recent stalls kept in memory
+PROFILE_MODE_CPROFILE = "cProfile"
+PROFILE_MODE_SAMPLING = "Sampling"
+PROFILE_MODES = (PROFILE_MODE_CPROFILE, PROFILE_MODE_SAMPLING)
+
+# Operation names used across the app
+OP_UPLOAD = "upload"
+OP_COPY = "copy"
+OP_BACKUP = "backup"
+OP_SCAN = "scan"
+OP_SEARCH = "search"
+OP_STATS = "stats"
+OP_UI_DISPATCH = "ui_dispatch"
+OP_HIDE_ARCHIVE = "hide_archive"
+OP_UI_TICK_LAG = "ui_tick_lag" # Extra delay of each heartbeat tick over STALL_TICK_MS
+OP_UI_STALL = "ui_stall" # Duration of each stall over STALL_THRESHOLD_SECONDS
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets; thread-safe."""
+    def __init__(self):
+        self._buckets = [0] * HISTOGRAM_BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(seconds):
+        if seconds <= HISTOGRAM_MIN_SECONDS:
+            return 0
+        index = int(math.log2(seconds / HISTOGRAM_MIN_SECONDS) * HISTOGRAM_BUCKETS_PER_DOUBLING) + 1
+        return min(index, HISTOGRAM_BUCKET_COUNT - 1)
+
+    @staticmethod
+    def _upper_edge(index):
+        return HISTOGRAM_MIN_SECONDS * 2 ** (index / HISTOGRAM_BUCKETS_PER_DOUBLING)
+
+    def record(self, seconds):
+        index = self._bucket(seconds)
+        with self._lock:
+            self._buckets[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile (0-100), in seconds."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(self.count * p / 100))
+            seen = 0
+            for index, n in enumerate(self._buckets):
+                seen += n
+                if seen >= rank:
+                    return min(self._upper_edge(index), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """Named latency histograms and counters, plus the profiling trigger."""
+    def __init__(self):
+        self._histograms = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+        self._armed = {} # operation -> (mode, output_dir, callback)
+
+    # --------------------------------------------------------------------------
+    # Recording
+    # --------------------------------------------------------------------------
+    def observe(self, name, seconds):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        histogram.record(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    @contextmanager
+    def timer(self, name):
+        """Times the block into histogram `name`; profiles it if `name` is armed."""
+        armed = self._armed.pop(name, None) if self._armed else None
+        profiler = _start_profile(armed[0]) if armed else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+            if profiler:
+                _finish_profile(name, profiler, *armed)
+
+    def timed(self, name):
+        """Decorator form of timer()."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # --------------------------------------------------------------------------
+    # Reading
+    # --------------------------------------------------------------------------
+    def snapshot(self):
+        """
+        Returns:
+            tuple: ({name: {count, mean, p50, p95, max}}, {counter: value}), names sorted.
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = dict(sorted(self._counters.items()))
+        return {name: h.summary() for name, h in histograms}, counters
+
+    def operations(self):
+        with self._lock:
+            return sorted(self._histograms)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # --------------------------------------------------------------------------
+    # Profiling
+    # --------------------------------------------------------------------------
+    def arm_profile(self, name, mode, output_dir, callback=None):
+        """
+        Profiles the next run of operation `name`.
+
+        Args:
+            mode (str): PROFILE_MODE_CPROFILE or PROFILE_MODE_SAMPLING.
+            output_dir (str): Where the profile files are written.
+            callback (callable | None): Called with the path of the summary file (or None
+                on failure) from the thread that ran the operation.
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        # One at a time: nested timed operations must not start a second profiler
+        self._armed = {name: (mode, output_dir, callback)}
+        logging.info(f"Profiling armed for next '{name}' ({mode}).")
+
+    def disarm_profile(self, name):
+        self._armed.pop(name, None)
+
+    def armed_operations(self):
+        return {name: armed[0] for name, armed in list(self._armed.items())}
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a helper thread and counts identical stacks."""
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[folded_stack(frame)] += 1
+                self.samples += 1
+
+
+class StallWatchdog:
+    """
+    Detects stalls of the Tk event loop and records where the Tk thread was stuck.
+
+    Must be created on the Tk thread (its stack is the one captured).
+
+    Args:
+        root: Any Tk widget; used only for after().
+        threshold (float): Seconds without a heartbeat that count as a stall.
+    """
+    def __init__(self, root, threshold=STALL_THRESHOLD_SECONDS, tick_ms=STALL_TICK_MS):
+        self.root = root
+        self.threshold = threshold
+        self.tick_ms = tick_ms
+        self.thread_id = threading.get_ident()
+        self.stalls = deque(maxlen=STALL_HISTORY) # dicts: time, duration, stack, samples
+        self._last_tick = time.perf_counter()
+        self._stacks = Counter() # Stacks captured during the current stall
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="UIStallWatchdog", daemon=True)
+
+    def start(self):
+        self._last_tick = time.perf_counter()
+        self.root.after(self.tick_ms, self._tick)
+        self._thread.start()
+        logging.info(f"UI stall watchdog started (threshold {self.threshold:.2f}s).")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def recent_stalls(self):
+        """Newest first."""
+        with self._lock:
+            return list(reversed(self.stalls))
+
+    def _tick(self):
+        # Tk thread
+        now = time.perf_counter()
+        gap = now - self._last_tick
+        self._last_tick = now
+        metrics.observe(OP_UI_TICK_LAG, max(0.0, gap - self.tick_ms / 1000))
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+        if stacks or gap >= self.threshold:
+            self._record_stall(gap, stacks)
+        if not self._stop.is_set():
+            try:
+                self.root.after(self.tick_ms, self._tick)
+            except Exception: # Window destroyed
+                self._stop.set()
+
+    def _record_stall(self, duration, stacks):
+        stack, samples = stacks.most_common(1)[0] if stacks else ("(not captured)", 0)
+        stall = {"time": datetime.datetime.now(), "duration": duration, "stack": stack, "samples": samples}
+        with self._lock:
+            self.stalls.append(stall)
+        metrics.observe(OP_UI_STALL, duration)
+        metrics.increment("ui_stalls")
+        logging.warning(f"UI thread stalled for {duration:.2f}s; stack ({samples} samples): {stack}")
+
+    def _watch(self):
+        # Helper thread: sample the Tk thread's stack while its heartbeat is overdue
+        while not self._stop.wait(self.threshold / 4):
+            if time.perf_counter() - self._last_tick < self.threshold:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None: # Tk thread has exited
+                return
+            with self._lock:
+                self._stacks[folded_stack(frame)] += 1
+
+
+def folded_stack(frame):
+    """'outer;...;inner' function stack of frame (the "folded" format used by flame graph tools)."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _start_profile(mode):
+    if mode == PROFILE_MODE_CPROFILE:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return SamplingProfiler(threading.get_ident()).start()
+
+
+def _finish_profile(name, profiler, mode, output_dir, callback):
+    path = None
+    try:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, f"{name}-{stamp}")
+        if mode == PROFILE_MODE_CPROFILE:
+            profiler.disable()
+            profiler.dump_stats(base + ".prof") # Open with snakeviz / pstats
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+            path = base + ".txt"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+        else:
+            profiler.stop()
+            path = base + ".folded" # One "stack count" line each; feed to flamegraph.pl / speedscope
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in profiler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        logging.info(f"Profile of '{name}' ({mode}) saved to {path}")
+    except Exception as e:
+        logging.error(f"Failed to save profile of '{name}': {e}", exc_info=True)
+        path = None
+    if callback:
+        callback(path)
+
+
+# Process-wide instance used by the app and the controllers
+metrics = Metrics()
@@ -8,8 +8,8 @@ if getattr(sys, 'frozen', False):
     os.environ["TK_LIBRARY"] = os.path.join(base_dir, "tcl", "tk8.6")
 
 
-import sqlite3
 import re
+import multiprocessing
 import tempfile
 import shutil
 import platform
@@ -19,41 +19,49 @@ import datetime
 import threading
 import queue
 
-import win32print
 # Add this near your other imports
 # Import the module itself, and specific functions you need.
 # DO NOT import CURRENT_LANGUAGE directly.
 # NEW - Correctly imports only what's available
-from translations import set_language, get_translation
+from translations import set_language, get_translation, TranslationRegistry
 import translations # Also import the module itself to access global variables if needed
 
 from concurrent.futures import ThreadPoolExecutor
-import json
 import customtkinter as ctk
 from PIL import Image, ImageTk
 from tkinter import filedialog, messagebox, simpledialog
-import tkinter as tk
-# For secure password hashing (using passlib)
-from passlib.hash import pbkdf2_sha256
 import time
 # Controllers for MVC pattern
-from controllers.user_controller import UserController
-from controllers.archive_controller import ArchiveController
+from controllers.user_controller import UserController, DEFAULT_KDF_ROUNDS
+from controllers.env_config import env_number
+from controllers.session_manager import SessionManager
+from controllers.user_repository import UserRepository
+from controllers.archive_index_repository import ArchiveIndexRepository
+from controllers import user_io
+from controllers import activity_log
+from controllers.permission_manager import PermissionManager
+from app_logging import (configure_logging, flush_logs, get_log_file_path, parse_log_line,
+                         tail_lines, LogFollower, LOG_FILE_NAME)
+from controllers.archive_controller import ArchiveController, sanitize_path
+from controllers.archive_structure import StructureStore, STRUCTURE_FILE
+from user_table import VirtualUserTable
+from controllers.pdf_assembler import assemble_pdf
+from controllers.ocr_pipeline import OcrPipeline
+from controllers.print_spooler import PrintSpooler
+from controllers.ingest_pipeline import IngestPipeline, INGEST_STORED, INGEST_REJECTED
+from controllers.naming_policy import NamingPolicy, NAMING_RULES_FILE
+from controllers.integrity_scrubber import IntegrityScrubber
+from controllers import archive_package
+from instrumentation import (metrics, StallWatchdog, PROFILE_MODES, OP_UPLOAD, OP_SCAN, OP_UI_DISPATCH,
+                             OP_HIDE_ARCHIVE, OP_COPY, OP_BACKUP, OP_SEARCH, OP_STATS)
 from concurrent.futures import ThreadPoolExecutor
-import cProfile
-import pstats
 import threading
 # For real-time monitoring using watchdog
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 WATCHDOG_AVAILABLE = True
-# WIA import assumed to be handled elsewhere or within try block
-try:
-    import comtypes.client
-    WIA_AVAILABLE = True
-except ImportError:
-    WIA_AVAILABLE = False
-    logging.warning("comtypes.client not found. Scanning via WIA will be disabled.")
+# WIA scanning needs comtypes (Windows); controllers.scan_pipeline checks for it
+from controllers.scan_pipeline import ScanBatch, WIA_AVAILABLE
 
 # For drag and drop functionality
 try:
@@ -68,11 +76,29 @@ except ImportError:
 # Constants (avoid magic strings)
 # ------------------------------------------------------------------------------
 DEFAULT_ADMIN_PASSWORD = "admin123"
-DEFAULT_USER_PASSWORD = "user123"
+# PBKDF2 iteration count for password hashes. Higher is slower to brute-force but also
+# slower to log in on thin clients; existing hashes are upgraded/downgraded on next login.
+PBKDF2_ROUNDS = env_number("ARCHIVE_PBKDF2_ROUNDS", DEFAULT_KDF_ROUNDS, cast=int, minimum=1000)
+LOGIN_VERIFY_TIMEOUT_SECONDS = 15 # Give up waiting on a background credential check after this long
+# Verified sessions let lock/unlock and re-login skip PBKDF2 until they go idle this long.
+SESSION_IDLE_TIMEOUT_SECONDS = env_number("ARCHIVE_SESSION_IDLE_SECONDS", 15 * 60, cast=int, minimum=60)
+SESSION_AUTO_LOCK_SECONDS = 5 * 60 # Lock the station after this much inactivity (must be < idle timeout)
+SESSION_CHECK_INTERVAL_MS = 30 * 1000
+ACTIVITY_VIEW_LIMIT = 10 # Rows shown in the admin "Recent Activity" box
+ACTIVITY_FOLLOW_INTERVAL_MS = 1000 # Poll interval while "Follow" is ticked
+ACTIVITY_FOLLOW_MAX_LINES = 500 # Oldest lines are dropped from the box beyond this
+ACTIVITY_SOURCE_AUDIT = "activity_source_audit" # Translation keys of the activity view sources
+ACTIVITY_SOURCE_LOG = "activity_source_log"
+ACTIVITY_LEVEL_FILTERS = {"activity_level_all": 0, "activity_level_info": 20, "activity_level_warning": 30,
+                          "activity_level_error": 40} # Application log only; audit entries have no level
+DROP_CLOSE_WAIT_SECONDS = 30 # On close, wait this long for the files of a cancelled drop being copied
+USER_SEARCH_DEBOUNCE_MS = 250 # Admin user search waits this long after the last keystroke
+PERFORMANCE_REFRESH_MS = 2000 # Refresh interval of the admin "Performance" panel
+PROFILED_OPERATIONS = [OP_UPLOAD, OP_COPY, OP_BACKUP, OP_SCAN, OP_SEARCH, OP_STATS, OP_UI_DISPATCH, OP_HIDE_ARCHIVE]
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
 IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"]
 DOCUMENT_EXTENSIONS = [".xlsx", ".xls", ".doc", ".docx", ".ppt", ".pptx", ".pdf"] # Added document extensions
 SUPPORTED_FILE_EXTENSIONS = IMAGE_EXTENSIONS + DOCUMENT_EXTENSIONS # Combined list
-set_language("en") # Or "ar" if you want Arabic default
 
 # ------------------------------------------------------------------------------
 # Logging Configuration
@@ -80,20 +106,8 @@ set_language("en") # Or "ar" if you want Arabic default
 # ------------------------------------------------------------------------------
 # Logging Configuration (CORRECTED FOR PACKAGED APPS)
 # ------------------------------------------------------------------------------
-# --- Custom Handler for Live Log Writing ---
-class LiveWritingFileHandler(logging.FileHandler):
-    """
-    A custom logging file handler that flushes the buffer after every record.
-    This ensures that log entries are written to the file in real-time.
-    """
-    def emit(self, record):
-        # Call the original emit method to format and write the record
-        super().emit(record)
-        # Immediately flush the stream to disk
-        self.flush()
-
 # ------------------------------------------------------------------------------
-# Logging Configuration (MODIFIED FOR LIVE WRITING)
+# Logging Configuration (asynchronous, buffered)
 # ------------------------------------------------------------------------------
 def get_data_dir():
     """
@@ -118,56 +132,13 @@ def setup_logging():
     # Create the directory if it doesn't exist
     os.makedirs(data_dir, exist_ok=True)
 
-    log_file_path = os.path.join(data_dir, 'archive_app.log')
-    
-
-    # Configure logging
-    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler = LiveWritingFileHandler(log_file_path)
-    handler.setFormatter(log_formatter)
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO) # Set your desired level here
+    log_file_path = os.path.join(data_dir, LOG_FILE_NAME)
 
-    # Clear existing handlers to prevent duplicate logs if this function is called again
-    if logger.hasHandlers():
-        logger.handlers.clear()
+    # Records are queued and written as JSON lines by a background listener in batches
+    # (see app_logging.py), with size/midnight rotation and an immediate flush for errors.
+    configure_logging(log_file_path, level=logging.INFO) # Set your desired level here
 
-    logger.addHandler(handler)
-
-    # Also add a handler to print to console (very useful for debugging)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(log_formatter)
-    logger.addHandler(console_handler)
-
-    logging.info(f"--- Logging initialized (Live Writing). Log file at: {log_file_path} ---")
-
-setup_logging()
-logging.critical("CRITICAL_LOG: Logging configured at DEBUG level.") # Added this line
-# ------------------------------------------------------------------------------
-# In-Memory User Store (for demo purposes only; use a database or external config in production)
-# ------------------------------------------------------------------------------
-users = {
-    "admin": {"password": pbkdf2_sha256.hash(DEFAULT_ADMIN_PASSWORD), "role": "admin"},
-    "user": {"password": pbkdf2_sha256.hash(DEFAULT_USER_PASSWORD), "role": "user"}
-}
-# Python
-def choose_printer():
-    printers = [printer[2] for printer in win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL)]
-    if not printers:
-        return None
-    # Use a customtkinter Toplevel to match other windows
-    top = ctk.CTkToplevel()
-    top.title("Select Printer")
-    top.geometry("300x120")
-    top.grab_set()        # Enforce modality
-    top.focus_force()     # Bring the window to the front
-    selected_printer = tk.StringVar(value=printers[0])
-    ctk.CTkLabel(top, text=get_translation("ctklabel_text_select_a_printer"), font=("Segoe UI", 14)).pack(pady=10)
-    option_menu = ctk.CTkOptionMenu(top, variable=selected_printer, values=printers, font=("Segoe UI", 14))
-    option_menu.pack(padx=20)
-    ctk.CTkButton(top, text=get_translation("ctkbutton_text_ok"), command=top.destroy, font=("Segoe UI", 14)).pack(pady=10)
-    top.wait_window()
-    return selected_printer.get()
+    logging.info(f"--- Logging initialized (buffered, async). Log file at: {log_file_path} ---")
 
 # ------------------------------------------------------------------------------
 # Watchdog Event Handler for Real-Time Monitoring
@@ -203,22 +174,42 @@ class FileArchiveApp:
         # return current_translations.get(key, f"_{key}_")
         return get_translation(key)
 
+    def _tr(self, widget, key=None, **option_keys):
+        """Registers the translation key(s) a widget shows so language switches update it in place. Returns the widget."""
+        return self.translation_registry.register(widget, key, **option_keys)
+
+    def _set_text(self, widget, key, **kwargs):
+        """widget.configure(text=<translation of key>, **kwargs), keeping the registry in step."""
+        widget.configure(text=get_translation(key), **kwargs)
+        return self.translation_registry.register(widget, key)
+
     def __init__(self):
         set_language("en") # This is fine as is
         logging.critical("CRITICAL_LOG: FileArchiveApp __init__ started.") # Added this line
         # Initialize current_user first, before it's referenced
         global DRAG_DROP_ENABLED
         self.current_user = None
+        # Widgets register their translation keys here; switch_language updates them in place
+        self.translation_registry = TranslationRegistry()
         # self.translations = {} # Initialize translation dictionary # Removed
         # self.load_app_translations() # Load translations based on CURRENT_LANGUAGE # Removed
 
         # --- Database and Controllers ---
-        self.initialize_user_database() # Connects and loads users into global `users` dict
-        # Ensure users dict is loaded before UserController initialization if it relies on it immediately
-        if not users and hasattr(self, 'load_users_from_db'): # Check if users is empty and loader exists
-            self.load_users_from_db()
-
-        self.user_controller = UserController(users) # Uses the global `users` dict
+        # users.db is the single source of truth; the repository's pooled connections may be
+        # used from worker threads (credential checks, bulk imports) as well as the Tk thread.
+        self.user_repository = UserRepository(os.path.join(get_data_dir(), "users.db"))
+        # The controller must exist before ensure_admin_user_db, which hashes through it.
+        self.user_controller = UserController(self.user_repository, kdf_rounds=PBKDF2_ROUNDS)
+        # Audit trail (who/what/path/when) in the activity table of users.db
+        self.activity_log = activity_log.ActivityLog(self.user_repository)
+        # OCR text and file checksums, in users.db too (same connection pool and migrations)
+        self.archive_index = ArchiveIndexRepository(self.user_repository)
+        logging.info(f"Password hashing configured with {PBKDF2_ROUNDS} PBKDF2 rounds.")
+        self.session_manager = SessionManager(idle_timeout=SESSION_IDLE_TIMEOUT_SECONDS)
+        self.session_token = None # Token of the logged-in user's session
+        self.locked_username = None # Set while the station is locked, so unlock keeps the built UI
+        self.ui_built_for = None # Username the tab contents were last built for
+        self.initialize_user_database() # Migrates the schema and bootstraps an admin if needed
 
         # --- Paths and State ---
         self.archives_path = "archives"
@@ -230,12 +221,17 @@ class FileArchiveApp:
              # You might want to show an error message and exit here if the archive path is essential
              messagebox.showerror("Fatal Error", f"Could not create required directory:\n{self.archives_path}\n\n{e}\n\nApplication cannot continue.")
              sys.exit(1) # Exit if the archive dir can't be created
+        # Folder show/hide without spawning attrib/chmod processes
+        self.permission_manager = PermissionManager(self.archives_path)
 
         self.search_queries = []
         # self.file_comments = {} # Removed comments functionality
 
         # --- Threading and UI Sync ---
         self.search_queries_lock = threading.Lock()
+        self.active_scan = None # ScanBatch while the scanner is running
+        self.active_drop = None # IngestPipeline while dropped files are being stored
+        self.active_import = None # Cancel event of a running package import
         # self.file_comments_lock = threading.Lock() # Removed
         self.ui_queue = queue.Queue()
         # Use context manager for ThreadPoolExecutor if Python version supports it well,
@@ -245,39 +241,14 @@ class FileArchiveApp:
 
 
         # --- Document Structure Definition ---
-        # Using stable English keys internally is often less complex.
-        self.structure = {
-            "Permanent Audit File": { # English key
-                "c1": {}, "c2": {}, "c3": {}, "c4": {}, "c5": {}, "c6": {},
-            },
-            "Working Papers File": { # English key
-                "A": {str(i): [] for i in range(1, 16)},
-                "B1": {
-                    "B10": ["B10A"],
-                    "B11": ["B11A"],
-                    "B12": [], "B13": [], "B14": [], "B15": [],
-                    "B16": [], "B17": [], "B18": [], "B19": [],
-                },
-                "B2": {
-                    "B20": [], "B21": [], "B22": [], "B23": [],
-                    "B24": [], "B25": [], "B26": [], "B27": [],
-                },
-                "B3": {
-                    "B30": [], "B31": [], "B32": [], "B33": [], "B34": [],
-                },
-                "I1": {
-                     "I10": [], "I11": [], "I11A": [], "I12": [],
-                 },
-                 "I2": {
-                     "I20": [], "I21": [], "I22": [], "I23": [], "I24": [],
-                     "I25": [], "I26": [], "I27": [], "I28": [], "I29": [],
-                 }
-                 # Add other sections like I3, I4, I5, I6, I7 etc. if needed
-                 # "I3": { ... },
-            }
-        }
+        # Stored in archive_structure.json next to users.db and compiled into an immutable
+        # tree shared by the controller, the naming policy, uploads and dialogs.
+        self.structure_store = StructureStore(os.path.join(get_data_dir(), STRUCTURE_FILE), self.archives_path)
+        self.structure = self.structure_store.load()
         # Create ArchiveController *after* self.structure is defined
-        self.archive_controller = ArchiveController(self.structure, self.archives_path)
+        self.archive_controller = ArchiveController(self.structure, self.archives_path, checksums=self.archive_index)
+        # File naming rules per structure folder; optional naming_rules.json next to users.db
+        self.naming_policy = NamingPolicy.from_file(self.structure, os.path.join(get_data_dir(), NAMING_RULES_FILE))
 
 
         # --- UI Setup ---
@@ -307,6 +278,7 @@ class FileArchiveApp:
             logging.info("Using standard CTk window (TkinterDnD not enabled/failed).")
 
         self.main_app.title(self._t("app_title")) # Use translation helper
+        self._tr(self.main_app, title="app_title")
         self.main_app.geometry("950x700") # Adjust size as needed
 
         # --- Main Frame (Takes up the whole window) ---
@@ -325,21 +297,22 @@ class FileArchiveApp:
         self.header_frame.grid_columnconfigure(3, weight=0) # Logout button fixed size <<< CONFIGURED COLUMN 3
 
         # App Title
-        ctk.CTkLabel(self.header_frame, text=self._t("ctklabel_text_file_archiving_system"), # Use self._t
-            font=("Segoe UI", 26, "bold")).grid(row=0, column=0, sticky="w", padx=(0, 10))
+        self._tr(ctk.CTkLabel(self.header_frame, text=self._t("ctklabel_text_file_archiving_system"), # Use self._t
+            font=("Segoe UI", 26, "bold")), "ctklabel_text_file_archiving_system").grid(row=0, column=0, sticky="w", padx=(0, 10))
 
         # User info label (text updated on login)
         self.user_label = ctk.CTkLabel(self.header_frame, text="", font=("Segoe UI", 12))
         self.user_label.grid(row=0, column=1, padx=10, sticky="e") # Align right before language button
 
         # Language switch button
-        self.language_button = ctk.CTkButton(self.header_frame, text=self._t("button_text_switch_language"), # Use self._t
-                                            command=self.switch_language, font=("Segoe UI", 12), width=120)
+        self.language_button = self._tr(ctk.CTkButton(self.header_frame, text=self._t("button_text_switch_language"), # Use self._t
+                                            command=self.switch_language, font=("Segoe UI", 12), width=120), "button_text_switch_language")
         self.language_button.grid(row=0, column=2, padx=10, sticky="e") # Align right before logout
 
         # Logout button placeholder (button added later by add_logout_button)
         self.logout_button_placeholder = ctk.CTkFrame(self.header_frame, fg_color="transparent", width=110) # Give it enough space
         self.logout_button_placeholder.grid(row=0, column=3, padx=(5, 0), sticky="e") # Grid in column 3
+        self.translation_registry.register_direction(self.header_frame) # Mirrored for Arabic
 
 
         # --- Tab View ---
@@ -355,13 +328,14 @@ class FileArchiveApp:
         self.status_frame.grid_columnconfigure(0, weight=1) # Label expands
 
         # Notification Label
-        self.notification_label = ctk.CTkLabel(self.status_frame, text=self._t("ctklabel_text_ready"), font=("Segoe UI", 12)) # Use self._t
+        self.notification_label = self._tr(ctk.CTkLabel(self.status_frame, text=self._t("ctklabel_text_ready"), font=("Segoe UI", 12)), "ctklabel_text_ready") # Use self._t
         self.notification_label.grid(row=0, column=0, sticky="w", padx=10) # Inner padding for text
 
         # Progress Bar
         self.progress_bar = ctk.CTkProgressBar(self.status_frame, width=150)
         self.progress_bar.grid(row=0, column=1, padx=10, sticky="e") # Inner padding
         self.progress_bar.set(0)
+        self.translation_registry.register_direction(self.status_frame)
 
         # --- Admin Controls Flag ---
         self.admin_controls_added = False # Still used to track if admin tab was ever added
@@ -378,11 +352,36 @@ class FileArchiveApp:
             self.start_monitoring()
         else:
             logging.warning("Watchdog not available, file monitoring disabled.")
-            self.notification_label.configure(text=self._t("status_monitoring_disabled")) # Inform user
+            self._set_text(self.notification_label, "status_monitoring_disabled") # Inform user
 
         # Start UI queue processing
         self.main_app.after(100, self.process_ui_queue)
 
+        # Log (with the Tk thread's stack) whenever the event loop is blocked
+        self.stall_watchdog = StallWatchdog(self.main_app).start()
+
+        # Text of scanned images is recognized in the background (idle priority, paused
+        # during scan batches) and indexed for search
+        self.ocr_pipeline = OcrPipeline(self.archive_index, self.archives_path,
+                                        is_busy=lambda: self.active_scan is not None,
+                                        spool_dir=os.path.join(get_data_dir(), "ocr_spool")).start()
+
+        # Checksums of every archived file are recorded and re-verified in the background,
+        # rate-limited and paused during scan batches; corrupt files are restored from
+        # ARCHIVE_MIRROR_PATH when it holds a good copy
+        self.scrubber = IntegrityScrubber(self.archive_index, self.archives_path,
+                                          is_busy=lambda: self.active_scan is not None).start()
+
+        # Print jobs run on the spooler thread; their progress shows in the status bar
+        self.print_spooler = PrintSpooler(on_status=lambda job: self.ui_queue.put(
+            lambda text=job.describe(): self.notification_label.configure(text=text)))
+        self.print_spooler.refresh_printers() # Warm the printer cache on the spooler thread
+
+        # Session activity tracking and idle auto-lock
+        self.main_app.bind_all("<KeyPress>", self.note_session_activity, add="+")
+        self.main_app.bind_all("<ButtonPress>", self.note_session_activity, add="+")
+        self.main_app.after(SESSION_CHECK_INTERVAL_MS, self.check_session_idle)
+
         # Hide main app initially - will be shown after successful login
         self.main_app.withdraw()
 
@@ -395,7 +394,7 @@ class FileArchiveApp:
         progress_values = cython_heavy_task(total_steps)
         for p in progress_values:
             self.ui_queue.put(lambda p=p: self.progress_bar.set(p))
-        self.ui_queue.put(lambda: self.notification_label.configure(text=get_translation("configure_text_heavy_task_complete")))
+        self.ui_queue.put(lambda: self._set_text(self.notification_label, "configure_text_heavy_task_complete"))
 
     def start_heavy_task(self):
         # Use the shared executor instead of creating a new one each time.
@@ -406,167 +405,40 @@ class FileArchiveApp:
     # ==== LANGUAGE SWITCHING (CORRECTED) =====================================
     # =========================================================================
     def switch_language(self):
-        """Switches the application language and rebuilds the UI."""
-        
-        # 1. Determine the new language based on the current one
-        new_lang = "ar" if translations.CURRENT_LANGUAGE == "en" else "en"
-        logging.info(f"Attempting to switch language from '{translations.CURRENT_LANGUAGE}' to '{new_lang}'")
-
-        # 2. Get the key of the currently selected tab so we can re-select it later
-        current_display = self.tabview.get()
-        selected_key = None
-        
-        possible_tab_keys = ["tab_upload_files", "tab_manage_files", "tab_settings"]
-        if self.current_user and self.current_user["role"] == "admin" and hasattr(self, 'tab_admin') and self.tab_admin.winfo_exists():
-            possible_tab_keys.append("tab_admin")
-
-        for key in possible_tab_keys:
-            # Use the current language to find the matching key
-            if self._t(key) == current_display:
-                selected_key = key
-                logging.info(f"Identified active tab key: '{selected_key}' for displayed name '{current_display}'")
-                break
-        
-        if not selected_key:
-            logging.warning(f"Could not determine key for tab '{current_display}'. Will default to first tab.")
-
-        # 3. Set the new language globally
-        switch_success = set_language(new_lang)
+        """
+        Switches the application language in place: every registered widget, tab name and
+        window title is retranslated and header/status layouts are mirrored for RTL.
+        Nothing is destroyed, so open forms keep their contents and the selected tab stays selected.
+        """
+        old_lang = translations.CURRENT_LANGUAGE
+        new_lang = "ar" if old_lang == "en" else "en"
+        logging.info(f"Attempting to switch language from '{old_lang}' to '{new_lang}'")
 
-        # 4. If the language was set successfully, rebuild the UI
-        if switch_success:
-            self._rebuild_ui_for_language(selected_key)
-        else:
+        if not set_language(new_lang):
             messagebox.showerror("Language Error", f"Could not switch to language '{new_lang}'.")
             logging.error(f"set_language failed for '{new_lang}'")
+            return
 
-    def _rebuild_ui_for_language(self, selected_tab_key):
-        """Destroys and recreates major UI parts to apply new language."""
-        # This will now correctly log the NEW language (e.g., 'ar')
-        logging.info(f"Rebuilding UI for language: {translations.CURRENT_LANGUAGE}. Selected key: {selected_tab_key}")
-
-        # --- The rest of this method is correct and does not need changes ---
-        if hasattr(self, 'header_frame') and self.header_frame.winfo_exists():
-            self.header_frame.destroy()
-        if hasattr(self, 'tabview') and self.tabview.winfo_exists():
-            self.tabview.destroy()
-            del self.tabview
-            if hasattr(self, 'tab_upload'): del self.tab_upload
-            if hasattr(self, 'tab_manage'): del self.tab_manage
-            if hasattr(self, 'tab_settings'): del self.tab_settings
-            if hasattr(self, 'tab_admin'): del self.tab_admin
-        if hasattr(self, 'status_frame') and self.status_frame.winfo_exists():
-            self.status_frame.destroy()
-
-        self.header_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent", height=60)
-        self.header_frame.grid(row=0, column=0, sticky="ew", padx=15, pady=(10, 5))
-        self.header_frame.grid_columnconfigure(0, weight=1)
-        self.header_frame.grid_columnconfigure(1, weight=0)
-        self.header_frame.grid_columnconfigure(2, weight=0)
-        self.header_frame.grid_columnconfigure(3, weight=0)
-        ctk.CTkLabel(self.header_frame, text=self._t("ctklabel_text_file_archiving_system"), font=("Segoe UI", 26, "bold")).grid(row=0, column=0, sticky="w", padx=(0, 10))
-        self.user_label = ctk.CTkLabel(self.header_frame, text="", font=("Segoe UI", 12))
-        self.user_label.grid(row=0, column=1, padx=10, sticky="e")
-        if self.current_user:
-             user_text = f"{self._t('label_user')}: {self.current_user['username']} ({self._t('role_' + self.current_user['role'])})"
-             self.user_label.configure(text=user_text)
-        self.language_button = ctk.CTkButton(self.header_frame, text=self._t("button_text_switch_language"), command=self.switch_language, font=("Segoe UI", 12), width=120)
-        self.language_button.grid(row=0, column=2, padx=10, sticky="e")
-        self.logout_button_placeholder = ctk.CTkFrame(self.header_frame, fg_color="transparent", width=110)
-        self.logout_button_placeholder.grid(row=0, column=3, padx=(5, 0), sticky="e")
-
-        self.tabview = ctk.CTkTabview(self.main_frame, corner_radius=8)
-        self.tabview.grid(row=1, column=0, sticky="nsew", padx=10, pady=(0, 10))
-        self._create_tabs()
+        started = time.perf_counter()
+        changed = self.translation_registry.retranslate(old_lang, new_lang)
+        self.update_user_label()
+        logging.info(f"Language switched to '{new_lang}': {changed} widgets updated in "
+                     f"{(time.perf_counter() - started) * 1000:.1f} ms.")
 
+    def update_user_label(self):
+        """Shows the logged-in user and role in the header, in the current language."""
+        if not hasattr(self, 'user_label'):
+            return
         if self.current_user:
-            logging.info("Setting up tab content after language switch...")
-            try:
-                if hasattr(self, 'tab_upload') and self.tab_upload.winfo_exists():
-                     self.setup_upload_tab()
-                if hasattr(self, 'tab_manage') and self.tab_manage.winfo_exists():
-                     self.setup_manage_tab()
-                if hasattr(self, 'tab_settings') and self.tab_settings.winfo_exists():
-                     self.setup_settings_tab()
-                if self.current_user["role"] == "admin":
-                     admin_tab_name = self._t("tab_admin")
-                     try:
-                          self.tab_admin = self.tabview.nametowidget(self.tabview._w + '.inner.' + admin_tab_name)
-                     except KeyError:
-                          self.tab_admin = self.tabview.add(admin_tab_name)
-                          self.tab_admin.grid_columnconfigure(0, weight=1)
-                          self.tab_admin.grid_rowconfigure(0, weight=1)
-                     if hasattr(self, 'tab_admin') and self.tab_admin.winfo_exists():
-                          self.setup_admin_tab()
-            except Exception as e:
-                logging.error(f"Error re-setting up tabs after language switch: {e}", exc_info=True)
-                messagebox.showerror(self._t("error_title"), f"{self._t('error_rebuild_tab_content')}: {e}")
-
-        self.status_frame = ctk.CTkFrame(self.main_frame, height=30, corner_radius=0)
-        self.status_frame.grid(row=2, column=0, sticky="ew", padx=0, pady=0)
-        self.status_frame.grid_columnconfigure(0, weight=1)
-        self.notification_label = ctk.CTkLabel(self.status_frame, text=self._t("ctklabel_text_ready"), font=("Segoe UI", 12))
-        self.notification_label.grid(row=0, column=0, sticky="w", padx=10)
-        self.progress_bar = ctk.CTkProgressBar(self.status_frame, width=150)
-        self.progress_bar.grid(row=0, column=1, padx=10, sticky="e")
-        self.progress_bar.set(0)
-
-        self.add_logout_button()
-
-        if selected_tab_key:
-            try:
-                new_label = self._t(selected_tab_key)
-                logging.info(f"Attempting to re-select tab using new label: '{new_label}' (from key: '{selected_tab_key}')")
-                if new_label in self.tabview._name_list:
-                    self.main_app.after(50, lambda name=new_label: self.tabview.set(name))
-                    logging.info(f"Scheduled selection of tab: '{new_label}'")
-                else:
-                    logging.warning(f"Tab with label '{new_label}' not found. Falling back to first tab.")
-                    self._select_first_tab()
-            except Exception as e:
-                logging.error(f"Could not re-select tab for key '{selected_tab_key}'. Error: {e}", exc_info=True)
-                self._select_first_tab()
+            self.user_label.configure(text=f"{self._t('label_user')}: {self.current_user['username']} "
+                                           f"({self._t('role_' + self.current_user['role'])})")
         else:
-            logging.warning("No selected_tab_key provided, selecting first available tab.")
-            self._select_first_tab()
-            
+            self.user_label.configure(text="")
+
     # =========================================================================
     # ==== END OF LANGUAGE SWITCHING ==========================================
     # =========================================================================
 
-    def load_translations(filename="translations.json"):
-        global TRANSLATIONS, CURRENT_LANGUAGE
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            file_path = os.path.join(script_dir, filename)
-            if not os.path.exists(file_path):
-                logging.error(f"Translation file not found at expected path: {file_path}")
-                TRANSLATIONS = {"en": {}, "ar": {}}
-                return TRANSLATIONS.get(CURRENT_LANGUAGE, {})
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                TRANSLATIONS = json.load(f)
-                
-            if "en" not in TRANSLATIONS:
-                TRANSLATIONS["en"] = {}
-            if "ar" not in TRANSLATIONS:
-                TRANSLATIONS["ar"] = {}
-                
-            logging.info(f"Translations loaded successfully from {file_path}. Current language: {CURRENT_LANGUAGE}")
-            return TRANSLATIONS.get(CURRENT_LANGUAGE, {})
-            
-        except FileNotFoundError:
-            logging.error(f"Translation file '{filename}' not found.")
-            TRANSLATIONS = {"en": {}, "ar": {}}
-            return TRANSLATIONS.get(CURRENT_LANGUAGE, {})
-        except json.JSONDecodeError:
-            logging.error(f"Error decoding JSON from translation file '{filename}'.")
-            TRANSLATIONS = {"en": {}, "ar": {}}
-            return TRANSLATIONS.get(CURRENT_LANGUAGE, {})
-        except Exception as e:
-            logging.error(f"An unexpected error occurred loading translations: {e}", exc_info=True)
-            TRANSLATIONS = {"en": {}, "ar": {}}
-            return TRANSLATIONS.get(CURRENT_LANGUAGE, {})
     # Add this helper method inside FileArchiveApp class
     # def load_app_translations(self): # Removed
     #     """Loads translations for the current language into the instance.""" # Removed
@@ -604,6 +476,8 @@ class FileArchiveApp:
         self.tab_upload = self.tabview.add(self._t("tab_upload_files"))
         self.tab_manage = self.tabview.add(self._t("tab_manage_files"))
         self.tab_settings = self.tabview.add(self._t("tab_settings"))
+        for key in ("tab_upload_files", "tab_manage_files", "tab_settings"):
+            self.translation_registry.register_tab(self.tabview, key)
 
         # Configure tab grids (apply to all base tabs)
         for tab in [self.tab_upload, self.tab_manage, self.tab_settings]:
@@ -649,7 +523,8 @@ class FileArchiveApp:
             try:
                 # Only run callback if main window exists
                 if self.main_app.winfo_exists():
-                    callback()
+                    with metrics.timer(OP_UI_DISPATCH):
+                        callback()
             except Exception as e:
                 logging.error(f"Error in UI callback: {e}")
             finally:
@@ -665,50 +540,22 @@ class FileArchiveApp:
     # --------------------------------------------------------------------------
     # Update Options for Header/Subheader (sets default subheader)
     # --------------------------------------------------------------------------
-        # Place this method within the FileArchiveApp class
-    def get_dynamic_folder_options(self, base_folder_path, template_options):
-        """
-        Gets folder options by merging template definition with actual folders on disk.
-
-        Args:
-            base_folder_path (str): The directory path to scan for folders.
-            template_options (list | dict | None): Options from self.structure.
-                                                   If dict, keys are used. If list, items are used.
-
-        Returns:
-            list: A sorted list of unique folder names found in template and on disk.
-        """
-        disk_folders = set()
-        template_folders = set()
-
-        # 1. Get folders from disk
-        if os.path.isdir(base_folder_path):
-            try:
-                for item in os.listdir(base_folder_path):
-                    # Check if it's a directory and not a hidden file/folder (optional)
-                    if os.path.isdir(os.path.join(base_folder_path, item)) and not item.startswith('.'):
-                        disk_folders.add(item)
-                logging.debug(f"Disk scan found folders in '{base_folder_path}': {disk_folders}")
-            except OSError as e:
-                logging.warning(f"Could not scan directory '{base_folder_path}': {e}")
-        else:
-            logging.debug(f"Base folder path for dynamic options does not exist: {base_folder_path}")
-
-
-        # 2. Get folders from template
-        if isinstance(template_options, dict):
-            template_folders = set(template_options.keys())
-        elif isinstance(template_options, list):
-            template_folders = set(template_options)
-        # Ignore if template_options is None or other type
-
-        logging.debug(f"Template options for '{base_folder_path}': {template_folders}")
+    def apply_structure(self, structure):
+        """Switches every component to a new compiled structure revision."""
+        if structure is self.structure:
+            return
+        self.structure = structure
+        self.archive_controller.set_structure(structure)
+        self.naming_policy.set_structure(structure)
+        logging.info(f"Using archive structure revision {structure.revision}.")
 
-        # 3. Merge and sort
-        combined_options = sorted(list(template_folders.union(disk_folders)))
-        logging.debug(f"Combined options for '{base_folder_path}': {combined_options}")
+    def sync_structure(self):
+        """Picks up structure changes saved by another running instance (one stat() call)."""
+        try:
+            self.apply_structure(self.structure_store.refresh())
+        except Exception as e:
+            logging.error(f"Could not reload the archive structure: {e}")
 
-        return combined_options
     # --- Modify update_section_options_upload ---
     def update_section_options_upload(self, *args):
         if not hasattr(self, 'section_menu'): return # Safety check
@@ -722,23 +569,8 @@ class FileArchiveApp:
         if company_display_name and header_value and subheader_value:
             try:
                 safe_company_name = self.sanitize_path(company_display_name)
-                header_template_options = self.structure.get(header_value, None)
-
-                # Check if template structure is nested (dict)
-                if isinstance(header_template_options, dict):
-                    # Get template sections for this subheader
-                    section_template_options = header_template_options.get(subheader_value, None)
-
-                    # Determine disk path for sections
-                    company_subheader_path = os.path.join(self.archives_path, safe_company_name, header_value, subheader_value)
-
-                    # Get dynamic options (sections)
-                    sections = self.archive_controller.get_dynamic_folder_options(company_subheader_path, section_template_options)
-                    logging.info(f"Updating Section options for Company '{safe_company_name}', Path '{header_value}/{subheader_value}'. Found: {sections}")
-                else:
-                    # Flat structure - no sections defined in template or dynamically scanned at this level
-                    logging.debug(f"update_section_options_upload: Header '{header_value}' is flat, no sections applicable.")
-                    sections = [] # Explicitly clear
+                sections = list(self.structure.options(header_value, subheader_value)) # None under flat headers
+                logging.info(f"Updating Section options for Company '{safe_company_name}', Path '{header_value}/{subheader_value}'. Found: {sections}")
 
             except Exception as e:
                  logging.error(f"Error in update_section_options_upload for company '{company_display_name}': {e}", exc_info=True)
@@ -770,21 +602,7 @@ class FileArchiveApp:
         if company_display_name and header_value and subheader_value and section_value:
              try:
                 safe_company_name = self.sanitize_path(company_display_name)
-                header_template_options = self.structure.get(header_value, None)
-
-                # Check if template structure is nested down to sections
-                subsection_template_options = None
-                if isinstance(header_template_options, dict):
-                    section_dict = header_template_options.get(subheader_value, None)
-                    if isinstance(section_dict, dict):
-                        subsection_template_options = section_dict.get(section_value, None) # Should be a list or None
-
-                # Determine disk path for subsections
-                company_section_path = os.path.join(self.archives_path, safe_company_name, header_value, subheader_value, section_value)
-
-                # Get dynamic options (subsections)
-                # Pass the template list (or None)
-                subsections = self.archive_controller.get_dynamic_folder_options(company_section_path, subsection_template_options)
+                subsections = list(self.structure.options(header_value, subheader_value, section_value))
                 logging.info(f"Updating Subsection options for Company '{safe_company_name}', Path '{header_value}/{subheader_value}/{section_value}'. Found: {subsections}")
 
              except Exception as e:
@@ -796,8 +614,9 @@ class FileArchiveApp:
 
         if subsections:
             if current_subsection not in subsections:
-                 # Check if template defined a default and it exists, otherwise use first dynamic
-                 default_in_template = subsection_template_options[0] if isinstance(subsection_template_options, list) and subsection_template_options else None
+                 # Use the first subsection in template order as the default
+                 template_order = self.structure.children(header_value, subheader_value, section_value)
+                 default_in_template = template_order[0] if template_order else None
                  if default_in_template and default_in_template in subsections:
                       self.subsection_var.set(default_in_template)
                  else:
@@ -835,12 +654,9 @@ class FileArchiveApp:
                  safe_company_name = self.current_company["safe_name"]
 
 
+            self.sync_structure()
             header_value = self.header_var.get()
-            header_template_options = self.structure.get(header_value, None) # Get template structure for this header
-
-            # --- Determine Path and Get Dynamic Options for Subheaders ---
-            company_header_path = os.path.join(self.archives_path, safe_company_name, header_value)
-            subh_options = self.archive_controller.get_dynamic_folder_options(company_header_path, header_template_options)
+            subh_options = list(self.structure.options(header_value))
 
             logging.info(f"Updating Subheader options for Company '{safe_company_name}', Header '{header_value}'. Found: {subh_options}")
 
@@ -876,110 +692,224 @@ class FileArchiveApp:
                     widget.destroy()
 
                 # Add the logout button directly into the placeholder frame
-                logout_btn = ctk.CTkButton(self.logout_button_placeholder, text=self._t("ctkbutton_text_logout"),
+                logout_btn = self._tr(ctk.CTkButton(self.logout_button_placeholder, text=self._t("ctkbutton_text_logout"),
                                         command=self.logout,
                                         font=("Segoe UI", 13), # Match header style
                                         height=35,             # Match header style
                                         width=100,             # Explicit width
-                                        fg_color="#dc3545", hover_color="#c82333")
+                                        fg_color="#dc3545", hover_color="#c82333"), "ctkbutton_text_logout")
                 # Pack inside the placeholder, aligned right if desired
                 logout_btn.pack(side="right", padx=0, pady=0)
+
+                lock_btn = self._tr(ctk.CTkButton(self.logout_button_placeholder, text=self._t("ctkbutton_text_lock"),
+                                        command=self.lock_session,
+                                        font=("Segoe UI", 13), height=35, width=80,
+                                        fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_lock")
+                lock_btn.pack(side="right", padx=(0, 5), pady=0)
+                # Fresh left-to-right children: mirrored again if Arabic is active
+                self.translation_registry.register_direction(self.logout_button_placeholder)
                 logging.info("Logout button added to header placeholder.")
             else:
                 logging.error("Could not find or access logout button placeholder in header.")
         except Exception as e:
             logging.error(f"Error adding logout button to header: {e}", exc_info=True)
-    def authenticate_user(self):
+    def authenticate_user(self, prefill_username=None):
         """Improved login dialog with better UI"""
         login_win = ctk.CTkToplevel(self.main_app)
         login_win.transient(self.main_app) # Stay on top of main window
         login_win.title("Login")
         login_win.resizable(False, False)
-        self.center_window(login_win, 400, 300)
+        self.center_window(login_win, 400, 360)
         login_win.grab_set() # Focus and block main window
 
         # Login title with larger font
-        ctk.CTkLabel(login_win, text=get_translation("ctklabel_text_file_archiving_system"),
-                    font=("Segoe UI", 24, "bold")).pack(pady=(20, 5))
+        self._tr(ctk.CTkLabel(login_win, text=get_translation("ctklabel_text_file_archiving_system"),
+                    font=("Segoe UI", 24, "bold")), "ctklabel_text_file_archiving_system").pack(pady=(20, 5))
 
-        ctk.CTkLabel(login_win, text=get_translation("ctklabel_text_please_login"),
-                    font=("Segoe UI", 16)).pack(pady=(0, 20))
+        self._tr(ctk.CTkLabel(login_win, text=get_translation("ctklabel_text_please_login"),
+                    font=("Segoe UI", 16)), "ctklabel_text_please_login").pack(pady=(0, 20))
 
         # Frame for inputs
         login_frame = ctk.CTkFrame(login_win)
         login_frame.pack(padx=20, pady=10, fill="x")
 
         # Username field
-        ctk.CTkLabel(login_frame, text=get_translation("ctklabel_text_username"),
-                    font=("Segoe UI", 14)).pack(anchor="w", padx=10, pady=(10, 0))
+        self._tr(ctk.CTkLabel(login_frame, text=get_translation("ctklabel_text_username"),
+                    font=("Segoe UI", 14)), "ctklabel_text_username").pack(anchor="w", padx=10, pady=(10, 0))
 
-        username_entry = ctk.CTkEntry(login_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_your_username"),
-                                    width=300, font=("Segoe UI", 14))
+        username_entry = self._tr(ctk.CTkEntry(login_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_your_username"),
+                                    width=300, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_your_username")
         username_entry.pack(padx=10, pady=(5, 10), fill="x")
+        if prefill_username:
+            username_entry.insert(0, prefill_username)
 
         # Password field
-        ctk.CTkLabel(login_frame, text=get_translation("ctklabel_text_password"),
-                    font=("Segoe UI", 14)).pack(anchor="w", padx=10, pady=(10, 0))
+        self._tr(ctk.CTkLabel(login_frame, text=get_translation("ctklabel_text_password"),
+                    font=("Segoe UI", 14)), "ctklabel_text_password").pack(anchor="w", padx=10, pady=(10, 0))
 
-        password_entry = ctk.CTkEntry(login_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_your_password"),
-                                    show="*", width=300, font=("Segoe UI", 14))
+        password_entry = self._tr(ctk.CTkEntry(login_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_your_password"),
+                                    show="*", width=300, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_your_password")
         password_entry.pack(padx=10, pady=(5, 15), fill="x")
 
         # Remember the input field values (in a real app, you'd want secure handling)
         remember_var = ctk.BooleanVar(value=False)
-        remember_check = ctk.CTkCheckBox(login_win, text=get_translation("ctkcheckbox_text_remember_username"),
-                                        variable=remember_var, font=("Segoe UI", 12))
+        remember_check = self._tr(ctk.CTkCheckBox(login_win, text=get_translation("ctkcheckbox_text_remember_username"),
+                                        variable=remember_var, font=("Segoe UI", 12)), "ctkcheckbox_text_remember_username")
         remember_check.pack(pady=5)
 
+        # Spinner and status shown while credentials are verified off the Tk thread
+        verify_status_label = ctk.CTkLabel(login_win, text="", font=("Segoe UI", 12))
+        verify_spinner = ctk.CTkProgressBar(login_win, mode="indeterminate", width=200)
+        login_state = {"pending": False, "attempt": 0, "password": None}
+
+        def set_pending(pending):
+            login_state["pending"] = pending
+            if not login_win.winfo_exists():
+                return
+            if pending:
+                login_btn.configure(state="disabled")
+                self._set_text(verify_status_label, "ctklabel_text_verifying_credentials")
+                verify_status_label.pack(pady=(0, 2))
+                verify_spinner.pack(pady=(0, 5))
+                verify_spinner.start()
+            else:
+                verify_spinner.stop()
+                verify_spinner.pack_forget()
+                verify_status_label.pack_forget()
+                login_btn.configure(state="normal")
+
+        def complete_login(username, password=None):
+            """
+            Finishes a successful login. `password` is given only after a full PBKDF2 check,
+            in which case a new session is started; session unlocks pass None.
+            """
+            self.user_controller.reset_failed_logins(username)
+            if password is not None:
+                self.session_token = self.session_manager.create(username, self.current_user["role"], password)
+                messagebox.showinfo("Login Success", f"Welcome {self.current_user['role'].capitalize()}!")
+            logging.info(f"{self.current_user['role'].capitalize()} '{username}' logged in.")
+            self.record_activity(activity_log.ACTION_LOGIN, details="session unlock" if password is None else "")
+
+            # Update the user label
+            self.update_user_label()
+
+            login_win.destroy()
+
+            # Unlocking the same user that locked the station: the UI is already built
+            unlocking = self.locked_username == username and self.ui_built_for == username
+            self.locked_username = None
+            if unlocking:
+                if self.current_user["role"] == "admin":
+                    self.show_archive_folder()
+                self.main_app.deiconify()
+                return
+
+            # A different user: drop the previous user's tab contents (and admin tab)
+            if self.ui_built_for is not None:
+                self._create_tabs()
+            self.ui_built_for = username
+
+            # Setup the tab content BEFORE showing the main window
+            if hasattr(self, 'setup_upload_tab'):
+                self.setup_upload_tab()
+            if hasattr(self, 'setup_manage_tab'):
+                self.setup_manage_tab()
+            if hasattr(self, 'setup_settings_tab'):
+                self.setup_settings_tab()
+
+            # Show the admin tab if admin user
+            if self.current_user["role"] == "admin":
+                self.show_archive_folder()
+                if hasattr(self, 'tabview') and not hasattr(self, 'tab_admin'):
+                    self.tab_admin = self.tabview.add(get_translation("tab_admin"))
+                    self.translation_registry.register_tab(self.tabview, "tab_admin")
+                    self.setup_admin_tab()
+            else:
+                # Make sure the archive folder is hidden for non-admin users
+                self.hide_archive_folder()
+
+            # Add logout button
+            self.add_logout_button()
+
+            # Now show the main window after tabs are set up
+            self.main_app.deiconify()
+
+        def handle_verification_result(attempt, username, future):
+            """Runs on the Tk thread (via ui_queue) once the background check finishes."""
+            if attempt != login_state["attempt"] or not login_win.winfo_exists():
+                return # Timed out or dialog closed; result is stale
+            set_pending(False)
+            password, login_state["password"] = login_state["password"], None
+            try:
+                verified_user = future.result()
+                if verified_user:
+                    self.current_user = verified_user
+                    complete_login(username, password=password)
+                else:
+                    lockout = self.user_controller.record_failed_login(username)
+                    if lockout > 0:
+                        messagebox.showerror("Login Error", f"Invalid credentials!\n\nToo many failed attempts. Try again in {int(lockout)} seconds.", parent=login_win)
+                    else:
+                        messagebox.showerror("Login Error", "Invalid credentials!", parent=login_win)
+                    logging.warning("Failed login attempt.")
+            except Exception as e:
+                messagebox.showerror("Login Error", f"Error during login: {e}", parent=login_win)
+                logging.error(f"Login error: {e}")
+
+        def handle_verification_timeout(attempt):
+            if attempt != login_state["attempt"] or not login_state["pending"] or not login_win.winfo_exists():
+                return
+            login_state["attempt"] += 1 # Invalidate the in-flight check
+            login_state["password"] = None
+            set_pending(False)
+            logging.error(f"Credential verification exceeded {LOGIN_VERIFY_TIMEOUT_SECONDS}s timeout.")
+            messagebox.showerror("Login Error", "Verifying credentials took too long. Please try again.", parent=login_win)
+
         def do_login():
+            # Ignore repeated Enter/clicks while a check is running: one derivation at a time
+            if login_state["pending"]:
+                return
             username = username_entry.get().strip()
             password = password_entry.get().strip()
+            if not username or not password:
+                messagebox.showerror("Login Error", "Invalid credentials!", parent=login_win)
+                return
             try:
-                if username in users and pbkdf2_sha256.verify(password, users[username]["password"]):
-                    self.current_user = {"username": username, "role": users[username]["role"]}
-                    messagebox.showinfo("Login Success", f"Welcome {self.current_user['role'].capitalize()}!")
-                    logging.info(f"{self.current_user['role'].capitalize()} '{username}' logged in.")
-
-                    # Update the user label
-                    if hasattr(self, 'user_label'):
-                        self.user_label.configure(text=f"User: {username} ({self.current_user['role']})")
-
-                    login_win.destroy()
-
-                    # Setup the tab content BEFORE showing the main window
-                    if hasattr(self, 'setup_upload_tab'):
-                        self.setup_upload_tab()
-                    if hasattr(self, 'setup_manage_tab'):
-                        self.setup_manage_tab()
-                    if hasattr(self, 'setup_settings_tab'):
-                        self.setup_settings_tab()
-
-                    # Show the admin tab if admin user
-                    if self.current_user["role"] == "admin":
-                        self.show_archive_folder()
-                        if hasattr(self, 'tabview') and not hasattr(self, 'tab_admin'):
-                            self.tab_admin = self.tabview.add(get_translation("tab_admin"))
-                            self.setup_admin_tab()
-                    else:
-                        # Make sure the archive folder is hidden for non-admin users
-                        self.hide_archive_folder()
+                # Locked accounts are rejected before any PBKDF2 work is done
+                remaining = self.user_controller.lockout_remaining(username)
+                if remaining > 0:
+                    messagebox.showerror("Login Error", f"Too many failed attempts. Try again in {int(remaining) + 1} seconds.", parent=login_win)
+                    logging.warning(f"Login for '{username}' rejected: locked for another {remaining:.0f}s.")
+                    return
 
-                    # Add logout button
-                    self.add_logout_button()
+                # Fast path: a live session for this user is checked with one HMAC, no PBKDF2
+                session = self.session_manager.unlock(username, password)
+                stored_user = self.user_repository.get(username) if session else None
+                if stored_user:
+                    self.current_user = {"username": username, "role": stored_user["role"]}
+                    self.session_token = session.token
+                    logging.info(f"'{username}' unlocked from cached session.")
+                    complete_login(username)
+                    return
 
-                    # Now show the main window after tabs are set up
-                    self.main_app.deiconify()
-                else:
-                    messagebox.showerror("Login Error", "Invalid credentials!")
-                    logging.warning("Failed login attempt.")
+                login_state["attempt"] += 1
+                login_state["password"] = password
+                attempt = login_state["attempt"]
+                set_pending(True)
+                future = self.executor.submit(self.user_controller.verify_credentials, username, password)
+                future.add_done_callback(
+                    lambda f, a=attempt: self.ui_queue.put(lambda: handle_verification_result(a, username, f)))
+                login_win.after(LOGIN_VERIFY_TIMEOUT_SECONDS * 1000, lambda a=attempt: handle_verification_timeout(a))
             except Exception as e:
-                messagebox.showerror("Login Error", f"Error during login: {e}")
+                set_pending(False)
+                messagebox.showerror("Login Error", f"Error during login: {e}", parent=login_win)
                 logging.error(f"Login error: {e}")
 
         # Login button
-        ctk.CTkButton(login_win, text=get_translation("ctkbutton_text_login"), command=do_login,
+        login_btn = self._tr(ctk.CTkButton(login_win, text=get_translation("ctkbutton_text_login"), command=do_login,
                     width=200, height=40, font=("Segoe UI", 16, "bold"),
-                    fg_color="#2D7FF9", hover_color="#1A6CD6").pack(pady=15)
+                    fg_color="#2D7FF9", hover_color="#1A6CD6"), "ctkbutton_text_login")
+        login_btn.pack(pady=15)
 
         # Focus on username entry
         username_entry.focus_set()
@@ -990,91 +920,114 @@ class FileArchiveApp:
         login_win.grab_set()
         self.main_app.wait_window(login_win)
     def change_password(self):
-        """Allow users to change their password"""
+        """Only allow admin users to change their own password"""
         if not self.current_user:
             return
 
+        # If the current user is not an admin, disallow password change
+        if self.current_user["role"].lower() != "admin":
+            messagebox.showerror("Permission Denied", "Only admin users can change their password.", parent=self.main_app)
+            return
+
         change_pwd_win = ctk.CTkToplevel(self.main_app)
         change_pwd_win.transient(self.main_app) # Stay on top
         change_pwd_win.title("Change Password")
-        self.center_window(change_pwd_win, 400, 250)
+        self.center_window(change_pwd_win, 400, 320)
         change_pwd_win.grab_set()
 
-        ctk.CTkLabel(change_pwd_win, text=get_translation("ctklabel_text_change_password"),
-                     font=("Segoe UI", 20, "bold")).pack(pady=15)
+        self._tr(ctk.CTkLabel(change_pwd_win, text=get_translation("ctklabel_text_change_password"),
+                     font=("Segoe UI", 20, "bold")), "ctklabel_text_change_password").pack(pady=15)
 
         # Current password
-        current_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_current_password"),
-                                 show="*", width=250, font=("Segoe UI", 14))
+        current_pwd = self._tr(ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_current_password"),
+                                 show="*", width=250, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_current_password")
         current_pwd.pack(pady=10)
 
         # New password
-        new_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_new_password"),
-                              show="*", width=250, font=("Segoe UI", 14))
+        new_pwd = self._tr(ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_new_password"),
+                              show="*", width=250, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_new_password")
         new_pwd.pack(pady=10)
 
         # Confirm new password
-        confirm_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_confirm_new_password"),
-                                  show="*", width=250, font=("Segoe UI", 14))
+        confirm_pwd = self._tr(ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_confirm_new_password"),
+                                  show="*", width=250, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_confirm_new_password")
         confirm_pwd.pack(pady=10)
 
-        def change_password(self):
-            """Only allow admin users to change their own password"""
-            if not self.current_user:
-                return
+        def do_change_password():
+            curr = current_pwd.get().strip()
+            new = new_pwd.get().strip()
+            confirm = confirm_pwd.get().strip()
+            username = self.current_user['username']
 
-            # If the current user is not an admin, disallow password change
-            if self.current_user["role"].lower() != "admin":
-                messagebox.showerror("Permission Denied", "Only admin users can change their password.", parent=self.main_app)
+            if not (curr and new and confirm):
+                messagebox.showerror("Error", "All fields are required", parent=change_pwd_win)
                 return
 
-            change_pwd_win = ctk.CTkToplevel(self.main_app)
-            change_pwd_win.transient(self.main_app)
-            change_pwd_win.title("Change Password")
-            self.center_window(change_pwd_win, 400, 250)
-            change_pwd_win.grab_set()
-
-            ctk.CTkLabel(change_pwd_win, text=get_translation("ctklabel_text_change_password"), font=("Segoe UI", 20, "bold")).pack(pady=15)
-
-            # Current password
-            current_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_current_password"), show="*", width=250, font=("Segoe UI", 14))
-            current_pwd.pack(pady=10)
+            if new != confirm:
+                messagebox.showerror("Error", "New passwords do not match", parent=change_pwd_win)
+                return
 
-            # New password
-            new_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_new_password"), show="*", width=250, font=("Segoe UI", 14))
-            new_pwd.pack(pady=10)
+            # Re-verify against the live session first; fall back to the stored hash
+            if not (self.session_manager.verify_password(username, curr) or
+                    self.user_controller.check_password(username, curr)):
+                messagebox.showerror("Error", "Current password is incorrect", parent=change_pwd_win)
+                return
 
-            # Confirm new password
-            confirm_pwd = ctk.CTkEntry(change_pwd_win, placeholder_text=get_translation("ctkentry_placeholder_text_confirm_new_password"), show="*", width=250, font=("Segoe UI", 14))
-            confirm_pwd.pack(pady=10)
+            self.user_repository.update_password(username, self.user_controller.hash_password(new))
 
-            def do_change_password():
-                curr = current_pwd.get().strip()
-                new = new_pwd.get().strip()
-                confirm = confirm_pwd.get().strip()
-                username = self.current_user['username']
+            # The old password must no longer unlock anything
+            self.session_manager.invalidate(username)
+            self.session_token = self.session_manager.create(username, self.current_user["role"], new)
 
-                if not (curr and new and confirm):
-                    messagebox.showerror("Error", "All fields are required", parent=change_pwd_win)
-                    return
+            messagebox.showinfo("Success", "Password changed successfully", parent=change_pwd_win)
+            logging.info(f"Admin '{username}' changed their password")
+            self.record_activity(activity_log.ACTION_PASSWORD_CHANGE, details=username)
+            change_pwd_win.destroy()
 
-                if new != confirm:
-                    messagebox.showerror("Error", "New passwords do not match", parent=change_pwd_win)
-                    return
+        # Change button
+        self._tr(ctk.CTkButton(change_pwd_win, text=get_translation("ctkbutton_text_change_password"),
+                    command=do_change_password, width=200,
+                    font=("Segoe UI", 14, "bold")), "ctkbutton_text_change_password").pack(pady=15)
 
-                if not pbkdf2_sha256.verify(curr, users[username]["password"]):
-                    messagebox.showerror("Error", "Current password is incorrect", parent=change_pwd_win)
-                    return
+    # --------------------------------------------------------------------------
+    # Session Lock / Idle Expiry
+    # --------------------------------------------------------------------------
+    def note_session_activity(self, event=None):
+        """Key/mouse activity anywhere in the app keeps the current session alive."""
+        if self.current_user and self.session_token:
+            self.session_manager.touch(self.session_token)
+
+    def check_session_idle(self):
+        """Periodically locks the station once the session has been idle too long."""
+        # Reschedule first: lock_session blocks in the login dialog until someone unlocks
+        if self.main_app.winfo_exists():
+            self.main_app.after(SESSION_CHECK_INTERVAL_MS, self.check_session_idle)
+        try:
+            self.session_manager.purge_expired()
+            if self.current_user and self.session_token:
+                idle = self.session_manager.idle_seconds(self.session_token)
+                if idle is None or idle >= SESSION_AUTO_LOCK_SECONDS:
+                    logging.info(f"Session for '{self.current_user['username']}' idle; locking station.")
+                    self.lock_session()
+        except Exception as e:
+            logging.error(f"Error checking session idle state: {e}", exc_info=True)
 
-                users[username]["password"] = pbkdf2_sha256.hash(new)
-                messagebox.showinfo("Success", "Password changed successfully", parent=change_pwd_win)
-                logging.info(f"Admin '{username}' changed their password")
-                change_pwd_win.destroy()
+    def lock_session(self):
+        """
+        Hides the main window and asks for the password again. The session is kept, so
+        unlocking within the idle timeout is an HMAC check rather than a PBKDF2 derivation.
+        """
+        if not self.current_user:
+            return
+        username = self.current_user["username"]
+        self.hide_archive_folder()
+        logging.info(f"Station locked by '{username}'.")
+        self.locked_username = username
+        self.current_user = None
+        self.session_token = None
+        self.main_app.withdraw()
+        self.authenticate_user(prefill_username=username)
 
-            # Change button
-            ctk.CTkButton(change_pwd_win, text=get_translation("ctkbutton_text_change_password"),
-                        command=do_change_password, width=200,
-                        font=("Segoe UI", 14, "bold")).pack(pady=15)
     # --------------------------------------------------------------------------
     # Center Window Utility
     # --------------------------------------------------------------------------
@@ -1096,46 +1049,22 @@ class FileArchiveApp:
         self.secure_archive_folder()
 
     def show_archive_folder(self):
-        if platform.system() == "Windows":
-            subprocess.run(['attrib', '-h', '-s', '/S', '/D', self.archives_path], shell=True)
-        else:
-            subprocess.run(['chmod', '755', self.archives_path])
+        # Recursive on Windows (like `attrib -h -s /S /D`); only paths not already visible are touched
+        self.permission_manager.set_visible(True, recursive=True)
         logging.info(f"Archive folder shown: {self.archives_path}")
 
     def hide_archive_folder(self):
-        """Hide the archive folder (non-recursively) with detailed logging"""
-        start_time = time.time()  # Start timer
+        """Hide the archive folder (non-recursively); timed under OP_HIDE_ARCHIVE"""
         try:
-            archive_path = os.path.abspath(self.archives_path)
-            if not os.path.exists(archive_path):
-                logging.warning(f"Archive path does not exist: {archive_path}")
-                return
-
-            logging.info(f"Hiding archive folder (non-recursive) STARTED: {archive_path}")
-
-            if platform.system() == "Windows":
-                logging.info("Before Windows attrib command")
-                subprocess.run(['attrib', '+h', '+s', archive_path], shell=True, check=True)
-                logging.info("After Windows attrib command")
-            else:
-                logging.info("Before chmod command")
-                subprocess.run(['chmod', '700', archive_path], check=True)
-                logging.info("After chmod command")
-
-            logging.info("Archive folder hidden successfully (non-recursive) ENDED")
+            with metrics.timer(OP_HIDE_ARCHIVE):
+                self.permission_manager.set_visible(False)
+            logging.info(f"Archive folder hidden (non-recursive): {self.permission_manager.root}")
         except Exception as e:
             logging.error(f"Error hiding archive folder: {e}")
-        finally:
-            end_time = time.time()  # End timer
-            duration = end_time - start_time
-            logging.info(f"hide_archive_folder() execution time: {duration:.4f} seconds") # Log duration
 
     def secure_archive_folder(self):
         # Note: This is minimal security and should be improved for sensitive data.
-        if platform.system() == "Windows":
-            subprocess.run(['attrib', '+h', '+s', '/S', '/D', self.archives_path], shell=True)
-        else:
-            subprocess.run(['chmod', '700', self.archives_path])
+        self.permission_manager.set_visible(False, recursive=True)
         logging.info(f"Archive folder secured: {self.archives_path}")
 
     # --------------------------------------------------------------------------
@@ -1144,12 +1073,14 @@ class FileArchiveApp:
     def add_admin_controls(self):
         if self.admin_controls_added:
             return
-        refresh_btn = ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_refresh_folders"), command=self.refresh_folders, font=("Segoe UI", 14))
+        refresh_btn = self._tr(ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_refresh_folders"), command=self.refresh_folders, font=("Segoe UI", 14)), "ctkbutton_text_refresh_folders")
         refresh_btn.grid(row=9, column=0, pady=5)
-        search_btn = ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_search_archive"), command=self.search_archive, font=("Segoe UI", 14))
+        search_btn = self._tr(ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_search_archive"), command=self.search_archive, font=("Segoe UI", 14)), "ctkbutton_text_search_archive")
         search_btn.grid(row=9, column=1, pady=5)
-        dashboard_btn = ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_dashboard"), command=self.open_dashboard, font=("Segoe UI", 14))
-        dashboard_btn.grid(row=10, column=0, columnspan=2, pady=5)
+        dashboard_btn = self._tr(ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_dashboard"), command=self.open_dashboard, font=("Segoe UI", 14)), "ctkbutton_text_dashboard")
+        dashboard_btn.grid(row=10, column=0, pady=5)
+        import_folders_btn = self._tr(ctk.CTkButton(self.main_frame, text=get_translation("ctkbutton_text_import_folders"), command=self.import_structure_folders, font=("Segoe UI", 14)), "ctkbutton_text_import_folders")
+        import_folders_btn.grid(row=10, column=1, pady=5)
         self.admin_controls_added = True
 
     # --------------------------------------------------------------------------
@@ -1163,19 +1094,52 @@ class FileArchiveApp:
                     self.archive_controller.clear_cache()
                     logging.info("Admin triggered folder refresh, clearing full ArchiveController cache.")
 
-                for root, dirs, _ in os.walk(self.archives_path):
-                    for d in dirs:
-                        show_path = os.path.join(root, d)
-                        if platform.system() == "Windows":
-                            subprocess.run(['attrib', '-h', '-s', '/S', '/D', show_path], shell=True)
-                self.show_archive_folder()
+                # Re-check every node against the file system (ignoring cached state) but
+                # only rewrite attributes that are actually wrong
+                self.permission_manager.set_visible(True, recursive=True, use_cache=False)
                 self.ui_queue.put(lambda: messagebox.showinfo("Refreshed", "All folders are now visible."))
                 logging.info("Folders refreshed by admin.")
             except Exception as e:
-                self.ui_queue.put(lambda: messagebox.showerror("Error", f"Failed to refresh folders: {e}"))
+                self.ui_queue.put(lambda e=e: messagebox.showerror("Error", f"Failed to refresh folders: {e}"))
                 logging.error(f"Error refreshing folders: {e}")
         threading.Thread(target=task, daemon=True).start()
 
+    def import_structure_folders(self):
+        """
+        Lets an admin add folders created outside the app (e.g. in Explorer) to the shared
+        structure template, after seeing which ones would be added.
+        """
+        def find():
+            try:
+                folders = self.structure_store.unlisted_folders()
+            except Exception as e:
+                logging.error(f"Error looking for unlisted folders: {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: messagebox.showerror("Error", f"Failed to read the archive folders: {e}"))
+                return
+            self.ui_queue.put(lambda: confirm(folders))
+
+        def confirm(folders):
+            if not folders:
+                messagebox.showinfo("Import Folders", "Every folder in the archive is already part of the structure.")
+                return
+            listing = "\n".join("/".join(parts) for parts in folders[:15])
+            more = f"\n... and {len(folders) - 15} more" if len(folders) > 15 else ""
+            if messagebox.askyesno("Import Folders",
+                                   f"Add {len(folders)} folder(s) found in the archive to the structure of every company?\n\n"
+                                   f"{listing}{more}"):
+                self.executor.submit(apply, folders)
+
+        def apply(folders):
+            try:
+                structure = self.structure_store.import_folders(folders)
+            except Exception as e:
+                logging.error(f"Error importing folders into the structure: {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: messagebox.showerror("Error", f"Failed to import folders: {e}"))
+                return
+            self.ui_queue.put(lambda: (self.apply_structure(structure), self.update_options()))
+
+        self.executor.submit(find)
+
     # --------------------------------------------------------------------------
     # Real-Time Monitoring Using Watchdog
     # --------------------------------------------------------------------------
@@ -1203,35 +1167,35 @@ class FileArchiveApp:
             return None, None, None, None, None # Return 5 Nones now
 
         # --- UI Elements ---
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_company"), font=("Segoe UI", 14)).pack(pady=5)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_company"), font=("Segoe UI", 14)), "ctklabel_text_select_company").pack(pady=5)
         company_var = ctk.StringVar(value=companies[0])
         company_menu = ctk.CTkOptionMenu(parent, variable=company_var, values=companies, font=("Segoe UI", 14))
         company_menu.pack(pady=5)
 
-        headers = list(self.structure.keys())
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_header"), font=("Segoe UI", 14)).pack(pady=5)
+        headers = list(self.structure.headers)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_header"), font=("Segoe UI", 14)), "ctklabel_text_select_header").pack(pady=5)
         header_var = ctk.StringVar(value=headers[0])
         header_menu = ctk.CTkOptionMenu(parent, variable=header_var, values=headers, font=("Segoe UI", 14))
         header_menu.pack(pady=5)
 
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_subheader"), font=("Segoe UI", 14)).pack(pady=5)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_subheader"), font=("Segoe UI", 14)), "ctklabel_text_select_subheader").pack(pady=5)
         subheader_var = ctk.StringVar()
         subheader_menu = ctk.CTkOptionMenu(parent, variable=subheader_var, values=[], font=("Segoe UI", 14))
         subheader_menu.pack(pady=5)
 
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_section"), font=("Segoe UI", 14)).pack(pady=5)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_section"), font=("Segoe UI", 14)), "ctklabel_text_select_section").pack(pady=5)
         section_var = ctk.StringVar() # Use local var for this instance
         section_menu = ctk.CTkOptionMenu(parent, variable=section_var, values=[], font=("Segoe UI", 14))
         section_menu.pack(pady=5)
 
         # --- NEW SUBSECTION WIDGETS ---
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_subsection"), font=("Segoe UI", 14)).pack(pady=5)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_subsection"), font=("Segoe UI", 14)), "ctklabel_text_select_subsection").pack(pady=5)
         subsection_var = ctk.StringVar() # Use local var for this instance
         subsection_menu = ctk.CTkOptionMenu(parent, variable=subsection_var, values=[], font=("Segoe UI", 14))
         subsection_menu.pack(pady=5)
         # --- END NEW ---
 
-        ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_file"), font=("Segoe UI", 14)).pack(pady=5)
+        self._tr(ctk.CTkLabel(parent, text=get_translation("ctklabel_text_select_file"), font=("Segoe UI", 14)), "ctklabel_text_select_file").pack(pady=5)
         file_var = ctk.StringVar(value="")
         file_menu = ctk.CTkOptionMenu(parent, variable=file_var, values=[], font=("Segoe UI", 14))
         file_menu.pack(pady=5)
@@ -1240,11 +1204,7 @@ class FileArchiveApp:
         # Define these *inside* create_selection_interface so they capture local vars
 
         def update_subsections_local(*args):
-            opts = self.structure.get(header_var.get(), [])
-            subsections = []
-            if isinstance(opts, dict):
-                section_dict = opts.get(subheader_var.get(), {})
-                subsections = section_dict.get(section_var.get(), []) # Get subsections for selected section
+            subsections = list(self.structure.children(header_var.get(), subheader_var.get(), section_var.get()))
 
             subsection_menu.configure(values=subsections)
             if subsections:
@@ -1254,11 +1214,7 @@ class FileArchiveApp:
                 subsection_var.set("")
 
         def update_sections_local(*args):
-            opts = self.structure.get(header_var.get(), [])
-            sections = []
-            if isinstance(opts, dict):
-                section_dict = opts.get(subheader_var.get(), {})
-                sections = list(section_dict.keys()) # Sections are keys
+            sections = list(self.structure.children(header_var.get(), subheader_var.get())) # None under flat headers
 
             section_menu.configure(values=sections)
             if sections:
@@ -1269,12 +1225,7 @@ class FileArchiveApp:
             update_subsections_local() # Update subsections when section changes
 
         def update_subheaders_local(*args):
-            opts = self.structure.get(header_var.get(), [])
-            subh = []
-            if isinstance(opts, dict):
-                subh = list(opts.keys()) # Subheaders are keys
-            else: # Flat structure
-                subh = opts # Subheaders are the list items
+            subh = list(self.structure.children(header_var.get()))
 
             subheader_menu.configure(values=subh)
             if subh:
@@ -1286,25 +1237,9 @@ class FileArchiveApp:
 
 
         def update_file_menu_local(*args):
-            folder = os.path.join(self.archives_path, company_var.get(), header_var.get())
-            subh = subheader_var.get()
-            sec = section_var.get()
-            subsec = subsection_var.get() # Get subsection
-
-            structure_options = self.structure.get(header_var.get(), [])
-
-            if isinstance(structure_options, dict): # Nested Header
-                if subh: folder = os.path.join(folder, subh)
-                section_dict = structure_options.get(subh, {})
-                if sec and sec in section_dict:
-                     folder = os.path.join(folder, sec) # Add section path
-                     # Check if this section HAS subsections before adding subsection path
-                     if subsec and section_dict.get(sec, []): # Check if subsec selected AND section is defined to have them
-                         folder = os.path.join(folder, subsec) # Add subsection path
-
-            elif subh: # Flat structure (Header -> Subheader)
-                folder = os.path.join(folder, subh)
-                # No section/subsection for flat structure
+            folder = self.archive_controller.folder_for(company_var.get(), header_var.get(), subheader_var.get(),
+                                                        section_var.get(), subsection_var.get(),
+                                                        known_section_only=True)
 
             # --- Rest of file listing logic ---
             file_options = []
@@ -1357,56 +1292,40 @@ class FileArchiveApp:
             return None
 
     
-    def print_preview(self, file_path):
-        """Handles printing functionality for the previewed image."""
-        try:
-            if platform.system() == "Windows":
-                # Windows printing
-                temp_dir = tempfile.gettempdir()
-                temp_file_name = os.path.join(temp_dir, "archive_print.png")
-                temp_file_name = os.path.abspath(temp_file_name)
-
-                img = Image.open(file_path)
-                img.save(temp_file_name, format='PNG')
-
-                # Prompt the user for a printer name
-                printer_name = choose_printer()
-                if not printer_name:
-                    messagebox.showerror("Print Error", "No printer selected.")
-                    return
-
-                # Construct mspaint command with the selected printer
-                print_command = ['mspaint', '/pt', temp_file_name, printer_name]
-                command_str = ' '.join(print_command)
-                logging.info(f"Printing command: {command_str}")
-
-                result = subprocess.run(print_command, capture_output=True, text=True, check=False)
-
-                if result.returncode != 0:
-                    error_message = f"Printing failed with code {result.returncode}. Stderr: {result.stderr}"
-                    logging.error(error_message)
-                    messagebox.showerror("Print Error", f"Printing failed. See log for details: {error_message}")
-                else:
-                    messagebox.showinfo("Print", "Printing started. Please check your printer.")
-
-            elif platform.system() == "Darwin" or platform.system() == "Linux":
-                # macOS and Linux printing (using lp command)
-                subprocess.run(['lp', file_path], check=True)
-                messagebox.showinfo("Print", "Printing started. Please check your printer.")
-            else:
-                messagebox.showinfo("Print", "Printing is not supported on this operating system.")
-            logging.info(f"Print command executed for file: {file_path}")
-
-        except Exception as e:
-            messagebox.showerror("Print Error", f"Could not print file: {e}")
-            logging.error(f"Error during print: {e}")
-        finally:
-            if platform.system() == "Windows" and 'temp_file_name' in locals():
-                try:
-                    os.remove(temp_file_name) # Clean up temp file after printing attempt
-                except OSError as e:
-                    logging.error(f"Error cleaning up temporary print file: {e}")
+    def print_files(self, file_paths, title="Archive"):
+        """
+        Queues file_paths as one print job on the preferred printer (no re-encoding, no
+        waiting). Until the printer list is known the job goes to the system default; a
+        missing printer is reported in the status bar when the job fails.
+        """
+        self.print_spooler.submit(file_paths, printer=self.print_spooler.preferred_printer(), title=title)
 
+    def print_preview(self, file_path):
+        """Prints the previewed file."""
+        self.print_files([file_path], title=os.path.basename(file_path))
+
+    def choose_printer(self, parent):
+        """Printer selector for dialogs; the choice becomes the preferred printer. Returns the menu's frame."""
+        names, _ = self.print_spooler.printers() # Cached; refreshed below on the spooler thread
+        frame = ctk.CTkFrame(parent, fg_color="transparent")
+        self._tr(ctk.CTkLabel(frame, text=get_translation("ctklabel_text_select_a_printer"), font=("Segoe UI", 14)),
+                 "ctklabel_text_select_a_printer").pack(side="left", padx=(0, 5))
+        printer_var = ctk.StringVar(value=self.print_spooler.preferred_printer() or "")
+        def set_printer(name):
+            self.print_spooler.last_printer = name
+        printer_menu = ctk.CTkOptionMenu(frame, variable=printer_var, values=names or [""], command=set_printer,
+                                         font=("Segoe UI", 14))
+        printer_menu.pack(side="left")
+
+        def show_printers(names):
+            if not printer_menu.winfo_exists():
+                return
+            printer_menu.configure(values=names or [""])
+            if printer_var.get() not in names:
+                printer_var.set(self.print_spooler.preferred_printer() or "")
+        self.print_spooler.refresh_printers(
+            on_done=lambda names, default: self.ui_queue.put(lambda: show_printers(names)))
+        return frame
 
     def custom_preview_interface(self):
         """Opens a dialog to select and preview a file, including subsection path."""
@@ -1443,22 +1362,7 @@ class FileArchiveApp:
                 return
 
             # --- Build path including subsection conditionally ---
-            folder = os.path.join(self.archives_path, comp, head)
-            structure_options = self.structure.get(head, [])
-            has_subsections_defined = False
-            if isinstance(structure_options, dict): # Nested Header
-                if subh: folder = os.path.join(folder, subh)
-                section_dict = structure_options.get(subh, {})
-                if sec and sec in section_dict:
-                    folder = os.path.join(folder, sec)
-                    subsections_list = section_dict.get(sec, [])
-                    has_subsections_defined = bool(subsections_list)
-                    # Add subsection path ONLY if subsection is selected AND section supports it
-                    if subsec and has_subsections_defined:
-                         folder = os.path.join(folder, subsec)
-            elif subh: # Flat structure
-                 folder = os.path.join(folder, subh)
-            # --- End Path Building ---
+            folder = self.archive_controller.folder_for(comp, head, subh, sec, subsec, known_section_only=True)
 
             file_path = os.path.join(folder, file_selected)
             logging.info(f"[Preview] Attempting to preview: {file_path}")
@@ -1485,9 +1389,9 @@ class FileArchiveApp:
                     label.pack(pady=10, padx=10)
 
                     # Add Print button to image window
-                    print_btn = ctk.CTkButton(img_win, text=get_translation("ctkbutton_text_print"),
+                    print_btn = self._tr(ctk.CTkButton(img_win, text=get_translation("ctkbutton_text_print"),
                                               command=lambda p=file_path: self.print_preview(p),
-                                              font=("Segoe UI", 14))
+                                              font=("Segoe UI", 14)), "ctkbutton_text_print")
                     print_btn.pack(pady=(5, 10))
                     img_win.after(100, lambda: img_win.lift()) # Ensure it comes to front
 
@@ -1504,9 +1408,36 @@ class FileArchiveApp:
                         messagebox.showerror("Open Error", f"Could not open file:\n{e}", parent=preview_win)
                         logging.error(f"[Preview] Error opening file {file_path} with OS: {e}", exc_info=True)
 
-        preview_btn = ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_previewopen_selected_file"), command=perform_preview, font=("Segoe UI", 14))
+        preview_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_previewopen_selected_file"), command=perform_preview, font=("Segoe UI", 14)), "ctkbutton_text_previewopen_selected_file")
         preview_btn.pack()
 
+        # Print every current (non-backup) file of the selected folder as one job
+        def print_section():
+            if not company_var.get() or not header_var.get():
+                messagebox.showerror("Error", "Please select Company and Header.", parent=preview_win)
+                return
+            folder = self.archive_controller.folder_for(company_var.get(), header_var.get(), subheader_var.get(),
+                                                        section_var.get(), subsection_var.get(),
+                                                        known_section_only=True)
+
+            def collect():
+                try:
+                    with os.scandir(folder) as entries:
+                        files = sorted(e.path for e in entries if e.is_file() and "_backup_" not in e.name)
+                except OSError as e:
+                    logging.error(f"[Print] Could not list {folder}: {e}")
+                    files = []
+                if files:
+                    self.ui_queue.put(lambda: self.print_files(files, title=os.path.basename(folder)))
+                else:
+                    self.ui_queue.put(lambda: messagebox.showinfo("Print", "There are no files to print in this folder.", parent=preview_win))
+
+            self.executor.submit(collect)
+
+        self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_print_section"), command=print_section,
+                               font=("Segoe UI", 14)), "ctkbutton_text_print_section").pack(pady=(10, 0))
+        self.choose_printer(button_frame).pack(pady=(10, 0))
+
     def custom_rollback_interface(self):
         """Opens a dialog to select a file and rollback to a previous version, including subsection path."""
         rb_win = ctk.CTkToplevel(self.main_app)
@@ -1523,7 +1454,7 @@ class FileArchiveApp:
         company_var, header_var, subheader_var, section_var, subsection_var, file_var = sel_vars
 
         # Backup selection widgets
-        ctk.CTkLabel(rb_win, text=get_translation("ctklabel_text_select_backup_version"), font=("Segoe UI", 14)).pack(pady=(10,2), anchor="w", padx=20)
+        self._tr(ctk.CTkLabel(rb_win, text=get_translation("ctklabel_text_select_backup_version"), font=("Segoe UI", 14)), "ctklabel_text_select_backup_version").pack(pady=(10,2), anchor="w", padx=20)
         backup_var = ctk.StringVar(value="")
         backup_menu = ctk.CTkOptionMenu(rb_win, variable=backup_var, values=[""], font=("Segoe UI", 12), width=300)
         backup_menu.pack(pady=(0,10), padx=20, fill="x")
@@ -1543,52 +1474,10 @@ class FileArchiveApp:
 
             backup_options = []
             if comp and head and selected_file:
-                # --- Build path including subsection ---
-                folder = os.path.join(self.archives_path, comp, head)
-                structure_options = self.structure.get(head, [])
-                has_subsections_defined = False
-                if isinstance(structure_options, dict):
-                    if subh: folder = os.path.join(folder, subh)
-                    section_dict = structure_options.get(subh, {})
-                    if sec and sec in section_dict:
-                        folder = os.path.join(folder, sec)
-                        subsections_list = section_dict.get(sec, [])
-                        has_subsections_defined = bool(subsections_list)
-                        if subsec and has_subsections_defined:
-                             folder = os.path.join(folder, subsec)
-                elif subh:
-                     folder = os.path.join(folder, subh)
-                # --- End Path Building ---
-
+                folder = self.archive_controller.folder_for(comp, head, subh, sec, subsec, known_section_only=True)
                 if os.path.exists(folder):
-                    try:
-                        base_name, ext = os.path.splitext(selected_file)
-                        # Regex to find backups: base_backup_TIMESTAMP_optionalCount.ext
-                        pattern = re.compile(re.escape(base_name) + r"_backup_(\d{14}(?:_\d+)?)" + re.escape(ext) + r"$")
-                        all_files = os.listdir(folder)
-                        for fname in all_files:
-                            match = pattern.match(fname)
-                            if match and os.path.isfile(os.path.join(folder, fname)):
-                                backup_options.append(fname)
-
-                        # Sort backups by timestamp (descending - newest first)
-                        def sort_key(filename):
-                            match = pattern.match(filename)
-                            if match:
-                                try:
-                                    # Extract full timestamp part (e.g., 20230101120000 or 20230101120000_1)
-                                    ts_part = match.group(1)
-                                    # Use only the main 14 digits for primary sorting
-                                    return int(ts_part[:14])
-                                except (ValueError, IndexError):
-                                    return 0 # Error case, sort to beginning
-                            return 0 # Should not happen if pattern matched
-
-                        backup_options.sort(key=sort_key, reverse=True)
-                        logging.debug(f"[Rollback] Found backups for {selected_file} in {folder}: {backup_options}")
-
-                    except Exception as e:
-                        logging.error(f"[Rollback] Error finding/sorting backups for {selected_file}: {e}")
+                    backup_options = self.archive_controller.list_backups(folder, selected_file)
+                    logging.debug(f"[Rollback] Found backups for {selected_file} in {folder}: {backup_options}")
                 else:
                     logging.warning(f"[Rollback] Folder not found for backup search: {folder}")
 
@@ -1630,21 +1519,7 @@ class FileArchiveApp:
                  return
 
             # --- Build path including subsection ---
-            folder = os.path.join(self.archives_path, comp, head)
-            structure_options = self.structure.get(head, [])
-            has_subsections_defined = False
-            if isinstance(structure_options, dict):
-                if subh: folder = os.path.join(folder, subh)
-                section_dict = structure_options.get(subh, {})
-                if sec and sec in section_dict:
-                    folder = os.path.join(folder, sec)
-                    subsections_list = section_dict.get(sec, [])
-                    has_subsections_defined = bool(subsections_list)
-                    if subsec and has_subsections_defined:
-                         folder = os.path.join(folder, subsec)
-            elif subh:
-                 folder = os.path.join(folder, subh)
-            # --- End Path Building ---
+            folder = self.archive_controller.folder_for(comp, head, subh, sec, subsec, known_section_only=True)
 
             original_path = os.path.join(folder, original_file)
             backup_path = os.path.join(folder, backup_file)
@@ -1668,6 +1543,7 @@ class FileArchiveApp:
                 shutil.copy2(backup_path, original_path) # Use copy2 to preserve metadata
                 messagebox.showinfo("Success", f"Rolled back '{original_file}'\nto version from '{backup_file}'", parent=rb_win)
                 logging.info(f"[Rollback] Success: {original_path} restored from {backup_path}")
+                self.record_activity(activity_log.ACTION_ROLLBACK, path=original_path, details=f"from {backup_file}")
                 rb_win.destroy()
             except Exception as e:
                 messagebox.showerror("Rollback Error", f"Rollback failed: {e}", parent=rb_win)
@@ -1675,67 +1551,221 @@ class FileArchiveApp:
 
         # Note: Removed the 'Delete' functionality from this button for clarity.
         # If delete is needed, it should be a separate function/button.
-        rollback_btn = ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_rollback_to_selected_backup"), command=perform_rollback, font=("Segoe UI", 14))
+        rollback_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_rollback_to_selected_backup"), command=perform_rollback, font=("Segoe UI", 14)), "ctkbutton_text_rollback_to_selected_backup")
         rollback_btn.pack()
 
 
-    # --------------------------------------------------------------------------
-    # Custom Rollback Interface (with Backup Sorting & Delete Option)
-    # --------------------------------------------------------------------------
-    def create_company_structure(self, company_name):
-        """Create folder structure for a company with Unicode support, including subsections."""
-        try:
-            safe_company_name = self.sanitize_path(company_name)
-            # Update current company info
-            self.current_company = {"display_name": company_name, "safe_name": safe_company_name}
+    def export_package_interface(self):
+        """Opens a dialog to export a company, or a header/subheader/section of one, as a package."""
+        exp_win = ctk.CTkToplevel(self.main_app)
+        exp_win.transient(self.main_app)
+        exp_win.title("Export Package")
+        self.center_window(exp_win, 450, 560)
+        exp_win.grab_set()
 
-            base_path = os.path.join(self.archives_path, safe_company_name)
-            logging.info(f"Creating/Verifying structure for company: {company_name} (Safe Path: {safe_company_name})")
-
-            # Create base company folder
-            os.makedirs(base_path, exist_ok=True)
-
-            # Iterate through defined structure
-            for header, sub_level_data in self.structure.items():
-                header_path = os.path.join(base_path, header)
-                os.makedirs(header_path, exist_ok=True)
-
-                if isinstance(sub_level_data, dict): # Nested: Header -> Subheader -> Section -> Subsection
-                    for subheader, section_dict in sub_level_data.items():
-                        subheader_path = os.path.join(header_path, subheader)
-                        os.makedirs(subheader_path, exist_ok=True)
-
-                        if isinstance(section_dict, dict): # Ensure it's the expected Section dict
-                            for section, subsection_list in section_dict.items():
-                                section_path = os.path.join(subheader_path, section)
-                                os.makedirs(section_path, exist_ok=True)
-
-                                # Create subsection folders if defined
-                                if isinstance(subsection_list, list):
-                                    for subsection in subsection_list:
-                                        if subsection: # Skip if subsection name is empty
-                                             subsection_path = os.path.join(section_path, subsection)
-                                             os.makedirs(subsection_path, exist_ok=True)
-                                else:
-                                     logging.warning(f"Expected list of subsections for {header}/{subheader}/{section}, found: {type(subsection_list)}")
-                        else:
-                             logging.warning(f"Expected dict for sections under {header}/{subheader}, found: {type(section_dict)}")
+        companies = sorted(d for d in os.listdir(self.archives_path) if os.path.isdir(os.path.join(self.archives_path, d)))
+        if not companies:
+            messagebox.showinfo("Info", "No companies found in archive.", parent=exp_win)
+            exp_win.destroy()
+            return
 
-                elif isinstance(sub_level_data, list): # Flat: Header -> Subheader list
-                    for subheader_item in sub_level_data:
-                        if subheader_item: # Skip if item name is empty
-                             subheader_path = os.path.join(header_path, subheader_item)
-                             os.makedirs(subheader_path, exist_ok=True)
-                else:
-                     logging.warning(f"Unknown structure type for header '{header}': {type(sub_level_data)}")
+        self._tr(ctk.CTkLabel(exp_win, text=get_translation("ctklabel_text_select_company"), font=("Segoe UI", 14)), "ctklabel_text_select_company").pack(pady=5)
+        company_var = ctk.StringVar(value=companies[0])
+        ctk.CTkOptionMenu(exp_win, variable=company_var, values=companies, font=("Segoe UI", 14)).pack(pady=5)
+
+        # Each level narrows the export; "All" exports everything below the level above
+        level_vars = []
+        level_menus = []
+        for key in ("ctklabel_text_select_header", "ctklabel_text_select_subheader", "ctklabel_text_select_section"):
+            self._tr(ctk.CTkLabel(exp_win, text=get_translation(key), font=("Segoe UI", 14)), key).pack(pady=5)
+            var = ctk.StringVar(value="All")
+            menu = ctk.CTkOptionMenu(exp_win, variable=var, values=["All"], font=("Segoe UI", 14))
+            menu.pack(pady=5)
+            level_vars.append(var)
+            level_menus.append(menu)
+
+        def selected_parts():
+            parts = []
+            for var in level_vars:
+                if var.get() in ("", "All"):
+                    break
+                parts.append(var.get())
+            return parts
+
+        def update_levels(*args):
+            parts = ()
+            for var, menu in zip(level_vars, level_menus):
+                options = ["All"] + list(self.structure.options(*parts)) if len(parts) == level_vars.index(var) else ["All"]
+                menu.configure(values=options)
+                if var.get() not in options:
+                    var.set("All")
+                if var.get() != "All" and len(parts) == level_vars.index(var):
+                    parts += (var.get(),)
+
+        for var in level_vars:
+            var.trace_add("write", update_levels)
+        update_levels()
+
+        self._tr(ctk.CTkLabel(exp_win, text=get_translation("ctklabel_text_package_format"), font=("Segoe UI", 14)), "ctklabel_text_package_format").pack(pady=5)
+        format_var = ctk.StringVar(value=archive_package.PACKAGE_ZIP)
+        ctk.CTkOptionMenu(exp_win, variable=format_var, values=archive_package.package_formats(), font=("Segoe UI", 14)).pack(pady=5)
+
+        backups_var = ctk.BooleanVar(value=False)
+        self._tr(ctk.CTkCheckBox(exp_win, text=get_translation("ctkcheckbox_text_include_backup_versions"), variable=backups_var,
+                                 font=("Segoe UI", 13)), "ctkcheckbox_text_include_backup_versions").pack(pady=10)
+
+        status_label = ctk.CTkLabel(exp_win, text="", font=("Segoe UI", 12))
+        status_label.pack(pady=5)
+        button_frame = ctk.CTkFrame(exp_win, fg_color="transparent")
+        button_frame.pack(pady=10)
+        cancel_event = threading.Event()
+        exp_win.protocol("WM_DELETE_WINDOW", lambda: (cancel_event.set(), exp_win.destroy()))
+
+        def show_progress(done, total):
+            if status_label.winfo_exists():
+                status_label.configure(text=f"Exported {done / 1048576:.0f} of {total / 1048576:.0f} MB")
+
+        def finish(result=None, error=None):
+            if not exp_win.winfo_exists():
+                return
+            export_btn.configure(state="normal")
+            if error is not None:
+                status_label.configure(text="")
+                messagebox.showerror("Export Package", f"Export failed:\n{error}", parent=exp_win)
+                return
+            messagebox.showinfo("Export Package",
+                                f"Exported {result['files']} file(s), {result['bytes'] / 1048576:.1f} MB to:\n{result['package']}\n\n"
+                                f"SHA-256: {result['sha256']}", parent=exp_win)
+            exp_win.destroy()
+
+        def start_export():
+            company = company_var.get()
+            source_parts = [company] + selected_parts()
+            extension = f".{format_var.get()}"
+            package_path = filedialog.asksaveasfilename(
+                parent=exp_win, title="Export Package", defaultextension=extension,
+                initialfile=f"{'_'.join(source_parts)}_{datetime.datetime.now():%Y%m%d}{extension}",
+                filetypes=[(format_var.get().upper(), f"*{extension}")])
+            if not package_path:
+                return
+            include_backups = backups_var.get()
+            export_btn.configure(state="disabled")
+            cancel_event.clear()
 
-            logging.debug(f"Structure verification complete for: {safe_company_name}")
+            def worker():
+                try:
+                    result = archive_package.export_package(
+                        self.archives_path, source_parts, package_path, format_var.get(), include_backups,
+                        repository=self.archive_index, structure_revision=self.structure.revision,
+                        on_progress=lambda done, total: self.ui_queue.put(lambda: show_progress(done, total)),
+                        cancel=cancel_event)
+                    self.record_activity(activity_log.ACTION_ARCHIVE_EXPORT, path=package_path,
+                                         details=f"{'/'.join(source_parts)}: {result['files']} files, sha256 {result['sha256']}")
+                    self.ui_queue.put(lambda: finish(result=result))
+                except Exception as e:
+                    logging.error(f"[Export] Export of {'/'.join(source_parts)} to '{package_path}' failed: {e}", exc_info=True)
+                    self.ui_queue.put(lambda e=e: finish(error=e))
 
-        except Exception as e:
-            logging.error(f"Failed to create company structure for '{company_name}': {e}", exc_info=True)
-            # Re-raise the exception so the calling function knows structure creation failed
-            raise
+            self.executor.submit(worker)
+
+        export_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_export_package"), command=start_export,
+                                            font=("Segoe UI", 14)), "ctkbutton_text_export_package")
+        export_btn.pack(side="left", padx=5)
+        self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_cancel"), font=("Segoe UI", 14),
+                               command=lambda: (cancel_event.set(), exp_win.destroy())), "ctkbutton_text_cancel").pack(side="left", padx=5)
+
+    def import_package_interface(self):
+        """
+        Imports an exported package (or its manifest.json) into a company, skipping content
+        already stored. While an import runs, the Import Package button cancels it.
+        """
+        if self.active_import is not None:
+            if messagebox.askyesno("Import Package", "An import is running. Stop after the current file?", parent=self.main_app):
+                self.active_import.set()
+            return
+        package_path = filedialog.askopenfilename(title="Import Package", filetypes=archive_package.PACKAGE_FILE_TYPES)
+        if not package_path:
+            return
+        cancel_event = threading.Event()
+
+        def store(company, folder_parts, staged_path, filename):
+            # Runs on a worker: straight to the controller, leaving the Upload tab's company alone
+            header, subheader, section, subsection = (list(folder_parts) + ["", "", ""])[:4]
+            dest_folder = self.archive_controller.folder_for(company, header, subheader, section, subsection)
+            dest_file = self.archive_controller.store_file(dest_folder, staged_path, filename) # Records the checksum
+            self.record_activity(activity_log.ACTION_UPLOAD, path=dest_file, details=package_path)
+            self.ocr_pipeline.submit(dest_file)
+            return dest_file
+
+        def set_running(running):
+            self.active_import = cancel_event if running else None
+            if hasattr(self, 'import_package_btn') and self.import_package_btn.winfo_exists():
+                self._set_text(self.import_package_btn,
+                               "ctkbutton_text_cancel_import" if running else "ctkbutton_text_import_package")
+
+        def show_progress(done, total):
+            self.notification_label.configure(text=f"Importing... {done / 1048576:.0f} of {total / 1048576:.0f} MB")
+
+        def finish(result=None, error=None):
+            set_running(False)
+            if error is not None:
+                self.notification_label.configure(text="")
+                messagebox.showerror("Import Package", f"Import failed:\n{error}")
+                return
+            stopped = " (stopped)" if cancel_event.is_set() else ""
+            summary = (f"Imported into '{result['company']}'{stopped}: {result['stored']} stored, "
+                       f"{result['duplicates']} already present, {len(result['unmapped'])} outside the archive structure, "
+                       f"{len(result['errors'])} errors.")
+            self.notification_label.configure(text=summary)
+            problems = [f"Not in the structure: {path}" for path in result["unmapped"]] + result["errors"]
+            if problems:
+                more = f"\n... and {len(problems) - 15} more (see log)" if len(problems) > 15 else ""
+                messagebox.showwarning("Import Package", summary + "\n\n" + "\n".join(problems[:15]) + more)
+            else:
+                messagebox.showinfo("Import Package", summary)
 
+        def run_import(company):
+            try:
+                self.archive_controller.create_company_structure(company)
+                result = archive_package.import_package(
+                    package_path, self.archives_path, self.structure, store, repository=self.archive_index,
+                    company=company,
+                    on_progress=lambda done, total: self.ui_queue.put(lambda: show_progress(done, total)),
+                    cancel=cancel_event)
+                self.record_activity(activity_log.ACTION_ARCHIVE_IMPORT, path=package_path,
+                                     details=f"{result['company']}: {result['stored']} stored, {result['duplicates']} duplicates, "
+                                             f"{len(result['unmapped'])} unmapped, {len(result['errors'])} errors")
+                self.ui_queue.put(lambda: finish(result=result))
+            except Exception as e:
+                logging.error(f"[Import] Import of '{package_path}' failed: {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: finish(error=e))
+
+        def confirm(manifest):
+            total = sum(entry["size"] for entry in manifest["files"])
+            company = simpledialog.askstring(
+                "Import Package",
+                f"{len(manifest['files'])} file(s), {total / 1048576:.1f} MB from '{manifest['source']}' "
+                f"(exported {manifest.get('created', '?')}).\n\nImport into company:",
+                initialvalue=manifest["source"].split("/")[0], parent=self.main_app)
+            if not company or not company.strip():
+                return
+            self.notification_label.configure(text="Importing...")
+            set_running(True)
+            self.executor.submit(run_import, sanitize_path(company.strip()))
+
+        def read():
+            try:
+                manifest = archive_package.read_manifest(package_path)
+                self.ui_queue.put(lambda: confirm(manifest))
+            except Exception as e:
+                logging.error(f"[Import] Cannot read '{package_path}': {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: finish(error=e))
+
+        self.executor.submit(read)
+
+    # --------------------------------------------------------------------------
+    # Custom Rollback Interface (with Backup Sorting & Delete Option)
+    # --------------------------------------------------------------------------
     # --------------------------------------------------------------------------
     # Open Path using OS Commands (for admin use if needed)
     # --------------------------------------------------------------------------
@@ -1769,6 +1799,9 @@ class FileArchiveApp:
         system_tab = admin_tabview.add(system_tab_name)
         users_tab = admin_tabview.add(users_tab_name)
         stats_tab = admin_tabview.add(stats_tab_name)
+        performance_tab = admin_tabview.add(get_translation("admin_performance_tab"))
+        for key in ("admin_system_tab", "admin_users_tab", "admin_stats_tab", "admin_performance_tab"):
+            self.translation_registry.register_tab(admin_tabview, key)
         logging.debug(f"Added admin sub-tabs.")
 
         # =====================================================================
@@ -1782,8 +1815,8 @@ class FileArchiveApp:
         header_frame.pack(fill="x", pady=(10, 20))
 
         ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 24)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_system_management"),
-                    font=("Segoe UI", 20, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_system_management"),
+                    font=("Segoe UI", 20, "bold")), "ctklabel_text_system_management").pack(side="left")
 
         # Admin buttons grid
         admin_buttons = ctk.CTkFrame(sys_frame, fg_color="transparent")
@@ -1791,36 +1824,36 @@ class FileArchiveApp:
         admin_buttons.grid_columnconfigure((0, 1), weight=1, uniform="column")
 
         # Refresh folders button with icon
-        refresh_btn = ctk.CTkButton(admin_buttons, text=get_translation("ctkbutton_text_refresh_folders"),
+        refresh_btn = self._tr(ctk.CTkButton(admin_buttons, text=get_translation("ctkbutton_text_refresh_folders"),
                                     command=self.refresh_folders,
                                     font=("Segoe UI", 14),
                                     height=45,
-                                    corner_radius=8)
+                                    corner_radius=8), "ctkbutton_text_refresh_folders")
         refresh_btn.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
 
         # Search archive button with icon
-        search_btn = ctk.CTkButton(admin_buttons, text=get_translation("ctkbutton_text_search_archive"),
+        search_btn = self._tr(ctk.CTkButton(admin_buttons, text=get_translation("ctkbutton_text_search_archive"),
                                 command=self.search_archive,
                                 font=("Segoe UI", 14),
                                 height=45,
-                                corner_radius=8)
+                                corner_radius=8), "ctkbutton_text_search_archive")
         search_btn.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
 
         # Dashboard button (full width) with icon
-        dashboard_btn = ctk.CTkButton(sys_frame, text=get_translation("ctkbutton_text_open_admin_dashboard"),
+        dashboard_btn = self._tr(ctk.CTkButton(sys_frame, text=get_translation("ctkbutton_text_open_admin_dashboard"),
                                     command=self.open_dashboard,
                                     font=("Segoe UI", 14, "bold"),
                                     height=45,
                                     corner_radius=8,
-                                    fg_color="#2D7FF9", hover_color="#1A6CD6")
+                                    fg_color="#2D7FF9", hover_color="#1A6CD6"), "ctkbutton_text_open_admin_dashboard")
         dashboard_btn.pack(fill="x", pady=15)
 
         # System info section
         info_frame = ctk.CTkFrame(sys_frame)
         info_frame.pack(fill="x", pady=15)
 
-        ctk.CTkLabel(info_frame, text=get_translation("ctklabel_text_system_information"),
-                    font=("Segoe UI", 16, "bold")).pack(anchor="w", padx=15, pady=(10, 5))
+        self._tr(ctk.CTkLabel(info_frame, text=get_translation("ctklabel_text_system_information"),
+                    font=("Segoe UI", 16, "bold")), "ctklabel_text_system_information").pack(anchor="w", padx=15, pady=(10, 5))
 
         # Get system info
         import platform
@@ -1846,19 +1879,37 @@ class FileArchiveApp:
         header_frame.grid_columnconfigure(1, weight=1)
 
         ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 24)).grid(row=0, column=0, padx=(0, 10))
-        ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_user_management"),
-                    font=("Segoe UI", 20, "bold")).grid(row=0, column=1, sticky="w")
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_user_management"),
+                    font=("Segoe UI", 20, "bold")), "ctklabel_text_user_management").grid(row=0, column=1, sticky="w")
 
         # Add user button with icon
-        add_user_btn = ctk.CTkButton(header_frame, text=get_translation("ctkbutton_text_add_user"),
+        add_user_btn = self._tr(ctk.CTkButton(header_frame, text=get_translation("ctkbutton_text_add_user"),
                                     command=self.add_user_dialog,
                                     font=("Segoe UI", 14),
                                     height=40,
                                     width=120,
                                     corner_radius=8,
-                                    fg_color="#28a745", hover_color="#218838")
+                                    fg_color="#28a745", hover_color="#218838"), "ctkbutton_text_add_user")
         add_user_btn.grid(row=0, column=2, padx=10)
 
+        # Bulk provisioning
+        import_users_btn = self._tr(ctk.CTkButton(header_frame, text=get_translation("ctkbutton_text_import_users"),
+                                    command=self.import_users_dialog,
+                                    font=("Segoe UI", 14),
+                                    height=40,
+                                    width=120,
+                                    corner_radius=8), "ctkbutton_text_import_users")
+        import_users_btn.grid(row=0, column=3, padx=(0, 10))
+
+        export_users_btn = self._tr(ctk.CTkButton(header_frame, text=get_translation("ctkbutton_text_export_users"),
+                                    command=self.export_users_dialog,
+                                    font=("Segoe UI", 14),
+                                    height=40,
+                                    width=120,
+                                    corner_radius=8,
+                                    fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_export_users")
+        export_users_btn.grid(row=0, column=4)
+
         # Search and filter section
         filter_frame = ctk.CTkFrame(user_mgmt_frame, fg_color="transparent")
         filter_frame.pack(fill="x", pady=(0, 10))
@@ -1866,29 +1917,32 @@ class FileArchiveApp:
         ctk.CTkLabel(filter_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 5))
 
         self.user_search_var = ctk.StringVar()
-        user_search = ctk.CTkEntry(filter_frame, placeholder_text=get_translation("ctkentry_placeholder_text_search_users"),
+        user_search = self._tr(ctk.CTkEntry(filter_frame, placeholder_text=get_translation("ctkentry_placeholder_text_search_users"),
                                 width=200, font=("Segoe UI", 13),
-                                textvariable=self.user_search_var)
+                                textvariable=self.user_search_var), placeholder_text="ctkentry_placeholder_text_search_users")
         user_search.pack(side="left", padx=5)
 
         # Role filter
         self.role_filter_var = ctk.StringVar(value="All")
-        ctk.CTkLabel(filter_frame, text=get_translation("ctklabel_text_role"), font=("Segoe UI", 13)).pack(side="left", padx=(15, 5))
+        self._tr(ctk.CTkLabel(filter_frame, text=get_translation("ctklabel_text_role"), font=("Segoe UI", 13)), "ctklabel_text_role").pack(side="left", padx=(15, 5))
         role_filter = ctk.CTkOptionMenu(filter_frame, values=["All", "Admin", "User"],
                                     variable=self.role_filter_var,
                                     width=100, font=("Segoe UI", 13))
         role_filter.pack(side="left", padx=5)
 
-        # Connect search and filter to refresh function
-        self.user_search_var.trace("w", lambda *args: self.refresh_user_list())
+        # Connect search and filter to refresh function. Typing is debounced so a burst of
+        # keystrokes runs one query.
+        self.user_search_after_id = None
+        self.user_search_var.trace("w", lambda *args: self.schedule_user_list_refresh())
         self.role_filter_var.trace("w", lambda *args: self.refresh_user_list())
 
-        # User list in a scrollable frame with modern styling
-        user_list_frame = ctk.CTkScrollableFrame(user_mgmt_frame, height=350)
-        user_list_frame.pack(fill="both", expand=True, pady=10)
-
-        # Store reference to the frame for later updates
-        self.user_list_frame = user_list_frame
+        # Virtualized user list: only the visible rows exist as widgets
+        self.user_table = VirtualUserTable(user_mgmt_frame, self.user_repository, height=350,
+                                           on_edit=self.edit_user_dialog,
+                                           on_delete=self.delete_user_confirm,
+                                           current_username=lambda: self.current_user["username"] if self.current_user else None,
+                                           tr=self._tr)
+        self.user_table.pack(fill="both", expand=True, pady=10)
 
         # Status bar at the bottom
         self.user_status_label = ctk.CTkLabel(user_mgmt_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 12))
@@ -1908,125 +1962,274 @@ class FileArchiveApp:
         header_frame.pack(fill="x", pady=(10, 20))
 
         ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 24)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_system_statistics"),
-                    font=("Segoe UI", 20, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_system_statistics"),
+                    font=("Segoe UI", 20, "bold")), "ctklabel_text_system_statistics").pack(side="left")
 
         # Simple stats display
         stats_info = ctk.CTkFrame(stats_frame)
         stats_info.pack(fill="x", pady=10)
 
         # Count users by role
-        admin_count = sum(1 for user in users.values() if user["role"] == "admin")
-        user_count = sum(1 for user in users.values() if user["role"] == "user")
+        role_counts = self.user_repository.count_by_role()
+        admin_count = role_counts.get("admin", 0)
+        user_count = role_counts.get("user", 0)
 
         # User stats
         user_stats_frame = ctk.CTkFrame(stats_info)
         user_stats_frame.pack(fill="x", padx=15, pady=10)
 
-        ctk.CTkLabel(user_stats_frame, text=get_translation("ctklabel_text_user_statistics"),
-                    font=("Segoe UI", 16, "bold")).pack(anchor="w", pady=(5, 10))
+        self._tr(ctk.CTkLabel(user_stats_frame, text=get_translation("ctklabel_text_user_statistics"),
+                    font=("Segoe UI", 16, "bold")), "ctklabel_text_user_statistics").pack(anchor="w", pady=(5, 10))
 
-        ctk.CTkLabel(user_stats_frame, text=f"Total Users: {len(users)}",
+        ctk.CTkLabel(user_stats_frame, text=f"Total Users: {sum(role_counts.values())}",
                     font=("Segoe UI", 14)).pack(anchor="w", padx=20, pady=2)
         ctk.CTkLabel(user_stats_frame, text=f"Admin Users: {admin_count}",
                     font=("Segoe UI", 14)).pack(anchor="w", padx=20, pady=2)
         ctk.CTkLabel(user_stats_frame, text=f"Regular Users: {user_count}",
                     font=("Segoe UI", 14)).pack(anchor="w", padx=20, pady=2)
 
+        # =====================================================================
+        # Performance Tab
+        # =====================================================================
+        self.setup_performance_panel(performance_tab)
+
+    # --------------------------------------------------------------------------
+    # Performance Panel (live latency metrics and on-demand profiling)
+    # --------------------------------------------------------------------------
+    def setup_performance_panel(self, parent):
+        """Live p50/p95 of the instrumented operations, plus "profile the next run" controls."""
+        perf_frame = ctk.CTkFrame(parent)
+        perf_frame.pack(fill="both", expand=True, padx=20, pady=15)
+
+        header_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        header_frame.pack(fill="x", pady=(10, 10))
+        self.translation_registry.register_direction(header_frame)
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_performance"),
+                    font=("Segoe UI", 20, "bold")), "ctklabel_text_performance").pack(side="left")
+        self._tr(ctk.CTkButton(header_frame, text=get_translation("ctkbutton_text_reset_metrics"),
+                               command=self.reset_performance_metrics, font=("Segoe UI", 13), width=120,
+                               fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_reset_metrics").pack(side="right")
+
+        self.performance_text = ctk.CTkTextbox(perf_frame, font=("Consolas", 12), wrap="none")
+        self.performance_text.pack(fill="both", expand=True, pady=(0, 10))
+        self.performance_text.configure(state="disabled")
+
+        # Profile the next run of one operation
+        profile_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        profile_frame.pack(fill="x", pady=(0, 5))
+        self.translation_registry.register_direction(profile_frame)
+        self._tr(ctk.CTkLabel(profile_frame, text=get_translation("ctklabel_text_operation"), font=("Segoe UI", 13)),
+                 "ctklabel_text_operation").pack(side="left", padx=(0, 5))
+        self.profile_operation_var = ctk.StringVar(value=OP_UPLOAD)
+        ctk.CTkOptionMenu(profile_frame, values=PROFILED_OPERATIONS, variable=self.profile_operation_var,
+                          width=140, font=("Segoe UI", 13)).pack(side="left", padx=5)
+        self._tr(ctk.CTkLabel(profile_frame, text=get_translation("ctklabel_text_profiler"), font=("Segoe UI", 13)),
+                 "ctklabel_text_profiler").pack(side="left", padx=(15, 5))
+        self.profile_mode_var = ctk.StringVar(value=PROFILE_MODES[0])
+        ctk.CTkOptionMenu(profile_frame, values=list(PROFILE_MODES), variable=self.profile_mode_var,
+                          width=110, font=("Segoe UI", 13)).pack(side="left", padx=5)
+        self._tr(ctk.CTkButton(profile_frame, text=get_translation("ctkbutton_text_profile_next_run"),
+                               command=self.arm_operation_profile, font=("Segoe UI", 13), width=150),
+                 "ctkbutton_text_profile_next_run").pack(side="left", padx=(15, 0))
+
+        self.profile_status_label = ctk.CTkLabel(perf_frame, text="", font=("Segoe UI", 12), anchor="w")
+        self.profile_status_label.pack(fill="x", pady=(5, 10))
+
+        # Background OCR of scanned images
+        ocr_frame = ctk.CTkFrame(perf_frame, fg_color="transparent")
+        ocr_frame.pack(fill="x", pady=(0, 10))
+        self.translation_registry.register_direction(ocr_frame)
+        self._tr(ctk.CTkLabel(ocr_frame, text=get_translation("ctklabel_text_ocr"), font=("Segoe UI", 13, "bold")),
+                 "ctklabel_text_ocr").pack(side="left", padx=(0, 10))
+        self.ocr_pause_btn = self._tr(ctk.CTkButton(ocr_frame, text=get_translation("ctkbutton_text_pause_ocr"),
+                                                    command=self.toggle_ocr_pause, font=("Segoe UI", 13), width=120),
+                                      "ctkbutton_text_pause_ocr")
+        self.ocr_pause_btn.pack(side="left", padx=5)
+        self._tr(ctk.CTkButton(ocr_frame, text=get_translation("ctkbutton_text_index_existing_scans"),
+                               command=self.ocr_pipeline.backfill, font=("Segoe UI", 13), width=170),
+                 "ctkbutton_text_index_existing_scans").pack(side="left", padx=5)
+
+        self.refresh_performance_panel()
+
+    def refresh_performance_panel(self):
+        """Redraws the metrics table every PERFORMANCE_REFRESH_MS while the panel exists."""
+        if not hasattr(self, 'performance_text') or not self.performance_text.winfo_exists():
+            return
+        self.draw_performance_metrics()
+        self.main_app.after(PERFORMANCE_REFRESH_MS, self.refresh_performance_panel)
+
+    def draw_performance_metrics(self):
+        histograms, counters = metrics.snapshot()
+        lines = [f"{'Operation':<14}{'Count':>8}{'p50 ms':>11}{'p95 ms':>11}{'Max ms':>11}{'Mean ms':>11}"]
+        for name, h in histograms.items():
+            lines.append(f"{name:<14}{h['count']:>8}{h['p50'] * 1000:>11.2f}{h['p95'] * 1000:>11.2f}"
+                         f"{h['max'] * 1000:>11.2f}{h['mean'] * 1000:>11.2f}")
+        if not histograms:
+            lines.append("No operations recorded yet.")
+        if counters:
+            lines.append("")
+            lines.extend(f"{name:<14}{value:>8}" for name, value in counters.items())
+        ocr = self.ocr_pipeline.status()
+        lines.append("")
+        if ocr["available"]:
+            state = "paused" if ocr["paused"] else "running"
+            backfill = ", backfilling archive" if ocr["backfilling"] else ""
+            lines.append(f"OCR: {state}{backfill}; queued {ocr['pending']}, indexed {ocr['done']}, failed {ocr['failed']}")
+        else:
+            lines.append("OCR: unavailable (Tesseract / pytesseract not found)")
+        scrub = self.scrubber.status()
+        walk = ", walking archive" if scrub["discovering"] else ""
+        last_pass = datetime.datetime.fromtimestamp(scrub["last_pass"]).strftime("%Y-%m-%d %H:%M") if scrub["last_pass"] else "never"
+        lines.append(f"Integrity: {scrub['checked']} file(s) hashed ({scrub['bytes_read'] / 1048576:.1f} MB){walk}; "
+                     f"queued {scrub['queued']}, corrupt {scrub['corrupt']}, repaired {scrub['repaired']}; "
+                     f"last full walk {last_pass}; mirror {scrub['mirror'] or 'not configured'}")
+        for path, status, verified_at in self.scrubber.problems()[:10]:
+            lines.append(f"  {status:<9}{datetime.datetime.fromtimestamp(verified_at):%Y-%m-%d %H:%M}  {path}")
+        stalls = self.stall_watchdog.recent_stalls()
+        if stalls:
+            lines.append("")
+            lines.append(f"UI stalls (>{self.stall_watchdog.threshold:.2f}s), newest first:")
+            for stall in stalls[:10]:
+                # Innermost frames are the useful end of the folded stack
+                stack = " <- ".join(reversed(stall["stack"].split(";")[-4:]))
+                lines.append(f"{stall['time']:%H:%M:%S} {stall['duration']:>6.2f}s  {stack}")
+        text = "\n".join(lines)
+        if text != self.performance_text.get("1.0", "end-1c"): # Avoid flicker when nothing changed
+            self.performance_text.configure(state="normal")
+            self.performance_text.delete("1.0", "end")
+            self.performance_text.insert("1.0", text)
+            self.performance_text.configure(state="disabled")
+
+    def arm_operation_profile(self):
+        """Profiles the next run of the selected operation; the result goes to <data dir>/profiles."""
+        operation = self.profile_operation_var.get()
+        mode = self.profile_mode_var.get()
+        output_dir = os.path.join(get_data_dir(), "profiles")
+
+        def saved(path):
+            # Runs on whichever thread executed the operation
+            self.ui_queue.put(lambda: self.on_profile_saved(operation, path))
+
+        metrics.arm_profile(operation, mode, output_dir, callback=saved)
+        self.profile_status_label.configure(text=f"Waiting for the next '{operation}' ({mode})...")
+
+    def on_profile_saved(self, operation, path):
+        if hasattr(self, 'profile_status_label') and self.profile_status_label.winfo_exists():
+            if path:
+                self.profile_status_label.configure(text=f"Profile of '{operation}' saved: {path}")
+            else:
+                self.profile_status_label.configure(text=f"Profile of '{operation}' could not be saved (see log).")
+
+    def toggle_ocr_pause(self):
+        if self.ocr_pipeline.paused:
+            self.ocr_pipeline.resume()
+            self._set_text(self.ocr_pause_btn, "ctkbutton_text_pause_ocr")
+        else:
+            self.ocr_pipeline.pause()
+            self._set_text(self.ocr_pause_btn, "ctkbutton_text_resume_ocr")
+        self.draw_performance_metrics()
+
+    def reset_performance_metrics(self):
+        metrics.reset()
+        logging.info("Performance metrics reset by admin.")
+        self.draw_performance_metrics()
+
+    def schedule_user_list_refresh(self):
+        """Refreshes the user list USER_SEARCH_DEBOUNCE_MS after the last keystroke in the search box."""
+        if self.user_search_after_id is not None:
+            self.main_app.after_cancel(self.user_search_after_id)
+        self.user_search_after_id = self.main_app.after(USER_SEARCH_DEBOUNCE_MS, self.refresh_user_list)
+
     def refresh_user_list(self):
         """Refresh the user list display with search and filter"""
-        # Return if user_list_frame doesn't exist anymore
-        if not hasattr(self, 'user_list_frame') or not self.user_list_frame.winfo_exists():
+        self.user_search_after_id = None
+        # Return if the user table doesn't exist anymore
+        if not hasattr(self, 'user_table') or not self.user_table.winfo_exists():
             return
 
-        # Clear existing widgets
-        for widget in self.user_list_frame.winfo_children():
-            widget.destroy()
-
         # Get search and filter values
-        search_text = self.user_search_var.get().lower() if hasattr(self, 'user_search_var') else ""
+        search_text = self.user_search_var.get().strip() if hasattr(self, 'user_search_var') else ""
         role_filter = self.role_filter_var.get() if hasattr(self, 'role_filter_var') else "All"
 
-        # Filter users
-        filtered_users = {}
-        for username, details in users.items():
-            # Apply search filter
-            if search_text and search_text not in username.lower():
-                continue
-
-            # Apply role filter
-            if role_filter != "All" and details["role"] != role_filter.lower():
-                continue
-
-            filtered_users[username] = details
+        # Count + first page in SQL; further pages load as the table scrolls
+        shown = self.user_table.set_query(search=search_text,
+                                          role=None if role_filter == "All" else role_filter.lower())
 
         # Update status label
         if hasattr(self, 'user_status_label'):
-            self.user_status_label.configure(text=f"Showing {len(filtered_users)} of {len(users)} users")
+            self.user_status_label.configure(text=f"Showing {shown} of {self.user_repository.count()} users")
 
-        # If no users found
-        if not filtered_users:
-            no_results = ctk.CTkLabel(self.user_list_frame,
-                                    text="No users found matching your criteria",
-                                    font=("Segoe UI", 14))
-            no_results.pack(pady=50)
+    def import_users_dialog(self):
+        """Bulk-import users from a CSV or JSON file (admin only)."""
+        if not self.current_user or self.current_user["role"] != "admin":
             return
+        path = filedialog.askopenfilename(
+            title="Import Users",
+            filetypes=[("User files", "*.csv *.json"), ("CSV", "*.csv"), ("JSON", "*.json")])
+        if not path:
+            return
+        update_existing = messagebox.askyesno(
+            "Import Users", "Update users that already exist (role and password)?\n\n"
+            "Choose 'No' to report them as errors instead.")
+        admin = self.current_user["username"]
+        self.notification_label.configure(text=f"Importing users from {os.path.basename(path)}...")
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start()
+
+        def finish(result=None, error=None):
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+            self.progress_bar.set(0)
+            if error:
+                self.notification_label.configure(text="User import failed.")
+                messagebox.showerror("Import Users", f"Could not import users:\n{error}")
+                return
+            summary = f"Added: {result['imported']}\nUpdated: {result['updated']}\nRejected: {len(result['errors'])}"
+            if result["errors"]:
+                shown = result["errors"][:15]
+                summary += "\n\n" + "\n".join(f"Row {row}: {message}" for row, message in shown)
+                if len(result["errors"]) > len(shown):
+                    summary += f"\n... and {len(result['errors']) - len(shown)} more (see log)."
+                for row, message in result["errors"]:
+                    logging.warning(f"User import row {row} rejected: {message}")
+            logging.info(f"Admin '{admin}' imported users from '{path}'.")
+            self.record_activity(activity_log.ACTION_USER_IMPORT, path=path, username=admin,
+                                 details=f"added {result['imported']}, updated {result['updated']}, rejected {len(result['errors'])}")
+            self.notification_label.configure(text=f"Imported {result['imported'] + result['updated']} users.")
+            messagebox.showinfo("Import Users", summary)
+            self.refresh_user_list()
 
-        # Add user cards
-        for username, details in filtered_users.items():
-            # Create a card-like frame for each user
-            card = ctk.CTkFrame(self.user_list_frame)
-            card.pack(fill="x", padx=5, pady=5)
-
-            # Main content frame
-            content = ctk.CTkFrame(card, fg_color="transparent")
-            content.pack(fill="x", padx=10, pady=10)
-            content.grid_columnconfigure(1, weight=1)
-
-            # User icon based on role
-            icon = "🔑" if details["role"] == "admin" else "👤"
-            ctk.CTkLabel(content, text=icon, font=("Segoe UI", 24)).grid(row=0, column=0, rowspan=2, padx=(0, 10))
-
-            # Username with larger font
-            ctk.CTkLabel(content, text=username,
-                        font=("Segoe UI", 16, "bold")).grid(row=0, column=1, sticky="w")
-
-            # Role with badge-like appearance
-            role_frame = ctk.CTkFrame(content, fg_color="#2D7FF9" if details["role"] == "admin" else "#6c757d",
-                                    corner_radius=5, height=22)
-            role_frame.grid(row=1, column=1, sticky="w")
-            role_frame.grid_propagate(False)
-
-            ctk.CTkLabel(role_frame, text=details["role"].upper(),
-                        font=("Segoe UI", 11, "bold"),
-                        text_color="white").pack(padx=8, pady=0)
-
-            # Action buttons
-            action_frame = ctk.CTkFrame(content, fg_color="transparent")
-            action_frame.grid(row=0, column=2, rowspan=2, padx=10, sticky="e")
-
-            # Edit button
-            edit_btn = ctk.CTkButton(action_frame, text=get_translation("ctkbutton_text_edit"),
-                                    command=lambda u=username: self.edit_user_dialog(u),
-                                    font=("Segoe UI", 12),
-                                    width=80, height=30,
-                                    corner_radius=6,
-                                    fg_color="#ffc107", hover_color="#e0a800",
-                                    text_color="#000000")
-            edit_btn.pack(side="left", padx=5)
-
-            # Delete button (don't allow deleting the current user)
-            delete_btn = ctk.CTkButton(action_frame, text=get_translation("ctkbutton_text_delete"),
-                                    command=lambda u=username: self.delete_user_confirm(u),
-                                    font=("Segoe UI", 12),
-                                    width=80, height=30,
-                                    corner_radius=6,
-                                    fg_color="#dc3545", hover_color="#c82333")
-            delete_btn.pack(side="left", padx=5)
-
-            # Disable delete button if it's the current user
-            if self.current_user and username == self.current_user["username"]:
-                delete_btn.configure(state="disabled")
+        def worker():
+            try:
+                result = user_io.import_users(self.user_repository, path, PBKDF2_ROUNDS, update_existing,
+                                              protected_usernames=(admin,))
+                # Cached sessions must not keep accepting replaced passwords or old roles
+                for username in result["updated_usernames"]:
+                    self.session_manager.invalidate(username)
+                self.ui_queue.put(lambda: finish(result=result))
+            except Exception as e:
+                logging.error(f"Bulk user import from '{path}' failed: {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: finish(error=e))
+
+        self.executor.submit(worker)
+
+    def export_users_dialog(self):
+        """Export all users (with password hashes) to a CSV or JSON file (admin only)."""
+        if not self.current_user or self.current_user["role"] != "admin":
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Users", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            count = user_io.export_users(self.user_repository, path)
+            logging.info(f"Admin '{self.current_user['username']}' exported {count} users to '{path}'.")
+            self.record_activity(activity_log.ACTION_USER_EXPORT, path=path, details=f"{count} users")
+            messagebox.showinfo("Export Users", f"Exported {count} users to:\n{path}")
+        except Exception as e:
+            logging.error(f"User export to '{path}' failed: {e}", exc_info=True)
+            messagebox.showerror("Export Users", f"Could not export users:\n{e}")
 
     def add_user_dialog(self):
         """Show enhanced dialog to add a new user"""
@@ -2046,8 +2249,8 @@ class FileArchiveApp:
         header_frame.pack(fill="x", pady=(0, 20))
 
         ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 28)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_add_new_user"),
-                    font=("Segoe UI", 22, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_add_new_user"),
+                    font=("Segoe UI", 22, "bold")), "ctklabel_text_add_new_user").pack(side="left")
 
             # Form fields
         form_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
@@ -2058,11 +2261,11 @@ class FileArchiveApp:
         username_frame.pack(fill="x", pady=10)
 
         ctk.CTkLabel(username_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(username_frame, text=get_translation("ctklabel_text_username"),
-                    font=("Segoe UI", 14, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(username_frame, text=get_translation("ctklabel_text_username"),
+                    font=("Segoe UI", 14, "bold")), "ctklabel_text_username").pack(side="left")
 
-        username_entry = ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_username"),
-                                    width=400, height=35, font=("Segoe UI", 14))
+        username_entry = self._tr(ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_username"),
+                                    width=400, height=35, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_username")
         username_entry.pack(pady=(0, 15))
 
         # Password field with icon
@@ -2070,11 +2273,11 @@ class FileArchiveApp:
         password_frame.pack(fill="x", pady=10)
 
         ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_password"),
-                    font=("Segoe UI", 14, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_password"),
+                    font=("Segoe UI", 14, "bold")), "ctklabel_text_password").pack(side="left")
 
-        password_entry = ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_password"),
-                                    show="•", width=400, height=35, font=("Segoe UI", 14))
+        password_entry = self._tr(ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_password"),
+                                    show="•", width=400, height=35, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_password")
         password_entry.pack(pady=(0, 15))
 
         # Show/hide password toggle
@@ -2086,11 +2289,11 @@ class FileArchiveApp:
             password_entry.configure(show="" if password_visible else "•")
             toggle_btn.configure(text="👁️ Hide" if password_visible else "👁️ Show")
 
-        toggle_btn = ctk.CTkButton(form_frame, text=get_translation("ctkbutton_text_show"),
+        toggle_btn = self._tr(ctk.CTkButton(form_frame, text=get_translation("ctkbutton_text_show"),
                                 command=toggle_password_visibility,
                                 font=("Segoe UI", 12),
                                 width=80, height=25,
-                                fg_color="#6c757d", hover_color="#5a6268")
+                                fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_show")
         toggle_btn.pack(anchor="e", padx=5)
 
         # Role selection with styled radio buttons
@@ -2098,8 +2301,8 @@ class FileArchiveApp:
         role_frame.pack(fill="x", pady=15)
 
         ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_user_role"),
-                    font=("Segoe UI", 14, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_user_role"),
+                    font=("Segoe UI", 14, "bold")), "ctklabel_text_user_role").pack(side="left")
 
         role_var = ctk.StringVar(value="user")
 
@@ -2110,44 +2313,44 @@ class FileArchiveApp:
         admin_frame = ctk.CTkFrame(role_options, fg_color="#f8f9fa", corner_radius=6)
         admin_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
 
-        admin_radio = ctk.CTkRadioButton(admin_frame, text=get_translation("ctkradiobutton_text_admin"),
+        admin_radio = self._tr(ctk.CTkRadioButton(admin_frame, text=get_translation("ctkradiobutton_text_admin"),
                                         variable=role_var, value="admin",
                                         font=("Segoe UI", 14),
                                         border_width_checked=6,
                                         fg_color="#2D7FF9",
-                                        hover_color="#1A6CD6")
+                                        hover_color="#1A6CD6"), "ctkradiobutton_text_admin")
         admin_radio.pack(side="left", padx=15, pady=10)
 
-        ctk.CTkLabel(admin_frame, text=get_translation("ctklabel_text_full_system_access"),
+        self._tr(ctk.CTkLabel(admin_frame, text=get_translation("ctklabel_text_full_system_access"),
                     font=("Segoe UI", 12),
-                    text_color="#6c757d").pack(side="left", padx=5)
+                    text_color="#6c757d"), "ctklabel_text_full_system_access").pack(side="left", padx=5)
 
         # User radio with custom styling
         user_frame = ctk.CTkFrame(role_options, fg_color="#f8f9fa", corner_radius=6)
         user_frame.pack(side="left", fill="x", expand=True, padx=(5, 0))
 
-        user_radio = ctk.CTkRadioButton(user_frame, text=get_translation("ctkradiobutton_text_user"),
+        user_radio = self._tr(ctk.CTkRadioButton(user_frame, text=get_translation("ctkradiobutton_text_user"),
                                         variable=role_var, value="user",
                                         font=("Segoe UI", 14),
                                         border_width_checked=6,
                                         fg_color="#28a745",
-                                        hover_color="#218838")
+                                        hover_color="#218838"), "ctkradiobutton_text_user")
         user_radio.pack(side="left", padx=15, pady=10)
 
-        ctk.CTkLabel(user_frame, text=get_translation("ctklabel_text_limited_access"),
+        self._tr(ctk.CTkLabel(user_frame, text=get_translation("ctklabel_text_limited_access"),
                     font=("Segoe UI", 12),
-                    text_color="#6c757d").pack(side="left", padx=5)
+                    text_color="#6c757d"), "ctklabel_text_limited_access").pack(side="left", padx=5)
 
         # Buttons frame
         buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         buttons_frame.pack(fill="x", pady=(20, 0))
 
         # Cancel button
-        cancel_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
+        cancel_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
                                 command=add_win.destroy,
                                 font=("Segoe UI", 14),
                                 width=120, height=40,
-                                fg_color="#6c757d", hover_color="#5a6268")
+                                fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_cancel")
         cancel_btn.pack(side="left", padx=(0, 10))
 
         def do_add_user():
@@ -2160,33 +2363,30 @@ class FileArchiveApp:
                 messagebox.showerror("Error", "Username and password are required", parent=add_win)
                 return
 
-            if username in users:
+            if self.user_repository.exists(username):
                 messagebox.showerror("Error", f"User '{username}' already exists", parent=add_win)
                 return
 
-            # Add the new user
-            users[username] = {
-                "password": pbkdf2_sha256.hash(password),
-                "role": role
-            }
-
-            # Save changes to file
-            self.save_user_to_db(username, pbkdf2_sha256.hash(password), role)
+            # Add the new user; the insert itself rejects a name taken in the meantime
+            if not self.user_repository.add(username, self.user_controller.hash_password(password), role):
+                messagebox.showerror("Error", f"User '{username}' already exists", parent=add_win)
+                return
 
             messagebox.showinfo("Success", f"User '{username}' added successfully", parent=add_win)
             logging.info(f"Admin '{self.current_user['username']}' added new user '{username}' with role '{role}'")
+            self.record_activity(activity_log.ACTION_USER_ADD, details=f"{username} ({role})")
 
             # Refresh the user list
             self.refresh_user_list()
             add_win.destroy()
 
         # Add button
-        add_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_add_user"),
+        add_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_add_user"),
                             command=do_add_user,
                             font=("Segoe UI", 14, "bold"),
                             width=300, height=40,
                             corner_radius=8,
-                            fg_color="#28a745", hover_color="#218838")
+                            fg_color="#28a745", hover_color="#218838"), "ctkbutton_text_add_user")
         add_btn.pack(side="right")
 
         # Set focus to username entry
@@ -2231,16 +2431,16 @@ class FileArchiveApp:
         password_frame.pack(fill="x", pady=10)
 
         ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_new_password"),
-                    font=("Segoe UI", 14, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(password_frame, text=get_translation("ctklabel_text_new_password"),
+                    font=("Segoe UI", 14, "bold")), "ctklabel_text_new_password").pack(side="left")
 
-        password_entry = ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_leave_blank_to_keep_current_password"),
-                                    show="•", width=400, height=35, font=("Segoe UI", 14))
+        password_entry = self._tr(ctk.CTkEntry(form_frame, placeholder_text=get_translation("ctkentry_placeholder_text_leave_blank_to_keep_current_password"),
+                                    show="•", width=400, height=35, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_leave_blank_to_keep_current_password")
         password_entry.pack(pady=(0, 5))
 
-        ctk.CTkLabel(form_frame, text=get_translation("ctklabel_text_note_password_will_only_be_updated_if_a_new_one_is"),
+        self._tr(ctk.CTkLabel(form_frame, text=get_translation("ctklabel_text_note_password_will_only_be_updated_if_a_new_one_is"),
                     font=("Segoe UI", 12),
-                    text_color="#6c757d").pack(anchor="w", pady=(0, 15))
+                    text_color="#6c757d"), "ctklabel_text_note_password_will_only_be_updated_if_a_new_one_is").pack(anchor="w", pady=(0, 15))
 
         # Show/hide password toggle
         password_visible = False
@@ -2251,21 +2451,22 @@ class FileArchiveApp:
             password_entry.configure(show="" if password_visible else "•")
             toggle_btn.configure(text="👁️ Hide" if password_visible else "👁️ Show")
 
-        toggle_btn = ctk.CTkButton(form_frame, text=get_translation("ctkbutton_text_show"),
+        toggle_btn = self._tr(ctk.CTkButton(form_frame, text=get_translation("ctkbutton_text_show"),
                                 command=toggle_password_visibility,
                                 font=("Segoe UI", 12),
                                 width=80, height=25,
-                                fg_color="#6c757d", hover_color="#5a6268")
+                                fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_show")
         toggle_btn.pack(anchor="e", padx=5)
 
         # Role selection with styled radio buttons
-        current_role = users[username]["role"]
+        stored_user = self.user_repository.get(username)
+        current_role = stored_user["role"] if stored_user else "user"
         role_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
         role_frame.pack(fill="x", pady=15)
 
         ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 16)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_user_role"),
-                    font=("Segoe UI", 14, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(role_frame, text=get_translation("ctklabel_text_user_role"),
+                    font=("Segoe UI", 14, "bold")), "ctklabel_text_user_role").pack(side="left")
 
         role_var = ctk.StringVar(value=current_role)
 
@@ -2276,81 +2477,92 @@ class FileArchiveApp:
         admin_frame = ctk.CTkFrame(role_options, fg_color="#f8f9fa", corner_radius=6)
         admin_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
 
-        admin_radio = ctk.CTkRadioButton(admin_frame, text=get_translation("ctkradiobutton_text_admin"),
+        admin_radio = self._tr(ctk.CTkRadioButton(admin_frame, text=get_translation("ctkradiobutton_text_admin"),
                                         variable=role_var, value="admin",
                                         font=("Segoe UI", 14),
                                         border_width_checked=6,
                                         fg_color="#2D7FF9",
-                                        hover_color="#1A6CD6")
+                                        hover_color="#1A6CD6"), "ctkradiobutton_text_admin")
         admin_radio.pack(side="left", padx=15, pady=10)
 
-        ctk.CTkLabel(admin_frame, text=get_translation("ctklabel_text_full_system_access"),
+        self._tr(ctk.CTkLabel(admin_frame, text=get_translation("ctklabel_text_full_system_access"),
                     font=("Segoe UI", 12),
-                    text_color="#6c757d").pack(side="left", padx=5)
+                    text_color="#6c757d"), "ctklabel_text_full_system_access").pack(side="left", padx=5)
 
         # User radio with custom styling
         user_frame = ctk.CTkFrame(role_options, fg_color="#f8f9fa", corner_radius=6)
         user_frame.pack(side="left", fill="x", expand=True, padx=(5, 0))
 
-        user_radio = ctk.CTkRadioButton(user_frame, text=get_translation("ctkradiobutton_text_user"),
+        user_radio = self._tr(ctk.CTkRadioButton(user_frame, text=get_translation("ctkradiobutton_text_user"),
                                         variable=role_var, value="user",
                                         font=("Segoe UI", 14),
                                         border_width_checked=6,
                                         fg_color="#28a745",
-                                        hover_color="#218838")
+                                        hover_color="#218838"), "ctkradiobutton_text_user")
         user_radio.pack(side="left", padx=15, pady=10)
 
-        ctk.CTkLabel(user_frame, text=get_translation("ctklabel_text_limited_access"),
+        self._tr(ctk.CTkLabel(user_frame, text=get_translation("ctklabel_text_limited_access"),
                     font=("Segoe UI", 12),
-                    text_color="#6c757d").pack(side="left", padx=5)
+                    text_color="#6c757d"), "ctklabel_text_limited_access").pack(side="left", padx=5)
 
         # Buttons frame
         buttons_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         buttons_frame.pack(fill="x", pady=(20, 0))
 
         # Cancel button
-        cancel_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
+        cancel_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
                                 command=edit_win.destroy,
                                 font=("Segoe UI", 14),
                                 width=120, height=40,
-                                fg_color="#6c757d", hover_color="#5a6268")
+                                fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_cancel")
         cancel_btn.pack(side="left", padx=(0, 10))
 
         # Inside edit_user_dialog, modify the do_edit_user function:
         def do_edit_user():
             new_password = password_entry.get().strip()
             new_role = role_var.get()
+            if new_role != "admin" and self.is_last_admin(username):
+                messagebox.showerror("Error", f"'{username}' is the last admin and cannot be demoted.", parent=edit_win)
+                return
 
             # Update user details if a new password was entered
             if new_password:
-                users[username]["password"] = pbkdf2_sha256.hash(new_password)
-            users[username]["role"] = new_role
-
-            # Use the updated password hash when saving
-            effective_password = users[username]["password"]
-            self.save_user_to_db(username, effective_password, new_role)
+                self.user_repository.update_password(username, self.user_controller.hash_password(new_password))
+                # A cached session must not keep accepting the old password
+                self.session_manager.invalidate(username)
+            self.user_repository.update_role(username, new_role)
 
             messagebox.showinfo("Success", f"User '{username}' updated successfully", parent=edit_win)
             logging.info(f"Admin '{self.current_user['username']}' updated user '{username}'")
+            self.record_activity(activity_log.ACTION_USER_EDIT,
+                                 details=f"{username} ({new_role}{', password reset' if new_password else ''})")
             self.refresh_user_list()
             edit_win.destroy()
 
 
         # Update button
-        update_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_update_user"),
+        update_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_update_user"),
                                 command=do_edit_user,
                                 font=("Segoe UI", 14, "bold"),
                                 width=300, height=40,
                                 corner_radius=8,
-                                fg_color="#007bff", hover_color="#0069d9")
+                                fg_color="#007bff", hover_color="#0069d9"), "ctkbutton_text_update_user")
         update_btn.pack(side="right")
 
+    def is_last_admin(self, username):
+        """True if username is the only admin left (guard shared by edit and delete; imports use user_io.guard_admins)."""
+        user = self.user_repository.get(username)
+        return bool(user and user["role"] == "admin" and self.user_repository.count_by_role().get("admin", 0) <= 1)
+
     def delete_user_confirm(self, username):
         """Show enhanced confirmation dialog to delete a user"""
         # Don't allow deleting the current user
         if self.current_user and username == self.current_user["username"]:
             messagebox.showerror("Error", "You cannot delete your own account")
             return
+        if self.is_last_admin(username):
+            messagebox.showerror("Error", f"'{username}' is the last admin and cannot be deleted.")
+            return
 
             # Create a custom confirmation dialog
                 # Create a custom confirmation dialog
@@ -2369,8 +2581,8 @@ class FileArchiveApp:
         ctk.CTkLabel(main_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 48)).pack(pady=(10, 5))
 
         # Warning message
-        ctk.CTkLabel(main_frame, text=get_translation("ctklabel_text_delete_user"),
-                    font=("Segoe UI", 20, "bold")).pack(pady=(0, 10))
+        self._tr(ctk.CTkLabel(main_frame, text=get_translation("ctklabel_text_delete_user"),
+                    font=("Segoe UI", 20, "bold")), "ctklabel_text_delete_user").pack(pady=(0, 10))
 
         message = f"Are you sure you want to delete user '{username}'?\nThis action cannot be undone."
         ctk.CTkLabel(main_frame, text=message,
@@ -2382,21 +2594,19 @@ class FileArchiveApp:
         buttons_frame.pack(fill="x", pady=(10, 0))
 
         # Cancel button
-        cancel_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
+        cancel_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_cancel"),
                                 command=confirm_win.destroy,
                                 font=("Segoe UI", 14),
                                 width=180, height=40,
-                                fg_color="#6c757d", hover_color="#5a6268")
+                                fg_color="#6c757d", hover_color="#5a6268"), "ctkbutton_text_cancel")
         cancel_btn.pack(side="left")
 
         def do_delete_user():
-            if username in users:
-                del users[username]
-                # Remove user from the database
-                self.cursor.execute("DELETE FROM users WHERE username=?", (username,))
-                self.conn.commit()
+            if self.user_repository.delete(username):
+                self.session_manager.invalidate(username)
                 messagebox.showinfo("Success", f"User '{username}' deleted successfully", parent=confirm_win)
                 logging.info(f"Admin '{self.current_user['username']}' deleted user '{username}'")
+                self.record_activity(activity_log.ACTION_USER_DELETE, details=username)
                 # Refresh the user list
                 self.refresh_user_list()
                 confirm_win.destroy()
@@ -2404,61 +2614,26 @@ class FileArchiveApp:
                 messagebox.showerror("Error", f"User '{username}' not found.", parent=confirm_win)
 
         # Delete button
-        delete_btn = ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_delete_user"),
+        delete_btn = self._tr(ctk.CTkButton(buttons_frame, text=get_translation("ctkbutton_text_delete_user"),
                                 command=do_delete_user,
                                 font=("Segoe UI", 14, "bold"),
                                 width=180, height=40,
                                 corner_radius=8,
-                                fg_color="#dc3545", hover_color="#c82333")
+                                fg_color="#dc3545", hover_color="#c82333"), "ctkbutton_text_delete_user")
         delete_btn.pack(side="right")
     def ensure_admin_user_db(self):
-        global users
-        self.cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'admin'")
-        count = self.cursor.fetchone()[0]
-        if count == 0:
-            # Create default admin user
-            admin_hash = pbkdf2_sha256.hash(DEFAULT_ADMIN_PASSWORD)
-            self.save_user_to_db("admin", admin_hash, "admin")
-            users["admin"] = {"password": admin_hash, "role": "admin"}
+        if self.user_repository.count_by_role().get("admin", 0) == 0:
+            # Create default admin user (the only place a default password is ever hashed)
+            admin_hash = self.user_controller.hash_password(DEFAULT_ADMIN_PASSWORD)
+            self.user_repository.save("admin", admin_hash, "admin")
             logging.warning("No admin users found, created default admin user.")
 
     def initialize_user_database(self):
-        # --- THIS IS THE KEY CHANGE ---
-        data_dir = get_data_dir()
-        # ----------------------------
-
-        self.db_path = os.path.join(data_dir, "users.db")
-        logging.info(f"Initializing user database at: {self.db_path}")
-        self.conn = sqlite3.connect(self.db_path)
-        self.cursor = self.conn.cursor()
-        # Create table if it doesn't exist
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL
-            )
-        """)
-        self.conn.commit()
-        self.load_users_from_db()
+        logging.info(f"Initializing user database at: {self.user_repository.db_path}")
+        schema_version = self.user_repository.migrate()
+        logging.info(f"users.db schema at version {schema_version}.")
         self.ensure_admin_user_db()
 
-    def save_user_to_db(self, username, hashed_password, role):
-        self.cursor.execute("""
-            INSERT OR REPLACE INTO users(username, password, role)
-            VALUES (?, ?, ?)
-        """, (username, hashed_password, role))
-        self.conn.commit()
-        logging.info(f"User '{username}' saved to database.")
-
-
-    def load_users_from_db(self):
-        global users
-        self.cursor.execute("SELECT username, password, role FROM users")
-        rows = self.cursor.fetchall()
-        users = {username: {"password": password, "role": role} for username, password, role in rows}
-        logging.info(f"Loaded {len(users)} users from database.")
-        
     def setup_settings_tab(self):
         """Configure the settings tab with improved visuals"""
         # Create a scrollable frame for the settings
@@ -2475,16 +2650,16 @@ class FileArchiveApp:
         app_header_frame.pack(fill="x", padx=15, pady=(10, 5))
 
         ctk.CTkLabel(app_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(app_header_frame, text=get_translation("ctklabel_text_appearance"),
-                    font=("Segoe UI", 18, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(app_header_frame, text=get_translation("ctklabel_text_appearance"),
+                    font=("Segoe UI", 18, "bold")), "ctklabel_text_appearance").pack(side="left")
 
 
         # Theme switcher with improved layout
         theme_frame = ctk.CTkFrame(appearance_frame, fg_color="transparent")
         theme_frame.pack(fill="x", padx=15, pady=15)
 
-        ctk.CTkLabel(theme_frame, text=get_translation("ctklabel_text_select_theme_mode"),
-                    font=("Segoe UI", 14)).pack(anchor="w", pady=(0, 10))
+        self._tr(ctk.CTkLabel(theme_frame, text=get_translation("ctklabel_text_select_theme_mode"),
+                    font=("Segoe UI", 14)), "ctklabel_text_select_theme_mode").pack(anchor="w", pady=(0, 10))
 
         # Radio button group for theme selection
         theme_selection = ctk.CTkFrame(theme_frame, fg_color="transparent")
@@ -2512,8 +2687,8 @@ class FileArchiveApp:
         shortcut_frame = ctk.CTkFrame(theme_frame, fg_color="transparent")
         shortcut_frame.pack(fill="x", pady=(10, 0))
 
-        ctk.CTkLabel(shortcut_frame, text=get_translation("ctklabel_text_tip_press_ctrlt_to_quickly_toggle_between_dark_and"),
-                    font=("Segoe UI", 12, "italic")).pack(anchor="w")
+        self._tr(ctk.CTkLabel(shortcut_frame, text=get_translation("ctklabel_text_tip_press_ctrlt_to_quickly_toggle_between_dark_and"),
+                    font=("Segoe UI", 12, "italic")), "ctklabel_text_tip_press_ctrlt_to_quickly_toggle_between_dark_and").pack(anchor="w")
 
         # User Settings Frame
         if self.current_user and self.current_user["role"] == "admin":
@@ -2525,8 +2700,8 @@ class FileArchiveApp:
             user_header_frame.pack(fill="x", padx=15, pady=(10, 5))
 
             ctk.CTkLabel(user_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-            ctk.CTkLabel(user_header_frame, text=get_translation("ctklabel_text_user_settings"),
-                        font=("Segoe UI", 18, "bold")).pack(side="left")
+            self._tr(ctk.CTkLabel(user_header_frame, text=get_translation("ctklabel_text_user_settings"),
+                        font=("Segoe UI", 18, "bold")), "ctklabel_text_user_settings").pack(side="left")
         
             # User info card with shadow effect (simulated with nested frames)
             card_outer = ctk.CTkFrame(user_frame, fg_color=["#D3D3D3", "#2B2B2B"])
@@ -2573,10 +2748,10 @@ class FileArchiveApp:
             pwd_button_frame = ctk.CTkFrame(action_frame, fg_color="transparent")
             pwd_button_frame.pack(fill="x", pady=5)
 
-            change_pwd_btn = ctk.CTkButton(pwd_button_frame, text=get_translation("ctkbutton_text_change_password"),
+            change_pwd_btn = self._tr(ctk.CTkButton(pwd_button_frame, text=get_translation("ctkbutton_text_change_password"),
                                         command=self.change_password,
                                         font=("Segoe UI", 14),
-                                        width=200)
+                                        width=200), "ctkbutton_text_change_password")
             change_pwd_btn.pack(side="left")
     def setup_manage_tab(self):
         """Configure the manage tab with file management functionality"""
@@ -2594,12 +2769,12 @@ class FileArchiveApp:
         op_header_frame.pack(fill="x", padx=15, pady=(10, 5))
 
         ctk.CTkLabel(op_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(op_header_frame, text=get_translation("ctklabel_text_file_operations"),
-                    font=("Segoe UI", 18, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(op_header_frame, text=get_translation("ctklabel_text_file_operations"),
+                    font=("Segoe UI", 18, "bold")), "ctklabel_text_file_operations").pack(side="left")
 
         # Operations description
-        ctk.CTkLabel(operations_frame, text=get_translation("ctklabel_text_manage_your_archived_files_with_these_tools"),
-                    font=("Segoe UI", 12)).pack(anchor="w", padx=15, pady=(0, 10))
+        self._tr(ctk.CTkLabel(operations_frame, text=get_translation("ctklabel_text_manage_your_archived_files_with_these_tools"),
+                    font=("Segoe UI", 12)), "ctklabel_text_manage_your_archived_files_with_these_tools").pack(anchor="w", padx=15, pady=(0, 10))
 
         # Operations grid with icons and descriptions
         buttons_frame = ctk.CTkFrame(operations_frame, fg_color="transparent")
@@ -2617,30 +2792,58 @@ class FileArchiveApp:
         preview_frame = ctk.CTkFrame(buttons_frame, fg_color="transparent")
         preview_frame.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
 
-        self.preview_btn = ctk.CTkButton(preview_frame, text=get_translation("ctkbutton_text_preview_file"),
+        self.preview_btn = self._tr(ctk.CTkButton(preview_frame, text=get_translation("ctkbutton_text_preview_file"),
                                         command=self.custom_preview_interface,
                                         font=button_font,
                                         width=button_width, height=button_height,
-                                        fg_color=["#3a7ebf", "#1f538d"])
+                                        fg_color=["#3a7ebf", "#1f538d"]), "ctkbutton_text_preview_file")
         self.preview_btn.pack(pady=5)
 
-        ctk.CTkLabel(preview_frame, text=get_translation("ctklabel_text_view_image_files"),
-                    font=("Segoe UI", 12)).pack()
+        self._tr(ctk.CTkLabel(preview_frame, text=get_translation("ctklabel_text_view_image_files"),
+                    font=("Segoe UI", 12)), "ctklabel_text_view_image_files").pack()
 
 
         # Rollback button
         rollback_frame = ctk.CTkFrame(buttons_frame, fg_color="transparent")
         rollback_frame.grid(row=0, column=1, padx=5, pady=5, sticky="nsew")
 
-        self.rollback_btn = ctk.CTkButton(rollback_frame, text=get_translation("ctkbutton_text_rollback_file"),
+        self.rollback_btn = self._tr(ctk.CTkButton(rollback_frame, text=get_translation("ctkbutton_text_rollback_file"),
                                         command=self.custom_rollback_interface,
                                         font=button_font,
                                         width=button_width, height=button_height,
-                                        fg_color=["#3a7ebf", "#1f538d"])
+                                        fg_color=["#3a7ebf", "#1f538d"]), "ctkbutton_text_rollback_file")
         self.rollback_btn.pack(pady=5)
 
-        ctk.CTkLabel(rollback_frame, text=get_translation("ctklabel_text_restore_previous_versions"),
-                    font=("Segoe UI", 12)).pack()
+        self._tr(ctk.CTkLabel(rollback_frame, text=get_translation("ctklabel_text_restore_previous_versions"),
+                    font=("Segoe UI", 12)), "ctklabel_text_restore_previous_versions").pack()
+
+        # Export button
+        export_frame = ctk.CTkFrame(buttons_frame, fg_color="transparent")
+        export_frame.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+
+        self.export_package_btn = self._tr(ctk.CTkButton(export_frame, text=get_translation("ctkbutton_text_export_package"),
+                                        command=self.export_package_interface,
+                                        font=button_font,
+                                        width=button_width, height=button_height,
+                                        fg_color=["#3a7ebf", "#1f538d"]), "ctkbutton_text_export_package")
+        self.export_package_btn.pack(pady=5)
+
+        self._tr(ctk.CTkLabel(export_frame, text=get_translation("ctklabel_text_export_company_or_subtree"),
+                    font=("Segoe UI", 12)), "ctklabel_text_export_company_or_subtree").pack()
+
+        # Import button
+        import_frame = ctk.CTkFrame(buttons_frame, fg_color="transparent")
+        import_frame.grid(row=1, column=1, padx=5, pady=5, sticky="nsew")
+
+        self.import_package_btn = self._tr(ctk.CTkButton(import_frame, text=get_translation("ctkbutton_text_import_package"),
+                                        command=self.import_package_interface,
+                                        font=button_font,
+                                        width=button_width, height=button_height,
+                                        fg_color=["#3a7ebf", "#1f538d"]), "ctkbutton_text_import_package")
+        self.import_package_btn.pack(pady=5)
+
+        self._tr(ctk.CTkLabel(import_frame, text=get_translation("ctklabel_text_import_exported_package"),
+                    font=("Segoe UI", 12)), "ctklabel_text_import_exported_package").pack()
 
         # Only show activity logs to admin users
         if self.current_user and self.current_user["role"] == "admin":
@@ -2653,15 +2856,54 @@ class FileArchiveApp:
             hist_header_frame.pack(fill="x", padx=15, pady=(10, 5))
 
             ctk.CTkLabel(hist_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-            ctk.CTkLabel(hist_header_frame, text=get_translation("ctklabel_text_recent_activity"),
-                        font=("Segoe UI", 18, "bold")).pack(side="left")
+            self._tr(ctk.CTkLabel(hist_header_frame, text=get_translation("ctklabel_text_recent_activity"),
+                        font=("Segoe UI", 18, "bold")), "ctklabel_text_recent_activity").pack(side="left")
 
             # Refresh button for activity log
-            refresh_btn = ctk.CTkButton(hist_header_frame, text=get_translation("ctkbutton_text_refresh"),
+            refresh_btn = self._tr(ctk.CTkButton(hist_header_frame, text=get_translation("ctkbutton_text_refresh"),
                                         command=self.update_activity_log,
-                                        width=100, font=("Segoe UI", 12))
+                                        width=100, font=("Segoe UI", 12)), "ctkbutton_text_refresh")
             refresh_btn.pack(side="right", padx=10)
 
+            # Source, filters and live follow
+            activity_filter_frame = ctk.CTkFrame(history_frame, fg_color="transparent")
+            activity_filter_frame.pack(fill="x", padx=15, pady=(0, 5))
+
+            source_keys = (ACTIVITY_SOURCE_AUDIT, ACTIVITY_SOURCE_LOG)
+            self.activity_source_var = ctk.StringVar(value=get_translation(ACTIVITY_SOURCE_AUDIT))
+            self._tr(ctk.CTkOptionMenu(activity_filter_frame, values=[get_translation(k) for k in source_keys],
+                                       variable=self.activity_source_var, width=140, font=("Segoe UI", 12),
+                                       command=lambda _: self.on_activity_source_change()),
+                     values=source_keys).pack(side="left", padx=(0, 5))
+
+            level_keys = tuple(ACTIVITY_LEVEL_FILTERS)
+            self.activity_level_var = ctk.StringVar(value=get_translation(level_keys[0]))
+            self.activity_level_menu = self._tr(ctk.CTkOptionMenu(activity_filter_frame, values=[get_translation(k) for k in level_keys],
+                                                                  variable=self.activity_level_var, width=100, font=("Segoe UI", 12),
+                                                                  state="disabled", # Enabled for the application log
+                                                                  command=lambda _: self.update_activity_log()),
+                                                values=level_keys)
+            self.activity_level_menu.pack(side="left", padx=5)
+
+            self.activity_user_var = ctk.StringVar()
+            activity_user_entry = self._tr(ctk.CTkEntry(activity_filter_frame, textvariable=self.activity_user_var,
+                                               placeholder_text=get_translation("ctkentry_placeholder_text_filter_by_user"),
+                                               width=120, font=("Segoe UI", 12)), placeholder_text="ctkentry_placeholder_text_filter_by_user")
+            activity_user_entry.pack(side="left", padx=5)
+            activity_user_entry.bind("<Return>", lambda event: self.update_activity_log())
+
+            self.activity_path_var = ctk.StringVar()
+            activity_path_entry = self._tr(ctk.CTkEntry(activity_filter_frame, textvariable=self.activity_path_var,
+                                               placeholder_text=get_translation("ctkentry_placeholder_text_filter_by_path"),
+                                               width=160, font=("Segoe UI", 12)), placeholder_text="ctkentry_placeholder_text_filter_by_path")
+            activity_path_entry.pack(side="left", padx=5)
+            activity_path_entry.bind("<Return>", lambda event: self.update_activity_log())
+
+            self.activity_follow_var = ctk.BooleanVar(value=False)
+            self._tr(ctk.CTkCheckBox(activity_filter_frame, text=get_translation("ctkcheckbox_text_follow"),
+                            variable=self.activity_follow_var, command=self.toggle_activity_follow,
+                            font=("Segoe UI", 12)), "ctkcheckbox_text_follow").pack(side="left", padx=5)
+
             # Activity log with scrollbar and modern styling
             self.activity_box = ctk.CTkTextbox(history_frame, width=400, height=200,
                                             font=("Consolas", 12))
@@ -2675,27 +2917,162 @@ class FileArchiveApp:
             footer_frame = ctk.CTkFrame(manage_scroll, corner_radius=8)
             footer_frame.pack(fill="x", padx=10, pady=15)
 
-            ctk.CTkLabel(footer_frame, text=get_translation("ctklabel_text_file_management_tools_are_available_above"),
-                        font=("Segoe UI", 14)).pack(pady=20)
+            self._tr(ctk.CTkLabel(footer_frame, text=get_translation("ctklabel_text_file_management_tools_are_available_above"),
+                        font=("Segoe UI", 14)), "ctklabel_text_file_management_tools_are_available_above").pack(pady=20)
 
     # This method needs to be OUTSIDE of setup_manage_tab (fix the indentation)
     def update_activity_log(self):
-        """Update the activity log with recent actions"""
-        if not hasattr(self, 'activity_box'):
+        """
+        Reload the activity box from the selected source: the audit trail (an indexed query)
+        or the tail of the application log (read backwards from the end). Either way the
+        cost depends on the number of lines shown, not on the size of the history.
+        """
+        if not hasattr(self, 'activity_box') or not self.activity_box.winfo_exists():
             return
         self.activity_box.configure(state="normal")
         self.activity_box.delete("1.0", "end")
+        self.activity_box_empty = True
         try:
-            if os.path.exists('archive_app.log'):
-                with open('archive_app.log', 'r') as log_file:
-                    lines = log_file.readlines()
-                    last_lines = lines[-10:] if len(lines) > 10 else lines
-                    self.activity_box.insert("1.0", "".join(last_lines))
+            lines = self.load_activity_lines()
+            if lines:
+                self.activity_box.insert("1.0", "\n".join(lines))
+                self.activity_box_empty = False
             else:
-                self.activity_box.insert("1.0", "No activity logs found.")
+                self.activity_box.insert("1.0", "No matching activity found.")
         except Exception as e:
             self.activity_box.insert("1.0", f"Could not load activity logs: {e}")
         self.activity_box.configure(state="disabled")
+        self.activity_box.see("end")
+
+    def on_activity_source_change(self):
+        """The level filter only applies to the application log; audit entries have no level."""
+        source = self._activity_choice('activity_source_var', (ACTIVITY_SOURCE_AUDIT, ACTIVITY_SOURCE_LOG))
+        self.activity_level_menu.configure(state="normal" if source == ACTIVITY_SOURCE_LOG else "disabled")
+        self.update_activity_log()
+
+    def _activity_choice(self, var_name, keys):
+        """Translation key of the choice shown in an activity view option menu (first key if none)."""
+        var = getattr(self, var_name, None)
+        shown = var.get() if var is not None else None
+        return next((key for key in keys if get_translation(key) == shown), keys[0])
+
+    def _activity_filters(self):
+        """Returns (source, min_level, user, path) from the activity view controls."""
+        source = self._activity_choice('activity_source_var', (ACTIVITY_SOURCE_AUDIT, ACTIVITY_SOURCE_LOG))
+        min_level = ACTIVITY_LEVEL_FILTERS[self._activity_choice('activity_level_var', tuple(ACTIVITY_LEVEL_FILTERS))]
+        user = self.activity_user_var.get().strip() if hasattr(self, 'activity_user_var') else ""
+        path = self.activity_path_var.get().strip() if hasattr(self, 'activity_path_var') else ""
+        return source, min_level, user, path
+
+    def _log_line_matches(self, record, min_level, user, path):
+        if min_level and LOG_LEVELS.get(record.get("level"), 0) < min_level:
+            return False
+        message = str(record.get("msg", "")).lower()
+        if user and user.lower() not in str(record.get("user") or "").lower() and user.lower() not in message:
+            return False
+        if path and path.lower() not in str(record.get("path") or "").lower() and path.lower() not in message:
+            return False
+        return True
+
+    def load_activity_lines(self):
+        """
+        Returns the last ACTIVITY_VIEW_LIMIT matching lines (oldest first) and remembers
+        where they end, so follow mode can append only what comes after.
+        """
+        source, min_level, user, path = self._activity_filters()
+        if source == ACTIVITY_SOURCE_LOG:
+            flush_logs()
+            log_path = get_log_file_path()
+            if not log_path or not os.path.exists(log_path):
+                self.activity_log_follower = None
+                return []
+            lines, end_offset = tail_lines(
+                log_path, ACTIVITY_VIEW_LIMIT,
+                predicate=lambda line: self._log_line_matches(parse_log_line(line), min_level, user, path))
+            self.activity_log_follower = LogFollower(log_path, end_offset)
+            return [self.format_log_entry(parse_log_line(line)) for line in lines]
+
+        entries = self.activity_log.recent(limit=ACTIVITY_VIEW_LIMIT, username=user or None,
+                                           path_contains=path or None)
+        self.activity_last_id = entries[0]["id"] if entries else 0
+        return [self.format_activity_entry(e) for e in reversed(entries)]
+
+    def read_new_activity_lines(self):
+        """Returns lines recorded since the last load/poll that match the current filters."""
+        source, min_level, user, path = self._activity_filters()
+        if source == ACTIVITY_SOURCE_LOG:
+            follower = getattr(self, 'activity_log_follower', None)
+            if follower is None:
+                return []
+            flush_logs()
+            records = (parse_log_line(line) for line in follower.read_new())
+            return [self.format_log_entry(r) for r in records if self._log_line_matches(r, min_level, user, path)]
+
+        entries = self.activity_log.recent(limit=ACTIVITY_FOLLOW_MAX_LINES, username=user or None,
+                                           path_contains=path or None,
+                                           after_id=getattr(self, 'activity_last_id', 0))
+        if entries:
+            self.activity_last_id = entries[0]["id"]
+        return [self.format_activity_entry(e) for e in reversed(entries)]
+
+    def toggle_activity_follow(self):
+        """Start/stop appending new activity to the box as it happens."""
+        job = getattr(self, 'activity_follow_job', None)
+        if job:
+            self.main_app.after_cancel(job)
+            self.activity_follow_job = None
+        if self.activity_follow_var.get():
+            self.update_activity_log()
+            self.activity_follow_job = self.main_app.after(ACTIVITY_FOLLOW_INTERVAL_MS, self.poll_activity_follow)
+
+    def poll_activity_follow(self):
+        self.activity_follow_job = None
+        if (not hasattr(self, 'activity_box') or not self.activity_box.winfo_exists()
+                or not self.activity_follow_var.get()):
+            return
+        try:
+            new_lines = self.read_new_activity_lines()
+            if new_lines:
+                self.activity_box.configure(state="normal")
+                if self.activity_box_empty:
+                    self.activity_box.delete("1.0", "end")
+                    self.activity_box.insert("end", "\n".join(new_lines))
+                    self.activity_box_empty = False
+                else:
+                    self.activity_box.insert("end", "\n" + "\n".join(new_lines))
+                # Keep the box bounded while following for a long time
+                line_count = int(self.activity_box.index("end-1c").split(".")[0])
+                if line_count > ACTIVITY_FOLLOW_MAX_LINES:
+                    self.activity_box.delete("1.0", f"{line_count - ACTIVITY_FOLLOW_MAX_LINES + 1}.0")
+                self.activity_box.configure(state="disabled")
+                self.activity_box.see("end")
+        except Exception as e:
+            logging.error(f"Error following activity log: {e}", exc_info=True)
+        self.activity_follow_job = self.main_app.after(ACTIVITY_FOLLOW_INTERVAL_MS, self.poll_activity_follow)
+
+    def format_log_entry(self, record):
+        """One line per log record: '<time>  <LEVEL>  <first line of message>'"""
+        message = str(record.get("msg", "")).split("\n", 1)[0]
+        if not record.get("level"):
+            return message
+        return f"{str(record.get('ts', ''))[:19].replace('T', ' ')}  {record['level']:<8} {message}"
+
+    def format_activity_entry(self, entry):
+        """One line per activity row: '<time>  <user>  <action>  <path>  (<details>)'"""
+        when = datetime.datetime.fromtimestamp(entry["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+        line = f"{when}  {entry['username'] or '-'}  {entry['action']}"
+        if entry["path"]:
+            line += f"  {entry['path']}"
+        if entry["details"]:
+            line += f"  ({entry['details']})"
+        return line
+
+    def record_activity(self, action, path="", details="", username=None):
+        """Adds an audit-trail row; username defaults to the logged-in user."""
+        if username is None and self.current_user:
+            username = self.current_user["username"]
+        self.activity_log.record(username, action, path, details)
+
     def setup_upload_tab(self):
         """Configure the upload tab with file upload functionality,
         including FOUR-level structure and drag & drop."""
@@ -2712,13 +3089,13 @@ class FileArchiveApp:
         header_frame = ctk.CTkFrame(company_frame, fg_color="transparent")
         header_frame.pack(fill="x", padx=15, pady=(10, 5))
         ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_company_information"), font=("Segoe UI", 18, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(header_frame, text=get_translation("ctklabel_text_company_information"), font=("Segoe UI", 18, "bold")), "ctklabel_text_company_information").pack(side="left")
         
         company_entry_frame = ctk.CTkFrame(company_frame, fg_color="transparent")
         company_entry_frame.pack(fill="x", padx=15, pady=(5, 15))
-        ctk.CTkLabel(company_entry_frame, text=get_translation("ctklabel_text_company_name"), font=("Segoe UI", 14)).pack(side="left", padx=(0, 10))
-        self.company_entry = ctk.CTkEntry(company_entry_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_company_name"),
-                                        font=("Segoe UI", 14))
+        self._tr(ctk.CTkLabel(company_entry_frame, text=get_translation("ctklabel_text_company_name"), font=("Segoe UI", 14)), "ctklabel_text_company_name").pack(side="left", padx=(0, 10))
+        self.company_entry = self._tr(ctk.CTkEntry(company_entry_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_company_name"),
+                                        font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_company_name")
         self.company_entry.pack(side="left", fill="x", expand=True)
         self.company_entry.bind("<FocusOut>", self.update_options)
         self.company_entry.bind("<Return>", self.update_options)
@@ -2729,27 +3106,27 @@ class FileArchiveApp:
         struct_header_frame = ctk.CTkFrame(structure_frame, fg_color="transparent")
         struct_header_frame.pack(fill="x", padx=15, pady=(10, 5))
         ctk.CTkLabel(struct_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(struct_header_frame, text=get_translation("ctklabel_text_document_structure"), font=("Segoe UI", 18, "bold")).pack(side="left")
-        ctk.CTkLabel(structure_frame, text=get_translation("ctklabel_text_select_the_appropriate_structure_for_filing"),
-                    font=("Segoe UI", 12)).pack(anchor="w", padx=15, pady=(0, 10))
+        self._tr(ctk.CTkLabel(struct_header_frame, text=get_translation("ctklabel_text_document_structure"), font=("Segoe UI", 18, "bold")), "ctklabel_text_document_structure").pack(side="left")
+        self._tr(ctk.CTkLabel(structure_frame, text=get_translation("ctklabel_text_select_the_appropriate_structure_for_filing"),
+                    font=("Segoe UI", 12)), "ctklabel_text_select_the_appropriate_structure_for_filing").pack(anchor="w", padx=15, pady=(0, 10))
         
         selection_frame = ctk.CTkFrame(structure_frame, fg_color="transparent")
         selection_frame.pack(fill="x", padx=15, pady=(5, 15))
         selection_frame.grid_columnconfigure(1, weight=1)
         
         # Header selection
-        ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_header"), font=("Segoe UI", 14)).grid(row=0, column=0, sticky="w",
+        self._tr(ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_header"), font=("Segoe UI", 14)), "ctklabel_text_header").grid(row=0, column=0, sticky="w",
                                                                                 padx=(0, 10), pady=10)
-        self.header_var = ctk.StringVar(value=list(self.structure.keys())[0])
+        self.header_var = ctk.StringVar(value=self.structure.headers[0])
         self.header_menu = ctk.CTkOptionMenu(selection_frame,
-                                            values=list(self.structure.keys()),
+                                            values=list(self.structure.headers),
                                             variable=self.header_var,
                                             font=("Segoe UI", 13))
         self.header_menu.grid(row=0, column=1, sticky="ew", pady=10)
         self.header_var.trace_add("write", self.update_options)
         
         # Subheader selection
-        ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_subheader"), font=("Segoe UI", 14)).grid(row=1, column=0, sticky="w",
+        self._tr(ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_subheader"), font=("Segoe UI", 14)), "ctklabel_text_subheader").grid(row=1, column=0, sticky="w",
                                                                                     padx=(0, 10), pady=10)
         self.subheader_var = ctk.StringVar()
         self.subheader_menu = ctk.CTkOptionMenu(selection_frame,
@@ -2760,7 +3137,7 @@ class FileArchiveApp:
         self.subheader_var.trace_add("write", self.update_section_options_upload)
         
         # Section selection
-        ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_section"), font=("Segoe UI", 14)).grid(row=2, column=0, sticky="w",
+        self._tr(ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_section"), font=("Segoe UI", 14)), "ctklabel_text_section").grid(row=2, column=0, sticky="w",
                                                                                 padx=(0, 10), pady=10)
         self.section_var = ctk.StringVar()
         self.section_menu = ctk.CTkOptionMenu(selection_frame,
@@ -2772,7 +3149,7 @@ class FileArchiveApp:
         self.section_var.trace_add("write", self.update_subsection_options_upload)
         
         # --- Subsection Selection (NEW) ---
-        ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_subsection"), font=("Segoe UI", 14)).grid(row=3, column=0, sticky="w",
+        self._tr(ctk.CTkLabel(selection_frame, text=get_translation("ctklabel_text_subsection"), font=("Segoe UI", 14)), "ctklabel_text_subsection").grid(row=3, column=0, sticky="w",
                                                                                     padx=(0, 10), pady=10)
         self.subsection_var = ctk.StringVar()
         self.subsection_menu = ctk.CTkOptionMenu(selection_frame,
@@ -2802,7 +3179,7 @@ class FileArchiveApp:
         upload_header_frame = ctk.CTkFrame(upload_opts_frame, fg_color="transparent")
         upload_header_frame.pack(fill="x", padx=15, pady=(10, 5))
         ctk.CTkLabel(upload_header_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 20)).pack(side="left", padx=(0, 10))
-        ctk.CTkLabel(upload_header_frame, text=get_translation("ctklabel_text_upload_options"), font=("Segoe UI", 18, "bold")).pack(side="left")
+        self._tr(ctk.CTkLabel(upload_header_frame, text=get_translation("ctklabel_text_upload_options"), font=("Segoe UI", 18, "bold")), "ctklabel_text_upload_options").pack(side="left")
         
         file_types_str = ", ".join([ext.upper().replace('.', '') for ext in SUPPORTED_FILE_EXTENSIONS])
         ctk.CTkLabel(upload_opts_frame, text=f"Supported: {file_types_str}",
@@ -2811,23 +3188,29 @@ class FileArchiveApp:
         button_frame = ctk.CTkFrame(upload_opts_frame, fg_color="transparent")
         button_frame.pack(fill="x", padx=15, pady=(5, 15))
         
-        self.upload_btn = ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_upload_file"),
+        self.upload_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_upload_file"),
                                         command=self.upload_file,
                                         font=("Segoe UI", 14, "bold"),
-                                        height=38)
+                                        height=38), "ctkbutton_text_upload_file")
         self.upload_btn.pack(side="left", padx=(0, 10))
         
-        self.batch_upload_btn = ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_batch_upload"),
+        self.batch_upload_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_batch_upload"),
                                             command=self.batch_upload,
                                             font=("Segoe UI", 14),
-                                            height=38)
+                                            height=38), "ctkbutton_text_batch_upload")
         self.batch_upload_btn.pack(side="left", padx=10)
         
-        self.scan_btn = ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_scan_archive"),
+        self.scan_btn = self._tr(ctk.CTkButton(button_frame, text=get_translation("ctkbutton_text_scan_archive"),
                                     command=self.scan_and_archive,
                                     font=("Segoe UI", 14, "bold"),
-                                    height=38)
+                                    height=38), "ctkbutton_text_scan_archive")
         self.scan_btn.pack(side="left", padx=(10, 0))
+
+        # Scanned pages are assembled into one compressed PDF unless unticked
+        self.scan_to_pdf_var = ctk.BooleanVar(value=True)
+        self._tr(ctk.CTkCheckBox(button_frame, text=get_translation("ctkcheckbox_text_scan_to_pdf"),
+                                 variable=self.scan_to_pdf_var, font=("Segoe UI", 13)),
+                 "ctkcheckbox_text_scan_to_pdf").pack(side="left", padx=(15, 0))
         
         # --- Drag & Drop Zone ---
         self.dropzone_frame = ctk.CTkFrame(upload_scroll, corner_radius=8, border_width=2,
@@ -2840,15 +3223,15 @@ class FileArchiveApp:
         dropzone_content_frame = ctk.CTkFrame(self.dropzone_frame, fg_color="transparent")
         dropzone_content_frame.pack(expand=True)
         
-        self.dropzone_label = ctk.CTkLabel(dropzone_content_frame, text=get_translation("ctklabel_text_drag_drop_files_here"),
-                                        font=("Segoe UI", 18, "bold"))
+        self.dropzone_label = self._tr(ctk.CTkLabel(dropzone_content_frame, text=get_translation("ctklabel_text_drag_drop_files_here"),
+                                        font=("Segoe UI", 18, "bold")), "ctklabel_text_drag_drop_files_here")
         self.dropzone_label.pack(pady=(5, 5))
         
         upload_icon = ctk.CTkLabel(dropzone_content_frame, text=get_translation("ctklabel_text_empty_string"), font=("Segoe UI", 48))
         upload_icon.pack(pady=10)
         
-        self.dropzone_sublabel = ctk.CTkLabel(dropzone_content_frame, text=get_translation("ctklabel_text_or_click_to_browse"),
-                                            font=("Segoe UI", 14))
+        self.dropzone_sublabel = self._tr(ctk.CTkLabel(dropzone_content_frame, text=get_translation("ctklabel_text_or_click_to_browse"),
+                                            font=("Segoe UI", 14)), "ctklabel_text_or_click_to_browse")
         self.dropzone_sublabel.pack(pady=(5, 5))
         
         clickable_widgets = [
@@ -2871,7 +3254,7 @@ class FileArchiveApp:
                     dropzone_widget.dnd_bind('<<DropLeave>>', self.on_drop_leave)
                     dropzone_widget.dnd_bind('<<Drop>>', self.on_drop)
                     logging.info("Drag & Drop events bound successfully.")
-                    self.dropzone_sublabel.configure(text=get_translation("configure_text_or_click_to_browse"))
+                    self._set_text(self.dropzone_sublabel, "configure_text_or_click_to_browse")
                 else:
                     raise RuntimeError("Could not find underlying Tkinter widget for dropzone.")
             except Exception as e:
@@ -2903,8 +3286,8 @@ class FileArchiveApp:
             logging.debug(f"[_perform_folder_creation_task] Safe company name: {safe_company_name}")
 
             # --- Determine Structure Type and Target Path ---
-            header_structure_type = type(self.structure.get(header))
-            is_flat_structure = (header_structure_type is list)
+            is_flat_structure = self.structure.is_flat(header)
+            structure_parent = None # Template node the new folder is added under (None: folder only)
             parent_path = os.path.join(self.archives_path, safe_company_name, header)
             target_level_description = f"Header '{header}'"
 
@@ -2919,11 +3302,13 @@ class FileArchiveApp:
                         raise ValueError("Subheader must be selected to add a new Section.")
                     parent_path = os.path.join(parent_path, current_subheader)
                     target_level_description = f"Subheader '{current_subheader}'"
+                    structure_parent = (header, current_subheader)
                 elif add_type == "Subsection":
                     if not current_subheader or not current_section:
                         raise ValueError("Subheader and Section must be selected to add a new Subsection.")
                     parent_path = os.path.join(parent_path, current_subheader, current_section)
                     target_level_description = f"Section '{current_section}'"
+                    structure_parent = (header, current_subheader, current_section)
                 else:
                     raise ValueError("Invalid element type selected.")
 
@@ -2942,6 +3327,9 @@ class FileArchiveApp:
             os.makedirs(new_element_path, exist_ok=True)
             logging.info(f"[_perform_folder_creation_task] Admin '{self.current_user['username']}' created/ensured folder: '{new_element_path}'")
 
+            # Record the folder in the structure definition (one transaction, new revision)
+            new_structure = self.structure_store.add(structure_parent, new_name) if structure_parent else None
+
             # --- Success: Queue UI Update ---
             # Prepare data needed for the success callback
             success_info = {
@@ -2951,7 +3339,8 @@ class FileArchiveApp:
                 "add_struct_win": add_struct_win, # Pass references carefully
                 "add_button": add_button,         # Pass references carefully
                 "original_button_text": original_button_text,
-                "parent_path_of_new_folder": parent_path # Pass the actual parent path
+                "parent_path_of_new_folder": parent_path, # Pass the actual parent path
+                "new_structure": new_structure
             }
             # Put the success handling function onto the UI queue
             self.ui_queue.put(lambda info=success_info: self._handle_folder_creation_success(info))
@@ -2998,6 +3387,10 @@ class FileArchiveApp:
             if add_struct_win.winfo_exists():
                  add_struct_win.destroy()
 
+        # Every component switches to the new structure revision
+        if info.get("new_structure") is not None:
+            self.apply_structure(info["new_structure"])
+
         # Clear cache for the parent path where the new folder was added
         if parent_path_of_new_folder and hasattr(self, 'archive_controller'):
             self.archive_controller.clear_cache(path_prefix=parent_path_of_new_folder)
@@ -3052,7 +3445,7 @@ class FileArchiveApp:
 
         # --- Show Loading State Immediately ---
         try:
-            add_button.configure(state="disabled", text=get_translation("configure_text_adding"))
+            self._set_text(add_button, "configure_text_adding", state="disabled")
             self.main_app.update() # Force update
 
             # --- Quick Local Validation ---
@@ -3135,8 +3528,8 @@ class FileArchiveApp:
         add_struct_win.grab_set()
         add_struct_win.attributes("-topmost", True)
 
-        ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_add_new_folder"),
-                     font=("Segoe UI", 18, "bold")).pack(pady=(15, 10))
+        self._tr(ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_add_new_folder"),
+                     font=("Segoe UI", 18, "bold")), "ctklabel_text_add_new_folder").pack(pady=(15, 10))
 
         # (Existing code to display context...)
         context_frame = ctk.CTkFrame(add_struct_win, fg_color="transparent")
@@ -3149,25 +3542,25 @@ class FileArchiveApp:
             ctk.CTkLabel(context_frame, text=f"Section: {section}", font=("Segoe UI", 12)).pack(anchor="w")
 
         # (Existing code for type selection...)
-        ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_1_what_are_you_adding"), font=("Segoe UI", 14)).pack(anchor="w", padx=20, pady=(15, 2))
+        self._tr(ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_1_what_are_you_adding"), font=("Segoe UI", 14)), "ctklabel_text_1_what_are_you_adding").pack(anchor="w", padx=20, pady=(15, 2))
         add_type_var = ctk.StringVar(value="Subsection")
         add_type_frame = ctk.CTkFrame(add_struct_win, fg_color="transparent")
         add_type_frame.pack(pady=(0, 10), padx=20)
-        ctk.CTkRadioButton(add_type_frame, text=get_translation("ctkradiobutton_text_new_section_under_subheader"), variable=add_type_var, value="Section", font=("Segoe UI", 13)).pack(side="left", padx=10)
-        ctk.CTkRadioButton(add_type_frame, text=get_translation("ctkradiobutton_text_new_subsection_under_section"), variable=add_type_var, value="Subsection", font=("Segoe UI", 13)).pack(side="left", padx=10)
+        self._tr(ctk.CTkRadioButton(add_type_frame, text=get_translation("ctkradiobutton_text_new_section_under_subheader"), variable=add_type_var, value="Section", font=("Segoe UI", 13)), "ctkradiobutton_text_new_section_under_subheader").pack(side="left", padx=10)
+        self._tr(ctk.CTkRadioButton(add_type_frame, text=get_translation("ctkradiobutton_text_new_subsection_under_section"), variable=add_type_var, value="Subsection", font=("Segoe UI", 13)), "ctkradiobutton_text_new_subsection_under_section").pack(side="left", padx=10)
 
         # (Existing code for name entry...)
-        ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_2_enter_name_for_new_folder"), font=("Segoe UI", 14)).pack(anchor="w", padx=20, pady=(10, 2))
-        new_element_entry = ctk.CTkEntry(add_struct_win, placeholder_text=get_translation("ctkentry_placeholder_text_eg_b10b_or_newsection"),
-                                         font=("Segoe UI", 13))
+        self._tr(ctk.CTkLabel(add_struct_win, text=get_translation("ctklabel_text_2_enter_name_for_new_folder"), font=("Segoe UI", 14)), "ctklabel_text_2_enter_name_for_new_folder").pack(anchor="w", padx=20, pady=(10, 2))
+        new_element_entry = self._tr(ctk.CTkEntry(add_struct_win, placeholder_text=get_translation("ctkentry_placeholder_text_eg_b10b_or_newsection"),
+                                         font=("Segoe UI", 13)), placeholder_text="ctkentry_placeholder_text_eg_b10b_or_newsection")
         new_element_entry.pack(pady=(0, 15), padx=20, fill="x")
         new_element_entry.focus_set()
 
         # --- Action Button (CORRECTED Command Setting) ---
         # Create the button FIRST
-        add_button = ctk.CTkButton(add_struct_win, text=get_translation("ctkbutton_text_add_folder"),
+        add_button = self._tr(ctk.CTkButton(add_struct_win, text=get_translation("ctkbutton_text_add_folder"),
                                    # Command will be set below using configure
-                                   font=("Segoe UI", 14, "bold"), height=40)
+                                   font=("Segoe UI", 14, "bold"), height=40), "ctkbutton_text_add_folder")
         add_button.pack(pady=(15, 15), padx=20, fill="x")
 
         # NOW configure the command using lambda to pass the button itself
@@ -3178,10 +3571,15 @@ class FileArchiveApp:
             add_button           # Argument 4 <<< THIS WAS MISSING IN THE CALL
         ))
     def scan_and_archive(self):
-        """Scan a document via WIA, prompt user for filename with prefix enforcement, and archive it."""
+        """Scan every page in the feeder (or one flatbed page) via WIA and archive each page with the
+        section prefix and a sequence number. Pressing Scan during a batch offers to stop it."""
         if not WIA_AVAILABLE:
             messagebox.showerror("Scanning Error", "Scanning via WIA is not available.\nPlease ensure 'comtypes' is installed and you are on Windows.", parent=self.main_app)
             return
+        if self.active_scan is not None:
+            if messagebox.askyesno("Scanning", "A scan is in progress. Stop after the current page?", parent=self.main_app):
+                self.active_scan.cancel()
+            return
 
         # --- Get Destination Info ---
         company_name = self.company_entry.get().strip()
@@ -3203,32 +3601,9 @@ class FileArchiveApp:
              logging.error(f"[Scan] Error in create_company_structure: {e}")
              return
 
-        # --- Determine Required Prefix and Destination Path ---
-        required_prefix = ""
-        structure_options = self.structure.get(header, [])
-        dest_path = os.path.join(self.archives_path, safe_company_name, header) # Start building path
-        has_subsections_defined = False
-
-        if isinstance(structure_options, dict): # Nested Header
-            section_dict = structure_options.get(subheader, {})
-            if subheader: dest_path = os.path.join(dest_path, subheader) # Add subheader to path
-
-            if section and section in section_dict:
-                dest_path = os.path.join(dest_path, section) # Add section path
-                subsections_list = section_dict.get(section, [])
-                has_subsections_defined = bool(subsections_list)
-                if subsection and subsection in subsections_list:
-                    required_prefix = subsection
-                    dest_path = os.path.join(dest_path, subsection) # Add subsection path
-                else:
-                    required_prefix = section # Use section prefix if no/invalid subsection
-            elif subheader: # Only subheader selected
-                 required_prefix = subheader
-                 # Path already includes subheader
-
-        elif subheader: # Flat structure, subheader is the final part
-            required_prefix = subheader
-            dest_path = os.path.join(dest_path, subheader) # Add subheader to path
+        # --- Determine Destination Path and Naming Rule ---
+        dest_path = self.archive_controller.folder_for(safe_company_name, header, subheader, section, subsection)
+        naming_rule = self.naming_policy.rule_for(header, subheader, section, subsection)
 
         # Ensure final directory exists (should be redundant, but safe)
         try:
@@ -3238,154 +3613,92 @@ class FileArchiveApp:
             messagebox.showerror("Error", f"Could not create destination folder:\n{dest_path}\nError: {e}", parent=self.main_app)
             return
 
-        logging.info(f"[Scan] Destination: H='{header}', S='{subheader}', Sec='{section}', SubSec='{subsection}'. Path='{dest_path}'. Required prefix: '{required_prefix}'")
-
-        # --- Perform Scan ---
-        self.notification_label.configure(text=get_translation("configure_text_scanning_document_please_wait"))
-        self.main_app.update_idletasks()
-        scanned_image = None
-        try:
-            wia = comtypes.client.CreateObject("WIA.CommonDialog")
-            # ShowAcquireImage can block, consider running in thread if becomes issue
-            scanned_image = wia.ShowAcquireImage()
-            if not scanned_image:
-                 self.notification_label.configure(text=get_translation("configure_text_scan_cancelled_or_failed"))
-                 messagebox.showwarning("Scan Cancelled", "Scan was cancelled or no image was acquired.", parent=self.main_app)
-                 return
+        logging.info(f"[Scan] Destination: H='{header}', S='{subheader}', Sec='{section}', SubSec='{subsection}'. Path='{dest_path}'. Naming: '{naming_rule.describe()}'")
 
-            self.notification_label.configure(text=get_translation("configure_text_scan_complete_please_name_the_file"))
-        except Exception as e:
-            logging.error(f"[Scan] Scanning error: {e}", exc_info=True)
-            self.notification_label.configure(text=get_translation("configure_text_scan_error"))
-            messagebox.showerror("Scan Error", f"Could not scan document: {e}", parent=self.main_app)
-            return
-        finally:
-             # Release COM object if necessary (though comtypes usually handles this)
-             # del wia # Maybe not needed
-             pass
-
-        # --- Naming Loop ---
-        destination_filename = None
-        invalid_filename_chars = r'[\\/:"*?<>|]+' # Regex for invalid characters
-        # Try to get extension from WIA if possible, otherwise default
-        try:
-             # This depends on the scanner/WIA version, might not always work
-             file_ext = "." + scanned_image.FormatID.split('-')[-1].lower() # Heuristic
-             if file_ext not in SUPPORTED_FILE_EXTENSIONS: # Validate guessed extension
-                 file_ext = ".png" # Fallback default
-        except Exception:
-             file_ext = ".png" # Default extension
-
-        while True:
-            prompt_title = "Name Scanned File"
-            prompt_message = f"Enter a name for the scanned document (extension {file_ext} will be added):"
-            base_suggestion = f"scan_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
-
-            if required_prefix:
-                prompt_message = f"Enter name suffix (prefix '{required_prefix}_' will be added automatically):"
-                base_suggestion = f"details_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
-
-            user_input_part = simpledialog.askstring(
-                prompt_title,
-                prompt_message,
-                parent=self.main_app,
-                initialvalue=base_suggestion
-            )
-
-            if user_input_part is None: # User cancelled
-                messagebox.showinfo("Cancelled", "Scan saving cancelled.", parent=self.main_app)
-                self.notification_label.configure(text=get_translation("configure_text_scan_saving_cancelled"))
-                logging.info("[Scan] Saving cancelled by user during naming.")
-                return # Abort saving
+        # --- Scan all pages in a background pipeline; each page is archived as it arrives ---
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        first_sequence = naming_rule.next_sequence(os.listdir(dest_path)) if naming_rule.uses_sequence else 1
 
-            user_input_part = user_input_part.strip().rstrip('.') # Remove trailing dots/spaces
+        def scan_name(name, sequence):
+            return naming_rule.fix(name, sequence) if naming_rule.prefix else f"scan_{name}"
 
-            if not user_input_part:
-                 messagebox.showerror("Invalid Name", "File name part cannot be empty.", parent=self.main_app)
-                 continue # Re-prompt
+        def name_for(page_number, ext):
+            return scan_name(f"{stamp}_{page_number:03d}{ext}", first_sequence + page_number - 1)
 
-            if re.search(invalid_filename_chars, user_input_part):
-                 messagebox.showerror("Invalid Characters", "File name part contains invalid characters (\\ / : * ? \" < > |).", parent=self.main_app)
-                 continue # Re-prompt
+        def page_stored(page_number):
+            self.ui_queue.put(lambda: self.notification_label.configure(
+                text=f"Scanning... {page_number} page(s) done"))
 
-            # Construct the full name
-            if required_prefix:
-                # Ensure only one underscore between prefix and user part
-                destination_filename = f"{required_prefix.rstrip('_')}_{user_input_part}{file_ext}"
-            else:
-                destination_filename = f"{user_input_part}{file_ext}"
+        def file_stored(dest_file):
+            self.record_activity(activity_log.ACTION_SCAN, path=dest_file, username=username)
+            self.ocr_pipeline.submit(dest_file) # Single-page images; PDFs come through page_sink
 
-            logging.info(f"[Scan] User provided name parts, constructed filename: '{destination_filename}'")
-            break # Exit the naming loop
+        def batch_done(pages, error):
+            self.ui_queue.put(lambda: self.on_scan_batch_done(pages, error, dest_path))
 
-        # --- Proceed with Saving ---
+        username = self.current_user["username"] if self.current_user else None
         try:
-            # Final destination file path
-            dest_file = os.path.join(dest_path, destination_filename)
-            logging.debug(f"[Scan] Final destination file path: {dest_file}")
-
-            # Handle existing files and backup (using the destination filename)
-            if os.path.exists(dest_file):
-                timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                base, ext = os.path.splitext(destination_filename)
-                backup_name = f"{base}_backup_{timestamp}{ext}"
-                backup_path = os.path.join(dest_path, backup_name)
-                try:
-                    count = 0
-                    while os.path.exists(backup_path): # Handle collision
-                         count += 1
-                         backup_name = f"{base}_backup_{timestamp}_{count}{ext}"
-                         backup_path = os.path.join(dest_path, backup_name)
-                    os.rename(dest_file, backup_path)
-                    logging.info(f"[Scan] Existing scan file versioned: {dest_file} -> {backup_path}")
-                except (PermissionError, FileNotFoundError, OSError) as e:
-                    logging.error(f"[Scan] Error versioning existing scan file {dest_file}: {e}")
-                    messagebox.showerror("Save Error", f"Error replacing existing file '{destination_filename}': {e}", parent=self.main_app)
-                    return # Stop saving
-
-            # Save the scanned image using the determined destination file path
-            scanned_image.SaveFile(dest_file)
-            logging.info(f"[Scan] Scanned file saved successfully: {dest_file}")
-
-            self.notification_label.configure(text=get_translation("configure_text_scan_saved_successfully"))
-            messagebox.showinfo("Scan Saved", f"Document scanned and saved as:\n'{destination_filename}'\nin folder:\n'{os.path.basename(dest_path)}'", parent=self.main_app) # Show folder name for clarity
-
+            self.active_scan = ScanBatch(self.archive_controller, dest_path, name_for,
+                                         pdf_name=scan_name(f"{stamp}.pdf", first_sequence) if self.scan_to_pdf_var.get() else None,
+                                         on_page=page_stored, on_file=file_stored, on_done=batch_done,
+                                         page_sink=self.ocr_pipeline.submit_pages).start()
         except Exception as e:
-            messagebox.showerror("Save Error", f"Failed to save scanned file '{destination_filename}':\n{str(e)}", parent=self.main_app)
-            logging.error(f"[Scan] Error saving scan to {dest_path}/{destination_filename}: {str(e)}", exc_info=True)
-            self.notification_label.configure(text=get_translation("configure_text_scan_saving_failed"))
+            logging.error(f"[Scan] Could not start scanning: {e}", exc_info=True)
+            self._set_text(self.notification_label, "configure_text_scan_error")
+            messagebox.showerror("Scan Error", f"Could not scan document: {e}", parent=self.main_app)
+            return
+        self._set_text(self.notification_label, "configure_text_scanning_document_please_wait")
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start()
+
+    def on_scan_batch_done(self, pages, error, dest_path):
+        """Runs on the Tk thread when a ScanBatch has stored its last page."""
+        self.active_scan = None
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode="determinate")
+        self.progress_bar.set(0)
+        if error and not pages:
+            self._set_text(self.notification_label, "configure_text_scan_error")
+            messagebox.showerror("Scan Error", f"Could not scan document: {error}", parent=self.main_app)
+            return
+        self._set_text(self.notification_label, "configure_text_scan_saved_successfully")
+        message = f"{pages} page(s) scanned and saved in folder:\n'{os.path.basename(dest_path)}'"
+        if error:
+            messagebox.showwarning("Scan Incomplete", f"{message}\n\nScanning stopped early: {error}", parent=self.main_app)
+        else:
+            messagebox.showinfo("Scan Saved", message, parent=self.main_app)
 
     
     def on_drop_enter(self, event):
         """Handle file drag enter event - highlights the drop zone"""
         self.dropzone_frame.configure(border_color=["#1A6CD6", "#2D7FF9"])
-        self.dropzone_label.configure(text=get_translation("configure_text_release_to_upload"))
+        self._set_text(self.dropzone_label, "configure_text_release_to_upload")
 
     def on_drop_leave(self, event):
         """Handle file drag leave event - restores the drop zone"""
         self.dropzone_frame.configure(border_color=self.dropzone_original_color)
-        self.dropzone_label.configure(text=get_translation("configure_text_drag_drop_files_here"))
+        self._set_text(self.dropzone_label, "configure_text_drag_drop_files_here")
 
     def on_drop(self, event):
-        """Handle file drop event - processes dropped files"""
+        """Handle file drop event - processes dropped files and folders"""
         # Return to normal appearance
         self.dropzone_frame.configure(border_color=self.dropzone_original_color)
-        self.dropzone_label.configure(text=get_translation("configure_text_drag_drop_files_here"))
+        self._set_text(self.dropzone_label, "configure_text_drag_drop_files_here")
 
         # Get the dropped file paths
         file_paths = self.parse_drop_data(event.data)
 
-        # Filter for supported files
-        valid_files = [f for f in file_paths if self.is_valid_supported_file(f)]
+        # Keep folders (walked later, in the background) and supported files
+        valid_paths = [f for f in file_paths if os.path.isdir(f) or self.is_valid_supported_file(f)]
 
-        # Check if any valid files were dropped
-        if not valid_files:
+        # Check if anything usable was dropped
+        if not valid_paths:
             supported_extensions_str = ", ".join([ext.upper().replace('.', '') for ext in SUPPORTED_FILE_EXTENSIONS])
-            messagebox.showerror("Invalid Files", f"Please drop only supported files ({supported_extensions_str})")
+            messagebox.showerror("Invalid Files", f"Please drop only folders or supported files ({supported_extensions_str})")
             return
 
-        # Process the valid files
-        self.process_dropped_files(valid_files)
+        # Process the valid files and folders
+        self.process_dropped_files(valid_paths)
 
     def parse_drop_data(self, data):
         """Parse the dropped file data into usable file paths"""
@@ -3397,7 +3710,6 @@ class FileArchiveApp:
             # Example: {C:/path/with spaces/file.txt} {C:/another/file.txt}
             if data.startswith("{") and "}" in data:
                 # Extract paths between curly braces
-                import re
                 files = re.findall(r'{([^}]*)}', data)
             else:
                 # If no curly braces, it might be a single file without spaces
@@ -3419,7 +3731,18 @@ class FileArchiveApp:
         return ext.lower() in SUPPORTED_FILE_EXTENSIONS
 
     def process_dropped_files(self, file_paths):
-        """Process multiple dropped files with naming convention check (Strict Rejection)."""
+        """
+        Uploads dropped files and the supported files inside dropped folders, with the
+        naming convention check (Strict Rejection). Folders are walked lazily and files
+        are copied by a bounded IngestPipeline, so large folders neither stall the UI nor
+        queue thousands of tasks at once. Files from subfolders all go to the selected folder.
+        Dropping again while a drop is being stored offers to stop it.
+        """
+        if self.active_drop is not None:
+            if messagebox.askyesno("Drop", "Dropped files are still being stored. Stop after the files being copied?",
+                                   parent=self.main_app):
+                self.active_drop.cancel()
+            return
         company_name = self.company_entry.get().strip()
         if not company_name:
             messagebox.showerror("Error", "Please enter a company name before dropping files.", parent=self.main_app)
@@ -3430,6 +3753,7 @@ class FileArchiveApp:
         subheader = self.subheader_var.get()
         section = self.section_var.get()
         subsection = self.subsection_var.get() # Get subsection from main UI state
+        naming_rule = self.naming_policy.rule_for(header, subheader, section, subsection)
 
         # Pre-create company structure once
         try:
@@ -3439,96 +3763,39 @@ class FileArchiveApp:
              logging.error(f"[Drop] Error creating structure before drop: {e}")
              return
 
-        total_files = len(file_paths)
-        processed_count = 0
-        success_count = 0
-        naming_failures = [] # Files rejected due to naming
-        other_errors = []
-        lock = threading.Lock() # Use lock for shared counters/lists
-
         self.progress_bar.set(0)
-        self.notification_label.configure(text=f"Processing {total_files} dropped files...")
-        self.main_app.update_idletasks()
+        self.notification_label.configure(text=f"Processing {len(file_paths)} dropped item(s)...")
 
         def drop_task(fp):
-            nonlocal processed_count, success_count
-            task_success = False
-            error_info = None
-            intended_drop_filename = os.path.basename(fp) # Start with original
-
-            try:
-                # --- Determine required prefix (same logic) ---
-                required_prefix = ""
-                structure_options_drop = self.structure.get(header, [])
-                # ... (logic to determine required_prefix based on header, subheader, section, subsection) ...
-                if isinstance(structure_options_drop, dict): # Nested Header
-                    section_dict_drop = structure_options_drop.get(subheader, {})
-                    if section and section in section_dict_drop:
-                        subsections_list_drop = section_dict_drop.get(section, [])
-                        if subsection and subsection in subsections_list_drop:
-                             required_prefix = subsection
-                        else:
-                            required_prefix = section
-                    elif subheader:
-                        required_prefix = subheader
-                elif subheader: # Flat structure
-                     required_prefix = subheader
-
-
-                # --- Check naming for drop (NO auto-rename) ---
-                needs_rename_drop = False
-                if required_prefix:
-                    if not intended_drop_filename.startswith(required_prefix + "_") and not intended_drop_filename.startswith(required_prefix):
-                         needs_rename_drop = True
-
-                if needs_rename_drop:
-                    # Strict check for Drag & Drop - add to failures and return
-                    logging.warning(f"[Drop Task] Rejecting {fp}: Prefix mismatch ('{required_prefix}' needed).")
-                    with lock:
-                        naming_failures.append(os.path.basename(fp))
-                    return # Exit this task
-
-                # --- Call perform_file_upload with the determined final name (which is original here) ---
-                result = self.perform_file_upload(
-                    company_name, header, subheader, section, subsection, # Structure
-                    fp,                      # Source path
-                    intended_drop_filename   # Final name (original, as rename check passed)
-                )
-                task_success = result # True or raises Exception
-
-            except Exception as e:
-                 error_info = f"{os.path.basename(fp)}: {e}"
-                 logging.error(f"[Drop Task] Error during upload for {fp}: {e}", exc_info=True)
-                 with lock:
-                     other_errors.append(error_info)
-            finally:
-                # --- (Update counters and UI as before) ---
-                with lock:
-                    processed_count += 1
-                    if task_success:
-                        success_count += 1
-                # Update progress via queue
-                progress = processed_count / total_files
-                status_msg = f"Processing drop {processed_count}/{total_files}..."
-                self.ui_queue.put(lambda p=progress, msg=status_msg: (
-                    self.progress_bar.set(p),
-                    self.notification_label.configure(text=msg)
-                ))
-
-        # Submit drop tasks
-        futures = [self.executor.submit(drop_task, fp) for fp in file_paths]
-
-        # Monitor completion (similar to batch upload)
-        def check_drop_completion():
-            all_done = all(f.done() for f in futures)
-            if all_done:
-                logging.info(f"[Drop] All {total_files} tasks completed. Success: {success_count}, Naming Rejected: {len(naming_failures)}, Errors: {len(other_errors)}")
-                # Schedule the final report via UI queue
-                self.ui_queue.put(lambda: self.report_batch_results(total_files, success_count, naming_failures, other_errors)) # Reuse report function
-            else:
-                self.main_app.after(200, check_drop_completion)
-
-        self.main_app.after(200, check_drop_completion)
+            """Runs on an ingest worker; returns INGEST_STORED or INGEST_REJECTED, raises on error."""
+            intended_drop_filename = os.path.basename(fp) # Original name, no auto-rename for drops
+            if not naming_rule.matches(intended_drop_filename):
+                logging.warning(f"[Drop Task] Rejecting {fp}: Naming mismatch ('{naming_rule.describe()}' needed).")
+                return INGEST_REJECTED
+            self.perform_file_upload(company_name, header, subheader, section, subsection,
+                                     fp, intended_drop_filename)
+            return INGEST_STORED
+
+        def on_progress(finished, found, walking):
+            progress = finished / found if found else 0
+            more = " (still searching folders)" if walking else ""
+            status_msg = f"Processing drop {finished}/{found}{more}..."
+            self.ui_queue.put(lambda p=progress, msg=status_msg: (
+                self.progress_bar.set(p),
+                self.notification_label.configure(text=msg)
+            ))
+
+        def on_done(result):
+            if result["skipped"]:
+                logging.info(f"[Drop] {result['skipped']} unsupported file(s) in dropped folders were skipped.")
+            def report():
+                self.active_drop = None
+                self.report_batch_results(result["found"], result["stored"], result["rejected"],
+                                          result["errors"]) # Reuse report function
+            self.ui_queue.put(report)
+
+        self.active_drop = IngestPipeline(file_paths, self.is_valid_supported_file, drop_task,
+                                          on_progress=on_progress, on_done=on_done).start()
     # --------------------------------------------------------------------------
     # Company Structure & File Upload
     # --------------------------------------------------------------------------
@@ -3569,55 +3836,29 @@ class FileArchiveApp:
         )
 
         if not file_path:
-            self.notification_label.configure(text=get_translation("configure_text_file_selection_cancelled"))
+            self._set_text(self.notification_label, "configure_text_file_selection_cancelled")
             return
 
         original_filename = os.path.basename(file_path)
         destination_filename = original_filename # Start with the original name
 
-        # --- Determine Required Prefix (same logic as perform_file_upload) ---
-        required_prefix = ""
-        structure_options = self.structure.get(header, [])
-        has_subsections_defined = False
-
-        if isinstance(structure_options, dict): # Nested Header
-            section_dict = structure_options.get(subheader, {})
-            if section and section in section_dict:
-                subsections_list = section_dict.get(section, [])
-                has_subsections_defined = bool(subsections_list)
-                if subsection and subsection in subsections_list:
-                     required_prefix = subsection
-                else:
-                    required_prefix = section
-            elif subheader:
-                required_prefix = subheader
-        elif subheader: # Flat structure
-             required_prefix = subheader
+        # --- Check the folder's naming rule (controllers/naming_policy.py) ---
+        dest_folder = self.archive_controller.folder_for(safe_company_name, header, subheader, section, subsection)
+        naming_rule = self.naming_policy.rule_for(header, subheader, section, subsection)
+        existing_names = os.listdir(dest_folder) if naming_rule.uses_sequence and os.path.isdir(dest_folder) else ()
+        review = self.naming_policy.review([original_filename], header, subheader, section, subsection, existing_names)
+        required_form = naming_rule.describe()
 
-        logging.info(f"[UploadSingle] Prefix Check: H='{header}', S='{subheader}', Sec='{section}', SubSec='{subsection}'. Required: '{required_prefix}' for '{original_filename}'")
+        logging.info(f"[UploadSingle] Naming Check: H='{header}', S='{subheader}', Sec='{section}', SubSec='{subsection}'. Required: '{required_form}' for '{original_filename}'")
 
         # --- Enforce Naming Convention Interactively ---
-        # Check if prefix exists and if filename *doesn't* start with prefix + "_"
-        # Or if it doesn't start exactly with the prefix (for cases like 'c1')
-        needs_rename = False
-        if required_prefix:
-             if not original_filename.startswith(required_prefix + "_") and not original_filename.startswith(required_prefix):
-                  needs_rename = True
-             elif original_filename.startswith(required_prefix + "_"):
-                  logging.debug(f"[UploadSingle] File '{original_filename}' already has correct prefix '{required_prefix}_'.")
-             elif original_filename.startswith(required_prefix) and not original_filename.startswith(required_prefix + "_"):
-                  # This case might be okay if prefix is standalone like 'c1'.
-                  # Or you might want to enforce 'c1_...' ? Let's allow exact match for now.
-                  logging.debug(f"[UploadSingle] File '{original_filename}' starts exactly with prefix '{required_prefix}'. Allowing.")
-
-
-        if needs_rename:
-            logging.warning(f"[UploadSingle] File '{original_filename}' needs prefix '{required_prefix}'. Prompting user.")
-
-            proposed_name = f"{required_prefix}_{original_filename}"
+        if not review.valid[0]:
+            logging.warning(f"[UploadSingle] File '{original_filename}' does not follow '{required_form}'. Prompting user.")
+
+            proposed_name = review.fixed[0]
             confirm_auto = messagebox.askyesno(
                 "Automatic Rename?",
-                f"File name '{original_filename}' should start with '{required_prefix}_'.\n\n"
+                f"File name '{original_filename}' should follow '{required_form}'.\n\n"
                 f"Automatically rename it to:\n'{proposed_name}'?",
                 parent=self.main_app
             )
@@ -3631,16 +3872,16 @@ class FileArchiveApp:
                     new_name_suggestion = proposed_name
                     new_name = simpledialog.askstring(
                         "Manual Rename Required",
-                        f"File name must start with '{required_prefix}_'.\n"
+                        f"File name must follow '{required_form}'.\n"
                         f"Current name: '{original_filename}'\n\n"
-                        f"Enter the new name (must start with '{required_prefix}_'):",
+                        f"Enter the new name (must follow '{required_form}'):",
                         parent=self.main_app,
                         initialvalue=new_name_suggestion
                     )
 
                     if new_name is None: # User pressed Cancel
                         messagebox.showinfo("Cancelled", "Upload cancelled during manual renaming.", parent=self.main_app)
-                        self.notification_label.configure(text=get_translation("configure_text_upload_cancelled"))
+                        self._set_text(self.notification_label, "configure_text_upload_cancelled")
                         logging.info("[UploadSingle] Upload cancelled by user during manual rename.")
                         return # Abort upload
 
@@ -3648,8 +3889,8 @@ class FileArchiveApp:
                     if not new_name:
                          messagebox.showerror("Invalid Name", "New file name cannot be empty.", parent=self.main_app)
                          continue # Re-prompt manual loop
-                    if not new_name.startswith(required_prefix + "_"):
-                        messagebox.showerror("Invalid Prefix", f"The new name MUST start with '{required_prefix}_'.", parent=self.main_app)
+                    if not naming_rule.matches(new_name):
+                        messagebox.showerror("Invalid Name", f"The new name MUST follow '{required_form}'.", parent=self.main_app)
                         continue # Re-prompt manual loop
 
                     # Valid manual name entered
@@ -3672,22 +3913,7 @@ class FileArchiveApp:
             # --- END MODIFIED CALL ---
 
             if success: # perform_file_upload now only returns True or raises Exception
-                # Recalculate final path for display message (as before)
-                final_dest_path = os.path.join(self.archives_path, safe_company_name, header)
-                # ... (rest of path calculation logic for message box) ...
-                structure_options_disp = self.structure.get(header, [])
-                has_subsections_defined_disp = False
-                if isinstance(structure_options_disp, dict):
-                    if subheader: final_dest_path = os.path.join(final_dest_path, subheader)
-                    section_dict_disp = structure_options_disp.get(subheader, {})
-                    if section:
-                        final_dest_path = os.path.join(final_dest_path, section)
-                        subsections_list_disp = section_dict_disp.get(section, [])
-                        has_subsections_defined_disp = bool(subsections_list_disp)
-                        if subsection and has_subsections_defined_disp:
-                             final_dest_path = os.path.join(final_dest_path, subsection)
-                elif subheader:
-                    final_dest_path = os.path.join(final_dest_path, subheader)
+                final_dest_path = dest_folder
 
                 self.notification_label.configure(text=f"Uploaded: {destination_filename}")
                 messagebox.showinfo("Success", f"File uploaded successfully as:\n'{destination_filename}'\nto:\n{final_dest_path}", parent=self.main_app)
@@ -3707,7 +3933,7 @@ class FileArchiveApp:
                  err_msg = f"An unexpected error occurred during upload:\n{str(e)}"
 
             messagebox.showerror("Upload Error", err_msg, parent=self.main_app)
-            self.notification_label.configure(text=get_translation("configure_text_upload_failed"))
+            self._set_text(self.notification_label, "configure_text_upload_failed")
 
     def batch_upload(self):
         """Handles batch file upload with pre-check for naming and optional auto-rename."""
@@ -3737,50 +3963,27 @@ class FileArchiveApp:
             filetypes=[("Supported Files", " ".join([f"*{ext}" for ext in SUPPORTED_FILE_EXTENSIONS]))]
         )
         if not file_paths:
-            self.notification_label.configure(text=get_translation("configure_text_batch_upload_cancelled"))
+            self._set_text(self.notification_label, "configure_text_batch_upload_cancelled")
             return
 
+        # Several page images (e.g. scanned elsewhere) can be archived as one compressed PDF
+        if len(file_paths) > 1 and all(os.path.splitext(fp)[1].lower() in IMAGE_EXTENSIONS for fp in file_paths):
+            if messagebox.askyesno("Batch Upload", f"Combine the {len(file_paths)} selected images into one PDF "
+                                   "(in the order selected)?", parent=self.main_app):
+                self.upload_images_as_pdf(company_name, header, subheader, section, subsection, file_paths)
+                return
+
         total_files = len(file_paths)
-        files_needing_rename = []
-        determined_prefix = "" # Store the prefix determined during the check
 
-        # --- Pre-check for Naming Convention ---
+        # --- Pre-check for Naming Convention (whole batch in one pass) ---
         logging.info(f"[Batch] Starting pre-check for {total_files} files...")
-        structure_options = self.structure.get(header, []) # Get structure once
-
-        for fp in file_paths:
-            original_filename = os.path.basename(fp)
-
-            # Determine required prefix (same logic as perform_file_upload)
-            required_prefix = ""
-            has_subsections_defined = False
-            if isinstance(structure_options, dict): # Nested Header
-                section_dict = structure_options.get(subheader, {})
-                if section and section in section_dict:
-                    subsections_list = section_dict.get(section, [])
-                    has_subsections_defined = bool(subsections_list)
-                    if subsection and subsection in subsections_list:
-                         required_prefix = subsection
-                    else:
-                        required_prefix = section
-                elif subheader:
-                    required_prefix = subheader
-            elif subheader: # Flat structure
-                 required_prefix = subheader
-
-            if not determined_prefix and required_prefix: # Store first determined prefix
-                determined_prefix = required_prefix
-
-            # Check naming convention (Prefix_ or exact Prefix)
-            needs_rename = False
-            if required_prefix:
-                if not original_filename.startswith(required_prefix + "_") and not original_filename.startswith(required_prefix):
-                     needs_rename = True
-
-            if needs_rename:
-                files_needing_rename.append(original_filename)
-                logging.debug(f"[Batch PreCheck] File '{original_filename}' needs prefix '{required_prefix}'.")
-
+        dest_folder = self.archive_controller.folder_for(safe_company_name, header, subheader, section, subsection)
+        naming_rule = self.naming_policy.rule_for(header, subheader, section, subsection)
+        existing_names = os.listdir(dest_folder) if naming_rule.uses_sequence and os.path.isdir(dest_folder) else ()
+        review = self.naming_policy.review([os.path.basename(fp) for fp in file_paths],
+                                           header, subheader, section, subsection, existing_names)
+        files_needing_rename = review.invalid_names
+        required_form = naming_rule.describe()
 
         # --- Ask for Confirmation if Renaming is Needed ---
         auto_rename_confirmed = False # Default to false (skip misnamed files)
@@ -3789,8 +3992,8 @@ class FileArchiveApp:
             # Use askyesnocancel: Yes=Rename, No=Skip, Cancel=Abort
             response = messagebox.askyesnocancel(
                 "Batch Rename Confirmation",
-                f"{num_to_rename} selected file(s) do not start with the required prefix ('{determined_prefix}').\n\n"
-                f"- YES: Automatically rename these {num_to_rename} file(s) with the prefix and upload.\n"
+                f"{num_to_rename} selected file(s) do not follow the required naming ('{required_form}').\n\n"
+                f"- YES: Automatically rename these {num_to_rename} file(s) to the required naming and upload.\n"
                 f"- NO: Upload only files that already have the correct name (SKIP the {num_to_rename}).\n"
                 f"- CANCEL: Abort the entire batch upload.",
                 icon='warning', # Add an icon
@@ -3805,7 +4008,7 @@ class FileArchiveApp:
                 logging.info("[Batch] User declined automatic renaming. Incorrectly named files will be skipped.")
             else: # User clicked Cancel (response is None)
                 messagebox.showinfo("Batch Cancelled", "Batch upload cancelled by user.", parent=self.main_app)
-                self.notification_label.configure(text=get_translation("configure_text_batch_upload_cancelled"))
+                self._set_text(self.notification_label, "configure_text_batch_upload_cancelled")
                 logging.info("[Batch] Upload cancelled by user during rename confirmation.")
                 return # Abort the batch operation
 
@@ -3821,48 +4024,24 @@ class FileArchiveApp:
         other_errors = []
         lock = threading.Lock()
 
-        def upload_task(fp):
+        final_names = review.final_names(auto_rename_confirmed)
+
+        def upload_task(fp, final_name):
             nonlocal processed_count, success_count
             task_success = False
             error_info = None
-            intended_batch_filename = os.path.basename(fp) # Start with original
+            intended_batch_filename = final_name or os.path.basename(fp)
 
             try:
-                # --- Determine required prefix (same logic as before) ---
-                required_prefix = ""
-                structure_options_task = self.structure.get(header, [])
-                # ... (logic to determine required_prefix based on header, subheader, section, subsection) ...
-                if isinstance(structure_options_task, dict): # Nested Header
-                    section_dict_task = structure_options_task.get(subheader, {})
-                    if section and section in section_dict_task:
-                        subsections_list_task = section_dict_task.get(section, [])
-                        # has_subsections_defined_task = bool(subsections_list_task) # Not strictly needed here
-                        if subsection and subsection in subsections_list_task:
-                             required_prefix = subsection
-                        else:
-                            required_prefix = section
-                    elif subheader:
-                        required_prefix = subheader
-                elif subheader: # Flat structure
-                     required_prefix = subheader
-
-                # --- Determine final filename based on auto_rename_confirmed ---
-                needs_rename_batch = False
-                if required_prefix:
-                    if not intended_batch_filename.startswith(required_prefix + "_") and not intended_batch_filename.startswith(required_prefix):
-                         needs_rename_batch = True
-
-                if needs_rename_batch:
-                    if auto_rename_confirmed: # Flag set based on user dialog earlier
-                        intended_batch_filename = f"{required_prefix}_{intended_batch_filename}"
-                        logging.info(f"[Batch Task] Auto-renaming to: {intended_batch_filename}")
-                    else:
-                        # Skip this file - add to naming failures and return
-                        logging.warning(f"[Batch Task] Skipping {fp}: Prefix mismatch and auto-rename declined.")
-                        with lock:
-                            naming_failures.append(os.path.basename(fp))
-                        # Explicitly return here to skip calling perform_file_upload for this file
-                        return # Exit this task for this file
+                if final_name is None:
+                    # Skip this file - add to naming failures and return
+                    logging.warning(f"[Batch Task] Skipping {fp}: Naming mismatch and auto-rename declined.")
+                    with lock:
+                        naming_failures.append(os.path.basename(fp))
+                    # Explicitly return here to skip calling perform_file_upload for this file
+                    return # Exit this task for this file
+                if final_name != os.path.basename(fp):
+                    logging.info(f"[Batch Task] Auto-renaming to: {final_name}")
 
                 # --- Call perform_file_upload with the determined final name ---
                 result = self.perform_file_upload(
@@ -3893,7 +4072,7 @@ class FileArchiveApp:
                 ))
         # --- END OF UPLOAD TASK ---
         # Submit tasks to the shared executor
-        futures = [self.executor.submit(upload_task, fp) for fp in file_paths]
+        futures = [self.executor.submit(upload_task, fp, name) for fp, name in zip(file_paths, final_names)]
 
         # Monitor completion using 'after' to avoid blocking UI
         def check_completion():
@@ -3917,6 +4096,40 @@ class FileArchiveApp:
         self.main_app.after(200, check_completion)
 
 
+    def upload_images_as_pdf(self, company_name, header, subheader, section, subsection, image_paths):
+        """Assembles image_paths into one compressed PDF in the background and uploads it."""
+        naming_rule = self.naming_policy.rule_for(header, subheader, section, subsection)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        pdf_name = naming_rule.fix(f"{stamp}.pdf") if naming_rule.prefix else f"document_{stamp}.pdf"
+        self.notification_label.configure(text=f"Combining {len(image_paths)} images into {pdf_name}...")
+        self.progress_bar.configure(mode="indeterminate")
+        self.progress_bar.start()
+
+        def finish(error=None):
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate")
+            self.progress_bar.set(0)
+            if error:
+                self.notification_label.configure(text="PDF upload failed.")
+                messagebox.showerror("Batch Upload", f"Could not create the PDF:\n{error}", parent=self.main_app)
+            else:
+                self.notification_label.configure(text=f"Uploaded {pdf_name} ({len(image_paths)} pages).")
+
+        def worker():
+            temp_dir = tempfile.mkdtemp(prefix="archive_pdf_")
+            try:
+                temp_pdf = os.path.join(temp_dir, pdf_name)
+                assemble_pdf(image_paths, temp_pdf)
+                self.perform_file_upload(company_name, header, subheader, section, subsection, temp_pdf, pdf_name)
+                self.ui_queue.put(finish)
+            except Exception as e:
+                logging.error(f"[Batch] Combining images into {pdf_name} failed: {e}", exc_info=True)
+                self.ui_queue.put(lambda e=e: finish(error=e))
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.executor.submit(worker)
+
     def report_batch_results(self, total, success, naming_fails, other_errs):
         """Updates UI after batch upload completion."""
         message_lines = [f"Batch Upload Report ({success}/{total} successful):"]
@@ -3955,7 +4168,7 @@ class FileArchiveApp:
         # Reset progress bar after a delay
         self.main_app.after(5000, lambda: self.progress_bar.set(0)) # Longer delay
         # Optionally, reset status bar text after even longer
-        self.main_app.after(10000, lambda: self.notification_label.configure(text=get_translation("configure_text_ready")))
+        self.main_app.after(10000, lambda: self._set_text(self.notification_label, "configure_text_ready"))
 
     # --------------------------------------------------------------------------
     # Dashboard and Search Functionality
@@ -3979,7 +4192,7 @@ class FileArchiveApp:
                                     command=lambda p=full_path: self.open_path(p), font=("Segoe UI", 12))
                 btn.pack(pady=2, fill="x", padx=5)
         else:
-            ctk.CTkLabel(self.results_frame, text=get_translation("ctklabel_text_no_results_found"), font=("Segoe UI", 12)).pack(pady=5)
+            self._tr(ctk.CTkLabel(self.results_frame, text=get_translation("ctklabel_text_no_results_found"), font=("Segoe UI", 12)), "ctklabel_text_no_results_found").pack(pady=5)
     # --- In search_archive method (replace its inner function perform_search) ---
     def search_archive(self):
         """Search the archive with enhanced UI—run heavy scanning off the UI thread."""
@@ -4005,24 +4218,10 @@ class FileArchiveApp:
                 self.ui_queue.put(lambda: messagebox.showerror("Error", "End date format should be YYYY-MM-DD"))
                 return
 
-            results = []
-            for root, dirs, files in os.walk(self.archives_path):
-                for name in dirs + files:
-                    if query in name.lower():
-                        full_path = os.path.join(root, name)
-                        if file_type_filter != "All" and os.path.isfile(full_path):
-                            ext = os.path.splitext(name)[1].lower()
-                            if file_type_filter == "Images" and ext not in SUPPORTED_FILE_EXTENSIONS:
-                                continue
-                        try:
-                            mod_time = datetime.datetime.fromtimestamp(os.stat(full_path).st_mtime)
-                        except Exception:
-                            mod_time = None
-                        if start_date and mod_time and mod_time < start_date:
-                            continue
-                        if end_date and mod_time and mod_time > end_date:
-                            continue
-                        results.append((full_path, name, mod_time))
+            text_matches = self.archive_index.search_ocr_text(query) if query else []
+            results = self.archive_controller.search(query, file_type_filter, start_date, end_date,
+                                                     extensions=SUPPORTED_FILE_EXTENSIONS,
+                                                     text_matches=text_matches)
             self.ui_queue.put(lambda: self.update_search_results(results))
             logging.info(f"Search for '{query}' returned {len(results)} results.")
 
@@ -4036,23 +4235,23 @@ class FileArchiveApp:
             self.center_window(search_win, 700, 600)
             search_win.grab_set()
 
-            ctk.CTkLabel(search_win, text=get_translation("ctklabel_text_search_archive"), font=("Segoe UI", 18, "bold")).pack(pady=10)
+            self._tr(ctk.CTkLabel(search_win, text=get_translation("ctklabel_text_search_archive"), font=("Segoe UI", 18, "bold")), "ctklabel_text_search_archive").pack(pady=10)
             search_frame = ctk.CTkFrame(search_win)
             search_frame.pack(pady=5, padx=5, fill="x")
-            ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_search_query"), font=("Segoe UI", 14)).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-            self.search_entry = ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_search_term"), width=200, font=("Segoe UI", 14))
+            self._tr(ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_search_query"), font=("Segoe UI", 14)), "ctklabel_text_search_query").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+            self.search_entry = self._tr(ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_enter_search_term"), width=200, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_enter_search_term")
             self.search_entry.grid(row=0, column=1, padx=5, pady=5)
-            ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_file_type"), font=("Segoe UI", 14)).grid(row=1, column=0, padx=5, pady=5, sticky="w")
+            self._tr(ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_file_type"), font=("Segoe UI", 14)), "ctklabel_text_file_type").grid(row=1, column=0, padx=5, pady=5, sticky="w")
             self.file_type_var = ctk.StringVar(value="All")
             file_type_menu = ctk.CTkOptionMenu(search_frame, variable=self.file_type_var, values=["All", "Images"], font=("Segoe UI", 14))
             file_type_menu.grid(row=1, column=1, padx=5, pady=5)
-            ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_start_date_yyyymmdd"), font=("Segoe UI", 14)).grid(row=2, column=0, padx=5, pady=5, sticky="w")
-            self.start_date_entry = ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_yyyymmdd"), width=200, font=("Segoe UI", 14))
+            self._tr(ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_start_date_yyyymmdd"), font=("Segoe UI", 14)), "ctklabel_text_start_date_yyyymmdd").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+            self.start_date_entry = self._tr(ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_yyyymmdd"), width=200, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_yyyymmdd")
             self.start_date_entry.grid(row=2, column=1, padx=5, pady=5)
-            ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_end_date_yyyymmdd"), font=("Segoe UI", 14)).grid(row=3, column=0, padx=5, pady=5, sticky="w")
-            self.end_date_entry = ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_yyyymmdd"), width=200, font=("Segoe UI", 14))
+            self._tr(ctk.CTkLabel(search_frame, text=get_translation("ctklabel_text_end_date_yyyymmdd"), font=("Segoe UI", 14)), "ctklabel_text_end_date_yyyymmdd").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+            self.end_date_entry = self._tr(ctk.CTkEntry(search_frame, placeholder_text=get_translation("ctkentry_placeholder_text_yyyymmdd"), width=200, font=("Segoe UI", 14)), placeholder_text="ctkentry_placeholder_text_yyyymmdd")
             self.end_date_entry.grid(row=3, column=1, padx=5, pady=5)
-            ctk.CTkButton(search_frame, text=get_translation("ctkbutton_text_search"), command=perform_search, font=("Segoe UI", 14)).grid(row=4, column=0, columnspan=2, pady=10)
+            self._tr(ctk.CTkButton(search_frame, text=get_translation("ctkbutton_text_search"), command=perform_search, font=("Segoe UI", 14)), "ctkbutton_text_search").grid(row=4, column=0, columnspan=2, pady=10)
             self.results_frame = ctk.CTkScrollableFrame(search_win, width=680, height=350)
             self.results_frame.pack(pady=10, padx=10)
         open_search_window()
@@ -4081,9 +4280,13 @@ class FileArchiveApp:
 
         # Log the logout
         logging.info(f"User '{self.current_user['username']}' logged out")
+        self.record_activity(activity_log.ACTION_LOGOUT)
 
-        # Clear current user
+        # Clear current user. The session itself is kept until it idles out, so logging
+        # back in (or switching back to this user) skips the PBKDF2 derivation.
         self.current_user = None
+        self.session_token = None
+        self.locked_username = None
 
         # Hide the main window
         self.main_app.withdraw()
@@ -4096,86 +4299,14 @@ class FileArchiveApp:
     # --------------------------------------------------------------------------
     def sanitize_path(self, text):
         """Sanitize text for use in file paths, preserving Unicode characters"""
-        # Replace filesystem-unsafe characters with safe ones
-        invalid_chars = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
-        for char in invalid_chars:
-            text = text.replace(char, '_')
-
-        # Ensure the path is valid for the current OS
-        if platform.system() == 'Windows':
-            # Handle Windows-specific path limitations (260 char path limit, trailing spaces/dots)
-            text = text.rstrip('. ')
-            # Prefix long paths with \\?\ on Windows to handle paths > 260 chars
-            # (only needed for very long paths, but good practice)
-            if len(text) > 200:  # Conservative threshold
-                return f"\\\\?\\{text}"
-
-        return text
+        return sanitize_path(text)
+
     def create_company_structure(self, company_name):
         """Create folder structure for a company with Unicode support, including subsections."""
         try:
-            safe_company_name = self.sanitize_path(company_name)
+            safe_company_name = self.archive_controller.create_company_structure(company_name)
             # Update current company info
             self.current_company = {"display_name": company_name, "safe_name": safe_company_name}
-
-            base_path = os.path.join(self.archives_path, safe_company_name)
-            logging.info(f"Creating/Verifying structure for company: {company_name} (Safe Path: {safe_company_name})")
-
-            # Create base company folder
-            logging.debug(f"Checking/Creating Company Base: {base_path}")
-            os.makedirs(base_path, exist_ok=True)
-
-            # Iterate through defined structure
-            for header, sub_level_data in self.structure.items():
-                header_path = os.path.join(base_path, header)
-                logging.debug(f"  Checking/Creating Header: {header_path}")
-                os.makedirs(header_path, exist_ok=True)
-
-                if isinstance(sub_level_data, dict): # Nested: Header -> Subheader -> Section -> Subsection
-                    logging.debug(f"    Processing Nested Header: {header}")
-                    for subheader, section_dict in sub_level_data.items():
-                        subheader_path = os.path.join(header_path, subheader)
-                        logging.debug(f"      Checking/Creating Subheader: {subheader_path}")
-                        os.makedirs(subheader_path, exist_ok=True)
-
-                        if isinstance(section_dict, dict): # Ensure it's the expected Section dict
-                            logging.debug(f"        Processing Section Dictionary for Subheader: {subheader}")
-                            for section, subsection_list in section_dict.items():
-                                section_path = os.path.join(subheader_path, section)
-                                logging.debug(f"          Checking/Creating Section: {section_path}")
-                                os.makedirs(section_path, exist_ok=True)
-
-                                # Create subsection folders if defined
-                                if isinstance(subsection_list, list):
-                                    if subsection_list: # Only log if there are subsections to create
-                                        logging.debug(f"            Processing Subsection List for Section: {section}")
-                                    for subsection in subsection_list:
-                                        if subsection: # Skip if subsection name is empty string or None
-                                             subsection_path = os.path.join(section_path, subsection)
-                                             logging.debug(f"              Checking/Creating Subsection: {subsection_path}")
-                                             os.makedirs(subsection_path, exist_ok=True)
-                                        else:
-                                            logging.debug(f"              Skipping empty subsection name under Section: {section}")
-                                elif subsection_list is not None: # Log if it's not a list but not None either
-                                     logging.warning(f"            Expected list of subsections for {header}/{subheader}/{section}, found: {type(subsection_list)}. Value: {subsection_list}")
-
-                        elif section_dict is not None: # Log if not a dict but not None
-                             logging.warning(f"        Expected dict for sections under {header}/{subheader}, found: {type(section_dict)}. Value: {section_dict}")
-
-                elif isinstance(sub_level_data, list): # Flat: Header -> Subheader list
-                    logging.debug(f"    Processing Flat Header: {header}")
-                    for subheader_item in sub_level_data:
-                        if subheader_item: # Skip if item name is empty string or None
-                             subheader_path = os.path.join(header_path, subheader_item)
-                             logging.debug(f"      Checking/Creating Flat Subheader Item: {subheader_path}")
-                             os.makedirs(subheader_path, exist_ok=True)
-                        else:
-                             logging.debug(f"      Skipping empty flat subheader item under Header: {header}")
-                else:
-                     logging.warning(f"  Unknown structure type for header '{header}': {type(sub_level_data)}. Value: {sub_level_data}")
-
-            logging.info(f"Structure verification complete for: {safe_company_name}")
-
         except Exception as e:
             logging.error(f"Failed to create company structure for '{company_name}': {e}", exc_info=True)
             # Re-raise the exception so the calling function knows structure creation failed
@@ -4185,6 +4316,7 @@ class FileArchiveApp:
 
     # Inside FileArchiveApp class
 
+    @metrics.timed(OP_UPLOAD)
     def perform_file_upload(self, company_name, header, subheader, section, subsection,
                             source_file_path, # Renamed for clarity
                             intended_destination_filename # New argument
@@ -4203,7 +4335,7 @@ class FileArchiveApp:
             intended_destination_filename (str): The final filename to use in the archive.
 
         Returns:
-            True on success.
+            str: The stored file path on success.
             Raises Exception on errors caught during IO.
         """
         dest_path = "Unknown" # Initialize for logging
@@ -4219,69 +4351,14 @@ class FileArchiveApp:
             safe_company_name = self.current_company["safe_name"]
             logging.debug(f"[UploadLogicV2] Using safe company name: {safe_company_name}")
 
-            # --- Determine structure and path components ---
-            structure_options = self.structure.get(header, [])
-            has_subsections_defined = False
-            if isinstance(structure_options, dict): # Nested Header
-                section_dict = structure_options.get(subheader, {})
-                if section and section in section_dict:
-                    subsections_list = section_dict.get(section, [])
-                    has_subsections_defined = bool(subsections_list)
-            # (Prefix calculation removed - no longer needed here)
-
-            # --- Calculate Destination Path ---
-            dest_path = os.path.join(self.archives_path, safe_company_name, header)
-            if isinstance(structure_options, dict): # Nested Header path construction
-                if subheader: dest_path = os.path.join(dest_path, subheader)
-                if section:
-                    dest_path = os.path.join(dest_path, section)
-                    if subsection and has_subsections_defined:
-                        dest_path = os.path.join(dest_path, subsection)
-            elif subheader: # Flat structure path construction
-                dest_path = os.path.join(dest_path, subheader)
+            # --- Destination folder, backup of an existing file, copy ---
+            dest_path = self.archive_controller.folder_for(safe_company_name, header, subheader, section, subsection)
             logging.debug(f"[UploadLogicV2] Calculated destination folder: {dest_path}")
-
-            # --- Ensure Destination Directory Exists ---
-            try:
-                os.makedirs(dest_path, exist_ok=True)
-                logging.debug(f"[UploadLogicV2] Ensured destination directory exists: {dest_path}")
-            except Exception as e_mkdir:
-                logging.error(f"[UploadLogicV2] FAILED to create destination directory {dest_path}: {e_mkdir}", exc_info=True)
-                raise IOError(f"Failed to create directory: {dest_path}") from e_mkdir
-
-            # --- Final Destination File Path ---
-            # Use the filename passed into the function
-            dest_file = os.path.join(dest_path, intended_destination_filename)
-            logging.debug(f"[UploadLogicV2] Final destination file path: {dest_file}")
-
-            # --- Backup Logic (uses intended_destination_filename) ---
-            if os.path.exists(dest_file):
-                logging.warning(f"[UploadLogicV2] Destination file exists: {dest_file}. Creating backup.")
-                timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-                base, ext = os.path.splitext(intended_destination_filename)
-                backup_name = f"{base}_backup_{timestamp}{ext}"
-                backup_path = os.path.join(dest_path, backup_name)
-                try:
-                    count = 0
-                    while os.path.exists(backup_path): # Handle collision
-                         count += 1
-                         backup_name = f"{base}_backup_{timestamp}_{count}{ext}"
-                         backup_path = os.path.join(dest_path, backup_name)
-                    os.rename(dest_file, backup_path)
-                    logging.info(f"[UploadLogicV2] Existing file versioned: {dest_file} -> {backup_path}")
-                except (PermissionError, FileNotFoundError, OSError) as e_mv:
-                    logging.error(f"[UploadLogicV2] FAILED to version existing file {dest_file}: {e_mv}", exc_info=True)
-                    raise IOError(f"Error versioning existing file '{intended_destination_filename}'") from e_mv
-
-            # --- Copy File ---
-            try:
-                logging.debug(f"[UploadLogicV2] Attempting copy: '{source_file_path}' -> '{dest_file}'")
-                shutil.copy2(source_file_path, dest_file) # Use copy2
-                logging.info(f"[UploadLogicV2] File copied successfully: {source_file_path} -> {dest_file}")
-                return True # Indicate success
-            except Exception as e_copy:
-                 logging.error(f"[UploadLogicV2] FAILED to copy file '{source_file_path}' to '{dest_file}': {e_copy}", exc_info=True)
-                 raise IOError(f"Failed to copy file to destination") from e_copy
+            dest_file = self.archive_controller.store_file(dest_path, source_file_path, intended_destination_filename)
+            logging.info(f"[UploadLogicV2] File copied successfully: {source_file_path} -> {dest_file}")
+            self.record_activity(activity_log.ACTION_UPLOAD, path=dest_file, details=source_file_path)
+            self.ocr_pipeline.submit(dest_file) # store_file has recorded its checksum
+            return dest_file # Indicate success
 
         except Exception as e_main:
             # Catch any other unexpected errors
@@ -4298,24 +4375,13 @@ class FileArchiveApp:
         self.center_window(dashboard, 500, 400)
         dashboard.grab_set()
 
-        total_files, total_size, file_types = 0, 0, {}
-        for root, _, files in os.walk(self.archives_path):
-            for f in files:
-                total_files += 1
-                fpath = os.path.join(root, f)
-                try:
-                    size = os.path.getsize(fpath)
-                    total_size += size
-                except Exception:
-                    continue
-                ext = os.path.splitext(f)[1].lower()
-                file_types[ext] = file_types.get(ext, 0) + 1
+        total_files, total_size, file_types = self.archive_controller.collect_stats()
         stats_text = f"Total Files: {total_files}\nTotal Size: {total_size} bytes\nFile Types:\n"
         for ext, count in file_types.items():
             stats_text += f"  {ext or 'no ext'}: {count}\n"
-        ctk.CTkLabel(dashboard, text=get_translation("ctklabel_text_archive_statistics"), font=("Segoe UI", 16, "bold")).pack(pady=5)
+        self._tr(ctk.CTkLabel(dashboard, text=get_translation("ctklabel_text_archive_statistics"), font=("Segoe UI", 16, "bold")), "ctklabel_text_archive_statistics").pack(pady=5)
         ctk.CTkLabel(dashboard, text=stats_text, font=("Segoe UI", 12)).pack(pady=5)
-        ctk.CTkLabel(dashboard, text=get_translation("ctklabel_text_search_analytics"), font=("Segoe UI", 16, "bold")).pack(pady=5)
+        self._tr(ctk.CTkLabel(dashboard, text=get_translation("ctklabel_text_search_analytics"), font=("Segoe UI", 16, "bold")), "ctklabel_text_search_analytics").pack(pady=5)
         with self.search_queries_lock:
             analytics_text = "\n".join(self.search_queries) if self.search_queries else "No searches performed yet."
         ctk.CTkLabel(dashboard, text=analytics_text, font=("Segoe UI", 12)).pack(pady=5)
@@ -4328,30 +4394,34 @@ class FileArchiveApp:
     def on_closing(self):
         """Handle application closing efficiently without blocking"""
         try:
+            # Stop a running drop before users.db closes; files being copied may still record activity
+            if self.active_drop is not None:
+                self.active_drop.cancel()
+                if not self.active_drop.wait(timeout=DROP_CLOSE_WAIT_SECONDS):
+                    logging.warning("[Drop] Closing while dropped files are still being copied.")
+            if self.active_import is not None:
+                self.active_import.set() # Package import stops after the current file
             # Log the user logout
             if self.current_user:
                 logging.info(f"User '{self.current_user['username']}' logged out")
+                self.record_activity(activity_log.ACTION_LOGOUT, details="application closed")
+            self.activity_log.flush()
+            self.stall_watchdog.stop()
+            self.ocr_pipeline.stop()
+            self.scrubber.stop()
 
             # Stop watchdog observer in a non-blocking way
             if hasattr(self, 'observer') and self.observer.is_alive():
                 self.observer.stop()
                 # Don't join the thread - it can cause hanging
 
-            # Hide archive folder without recursion (which can be slow)
-            if platform.system() == "Windows":
-                try:
-                    # Use a non-blocking approach - start process and don't wait
-                    subprocess.Popen(['attrib', '+h', '+s', self.archives_path],
-                                shell=True, creationflags=subprocess.CREATE_NO_WINDOW)
-                except Exception as e:
-                    logging.error(f"Error hiding archive folder: {e}")
-            else:
-                try:
-                    # Use a non-blocking approach
-                    subprocess.Popen(['chmod', '700', self.archives_path])
-                except Exception as e:
-                    logging.error(f"Error changing archive folder permissions: {e}")
+            # Hide archive folder without recursion (a single in-process attribute update)
+            try:
+                self.permission_manager.set_visible(False)
+            except Exception as e:
+                logging.error(f"Error hiding archive folder: {e}")
 
+            self.user_repository.close()
             logging.info("Application closing")
         except Exception as e:
             logging.error(f"Error during application cleanup: {e}")
@@ -4415,16 +4485,16 @@ class FileArchiveApp:
         logo_label.pack(pady=(40, 5))
 
         # App title with larger font
-        ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_file_archiving_system"),
-                    font=("Segoe UI", 28, "bold")).pack(pady=(0, 5))
+        self._tr(ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_file_archiving_system"),
+                    font=("Segoe UI", 28, "bold")), "ctklabel_text_file_archiving_system").pack(pady=(0, 5))
 
         # Version info
-        ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_version_10"),
-                    font=("Segoe UI", 14)).pack(pady=(0, 20))
+        self._tr(ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_version_10"),
+                    font=("Segoe UI", 14)), "ctklabel_text_version_10").pack(pady=(0, 20))
 
         # Loading message
-        loading_label = ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_initializing"),
-                                    font=("Segoe UI", 14))
+        loading_label = self._tr(ctk.CTkLabel(splash_frame, text=get_translation("ctklabel_text_initializing"),
+                                    font=("Segoe UI", 14)), "ctklabel_text_initializing")
         loading_label.pack(pady=(0, 10))
 
         # Stylish progress bar
@@ -4464,5 +4534,14 @@ class FileArchiveApp:
             self.main_app.mainloop()
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # Bulk user import hashes in worker processes (needed when frozen)
+    # Process-wide setup stays under the main guard: on Windows every worker process
+    # (user import hashing, OCR) re-imports this module as __mp_main__, and must not open
+    # a second handler on the log file or load the translations again.
+    setup_logging()
+    logging.critical("CRITICAL_LOG: Logging configured at DEBUG level.") # Added this line
+    if not WIA_AVAILABLE:
+        logging.warning("comtypes.client not found. Scanning via WIA will be disabled.")
+    set_language("en") # Or "ar" if you want Arabic default
     app = FileArchiveApp()
     app.run() # Run your application
\ No newline at end of file
@@ -2,116 +2,334 @@
 import json
 import os
 import logging
+import threading
+import weakref
+from types import MappingProxyType
 
 # --- Global State ---
-TRANSLATIONS = {} # Stores loaded translations, e.g., {"en": {"key": "value"}, "ar": {"key": "value"}}
+TRANSLATIONS = {} # Compiled, read-only tables per language, e.g., {"en": {"key": "value"}, "ar": {"key": "value"}}
 CURRENT_LANGUAGE = "en" # Default language
 DEFAULT_LANGUAGE = "en" # Define a default language
+SUPPORTED_LANGUAGES = ("en", "ar")
+RTL_LANGUAGES = ("ar",)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # Define SCRIPT_DIR globally for easy access
+LEGACY_TRANSLATIONS_FILE = "translations.json" # Older combined {"en": {...}, "ar": {...}} file; lowest priority
+# Compiled catalog cache. Lives next to the bytecode cache and is rebuilt whenever a source file changes.
+# Plain JSON, so a tampered cache file can at worst show wrong texts.
+CATALOG_CACHE_PATH = os.path.join(SCRIPT_DIR, "__pycache__", "translations.catalog.json")
+CATALOG_FORMAT_VERSION = 2
 
-# --- Load Translations ---
-def load_language_file(lang_code):
-    """Loads a specific language's translations from its JSON file."""
-    global TRANSLATIONS
-    filename = f"{lang_code}.json"
-    file_path = os.path.join(SCRIPT_DIR, filename)
+_active_table = MappingProxyType({}) # Table for CURRENT_LANGUAGE; get_translation's fast path
+_reported_missing = set() # (lang, key) pairs already warned about
+_EW_SWAP = str.maketrans("ew", "we") # Mirrors anchors/sticky values ("w" <-> "e", "nw" <-> "ne")
 
-    if not os.path.exists(file_path):
-        logging.error(f"Translation file not found: {file_path}")
-        return False
 
+# --- Build Catalog ---
+def _source_files():
+    files = [os.path.join(SCRIPT_DIR, LEGACY_TRANSLATIONS_FILE)]
+    files += [os.path.join(SCRIPT_DIR, f"{lang}.json") for lang in SUPPORTED_LANGUAGES]
+    return files
+
+def _source_signature():
+    """[name, mtime_ns, size] of every source file, used to validate the cached catalog."""
+    signature = []
+    for path in _source_files():
+        try:
+            st = os.stat(path)
+            signature.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+        except OSError:
+            signature.append([os.path.basename(path), None, None])
+    return [CATALOG_FORMAT_VERSION, signature] # Lists, so it compares equal after a JSON round trip
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            TRANSLATIONS[lang_code] = json.load(f)
-        logging.info(f"Translations for '{lang_code}' loaded successfully from {file_path}.")
-        return True
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except json.JSONDecodeError:
-        logging.error(f"Error decoding JSON from translation file '{filename}'.")
-        TRANSLATIONS[lang_code] = {} # Set empty dict on error to prevent repeated load attempts for bad file
-        return False
+        logging.error(f"Error decoding JSON from translation file '{os.path.basename(path)}'.")
     except Exception as e:
-        logging.error(f"An unexpected error occurred loading translations for '{lang_code}': {e}", exc_info=True)
-        TRANSLATIONS[lang_code] = {}
-        return False
+        logging.error(f"An unexpected error occurred loading translations from '{path}': {e}", exc_info=True)
+    return None
+
+def compile_catalog():
+    """
+    Merges every translation source into one flat table per language.
+
+    Priority per key: <lang>.json, then the legacy translations.json, then the
+    DEFAULT_LANGUAGE value (so fallbacks are resolved once here, not on every lookup).
+
+    Returns:
+        tuple: (catalog, missing). catalog maps language -> {key: text}; missing maps
+        language -> sorted keys that had to fall back to DEFAULT_LANGUAGE.
+    """
+    legacy = _read_json(os.path.join(SCRIPT_DIR, LEGACY_TRANSLATIONS_FILE)) or {}
+    merged = {}
+    for lang in SUPPORTED_LANGUAGES:
+        table = dict(legacy.get(lang) or {})
+        own = _read_json(os.path.join(SCRIPT_DIR, f"{lang}.json"))
+        if own is None:
+            logging.error(f"Translation file not found or unreadable: {lang}.json")
+        else:
+            table.update(own)
+        merged[lang] = table
+
+    default_table = merged[DEFAULT_LANGUAGE]
+    missing = {}
+    for lang, table in merged.items():
+        if lang == DEFAULT_LANGUAGE:
+            continue
+        fallback_keys = sorted(k for k in default_table if k not in table)
+        for key in fallback_keys:
+            table[key] = default_table[key]
+        missing[lang] = fallback_keys
+    return merged, missing
+
+def _load_cached_catalog(signature):
+    try:
+        with open(CATALOG_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("signature") == signature:
+            return cached["catalog"], cached["missing"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable translation catalog cache: {e}")
+    return None
+
+def _save_cached_catalog(signature, catalog, missing):
+    try:
+        os.makedirs(os.path.dirname(CATALOG_CACHE_PATH), exist_ok=True)
+        tmp_path = CATALOG_CACHE_PATH + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"signature": signature, "catalog": catalog, "missing": missing}, f, ensure_ascii=False)
+        os.replace(tmp_path, CATALOG_CACHE_PATH)
+    except OSError as e:
+        # Read-only install: just compile on every start
+        logging.info(f"Translation catalog cache not written ({e}).")
+
+def load_catalog():
+    """
+    Loads the compiled catalog (from cache when the sources are unchanged) into
+    TRANSLATIONS as read-only tables. Missing keys are reported once, here.
+    """
+    global TRANSLATIONS
+    signature = _source_signature()
+    cached = _load_cached_catalog(signature)
+    if cached:
+        catalog, missing = cached
+        logging.info("Translation catalog loaded from cache.")
+    else:
+        catalog, missing = compile_catalog()
+        _save_cached_catalog(signature, catalog, missing)
+        logging.info(f"Translation catalog compiled: {', '.join(f'{l}={len(t)}' for l, t in catalog.items())} keys.")
+    for lang, keys in missing.items():
+        if keys:
+            logging.warning(f"{len(keys)} translation key(s) missing in '{lang}', using '{DEFAULT_LANGUAGE}' text: {', '.join(keys)}")
+    TRANSLATIONS = {lang: MappingProxyType(table) for lang, table in catalog.items()}
+    return bool(TRANSLATIONS.get(DEFAULT_LANGUAGE))
 
 # --- Set Language ---
 def set_language(lang_code):
-    """Sets the current language for translations. Loads the language if not already loaded."""
-    global CURRENT_LANGUAGE
-    logging.debug(f"set_language: Called with lang_code='{lang_code}'. Current: '{CURRENT_LANGUAGE}'. Loaded: {list(TRANSLATIONS.keys())}")
-
-    if lang_code not in TRANSLATIONS:
-        logging.info(f"Language '{lang_code}' not loaded. Attempting to load.")
-        if not load_language_file(lang_code):
-            logging.warning(f"Failed to load translations for '{lang_code}'. Language not changed.")
-            # Optionally, fall back to default or current language if critical
-            if DEFAULT_LANGUAGE not in TRANSLATIONS: # Ensure default is loaded if target fails
-                if not load_language_file(DEFAULT_LANGUAGE): # Try to load default
-                    logging.error(f"CRITICAL: Default language '{DEFAULT_LANGUAGE}' also failed to load.")
-                    # No translations available, this is a critical state.
-                    # Depending on app requirements, could raise an error or use hardcoded fallbacks.
-                    return False # Indicate failure
-            CURRENT_LANGUAGE = DEFAULT_LANGUAGE # Fallback to default if target lang load fails
-            logging.warning(f"Fell back to default language: {DEFAULT_LANGUAGE}")
-            return False # Indicate failure to set desired language
-
+    """Sets the current language for translations."""
+    global CURRENT_LANGUAGE, _active_table
+    table = TRANSLATIONS.get(lang_code)
+    if table is None:
+        logging.warning(f"Language '{lang_code}' is not available. Language not changed.")
+        return False
     CURRENT_LANGUAGE = lang_code
+    _active_table = table
     logging.info(f"Application language changed to: {lang_code}.")
     return True
 
 # --- Get Translation ---
 def get_translation(key, lang=None):
     """Gets the translation for a key in the current or specified language."""
-    global CURRENT_LANGUAGE, TRANSLATIONS, DEFAULT_LANGUAGE
-
-    target_lang = lang if lang and lang in TRANSLATIONS else CURRENT_LANGUAGE
-    logging.debug(f"get_translation: key='{key}', target_lang='{target_lang}'. Current global lang='{CURRENT_LANGUAGE}'.")
-
-    # Ensure the target language is loaded, if not, try to load it.
-    # This is a safeguard, set_language should handle primary loading.
-    if target_lang not in TRANSLATIONS:
-        logging.warning(f"get_translation: Target language '{target_lang}' not loaded. Attempting to load.")
-        if not load_language_file(target_lang):
-            logging.warning(f"get_translation: Failed to load '{target_lang}'. Falling back to default language '{DEFAULT_LANGUAGE}' for this lookup.")
-            target_lang = DEFAULT_LANGUAGE # Fallback to default for this lookup
-            if DEFAULT_LANGUAGE not in TRANSLATIONS: # Ensure default is loaded
-                 if not load_language_file(DEFAULT_LANGUAGE):
-                    logging.error(f"CRITICAL: Default language '{DEFAULT_LANGUAGE}' failed to load in get_translation.")
-                    return f"_{key}_ERR_NO_LANG_" # Critical error, no translations
-
-    # Attempt to get translation for the target language
-    translation = TRANSLATIONS.get(target_lang, {}).get(key)
-    if translation is not None:
-        return translation
-
-    # Fallback 1: Try Default language if target language failed and wasn't Default
-    if target_lang != DEFAULT_LANGUAGE:
-        logging.warning(f"Translation missing for key '{key}' in '{target_lang}'. Falling back to {DEFAULT_LANGUAGE}.")
-        default_translation = TRANSLATIONS.get(DEFAULT_LANGUAGE, {}).get(key)
-        if default_translation is not None:
-            return default_translation
-
-    # Fallback 2: Return the key itself marked if not found anywhere
-    logging.warning(f"Translation missing for key='{key}' in '{target_lang}' and also in {DEFAULT_LANGUAGE} fallback.")
+    table = _active_table if lang is None else TRANSLATIONS.get(lang, _active_table)
+    text = table.get(key)
+    if text is not None:
+        return text
+    # Not in any source: report once per language/key, then return the key itself marked
+    missing_id = (lang or CURRENT_LANGUAGE, key)
+    if missing_id not in _reported_missing:
+        _reported_missing.add(missing_id)
+        logging.warning(f"Translation missing for key='{key}' in '{missing_id[0]}' and in {DEFAULT_LANGUAGE} fallback.")
     return f"_{key}_"
 
+def is_rtl(lang=None):
+    """True if the language (default: current) is written right-to-left."""
+    return (lang or CURRENT_LANGUAGE) in RTL_LANGUAGES
+
+# --- Widget Registry ---
+def _swap_sides(value):
+    """Swaps east/west (and left/right) in a pack side, anchor or grid sticky value."""
+    if not value:
+        return value
+    value = str(value)
+    if value in ("left", "right"):
+        return "right" if value == "left" else "left"
+    if set(value) <= set("nsew"): # Skips "center", "top", ...
+        return value.translate(_EW_SWAP)
+    return value
+
+def _swap_pad(value):
+    """Reverses an asymmetric (before, after) padding."""
+    if isinstance(value, (tuple, list)):
+        parts = list(value)
+    else:
+        parts = str(value).split()
+    if len(parts) == 2:
+        return (parts[1], parts[0])
+    return value
+
+class TranslationRegistry:
+    """
+    Keeps track of which widget shows which translation key, so a language switch can
+    update texts (and mirror layouts for right-to-left languages) in place instead of
+    destroying and rebuilding the UI.
+
+    Widgets are held weakly; destroyed widgets are dropped as they are found. A widget
+    whose text was changed to something else since it was registered (a status message,
+    a user name, ...) is left alone.
+    """
+    def __init__(self):
+        self._widgets = weakref.WeakKeyDictionary() # widget -> {option: key}
+        self._tabs = weakref.WeakKeyDictionary() # CTkTabview -> {key: None} (ordered set)
+        self._mirrored = weakref.WeakKeyDictionary() # container -> True if currently laid out RTL
+        self._lock = threading.Lock()
+
+    def register(self, widget, key=None, **option_keys):
+        """
+        Records the translation key(s) shown by a widget and returns the widget, so it can
+        wrap a constructor: `self._tr(ctk.CTkLabel(parent, text=...), "key").pack()`.
+
+        Args:
+            key (str | None): Key of the widget's "text" option.
+            **option_keys: Keys for other options, e.g. placeholder_text="key",
+                title="key" for a window title, or values=("key", ...) for the choices
+                of an option menu (its current choice is translated with them).
+        """
+        if key is not None:
+            option_keys["text"] = key
+        with self._lock:
+            self._widgets.setdefault(widget, {}).update(option_keys)
+        return widget
+
+    def register_tab(self, tabview, key):
+        """Records that tabview has a tab named get_translation(key)."""
+        with self._lock:
+            self._tabs.setdefault(tabview, {})[key] = None
+
+    def register_direction(self, container):
+        """
+        Marks a container whose children should be mirrored for RTL languages. Call it
+        after the children are laid out left-to-right (again after re-creating them); if
+        an RTL language is active they are mirrored immediately.
+        """
+        with self._lock:
+            self._mirrored[container] = False
+        self._apply_direction(container, is_rtl())
+
+    def retranslate(self, old_lang, new_lang):
+        """
+        Updates every registered widget, tab name and container from old_lang to new_lang.
+
+        Returns:
+            int: Number of widgets/tabs whose text was changed.
+        """
+        with self._lock:
+            widgets = list(self._widgets.items())
+            tabs = list(self._tabs.items())
+            containers = list(self._mirrored.keys())
+        changed = 0
+        for widget, option_keys in widgets:
+            try:
+                if not widget.winfo_exists():
+                    self._forget(widget)
+                    continue
+                updates = {}
+                for option, key in option_keys.items():
+                    if option == "values":
+                        self._retranslate_values(widget, key, old_lang, new_lang)
+                        continue
+                    current = widget.title() if option == "title" else widget.cget(option)
+                    if current == get_translation(key, old_lang):
+                        updates[option] = get_translation(key, new_lang)
+                if "title" in updates:
+                    widget.title(updates.pop("title"))
+                    changed += 1
+                if updates:
+                    widget.configure(**updates)
+                    changed += 1
+            except Exception as e:
+                logging.debug(f"Dropping widget from translation registry: {e}")
+                self._forget(widget)
+        for tabview, keys in tabs:
+            try:
+                if not tabview.winfo_exists():
+                    continue
+                for key in keys:
+                    old_name, new_name = get_translation(key, old_lang), get_translation(key, new_lang)
+                    if old_name != new_name and old_name in tabview._name_list:
+                        tabview.rename(old_name, new_name)
+                        changed += 1
+            except Exception as e:
+                logging.warning(f"Could not rename tabs after language switch: {e}")
+        rtl = is_rtl(new_lang)
+        for container in containers:
+            self._apply_direction(container, rtl)
+        return changed
+
+    @staticmethod
+    def _retranslate_values(menu, keys, old_lang, new_lang):
+        old_values = [get_translation(key, old_lang) for key in keys]
+        if list(menu.cget("values")) != old_values:
+            return
+        selected = menu.get()
+        menu.configure(values=[get_translation(key, new_lang) for key in keys])
+        if selected in old_values:
+            menu.set(get_translation(keys[old_values.index(selected)], new_lang))
+
+    def _forget(self, widget):
+        with self._lock:
+            self._widgets.pop(widget, None)
+
+    def _apply_direction(self, container, rtl):
+        if self._mirrored.get(container) is rtl:
+            return
+        try:
+            if container.winfo_exists():
+                self._mirror_children(container)
+                self._mirrored[container] = rtl
+        except Exception as e:
+            logging.warning(f"Could not mirror layout of {container}: {e}")
+
+    @staticmethod
+    def _mirror_children(container):
+        """Flips the children of container left<->right. Applying it twice restores the layout."""
+        columns = container.grid_size()[0]
+        for child in container.winfo_children():
+            manager = child.winfo_manager()
+            if manager == "pack":
+                info = child.pack_info()
+                child.pack_configure(side=_swap_sides(info.get("side")), anchor=_swap_sides(info.get("anchor")),
+                                     padx=_swap_pad(info.get("padx", 0)))
+            elif manager == "grid":
+                info = child.grid_info()
+                column, span = int(info.get("column", 0)), int(info.get("columnspan", 1))
+                child.grid_configure(column=columns - column - span, sticky=_swap_sides(info.get("sticky")),
+                                     padx=_swap_pad(info.get("padx", 0)))
+        if columns > 1:
+            settings = [container.grid_columnconfigure(c) for c in range(columns)]
+            for c, setting in enumerate(settings):
+                container.grid_columnconfigure(columns - 1 - c, weight=setting.get("weight", 0),
+                                               minsize=setting.get("minsize", 0), pad=setting.get("pad", 0),
+                                               uniform=setting.get("uniform") or "")
+
 # --- Initial Load ---
-# Load the default language on startup.
-if not load_language_file(DEFAULT_LANGUAGE):
+# Compile (or load the cached) catalog once on startup.
+if not load_catalog():
     logging.critical(f"Failed to load default language '{DEFAULT_LANGUAGE}' on startup. Application may not function correctly.")
-    # Handle this critical failure, e.g., by exiting or using a minimal set of hardcoded English strings.
-    # For now, TRANSLATIONS[DEFAULT_LANGUAGE] might be an empty dict if load_language_file set it.
-    if DEFAULT_LANGUAGE not in TRANSLATIONS: # If load_language_file didn't even create the key
-        TRANSLATIONS[DEFAULT_LANGUAGE] = {} # Ensure the key exists to prevent crashes in get_translation
-
-# Ensure CURRENT_LANGUAGE is set to something valid on startup,
-# even if default language loading failed.
-if DEFAULT_LANGUAGE in TRANSLATIONS:
-    CURRENT_LANGUAGE = DEFAULT_LANGUAGE
-else:
-    # This case means default language file is missing or corrupt AND load_language_file failed to create an empty dict.
-    # This is a very critical state. For robustness, set a hardcoded language and provide minimal functionality.
-    logging.error("CRITICAL: No languages could be loaded. Setting current language to 'en' nominally.")
-    CURRENT_LANGUAGE = "en" # Nominal setting
-    if "en" not in TRANSLATIONS: # Ensure 'en' key exists in TRANSLATIONS
-        TRANSLATIONS["en"] = {}
\ No newline at end of file
+    TRANSLATIONS.setdefault(DEFAULT_LANGUAGE, MappingProxyType({}))
+set_language(DEFAULT_LANGUAGE)
@@ -0,0 +1,222 @@
+# user_table.py
+# Virtualized user list for the admin tab.
+#
+# Only the rows that fit in the visible area exist as widgets (plus one spare). Scrolling
+# does not move widgets; it changes which users the fixed pool of rows displays. Rows are
+# fetched from users.db a page at a time, starting after the last username of the page
+# before (keyset paging), and the most recently used pages are cached, so the cost of a
+# scroll or a search does not depend on the number of accounts.
+import logging
+from collections import OrderedDict
+
+import customtkinter as ctk
+
+from translations import get_translation
+
+ROW_HEIGHT = 52
+PAGE_SIZE = 100 # Rows per repository query
+MAX_CACHED_PAGES = 8
+ADMIN_ROLE_COLOR = "#2D7FF9"
+USER_ROLE_COLOR = "#6c757d"
+
+
+class _UserRow:
+    """One reusable row: icon, username, role badge and Edit/Delete buttons."""
+    def __init__(self, table):
+        self.username = None
+        self._shown = None # (username, role) currently displayed
+        self.frame = ctk.CTkFrame(table.body, height=ROW_HEIGHT - 4)
+        self.frame.grid_propagate(False)
+        self.frame.grid_columnconfigure(1, weight=1)
+        self.frame.grid_rowconfigure(0, weight=1)
+
+        self.icon = ctk.CTkLabel(self.frame, text="", font=("Segoe UI", 20), width=36)
+        self.icon.grid(row=0, column=0, padx=(10, 6))
+        self.name_label = ctk.CTkLabel(self.frame, text="", font=("Segoe UI", 15, "bold"), anchor="w")
+        self.name_label.grid(row=0, column=1, sticky="w")
+        self.role_badge = ctk.CTkLabel(self.frame, text="", font=("Segoe UI", 11, "bold"), text_color="white",
+                                       corner_radius=5, width=64, height=22)
+        self.role_badge.grid(row=0, column=2, padx=10)
+        self.edit_btn = table.tr(ctk.CTkButton(self.frame, text=get_translation("ctkbutton_text_edit"),
+                                               command=lambda: table.on_edit(self.username),
+                                               font=("Segoe UI", 12), width=80, height=30, corner_radius=6,
+                                               fg_color="#ffc107", hover_color="#e0a800", text_color="#000000"),
+                                 "ctkbutton_text_edit")
+        self.edit_btn.grid(row=0, column=3, padx=5)
+        self.delete_btn = table.tr(ctk.CTkButton(self.frame, text=get_translation("ctkbutton_text_delete"),
+                                                 command=lambda: table.on_delete(self.username),
+                                                 font=("Segoe UI", 12), width=80, height=30, corner_radius=6,
+                                                 fg_color="#dc3545", hover_color="#c82333"),
+                                   "ctkbutton_text_delete")
+        self.delete_btn.grid(row=0, column=4, padx=(5, 10))
+        for widget in (self.frame, self.icon, self.name_label, self.role_badge):
+            table.bind_wheel(widget)
+
+    def show(self, user, slot, deletable):
+        """Displays user in the given slot (row position within the visible area)."""
+        if self._shown != (user["username"], user["role"]):
+            self._shown = (user["username"], user["role"])
+            self.username = user["username"]
+            is_admin = user["role"] == "admin"
+            self.icon.configure(text="🔑" if is_admin else "👤")
+            self.name_label.configure(text=user["username"])
+            self.role_badge.configure(text=user["role"].upper(),
+                                      fg_color=ADMIN_ROLE_COLOR if is_admin else USER_ROLE_COLOR)
+        self.delete_btn.configure(state="normal" if deletable else "disabled")
+        self.frame.place(x=0, y=slot * ROW_HEIGHT, relwidth=1.0) # Height is fixed by the constructor
+
+    def hide(self):
+        self.username = None
+        self._shown = None
+        self.frame.place_forget()
+
+
+class VirtualUserTable(ctk.CTkFrame):
+    """
+    Scrollable user list that renders only the visible rows.
+
+    Args:
+        repository: UserRepository providing list_users(search, role, limit, offset, after)
+            and count_users(search, role).
+        on_edit / on_delete (callable): Called with the username of the clicked row.
+        current_username (callable): Returns the logged-in username; that row's Delete
+            button is disabled.
+        tr (callable | None): Translation registration hook (FileArchiveApp._tr), so the
+            row buttons follow language switches.
+    """
+    def __init__(self, master, repository, on_edit, on_delete, current_username=None, tr=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.repository = repository
+        self.on_edit = on_edit
+        self.on_delete = on_delete
+        self.current_username = current_username or (lambda: None)
+        self.tr = tr or (lambda widget, *args, **kwargs: widget)
+
+        self.query = None # (search, role) currently displayed
+        self.total = 0
+        self.first_index = 0
+        self._pages = OrderedDict() # page number -> list of user dicts (LRU)
+        self._page_ends = {} # page number -> username of its last row; kept when the page is evicted
+        self._rows = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.empty_label = self.tr(ctk.CTkLabel(self.body, text=get_translation("ctklabel_text_no_users_found"),
+                                                font=("Segoe UI", 14)), "ctklabel_text_no_users_found")
+
+        self.body.bind("<Configure>", lambda event: self._render())
+        self.bind_wheel(self.body)
+        self.bind_wheel(self.empty_label)
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+    def set_query(self, search="", role=None):
+        """
+        Shows the users matching search/role. Re-running the current query (after an
+        add/edit/delete) reloads the data but keeps the scroll position.
+
+        Returns:
+            int: Number of matching users.
+        """
+        query = (search, role)
+        if query != self.query:
+            self.first_index = 0
+        self.query = query
+        self._pages.clear()
+        self._page_ends.clear()
+        self.total = self.repository.count_users(search=search, role=role)
+        self._render()
+        return self.total
+
+    def bind_wheel(self, widget):
+        """Scrolls the table when the mouse wheel is used over widget."""
+        widget.bind("<MouseWheel>", self._on_mousewheel, add="+") # Windows / macOS
+        widget.bind("<Button-4>", lambda event: self.scroll_rows(-3), add="+") # X11
+        widget.bind("<Button-5>", lambda event: self.scroll_rows(3), add="+")
+
+    def scroll_rows(self, delta):
+        self._scroll_to(self.first_index + delta)
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+    def _visible_rows(self):
+        return max(1, self.body.winfo_height() // ROW_HEIGHT)
+
+    def _user_at(self, index):
+        page, offset = divmod(index, PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._load_page(page)
+            self._pages[page] = rows
+            while len(self._pages) > MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page)
+        return rows[offset] if offset < len(rows) else None
+
+    def _load_page(self, page):
+        """
+        Reads a page starting after the end of the nearest known page before it. Scrolling
+        always knows the previous page; only a scrollbar jump skips rows with an offset.
+        """
+        search, role = self.query
+        known = max((p for p in self._page_ends if p < page), default=None)
+        after = self._page_ends[known] if known is not None else None
+        skip = (page - (known + 1 if known is not None else 0)) * PAGE_SIZE
+        try:
+            rows = self.repository.list_users(search=search, role=role, limit=PAGE_SIZE, offset=skip, after=after)
+        except Exception as e:
+            logging.error(f"Failed to load users page {page}: {e}", exc_info=True)
+            return []
+        if len(rows) == PAGE_SIZE:
+            self._page_ends[page] = rows[-1]["username"]
+        return rows
+
+    def _scroll_to(self, index):
+        visible = self._visible_rows()
+        index = max(0, min(int(index), max(0, self.total - visible)))
+        if index != self.first_index:
+            self.first_index = index
+            self._render()
+
+    def _render(self):
+        if self.query is None:
+            return
+        visible = self._visible_rows()
+        self.first_index = max(0, min(self.first_index, max(0, self.total - visible)))
+        # Grow the row pool to fit the visible area (one spare for a partially shown row)
+        while len(self._rows) < visible + 1:
+            self._rows.append(_UserRow(self))
+        current = self.current_username()
+        for slot, row in enumerate(self._rows):
+            user = self._user_at(self.first_index + slot) if self.first_index + slot < self.total else None
+            if user is None:
+                row.hide()
+            else:
+                row.show(user, slot, deletable=user["username"] != current)
+        if self.total:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, rely=0.3, anchor="center")
+        if self.total > visible:
+            self.scrollbar.set(self.first_index / self.total, (self.first_index + visible) / self.total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(float(amount) * self.total)
+        elif action == "scroll":
+            step = self._visible_rows() if unit == "pages" else 1
+            self.scroll_rows(int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch; macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_rows(-3 * notches)